@@ -11,22 +11,22 @@ an "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express o
 specific language governing permissions and limitations under the License.
 """
 
-"""
-API 模块用于向外暴露接口，bamboo-engine 的使用者应该永远只用这个模块与 bamboo-engien 进行交互
-"""
+# API 模块用于向外暴露接口，bamboo-engine 的使用者应该永远只用这个模块与 bamboo-engien 进行交互
 
 import logging
 import functools
 import traceback
+from datetime import datetime
 from typing import Optional, Any, List
 from contextlib import contextmanager
 
 from .utils.object import Representable
-from .eri import EngineRuntimeInterface, ContextValue
+from .eri import EngineRuntimeInterface, ContextValue, StateSnapshot
 from .engine import Engine
 from .template import Template
 from .context import Context
 from .utils.constants import VAR_CONTEXT_MAPPING
+from .exceptions import NotFoundError
 
 logger = logging.getLogger("bamboo_engine")
 
@@ -282,7 +282,7 @@ def get_pipeline_states(runtime: EngineRuntimeInterface, root_id: str, flat_chil
     :return: 执行结果
     :rtype: EngineAPIResult
     """
-    states = runtime.get_state_by_root(root_id)
+    states = runtime.get_state_by_root(root_id) or runtime.get_archived_state_by_root(root_id)
     if not states:
         return {}
 
@@ -340,6 +340,49 @@ def get_pipeline_states(runtime: EngineRuntimeInterface, root_id: str, flat_chil
     return state_tree
 
 
+def _format_state_snapshot(snapshot: StateSnapshot) -> dict:
+    return {
+        "fields": list(StateSnapshot.FIELDS),
+        "states": snapshot.rows,
+        "cursor": snapshot.cursor,
+    }
+
+
+@_ensure_return_api_result
+def get_pipeline_states_snapshot(runtime: EngineRuntimeInterface, root_id: str) -> EngineAPIResult:
+    """
+    以紧凑的形式返回某个任务中所有节点的状态，每个节点的状态为一个与 fields 顺序一致的元组
+
+    :param runtime: 引擎运行时实例
+    :type runtime: EngineRuntimeInterface
+    :param root_id: 根节点 ID
+    :type root_id: str
+    :return: 执行结果
+    :rtype: EngineAPIResult
+    """
+    return _format_state_snapshot(runtime.get_state_snapshot_by_root(root_id))
+
+
+@_ensure_return_api_result
+def get_pipeline_states_since(
+    runtime: EngineRuntimeInterface, root_id: str, cursor: Optional[datetime] = None
+) -> EngineAPIResult:
+    """
+    以紧凑的形式返回某个任务中自上次获取后发生过变化的节点的状态，返回的 cursor 用于下一次获取，
+    增量结果是尽力而为的，可能遗漏提交较晚的更新且不包含被删除的节点，需要定期传入 cursor=None 获取全量状态校正
+
+    :param runtime: 引擎运行时实例
+    :type runtime: EngineRuntimeInterface
+    :param root_id: 根节点 ID
+    :type root_id: str
+    :param cursor: 上一次获取时返回的 cursor，为 None 时返回所有节点的状态
+    :type cursor: Optional[datetime]
+    :return: 执行结果
+    :rtype: EngineAPIResult
+    """
+    return _format_state_snapshot(runtime.get_state_snapshot_by_root_since(root_id, cursor))
+
+
 @_ensure_return_api_result
 def get_children_states(runtime: EngineRuntimeInterface, node_id: str) -> EngineAPIResult:
     """
@@ -438,7 +481,12 @@ def get_execution_data(runtime: EngineRuntimeInterface, node_id: str) -> EngineA
     :return: 执行结果
     :rtype: EngineAPIResult
     """
-    data = runtime.get_execution_data(node_id)
+    try:
+        data = runtime.get_execution_data(node_id)
+    except NotFoundError:
+        data = runtime.get_archived_execution_data(node_id)
+        if data is None:
+            raise
     return {"inputs": data.inputs, "outputs": data.outputs}
 
 
@@ -461,6 +509,14 @@ def get_data(runtime: EngineRuntimeInterface, node_id: str) -> EngineAPIResult:
     }
 
 
+def _get_histories_or_archived(runtime: EngineRuntimeInterface, get_histories, node_id: str, loop: int) -> list:
+    histories = get_histories(node_id, loop)
+    # 只有节点所属流程已经归档时才读取归档数据，避免没有历史的热数据节点每次都访问归档
+    if not histories and runtime.is_node_archived(node_id):
+        histories = runtime.get_archived_histories(node_id, loop)
+    return histories
+
+
 @_ensure_return_api_result
 def get_node_histories(runtime: EngineRuntimeInterface, node_id: str, loop: int = -1) -> EngineAPIResult:
     """
@@ -487,7 +543,7 @@ def get_node_histories(runtime: EngineRuntimeInterface, node_id: str, loop: int
             "inputs": h.inputs,
             "outputs": h.outputs,
         }
-        for h in runtime.get_histories(node_id, loop)
+        for h in _get_histories_or_archived(runtime, runtime.get_histories, node_id, loop)
     ]
 
 
@@ -515,7 +571,7 @@ def get_node_short_histories(runtime: EngineRuntimeInterface, node_id: str, loop
             "skip": h.skip,
             "version": h.version,
         }
-        for h in runtime.get_short_histories(node_id, loop)
+        for h in _get_histories_or_archived(runtime, runtime.get_short_histories, node_id, loop)
     ]
 
 
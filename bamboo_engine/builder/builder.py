@@ -11,8 +11,7 @@ an "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express o
 specific language governing permissions and limitations under the License.
 """
 
-import copy
-import queue
+from collections import deque
 
 from bamboo_engine.utils.string import unique_id
 
@@ -22,16 +21,6 @@ from .flow.event import ExecutableEndEvent
 
 __all__ = ["build_tree"]
 
-__skeleton = {
-    "id": None,
-    "start_event": None,
-    "end_event": None,
-    "activities": {},
-    "gateways": {},
-    "flows": {},
-    "data": {"inputs": {}, "outputs": []},
-}
-
 __node_type = {
     "ServiceActivity": "activities",
     "SubProcess": "activities",
@@ -60,17 +49,36 @@ __multiple_incoming_type = {
 __incoming = "__incoming"
 
 
-def build_tree(start_elem, id=None, data=None):
-    tree = copy.deepcopy(__skeleton)
-    elem_queue = queue.Queue()
+def build_tree(start_elem, id=None, data=None, id_generator=None):
+    """
+    从开始节点出发构造流程描述
+
+    :param start_elem: 开始节点
+    :param id: 流程 ID，为空时自动生成
+    :param data: 流程数据
+    :param id_generator: 连线及流程 ID 的生成函数，接收单字符前缀并返回 ID，默认为 unique_id；
+        批量构造大量流程时可以传入 UniqueIdGenerator 实例，避免每个 ID 都调用 uuid4
+    :return: 流程描述
+    """
+    id_generator = id_generator or unique_id
+    tree = {
+        "id": None,
+        "start_event": None,
+        "end_event": None,
+        "activities": {},
+        "gateways": {},
+        "flows": {},
+        "data": {"inputs": {}, "outputs": []},
+    }
+    elem_queue = deque()
     processed_elem = set()
 
     tree[__incoming] = {}
-    elem_queue.put(start_elem)
+    elem_queue.append(start_elem)
 
-    while not elem_queue.empty():
+    while elem_queue:
         # get elem
-        elem = elem_queue.get()
+        elem = elem_queue.popleft()
 
         # update node when we meet again
         if elem.id in processed_elem:
@@ -78,17 +86,16 @@ def build_tree(start_elem, id=None, data=None):
             continue
 
         # add to queue
-        for e in elem.outgoing:
-            elem_queue.put(e)
+        elem_queue.extend(elem.outgoing)
 
         # mark as processed
         processed_elem.add(elem.id)
 
         # tree grow
-        __grow(tree, elem)
+        __grow(tree, elem, id_generator)
 
     del tree[__incoming]
-    tree["id"] = id or unique_id("p")
+    tree["id"] = id or id_generator("p")
     user_data = data.to_dict() if isinstance(data, Data) else data
     tree["data"] = user_data or tree["data"]
     return tree
@@ -100,13 +107,15 @@ def __update(tree, elem):
     node["incoming"] = tree[__incoming][elem.id]
 
 
-def __grow(tree, elem):
-    if elem.type() in __start_elem:
-        outgoing = unique_id("f")
+def __grow(tree, elem, id_generator):
+    elem_type = elem.type()
+
+    if elem_type in __start_elem:
+        outgoing = id_generator("f")
         tree["start_event"] = {
             "incoming": "",
             "outgoing": outgoing,
-            "type": elem.type(),
+            "type": elem_type,
             "id": elem.id,
             "name": elem.name,
         }
@@ -114,22 +123,22 @@ def __grow(tree, elem):
         next_elem = elem.outgoing[0]
         __grow_flow(tree, outgoing, elem, next_elem)
 
-    elif elem.type() in __end_elem or isinstance(elem, ExecutableEndEvent):
+    elif elem_type in __end_elem or isinstance(elem, ExecutableEndEvent):
         tree["end_event"] = {
             "incoming": tree[__incoming][elem.id],
             "outgoing": "",
-            "type": elem.type(),
+            "type": elem_type,
             "id": elem.id,
             "name": elem.name,
         }
 
-    elif elem.type() == "ServiceActivity":
-        outgoing = unique_id("f")
+    elif elem_type == "ServiceActivity":
+        outgoing = id_generator("f")
 
         tree["activities"][elem.id] = {
             "incoming": tree[__incoming][elem.id],
             "outgoing": outgoing,
-            "type": elem.type(),
+            "type": elem_type,
             "id": elem.id,
             "name": elem.name,
             "error_ignorable": elem.error_ignorable,
@@ -143,8 +152,8 @@ def __grow(tree, elem):
         next_elem = elem.outgoing[0]
         __grow_flow(tree, outgoing, elem, next_elem)
 
-    elif elem.type() == "SubProcess":
-        outgoing = unique_id("f")
+    elif elem_type == "SubProcess":
+        outgoing = id_generator("f")
 
         subprocess_param = (
             elem.params.to_dict() if isinstance(elem.params, Params) else elem.params
@@ -155,12 +164,12 @@ def __grow(tree, elem):
             "incoming": tree[__incoming][elem.id],
             "name": elem.name,
             "outgoing": outgoing,
-            "type": elem.type(),
+            "type": elem_type,
             "params": subprocess_param,
         }
 
         subprocess["pipeline"] = build_tree(
-            start_elem=elem.start, id=elem.id, data=elem.data
+            start_elem=elem.start, id=elem.id, data=elem.data, id_generator=id_generator
         )
 
         tree["activities"][elem.id] = subprocess
@@ -168,28 +177,28 @@ def __grow(tree, elem):
         next_elem = elem.outgoing[0]
         __grow_flow(tree, outgoing, elem, next_elem)
 
-    elif elem.type() == "ParallelGateway":
-        outgoing = [unique_id("f") for _ in range(len(elem.outgoing))]
+    elif elem_type == "ParallelGateway":
+        outgoing = [id_generator("f") for _ in elem.outgoing]
 
         tree["gateways"][elem.id] = {
             "id": elem.id,
             "incoming": tree[__incoming][elem.id],
             "outgoing": outgoing,
-            "type": elem.type(),
+            "type": elem_type,
             "name": elem.name,
         }
 
         for i, next_elem in enumerate(elem.outgoing):
             __grow_flow(tree, outgoing[i], elem, next_elem)
 
-    elif elem.type() in {"ExclusiveGateway", "ConditionalParallelGateway"}:
-        outgoing = [unique_id("f") for _ in range(len(elem.outgoing))]
+    elif elem_type in {"ExclusiveGateway", "ConditionalParallelGateway"}:
+        outgoing = [id_generator("f") for _ in elem.outgoing]
 
         tree["gateways"][elem.id] = {
             "id": elem.id,
             "incoming": tree[__incoming][elem.id],
             "outgoing": outgoing,
-            "type": elem.type(),
+            "type": elem_type,
             "name": elem.name,
             "conditions": elem.link_conditions_with(outgoing),
         }
@@ -197,14 +206,14 @@ def __grow(tree, elem):
         for i, next_elem in enumerate(elem.outgoing):
             __grow_flow(tree, outgoing[i], elem, next_elem)
 
-    elif elem.type() == "ConvergeGateway":
-        outgoing = unique_id("f")
+    elif elem_type == "ConvergeGateway":
+        outgoing = id_generator("f")
 
         tree["gateways"][elem.id] = {
             "id": elem.id,
             "incoming": tree[__incoming][elem.id],
             "outgoing": outgoing,
-            "type": elem.type(),
+            "type": elem_type,
             "name": elem.name,
         }
 
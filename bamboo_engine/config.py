@@ -65,4 +65,14 @@ class Settings:
 
     MAKO_SANDBOX_IMPORT_MODULES = {}
 
+    MAKO_TEMPLATE_CACHE_SIZE = 4096
+
+    # 条件表达式编译结果缓存的最大条目数
+    BOOLRULE_COMPILED_CACHE_SIZE = 4096
+
+    PIPELINE_PLAN_CACHE_SIZE = 1024
+
+    # 用于并行校验子流程的 concurrent.futures.Executor，为 None 时串行校验
+    PIPELINE_VALIDATE_EXECUTOR = None
+
     RERUN_INDEX_OFFSET = 0
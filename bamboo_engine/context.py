@@ -11,13 +11,13 @@ an "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express o
 specific language governing permissions and limitations under the License.
 """
 
-"""
-流程上下文相关逻辑封装模块
-"""
+# 流程上下文相关逻辑封装模块
 
 import logging
+from collections import deque
+from collections.abc import Mapping
 from weakref import WeakValueDictionary
-from typing import List, Dict, Any
+from typing import List, Dict, Any, Optional, Set, Tuple, Callable, Iterator
 
 from bamboo_engine.eri import (
     ContextValue,
@@ -26,6 +26,7 @@ from bamboo_engine.eri import (
     Variable,
     ContextValueType,
 )
+from .exceptions import ReferenceCycleError
 from .template.template import Template
 from .utils.string import format_var_key, deformat_var_key
 
@@ -50,12 +51,23 @@ class SpliceVariable(Variable):
     模板类型变量，会尝试在流程上下文中解析变量中定义的模板
     """
 
-    def __init__(self, key: str, value: Any, pool: WeakValueDictionary):
+    def __init__(self, key: str, value: Any, pool: WeakValueDictionary, resolved: Optional[dict] = None):
+        """
+
+        :param key: 变量 key
+        :type key: str
+        :param value: 变量值
+        :type value: Any
+        :param pool: 变量池
+        :type pool: WeakValueDictionary
+        :param resolved: 已解析变量值字典，引用的变量存在于其中时直接使用该值，不再重复解析, defaults to None
+        :type resolved: Optional[dict], optional
+        """
         self.key = key
         self.value = value
         self.pool = pool
+        self.resolved = resolved
         self.refs = [k for k in Template(value).get_reference()]
-        import pdb
 
     def get(self):
         context = {}
@@ -63,6 +75,10 @@ class SpliceVariable(Variable):
             if r not in self.pool:
                 continue
 
+            if self.resolved is not None and r in self.resolved:
+                context[deformat_var_key(r)] = self.resolved[r]
+                continue
+
             var = self.pool[r]
             if issubclass(var.__class__, Variable):
                 var = var.get()
@@ -100,46 +116,165 @@ class Context:
         self.pool = WeakValueDictionary()
         self.variables = {}
         self.additional_data = additional_data
+        # 变量引用的其他变量 key，用于在 hydrate 时按照依赖顺序解析变量
+        self.references = {}
+        # hydrate 过程中已解析的变量值，保证每个变量只会被解析一次
+        self.resolved = {}
 
         # 将上下文数据转换成变量，变量内封装了自身解析的逻辑，且实现了 Variable 接口
         for v in self.values:
             if v.type is ContextValueType.PLAIN:
                 self.variables[v.key] = PlainVariable(key=v.key, value=v.value)
             elif v.type is ContextValueType.SPLICE:
-                self.variables[v.key] = SpliceVariable(key=v.key, value=v.value, pool=self.pool)
+                self.variables[v.key] = SpliceVariable(
+                    key=v.key, value=v.value, pool=self.pool, resolved=self.resolved
+                )
+                self.references[v.key] = self.variables[v.key].refs
             elif v.type is ContextValueType.COMPUTE:
+                value = SpliceVariable(key=v.key, value=v.value, pool=self.pool, resolved=self.resolved)
                 self.variables[v.key] = self.runtime.get_compute_variable(
                     code=v.code,
                     key=v.key,
-                    value=SpliceVariable(key=v.key, value=v.value, pool=self.pool),
+                    value=value,
                     additional_data=self.additional_data,
                 )
+                self.references[v.key] = value.refs
 
         for k, var in self.variables.items():
             self.pool[k] = var
 
+    def _resolve_order(self) -> Tuple[List[str], Set[str]]:
+        """
+        根据变量间的引用关系对变量池中的变量进行拓扑排序
+
+        :return: 按照依赖顺序排列的变量 key 列表，以及处于循环引用中或依赖了循环引用的变量 key 集合
+        :rtype: Tuple[List[str], Set[str]]
+        """
+        keys = list(self.pool.keys())
+        in_degree = {k: 0 for k in keys}
+        dependents = {}
+        for k in keys:
+            for ref in set(self.references.get(k, [])):
+                if ref not in in_degree:
+                    continue
+                in_degree[k] += 1
+                dependents.setdefault(ref, []).append(k)
+
+        queue = deque([k for k in keys if in_degree[k] == 0])
+        order = []
+        while queue:
+            k = queue.popleft()
+            order.append(k)
+            for dependent in dependents.get(k, []):
+                in_degree[dependent] -= 1
+                if in_degree[dependent] == 0:
+                    queue.append(dependent)
+
+        return order, {k for k in keys if in_degree[k] > 0}
+
     def hydrate(self, deformat=False, mute_error=False) -> Dict[str, Any]:
         """
         将当前上下文中的数据清洗成 Dict[str, Any] 类型的朴素数据，过程中会进行变量引用的分析和替换
 
+        变量会按照引用关系的拓扑顺序进行解析，每次 hydrate 过程中每个变量只会被解析一次
+
         :param deformat: 是否将返回字典中的 key 值从 ${%s} 替换为 %s
         :type deformat: bool, optional
+        :param mute_error: 是否忽略变量解析过程中的异常
+        :type mute_error: bool, optional
         :return: 上下文数据朴素值字典
         :rtype: Dict[str, Any]
         """
         key_formatter = deformat_var_key if deformat else _raw_key
-        hydrated = {}
+        values = {}
+
+        order, cycle_keys = self._resolve_order()
+        if cycle_keys:
+            e = ReferenceCycleError(
+                cycle_keys, "circular reference detected in context variables: %s" % ", ".join(sorted(cycle_keys))
+            )
+            if not mute_error:
+                raise e
+            logger.error(str(e))
+            for key in cycle_keys:
+                values[key] = str(e)
+
+        self.resolved.clear()
+        try:
+            for key in order:
+                try:
+                    values[key] = self.resolved[key] = self.pool[key].get()
+                except Exception as e:
+                    if not mute_error:
+                        raise e
+                    logger.exception("%s get error." % key)
+                    values[key] = str(e)
+        finally:
+            self.resolved.clear()
+
+        return {key_formatter(key): values[key] for key in self.pool.keys()}
+
+    def _resolve(self, key: str) -> Any:
+        """
+        解析单个变量的值，会先按照依赖顺序解析其引用的尚未解析的变量，解析结果记录在 resolved 中
 
-        for key, var in self.pool.items():
-            try:
-                hydrated[key_formatter(key)] = var.get()
-            except Exception as e:
-                if not mute_error:
-                    raise e
-                logger.exception("%s get error." % key)
-                hydrated[key_formatter(key)] = str(e)
+        :param key: 变量 key
+        :type key: str
+        :raises ReferenceCycleError: 变量引用中存在环时抛出
+        :return: 变量值
+        :rtype: Any
+        """
+        if key in self.resolved:
+            return self.resolved[key]
+
+        # 迭代进行后序深度优先遍历，避免变量引用链过深时超出递归深度限制
+        order = []
+        visited = set()
+        stack = [(key, iter(set(self.references.get(key, []))))]
+        path = [key]
+        while stack:
+            current, refs = stack[-1]
+            for ref in refs:
+                if ref not in self.pool or ref in self.resolved or ref in visited:
+                    continue
+                if ref in path:
+                    cycle_keys = set(path[path.index(ref) :])
+                    raise ReferenceCycleError(
+                        cycle_keys,
+                        "circular reference detected in context variables: %s" % ", ".join(sorted(cycle_keys)),
+                    )
+                stack.append((ref, iter(set(self.references.get(ref, [])))))
+                path.append(ref)
+                break
+            else:
+                stack.pop()
+                path.pop()
+                visited.add(current)
+                order.append(current)
 
-        return hydrated
+        for k in order:
+            self.resolved[k] = self.pool[k].get()
+
+        return self.resolved[key]
+
+    def lazy_hydrate(
+        self, deformat: bool = False, mute_error: bool = False, transform: Optional[Callable[[Any], Any]] = None
+    ) -> "LazyHydratedContext":
+        """
+        获取按需解析的上下文数据映射，只有被读取的变量及其依赖的变量会被解析
+
+        同一个上下文对象中的变量只会被解析一次，调用 hydrate 会清空已解析的结果
+
+        :param deformat: 是否将映射中的 key 值从 ${%s} 替换为 %s
+        :type deformat: bool, optional
+        :param mute_error: 是否忽略变量解析过程中的异常
+        :type mute_error: bool, optional
+        :param transform: 对解析后的变量值进行的转换
+        :type transform: Optional[Callable[[Any], Any]], optional
+        :return: 按需解析的上下文数据映射
+        :rtype: LazyHydratedContext
+        """
+        return LazyHydratedContext(self, deformat=deformat, mute_error=mute_error, transform=transform)
 
     def extract_outputs(
         self,
@@ -169,3 +304,76 @@ class Context:
             )
 
         self.runtime.upsert_plain_context_values(pipeline_id=pipeline_id, update=update)
+
+
+class LazyHydratedContext(Mapping):
+    """
+    按需解析的上下文数据映射，读取某个 key 时才会解析对应的变量，解析结果会被缓存
+    """
+
+    def __init__(
+        self,
+        context: Context,
+        deformat: bool = False,
+        mute_error: bool = False,
+        transform: Optional[Callable[[Any], Any]] = None,
+    ):
+        """
+
+        :param context: 流程执行上下文
+        :type context: Context
+        :param deformat: 是否将映射中的 key 值从 ${%s} 替换为 %s
+        :type deformat: bool, optional
+        :param mute_error: 是否忽略变量解析过程中的异常
+        :type mute_error: bool, optional
+        :param transform: 对解析后的变量值进行的转换
+        :type transform: Optional[Callable[[Any], Any]], optional
+        """
+        key_formatter = deformat_var_key if deformat else _raw_key
+        self.context = context
+        self.mute_error = mute_error
+        self.transform = transform
+        self._keys = {key_formatter(key): key for key in context.pool.keys()}
+        self._values = {}
+
+    def __getitem__(self, key: str) -> Any:
+        if key in self._values:
+            return self._values[key]
+
+        raw_key = self._keys[key]
+        try:
+            value = self.context._resolve(raw_key)
+        except Exception as e:
+            if not self.mute_error:
+                raise e
+            logger.exception("%s get error." % raw_key)
+            value = str(e)
+
+        if self.transform is not None:
+            value = self.transform(value)
+        self._values[key] = value
+        return value
+
+    def __contains__(self, key: Any) -> bool:
+        return key in self._keys
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self._keys)
+
+    def __len__(self) -> int:
+        return len(self._keys)
+
+    def __repr__(self) -> str:
+        return "LazyHydratedContext(loaded=%s, pending=%s)" % (
+            self._values,
+            [key for key in self._keys if key not in self._values],
+        )
+
+    def loaded(self) -> Dict[str, Any]:
+        """
+        获取已经解析过的变量值
+
+        :return: 已解析的上下文数据朴素值字典
+        :rtype: Dict[str, Any]
+        """
+        return dict(self._values)
@@ -23,6 +23,7 @@ from contextlib import contextmanager
 
 from . import states
 from . import validator
+from .config import Settings
 from .local import set_node_info, CurrentNodeInfo
 from .exceptions import InvalidOperationError, NotFoundError, StateVersionNotMatchError
 from .handler import HandlerFactory
@@ -86,7 +87,7 @@ class Engine:
         root_pipeline_context = {} if root_pipeline_context is None else root_pipeline_context
         subprocess_context = {} if subprocess_context is None else subprocess_context
         cycle_tolerate = options.get("cycle_tolerate", False)
-        validator.validate_and_process_pipeline(pipeline, cycle_tolerate)
+        validator.validate_and_process_pipeline(pipeline, cycle_tolerate, executor=Settings.PIPELINE_VALIDATE_EXECUTOR)
 
         self.runtime.pre_prepare_run_pipeline(
             pipeline, root_pipeline_data, root_pipeline_context, subprocess_context, **options
@@ -454,214 +455,242 @@ class Engine:
         """
 
         process_info = self.runtime.get_process_info(process_id)
-        self.runtime.wake_up(process_id)
 
-        current_node_id = node_id
-
-        # 推进循环
-        while True:
-            # 进程心跳
-            self.runtime.beat(process_id)
+        # 流程数据尚未准备完成（例如流式准备过程中断）的进程不能开始推进
+        if not process_info.ready:
+            logger.warning(
+                "[%s] process %s is not ready, execute at node %s is ignored",
+                process_info.root_pipeline_id,
+                process_id,
+                node_id,
+            )
+            return
 
-            # 遇到推进终点后需要尝试唤醒父进程
-            if current_node_id == process_info.destination_id:
-                self.runtime.die(process_id)
-                wake_up_seccess = self.runtime.child_process_finish(process_info.parent_id, process_id)
+        # 推进循环中的进程数据写操作可以由运行时缓冲合并，在进程让出前统一写入
+        # 推进循环中连续执行的节点可以复用运行时中的上下文快照
+        with self.runtime.process_write_behind(process_id), self.runtime.context_snapshot(process_id):
+            self.runtime.wake_up(process_id)
 
-                if wake_up_seccess:
-                    self.runtime.execute(process_info.parent_id, process_info.destination_id)
+            current_node_id = node_id
 
-                return
+            # 推进循环
+            while True:
+                # 进程心跳
+                self.runtime.beat(process_id)
 
-            try:
+                # 遇到推进终点后需要尝试唤醒父进程
+                if current_node_id == process_info.destination_id:
+                    self.runtime.die(process_id)
+                    self.runtime.flush_process_buffer(process_id)
+                    wake_up_seccess = self.runtime.child_process_finish(process_info.parent_id, process_id)
 
-                self.runtime.set_current_node(process_id, current_node_id)
+                    if wake_up_seccess:
+                        self.runtime.execute(process_info.parent_id, process_info.destination_id)
 
-                # 冻结检测
-                if self.runtime.is_frozen(process_id):
-                    self.runtime.freeze(process_id)
                     return
 
-                node_state_map = self.runtime.batch_get_state_name(process_info.pipeline_stack)
+                try:
 
-                # 检测根流程是否被撤销
-                if node_state_map[process_info.root_pipeline_id] == states.REVOKED:
-                    self.runtime.die(process_id)
-                    logger.info(
-                        "[%s] root pipeline revoked checked at node %s", process_info.root_pipeline_id, current_node_id,
-                    )
-                    return
+                    self.runtime.set_current_node(process_id, current_node_id)
 
-                # 检测流程栈中是否有被暂停的流程
-                for pid in process_info.pipeline_stack:
-                    if node_state_map[pid] == states.SUSPENDED:
-                        logger.info(
-                            "[%s] process %s suspended by subprocess %s",
-                            process_info.root_pipeline_id,
-                            process_id,
-                            pid,
-                        )
-                        self.runtime.suspend(process_id, pid)
+                    # 冻结检测
+                    if self.runtime.is_frozen(process_id):
+                        # 让出前写入缓冲的当前节点，恢复等操作需要根据当前节点找到进程
+                        self.runtime.flush_process_buffer(process_id)
+                        self.runtime.freeze(process_id)
                         return
 
-                node = self.runtime.get_node(current_node_id)
-                node_state = self.runtime.get_state_or_none(current_node_id)
-                loop = 1
-                inner_loop = 1
-                reset_mark_bit = False
-
-                if node_state:
-                    rerun_limit = self.runtime.node_rerun_limit(process_info.root_pipeline_id, current_node_id)
-                    # 重入次数超过限制
-                    if (
-                        node_state.name == states.FINISHED
-                        and node.type != NodeType.SubProcess
-                        and node_state.loop > rerun_limit
-                    ):
-                        exec_outputs = self.runtime.get_execution_data_outputs(current_node_id)
-                        exec_outputs["ex_data"] = "node execution exceed rerun limit {}".format(rerun_limit)
-
-                        self.runtime.set_execution_data_outputs(current_node_id, exec_outputs)
-                        self.runtime.set_state(
-                            node_id=current_node_id, to_state=states.FAILED, set_archive_time=True,
-                        )
-                        self.runtime.sleep(process_id)
-
-                        return
+                    node_state_map = self.runtime.batch_get_state_name(process_info.pipeline_stack)
 
-                    # 检测节点是否被预约暂停
-                    if node_state.name == states.SUSPENDED:
-                        # 预约暂停的节点在预约时获取不到 root_id 和 parent_id，故在此进行设置
-                        self.runtime.set_state_root_and_parent(
-                            node_id=current_node_id,
-                            root_id=process_info.root_pipeline_id,
-                            parent_id=process_info.top_pipeline_id,
-                        )
-                        self.runtime.suspend(process_id, current_node_id)
+                    # 检测根流程是否被撤销
+                    if node_state_map[process_info.root_pipeline_id] == states.REVOKED:
+                        self.runtime.die(process_id)
                         logger.info(
-                            "[%s] process %s suspended by node %s",
+                            "[%s] root pipeline revoked checked at node %s",
                             process_info.root_pipeline_id,
-                            process_id,
                             current_node_id,
                         )
                         return
 
-                    # 设置状态前检测
-                    if node_state.name not in states.INVERTED_TRANSITION[states.RUNNING]:
-                        self.runtime.sleep(process_id)
-                        return
-
-                    if node_state.name == states.FINISHED:
-                        loop = node_state.loop + 1
-                        inner_loop = node_state.inner_loop + 1
-                        reset_mark_bit = True
-
-                    # 重入前记录历史
-                    if (
-                        node.type in {NodeType.SubProcess, NodeType.ServiceActivity}
-                        and node_state.name == states.FINISHED
-                    ):
-                        self._add_history(node_id=current_node_id, state=node_state)
-
-                version = self.runtime.set_state(
-                    node_id=current_node_id,
-                    to_state=states.RUNNING,
-                    loop=loop,
-                    inner_loop=inner_loop,
-                    root_id=process_info.root_pipeline_id,
-                    parent_id=process_info.top_pipeline_id,
-                    set_started_time=True,
-                    reset_skip=reset_mark_bit,
-                    reset_retry=reset_mark_bit,
-                    reset_error_ignored=reset_mark_bit,
-                    refresh_version=reset_mark_bit,
-                )
-
-                logger.info(
-                    "[%s] before execute %s(%s) state: %s",
-                    process_info.root_pipeline_id,
-                    node.__class__.__name__,
-                    current_node_id,
-                    node_state,
-                )
-                handler = HandlerFactory.get_handler(node, self.runtime)
-                set_node_info(CurrentNodeInfo(node_id=current_node_id, version=version, loop=loop))
-                type_label = self._get_metrics_node_type(node)
-                execute_start = time.time()
-                execute_result = handler.execute(process_info, loop, inner_loop, version)
-                ENGINE_NODE_EXECUTE_TIME.labels(type_label).observe(time.time() - execute_start)
-
-                # 进程是否要进入睡眠
-                if execute_result.should_sleep:
-                    self.runtime.sleep(process_id)
-
-                # 节点是否准备好进入调度
-                if execute_result.schedule_ready:
-                    schedule = self.runtime.set_schedule(
-                        process_id=process_id,
+                    # 检测流程栈中是否有被暂停的流程
+                    for pid in process_info.pipeline_stack:
+                        if node_state_map[pid] == states.SUSPENDED:
+                            logger.info(
+                                "[%s] process %s suspended by subprocess %s",
+                                process_info.root_pipeline_id,
+                                process_id,
+                                pid,
+                            )
+                            self.runtime.flush_process_buffer(process_id)
+                            self.runtime.suspend(process_id, pid)
+                            return
+
+                    node = self.runtime.get_node(current_node_id)
+                    node_state = self.runtime.get_state_or_none(current_node_id)
+                    loop = 1
+                    inner_loop = 1
+                    reset_mark_bit = False
+
+                    if node_state:
+                        rerun_limit = self.runtime.node_rerun_limit(process_info.root_pipeline_id, current_node_id)
+                        # 重入次数超过限制
+                        if (
+                            node_state.name == states.FINISHED
+                            and node.type != NodeType.SubProcess
+                            and node_state.loop > rerun_limit
+                        ):
+                            self.runtime.flush_process_buffer(process_id)
+                            exec_outputs = self.runtime.get_execution_data_outputs(current_node_id)
+                            exec_outputs["ex_data"] = "node execution exceed rerun limit {}".format(rerun_limit)
+
+                            self.runtime.set_execution_data_outputs(current_node_id, exec_outputs)
+                            self.runtime.set_state(
+                                node_id=current_node_id, to_state=states.FAILED, set_archive_time=True,
+                            )
+                            self.runtime.sleep(process_id)
+
+                            return
+
+                        # 检测节点是否被预约暂停
+                        if node_state.name == states.SUSPENDED:
+                            # 预约暂停的节点在预约时获取不到 root_id 和 parent_id，故在此进行设置
+                            self.runtime.set_state_root_and_parent(
+                                node_id=current_node_id,
+                                root_id=process_info.root_pipeline_id,
+                                parent_id=process_info.top_pipeline_id,
+                            )
+                            self.runtime.flush_process_buffer(process_id)
+                            self.runtime.suspend(process_id, current_node_id)
+                            logger.info(
+                                "[%s] process %s suspended by node %s",
+                                process_info.root_pipeline_id,
+                                process_id,
+                                current_node_id,
+                            )
+                            return
+
+                        # 设置状态前检测
+                        if node_state.name not in states.INVERTED_TRANSITION[states.RUNNING]:
+                            self.runtime.sleep(process_id)
+                            return
+
+                        if node_state.name == states.FINISHED:
+                            loop = node_state.loop + 1
+                            inner_loop = node_state.inner_loop + 1
+                            reset_mark_bit = True
+
+                        # 重入前记录历史
+                        if (
+                            node.type in {NodeType.SubProcess, NodeType.ServiceActivity}
+                            and node_state.name == states.FINISHED
+                        ):
+                            self._add_history(node_id=current_node_id, state=node_state)
+
+                    version = self.runtime.set_state(
                         node_id=current_node_id,
-                        version=version,
-                        schedule_type=execute_result.schedule_type,
+                        to_state=states.RUNNING,
+                        loop=loop,
+                        inner_loop=inner_loop,
+                        root_id=process_info.root_pipeline_id,
+                        parent_id=process_info.top_pipeline_id,
+                        set_started_time=True,
+                        reset_skip=reset_mark_bit,
+                        reset_retry=reset_mark_bit,
+                        reset_error_ignored=reset_mark_bit,
+                        refresh_version=reset_mark_bit,
                     )
-                    if execute_result.schedule_type == ScheduleType.POLL:
-                        self.runtime.schedule(process_id, current_node_id, schedule.id)
-                # 是否有待调度的子进程
-                elif execute_result.dispatch_processes:
-                    children = [d.process_id for d in execute_result.dispatch_processes]
+
                     logger.info(
-                        "[%s] %s dispatch %s children: %s",
+                        "[%s] before execute %s(%s) state: %s",
                         process_info.root_pipeline_id,
-                        process_info.top_pipeline_id,
-                        len(execute_result.dispatch_processes),
-                        execute_result.dispatch_processes,
+                        node.__class__.__name__,
+                        current_node_id,
+                        node_state,
                     )
-                    self.runtime.join(process_id, children)
-                    for d in execute_result.dispatch_processes:
-                        self.runtime.execute(d.process_id, d.node_id)
+                    # 服务节点的执行可能耗时较长，执行前需要保证进程数据已写入，以便强制失败等操作能够找到当前进程
+                    if node.type == NodeType.ServiceActivity:
+                        self.runtime.flush_process_buffer(process_id)
+
+                    handler = HandlerFactory.get_handler(node, self.runtime)
+                    set_node_info(CurrentNodeInfo(node_id=current_node_id, version=version, loop=loop))
+                    type_label = self._get_metrics_node_type(node)
+                    execute_start = time.time()
+                    execute_result = handler.execute(process_info, loop, inner_loop, version)
+                    ENGINE_NODE_EXECUTE_TIME.labels(type_label).observe(time.time() - execute_start)
+
+                    # 进程是否要进入睡眠
+                    if execute_result.should_sleep:
+                        self.runtime.sleep(process_id)
+                        # 在派发调度或子进程前写入缓冲的进程数据，避免覆盖其他 worker 对进程的修改
+                        self.runtime.flush_process_buffer(process_id)
 
-                if execute_result.should_die:
-                    self.runtime.die(process_id)
+                    # 节点是否准备好进入调度
+                    if execute_result.schedule_ready:
+                        schedule = self.runtime.set_schedule(
+                            process_id=process_id,
+                            node_id=current_node_id,
+                            version=version,
+                            schedule_type=execute_result.schedule_type,
+                        )
+                        if execute_result.schedule_type == ScheduleType.POLL:
+                            self.runtime.schedule(process_id, current_node_id, schedule.id)
+                    # 是否有待调度的子进程
+                    elif execute_result.dispatch_processes:
+                        children = [d.process_id for d in execute_result.dispatch_processes]
+                        logger.info(
+                            "[%s] %s dispatch %s children: %s",
+                            process_info.root_pipeline_id,
+                            process_info.top_pipeline_id,
+                            len(execute_result.dispatch_processes),
+                            execute_result.dispatch_processes,
+                        )
+                        self.runtime.join(process_id, children)
+                        self.runtime.batch_execute(process_id, execute_result.dispatch_processes)
 
-                if execute_result.should_sleep or execute_result.should_die:
-                    return
+                    if execute_result.should_die:
+                        self.runtime.die(process_id)
 
-                current_node_id = execute_result.next_node_id
-            except Exception as e:
-                ex_data = traceback.format_exc()
-                logger.warning(
-                    "[%s]execute exception catch at node(%s): %s",
-                    process_info.root_pipeline_id,
-                    current_node_id,
-                    ex_data,
-                )
+                    if execute_result.should_sleep or execute_result.should_die:
+                        return
 
-                # state version already changed, so give up this execute
-                if isinstance(e, StateVersionNotMatchError):
+                    current_node_id = execute_result.next_node_id
+                except Exception as e:
+                    ex_data = traceback.format_exc()
                     logger.warning(
-                        "[%s]execute exception catch StateVersionNotMatchError at node(%s): %s",
+                        "[%s]execute exception catch at node(%s): %s",
                         process_info.root_pipeline_id,
                         current_node_id,
                         ex_data,
                     )
-                    return
 
-                # make sure sleep call at first, because remain operations may have been completed in execute
-                self.runtime.sleep(process_info.process_id)
+                    # state version already changed, so give up this execute
+                    if isinstance(e, StateVersionNotMatchError):
+                        logger.warning(
+                            "[%s]execute exception catch StateVersionNotMatchError at node(%s): %s",
+                            process_info.root_pipeline_id,
+                            current_node_id,
+                            ex_data,
+                        )
+                        return
 
-                outputs = self.runtime.get_execution_data_outputs(current_node_id)
-                outputs["ex_data"] = ex_data
-                self.runtime.set_execution_data_outputs(current_node_id, outputs)
+                    # make sure sleep call at first, because remain operations may have been completed in execute
+                    self.runtime.sleep(process_info.process_id)
+                    self.runtime.flush_process_buffer(process_info.process_id)
 
-                self.runtime.set_state(
-                    node_id=current_node_id,
-                    to_state=states.FAILED,
-                    root_id=process_info.root_pipeline_id,
-                    parent_id=process_info.top_pipeline_id,
-                    set_started_time=True,
-                    set_archive_time=True,
-                )
+                    outputs = self.runtime.get_execution_data_outputs(current_node_id)
+                    outputs["ex_data"] = ex_data
+                    self.runtime.set_execution_data_outputs(current_node_id, outputs)
 
-                return
+                    self.runtime.set_state(
+                        node_id=current_node_id,
+                        to_state=states.FAILED,
+                        root_id=process_info.root_pipeline_id,
+                        parent_id=process_info.top_pipeline_id,
+                        set_started_time=True,
+                        set_archive_time=True,
+                    )
+
+                    return
 
     @setup_gauge(ENGINE_RUNNING_SCHEDULES)
     @setup_histogram(ENGINE_SCHEDULE_RUNNING_TIME)
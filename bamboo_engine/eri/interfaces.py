@@ -13,11 +13,13 @@ specific language governing permissions and limitations under the License.
 
 from weakref import WeakValueDictionary
 from datetime import datetime
+from contextlib import contextmanager
 from abc import ABCMeta, abstractmethod
 from typing import List, Optional, Dict, Set, Any
 
 from .models import (
     State,
+    StateSnapshot,
     Node,
     Schedule,
     ScheduleType,
@@ -517,6 +519,18 @@ class TaskMixin:
         :type node_id: str
         """
 
+    def batch_execute(self, parent_id: int, dispatches: List[DispatchProcess]):
+        """
+        批量派发父进程 fork 出的子进程的执行任务，运行时可以复用父进程的路由信息及与 broker 的连接
+
+        :param parent_id: 父进程 ID
+        :type parent_id: int
+        :param dispatches: 待调度进程信息列表
+        :type dispatches: List[DispatchProcess]
+        """
+        for d in dispatches:
+            self.execute(d.process_id, d.node_id)
+
     @abstractmethod
     def schedule(
         self,
@@ -819,6 +833,25 @@ class ProcessMixin:
         :type stack: List[str]
         """
 
+    @contextmanager
+    def process_write_behind(self, process_id: int):
+        """
+        在推进循环中开启进程数据的写缓冲，beat, wake_up, sleep, die, set_current_node 产生的写操作
+        可以在运行时中暂存并合并，在退出时统一写入；运行时不支持写缓冲时直接执行代码块
+
+        :param process_id: 进程 ID
+        :type process_id: int
+        """
+        yield
+
+    def flush_process_buffer(self, process_id: int):
+        """
+        将进程在写缓冲中暂存的数据写入存储，运行时不支持写缓冲时不需要做任何操作
+
+        :param process_id: 进程 ID
+        :type process_id: int
+        """
+
 
 class StateMixin:
     """
@@ -869,6 +902,34 @@ class StateMixin:
         :rtype: List[State]
         """
 
+    def get_state_snapshot_by_root(self, root_id: str) -> StateSnapshot:
+        """
+        根据根节点 ID 获取该流程下所有节点的状态快照
+
+        :param root_id: 根节点 ID
+        :type root_id: str
+        :return: 节点状态快照
+        :rtype: StateSnapshot
+        """
+        return StateSnapshot.from_states(self.get_state_by_root(root_id))
+
+    def get_state_snapshot_by_root_since(self, root_id: str, cursor: Optional[datetime]) -> StateSnapshot:
+        """
+        根据根节点 ID 获取该流程下自 cursor 之后发生过变化的节点的状态快照，
+        运行时不支持增量获取时返回所有节点的状态，调用方按照节点 ID 合并即可
+
+        增量结果是尽力而为的，运行时可能遗漏提交较晚的更新，也不会返回被删除的节点，
+        调用方需要定期传入 cursor=None 获取全量状态进行校正
+
+        :param root_id: 根节点 ID
+        :type root_id: str
+        :param cursor: 上一次获取快照时返回的游标，为 None 时获取所有节点的状态
+        :type cursor: Optional[datetime]
+        :return: 节点状态快照
+        :rtype: StateSnapshot
+        """
+        return self.get_state_snapshot_by_root(root_id)
+
     @abstractmethod
     def batch_get_state_name(self, node_id_list: List[str]) -> Dict[str, str]:
         """
@@ -1136,6 +1197,32 @@ class ContextMixin:
         :rtype: set
         """
 
+    def resolve_context(self, pipeline_id: str, keys: set) -> List[ContextValue]:
+        """
+        获取某个流程上下文中 keys 所指定的变量以及这些变量直接和间接引用的其他所有变量的值，
+        运行时可以通过覆盖该方法来减少对存储的访问次数
+
+        :param pipeline_id: 流程 ID
+        :type pipeline_id: str
+        :param keys: 变量键
+        :type keys: set
+        :return: 变量值信息
+        :rtype: List[ContextValue]
+        """
+        references = self.get_context_key_references(pipeline_id=pipeline_id, keys=keys)
+        return self.get_context_values(pipeline_id=pipeline_id, keys=set(keys).union(references))
+
+    @contextmanager
+    def context_snapshot(self, process_id: int):
+        """
+        在推进循环中开启上下文快照，resolve_context 读取过的变量可以在运行时中暂存，
+        在调用 upsert_plain_context_values 后失效；运行时不支持快照时直接执行代码块
+
+        :param process_id: 进程 ID
+        :type process_id: int
+        """
+        yield
+
     @abstractmethod
     def upsert_plain_context_values(self, pipeline_id: str, update: Dict[str, ContextValue]):
         """
@@ -1380,6 +1467,59 @@ class ExecutionHistoryMixin:
         """
 
 
+class ArchiveMixin:
+    """
+    归档数据相关接口，流程完成后运行时可以将其执行数据转存到冷存储中，引擎 API 在热数据中找不到时会回退到这些接口，
+    运行时不支持归档时使用默认实现即可
+    """
+
+    def is_node_archived(self, node_id: str) -> bool:
+        """
+        判断某个节点所属的流程是否已经归档，引擎 API 只会对已归档的节点读取归档数据
+
+        :param node_id: 节点 ID
+        :type node_id: str
+        :return: 是否已归档
+        :rtype: bool
+        """
+        return False
+
+    def get_archived_state_by_root(self, root_id: str) -> List[State]:
+        """
+        根据根节点 ID 获取已归档流程中所有节点的状态
+
+        :param root_id: 根节点 ID
+        :type root_id: str
+        :return: 节点状态列表，流程未归档时返回空列表
+        :rtype: List[State]
+        """
+        return []
+
+    def get_archived_execution_data(self, node_id: str) -> Optional[ExecutionData]:
+        """
+        获取已归档节点的执行数据
+
+        :param node_id: 节点 ID
+        :type node_id: str
+        :return: 执行数据实例，节点未归档时返回 None
+        :rtype: Optional[ExecutionData]
+        """
+        return None
+
+    def get_archived_histories(self, node_id: str, loop: int = -1) -> List[ExecutionHistory]:
+        """
+        返回已归档节点的历史记录
+
+        :param node_id: 节点 ID
+        :type node_id: str
+        :param loop: 重入次数, -1 表示不过滤重入次数
+        :type loop: int, optional
+        :return: 历史记录列表，节点未归档时返回空列表
+        :rtype: List[ExecutionHistory]
+        """
+        return []
+
+
 class EngineRuntimeInterface(
     PluginManagerMixin,
     EngineAPIHooksMixin,
@@ -1391,6 +1531,7 @@ class EngineRuntimeInterface(
     ContextMixin,
     DataMixin,
     ExecutionHistoryMixin,
+    ArchiveMixin,
     metaclass=ABCMeta,
 ):
     @abstractmethod
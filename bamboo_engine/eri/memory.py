@@ -0,0 +1,1249 @@
+# -*- coding: utf-8 -*-
+"""
+Tencent is pleased to support the open source community by making 蓝鲸智云PaaS平台社区版 (BlueKing PaaS Community
+Edition) available.
+Copyright (C) 2017-2021 THL A29 Limited, a Tencent company. All rights reserved.
+Licensed under the MIT License (the "License"); you may not use this file except in compliance with the License.
+You may obtain a copy of the License at
+http://opensource.org/licenses/MIT
+Unless required by applicable law or agreed to in writing, software distributed under the License is distributed on
+an "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the License for the
+specific language governing permissions and limitations under the License.
+"""
+
+# 内存运行时，EngineRuntimeInterface 的参考实现
+#
+# 所有数据都保存在进程内存中，不依赖数据库和 broker，适用于测试，流程仿真以及对引擎本身的开销进行基准测试
+
+import copy
+import heapq
+import logging
+import threading
+import itertools
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from functools import partial
+from typing import Any, Callable, Dict, List, Optional, Set
+
+from bamboo_engine import states
+from bamboo_engine.engine import Engine
+from bamboo_engine.handlers import register
+from bamboo_engine.template import Template
+from bamboo_engine.utils.string import unique_id
+from bamboo_engine.exceptions import NotFoundError, StateVersionNotMatchError
+
+from .interfaces import EngineRuntimeInterface, Service, ExecutableEvent, Variable
+from .models import (
+    Node,
+    NodeType,
+    ServiceActivity,
+    SubProcess,
+    ExclusiveGateway,
+    ParallelGateway,
+    ConditionalParallelGateway,
+    ConvergeGateway,
+    EmptyStartEvent,
+    EmptyEndEvent,
+    ExecutableEndEvent,
+    Condition,
+    State,
+    Schedule,
+    ScheduleType,
+    Data,
+    DataInput,
+    ExecutionData,
+    ExecutionHistory,
+    ExecutionShortHistory,
+    CallbackData,
+    ProcessInfo,
+    SuspendedProcessInfo,
+    DispatchProcess,
+    ContextValue,
+    ContextValueType,
+)
+
+__all__ = ["InlineTaskExecutor", "ThreadPoolTaskExecutor", "MemoryRuntime"]
+
+logger = logging.getLogger("bamboo_engine")
+
+
+# task executors
+class InlineTaskExecutor:
+    """
+    在提交任务的线程中顺序执行任务，任务中提交的任务会在当前任务结束后执行，避免递归调用过深；
+    延迟任务使用虚拟时钟，在没有可执行的任务时直接推进到最早的延迟任务，不会真正等待
+    """
+
+    def __init__(self):
+        self._local = threading.local()
+
+    def _queues(self):
+        local = self._local
+        if not hasattr(local, "tasks"):
+            local.tasks = deque()
+            local.delayed = []
+            local.clock = 0
+            local.seq = itertools.count()
+            local.draining = False
+        return local
+
+    def submit(self, func: Callable, countdown: int = 0):
+        """
+        提交任务
+
+        :param func: 任务
+        :type func: Callable
+        :param countdown: 延迟执行的秒数
+        :type countdown: int, optional
+        """
+        local = self._queues()
+        if countdown > 0:
+            heapq.heappush(local.delayed, (local.clock + countdown, next(local.seq), func))
+        else:
+            local.tasks.append(func)
+        self._drain()
+
+    def _drain(self):
+        local = self._queues()
+        if local.draining:
+            return
+
+        local.draining = True
+        try:
+            while True:
+                while local.tasks:
+                    func = local.tasks.popleft()
+                    try:
+                        func()
+                    except Exception:
+                        logger.exception("[memory runtime] task %s raise exception", func)
+
+                if not local.delayed:
+                    return
+
+                local.clock, _, func = heapq.heappop(local.delayed)
+                local.tasks.append(func)
+        finally:
+            local.draining = False
+
+    def wait(self, timeout: Optional[float] = None) -> bool:
+        """
+        等待所有已提交的任务执行完成
+
+        :param timeout: 最长等待时间，内联执行时不会超时
+        :type timeout: Optional[float], optional
+        :return: 任务是否全部完成
+        :rtype: bool
+        """
+        self._drain()
+        return True
+
+    def shutdown(self):
+        """
+        停止执行器
+        """
+
+
+class ThreadPoolTaskExecutor:
+    """
+    在线程池中并发执行任务，延迟任务通过定时器在到期后放入线程池
+    """
+
+    def __init__(self, max_workers: int = 8):
+        """
+        :param max_workers: 最大工作线程数
+        :type max_workers: int, optional
+        """
+        self._pool = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="bamboo_engine_memory")
+        self._cond = threading.Condition()
+        self._pending = 0
+        self._timers = set()
+
+    def submit(self, func: Callable, countdown: int = 0):
+        """
+        提交任务
+
+        :param func: 任务
+        :type func: Callable
+        :param countdown: 延迟执行的秒数
+        :type countdown: int, optional
+        """
+        with self._cond:
+            self._pending += 1
+
+        if countdown <= 0:
+            self._pool.submit(self._run, func)
+            return
+
+        timer = threading.Timer(countdown, self._fire, args=(func,))
+        timer.daemon = True
+        with self._cond:
+            self._timers.add(timer)
+        timer.start()
+
+    def _fire(self, func: Callable):
+        with self._cond:
+            self._timers.discard(threading.current_thread())
+        self._pool.submit(self._run, func)
+
+    def _run(self, func: Callable):
+        try:
+            func()
+        except Exception:
+            logger.exception("[memory runtime] task %s raise exception", func)
+        finally:
+            with self._cond:
+                self._pending -= 1
+                if self._pending == 0:
+                    self._cond.notify_all()
+
+    def wait(self, timeout: Optional[float] = None) -> bool:
+        """
+        等待所有已提交的任务（包括任务中提交的任务）执行完成
+
+        :param timeout: 最长等待时间，为 None 时一直等待
+        :type timeout: Optional[float], optional
+        :return: 任务是否全部完成
+        :rtype: bool
+        """
+        with self._cond:
+            return self._cond.wait_for(lambda: self._pending == 0, timeout)
+
+    def shutdown(self):
+        """
+        取消尚未到期的延迟任务并停止线程池
+        """
+        with self._cond:
+            timers, self._timers = self._timers, set()
+        for timer in timers:
+            timer.cancel()
+        self._pool.shutdown(wait=True)
+
+
+# runtime records
+class _Process:
+    def __init__(
+        self,
+        id: int,
+        root_pipeline_id: str,
+        pipeline_stack: List[str],
+        priority: int,
+        queue: str,
+        parent_id: int = -1,
+        destination_id: str = "",
+        current_node_id: str = "",
+    ):
+        self.id = id
+        self.parent_id = parent_id
+        self.ack_num = 0
+        self.need_ack = -1
+        self.asleep = True
+        self.suspended = False
+        self.frozen = False
+        self.dead = False
+        self.last_heartbeat = datetime.now()
+        self.destination_id = destination_id
+        self.current_node_id = current_node_id
+        self.root_pipeline_id = root_pipeline_id
+        self.suspended_by = ""
+        self.priority = priority
+        self.queue = queue
+        self.pipeline_stack = pipeline_stack
+
+    def info(self) -> ProcessInfo:
+        return ProcessInfo(
+            process_id=self.id,
+            destination_id=self.destination_id,
+            root_pipeline_id=self.root_pipeline_id,
+            pipeline_stack=list(self.pipeline_stack),
+            parent_id=self.parent_id,
+        )
+
+
+class _ContextRecord:
+    def __init__(self, type: ContextValueType, value: Any, code: Optional[str] = None, references: Set[str] = None):
+        self.type = type
+        self.value = value
+        self.code = code
+        self.references = references or set()
+
+    def context_value(self, key: str) -> ContextValue:
+        return ContextValue(key=key, type=self.type, value=copy.deepcopy(self.value), code=self.code)
+
+
+class MemoryRuntime(EngineRuntimeInterface):
+    """
+    内存运行时，所有操作通过一把可重入锁保证线程安全，读写执行数据及上下文时会对数据进行深拷贝，
+    以模拟持久化运行时中序列化带来的数据隔离
+
+    使用示例::
+
+        runtime = MemoryRuntime()
+        runtime.register_service("example_component", "legacy", ExampleService)
+        Engine(runtime).run_pipeline(pipeline)
+        runtime.wait()
+    """
+
+    CONTEXT_VALUE_TYPE_MAP = {
+        "plain": ContextValueType.PLAIN,
+        "splice": ContextValueType.SPLICE,
+        "lazy": ContextValueType.COMPUTE,
+    }
+
+    def __init__(self, executor=None, node_rerun_limit: int = 100):
+        """
+        :param executor: 任务执行器，为 None 时使用 InlineTaskExecutor
+        :type executor: Optional[InlineTaskExecutor, ThreadPoolTaskExecutor], optional
+        :param node_rerun_limit: 节点最大重入次数
+        :type node_rerun_limit: int, optional
+        """
+        self.executor = executor or InlineTaskExecutor()
+        self.rerun_limit = node_rerun_limit
+
+        register()
+
+        self._lock = threading.RLock()
+        self._ids = itertools.count(1)
+
+        self._services = {}
+        self._executable_end_events = {}
+        self._compute_variables = {}
+
+        self._processes = {}
+        self._nodes = {}
+        self._states = {}
+        self._schedules = {}
+        self._scheduling = set()
+        self._data = {}
+        self._execution_data = {}
+        self._callback_data = {}
+        self._context = {}
+        self._context_outputs = {}
+        self._histories = {}
+
+    def _next_id(self) -> int:
+        return next(self._ids)
+
+    def wait(self, timeout: Optional[float] = None) -> bool:
+        """
+        等待已派发的所有引擎任务执行完成
+
+        :param timeout: 最长等待时间，为 None 时一直等待
+        :type timeout: Optional[float], optional
+        :return: 任务是否全部完成
+        :rtype: bool
+        """
+        return self.executor.wait(timeout)
+
+    # plugin relate
+    def register_service(self, code: str, version: str, factory: Callable[[], Service]):
+        """
+        注册服务，每次获取服务时都会通过 factory 创建新的服务实例
+
+        :param code: 服务唯一代号
+        :type code: str
+        :param version: 服务版本
+        :type version: str
+        :param factory: 服务类或工厂函数
+        :type factory: Callable[[], Service]
+        """
+        self._services[(code, version)] = factory
+
+    def register_executable_end_event(self, code: str, factory: Callable[[], ExecutableEvent]):
+        """
+        注册可执行结束事件
+
+        :param code: 可执行结束事件唯一代号
+        :type code: str
+        :param factory: 事件类或工厂函数
+        :type factory: Callable[[], ExecutableEvent]
+        """
+        self._executable_end_events[code] = factory
+
+    def register_compute_variable(self, code: str, factory: Callable[..., Variable]):
+        """
+        注册计算型变量，factory 会以 key, value, additional_data 关键字参数调用
+
+        :param code: 变量唯一代号
+        :type code: str
+        :param factory: 变量类或工厂函数
+        :type factory: Callable[..., Variable]
+        """
+        self._compute_variables[code] = factory
+
+    def get_service(self, code: str, version: str) -> Service:
+        if (code, version) not in self._services:
+            raise NotFoundError("service({}, {}) not registered".format(code, version))
+        return self._services[(code, version)]()
+
+    def get_executable_end_event(self, code: str) -> ExecutableEvent:
+        if code not in self._executable_end_events:
+            raise NotFoundError("executable end event({}) not registered".format(code))
+        return self._executable_end_events[code]()
+
+    def get_compute_variable(self, code: str, key: str, value: Variable, additional_data: dict) -> Variable:
+        if code not in self._compute_variables:
+            raise NotFoundError("compute variable({}) not registered".format(code))
+        return self._compute_variables[code](key=key, value=value, additional_data=additional_data)
+
+    # hooks, 内存运行时不需要在 API 调用前后执行额外的逻辑
+    def pre_prepare_run_pipeline(
+        self, pipeline: dict, root_pipeline_data: dict, root_pipeline_context: dict, subprocess_context: dict, **options
+    ):
+        pass
+
+    def post_prepare_run_pipeline(
+        self, pipeline: dict, root_pipeline_data: dict, root_pipeline_context: dict, subprocess_context: dict, **options
+    ):
+        pass
+
+    def pre_pause_pipeline(self, pipeline_id: str):
+        pass
+
+    def post_pause_pipeline(self, pipeline_id: str):
+        pass
+
+    def pre_revoke_pipeline(self, pipeline_id: str):
+        pass
+
+    def post_revoke_pipeline(self, pipeline_id: str):
+        pass
+
+    def pre_resume_pipeline(self, pipeline_id: str):
+        pass
+
+    def post_resume_pipeline(self, pipeline_id: str):
+        pass
+
+    def pre_resume_node(self, node_id: str):
+        pass
+
+    def post_resume_node(self, node_id: str):
+        pass
+
+    def pre_pause_node(self, node_id: str):
+        pass
+
+    def post_pause_node(self, node_id: str):
+        pass
+
+    def pre_retry_node(self, node_id: str, data: Optional[dict]):
+        pass
+
+    def post_retry_node(self, node_id: str, data: Optional[dict]):
+        pass
+
+    def pre_skip_node(self, node_id: str):
+        pass
+
+    def post_skip_node(self, node_id: str):
+        pass
+
+    def pre_skip_exclusive_gateway(self, node_id: str, flow_id: str):
+        pass
+
+    def post_skip_exclusive_gateway(self, node_id: str, flow_id: str):
+        pass
+
+    def pre_forced_fail_activity(self, node_id: str, ex_data: str):
+        pass
+
+    def post_forced_fail_activity(self, node_id: str, ex_data: str, old_version: str, new_version: str):
+        pass
+
+    def pre_callback(self, node_id: str, version: str, data: str):
+        pass
+
+    def post_callback(self, node_id: str, version: str, data: str):
+        pass
+
+    def pre_retry_subprocess(self, node_id: str):
+        pass
+
+    def post_retry_subprocess(self, node_id: str):
+        pass
+
+    # task relate
+    def _execute_task(self, process_id: int, node_id: str):
+        Engine(self).execute(process_id=process_id, node_id=node_id)
+
+    def _schedule_task(self, process_id: int, node_id: str, schedule_id: int, callback_data_id: Optional[int]):
+        Engine(self).schedule(
+            process_id=process_id, node_id=node_id, schedule_id=schedule_id, callback_data_id=callback_data_id
+        )
+
+    def _timeout_check_task(self, node_id: str, version: str):
+        state = self.get_state(node_id)
+        if state.name == states.RUNNING and state.version == version:
+            Engine(self).forced_fail_activity(node_id=node_id, ex_data="timeout kill")
+
+    def execute(self, process_id: int, node_id: str):
+        self.executor.submit(partial(self._execute_task, process_id, node_id))
+
+    def schedule(self, process_id: int, node_id: str, schedule_id: int, callback_data_id: Optional[int] = None):
+        self.executor.submit(partial(self._schedule_task, process_id, node_id, schedule_id, callback_data_id))
+
+    def set_next_schedule(
+        self,
+        process_id: int,
+        node_id: str,
+        schedule_id: int,
+        schedule_after: int,
+        callback_data_id: Optional[int] = None,
+    ):
+        self.executor.submit(
+            partial(self._schedule_task, process_id, node_id, schedule_id, callback_data_id), countdown=schedule_after
+        )
+
+    def start_timeout_monitor(self, process_id: int, node_id: str, version: str, timeout: int):
+        self.executor.submit(partial(self._timeout_check_task, node_id, version), countdown=timeout)
+
+    def stop_timeout_monitor(self, process_id: int, node_id: str, version: str, timeout: Optional[int] = None):
+        # 超时检查时会校验节点状态及版本，不需要取消已提交的任务
+        return
+
+    # process relate
+    def _get_process(self, process_id: int) -> _Process:
+        try:
+            return self._processes[process_id]
+        except KeyError:
+            raise NotFoundError("process({}) does not exist".format(process_id))
+
+    def _update_process(self, process_id: int, **fields):
+        with self._lock:
+            process = self._get_process(process_id)
+            for field, value in fields.items():
+                setattr(process, field, value)
+
+    def beat(self, process_id: int):
+        self._update_process(process_id, last_heartbeat=datetime.now())
+
+    def wake_up(self, process_id: int):
+        self._update_process(process_id, asleep=False)
+
+    def sleep(self, process_id: int):
+        self._update_process(process_id, asleep=True)
+
+    def suspend(self, process_id: int, by: str):
+        self._update_process(process_id, suspended=True, suspended_by=by)
+
+    def resume(self, process_id: int):
+        self._update_process(process_id, suspended=False, suspended_by="")
+
+    def batch_resume(self, process_id_list: List[int]):
+        with self._lock:
+            for process_id in process_id_list:
+                self._update_process(process_id, suspended=False, suspended_by="")
+
+    def die(self, process_id: int):
+        self._update_process(process_id, dead=True)
+
+    def get_process_info(self, process_id: int) -> ProcessInfo:
+        with self._lock:
+            return self._get_process(process_id).info()
+
+    def get_process_info_with_root_pipeline(self, pipeline_id: str) -> List[ProcessInfo]:
+        with self._lock:
+            return [p.info() for p in self._processes.values() if p.root_pipeline_id == pipeline_id]
+
+    def kill(self, process_id: int):
+        self._update_process(process_id, asleep=True)
+
+    def get_suspended_process_info(self, suspended_by: str) -> List[SuspendedProcessInfo]:
+        with self._lock:
+            return [
+                SuspendedProcessInfo(process_id=p.id, current_node=p.current_node_id)
+                for p in self._processes.values()
+                if p.suspended_by == suspended_by
+            ]
+
+    def _get_unique_process_id(self, node_id: str, predicate: Callable[[_Process], bool]) -> Optional[int]:
+        with self._lock:
+            process_ids = [p.id for p in self._processes.values() if p.current_node_id == node_id and predicate(p)]
+
+        if not process_ids:
+            return None
+
+        if len(process_ids) != 1:
+            raise ValueError("found multiple process({}) with current_node_id({})".format(process_ids, node_id))
+
+        return process_ids[0]
+
+    def get_sleep_process_with_current_node_id(self, node_id: str) -> Optional[int]:
+        return self._get_unique_process_id(node_id, lambda p: p.asleep)
+
+    def get_process_id_with_current_node_id(self, node_id: str) -> Optional[int]:
+        return self._get_unique_process_id(node_id, lambda p: not p.dead)
+
+    def set_current_node(self, process_id: int, node_id: str):
+        self._update_process(process_id, current_node_id=node_id)
+
+    def child_process_finish(self, parent_id: int, process_id: int) -> bool:
+        with self._lock:
+            self._get_process(process_id).dead = True
+
+            parent = self._get_process(parent_id)
+            parent.ack_num += 1
+            if parent.ack_num != parent.need_ack:
+                return False
+
+            parent.ack_num = 0
+            parent.need_ack = -1
+            return True
+
+    def is_frozen(self, process_id: int) -> bool:
+        with self._lock:
+            return self._get_process(process_id).frozen
+
+    def freeze(self, process_id: int):
+        self._update_process(process_id, frozen=True)
+
+    def fork(
+        self, parent_id: int, root_pipeline_id: str, pipeline_stack: List[str], from_to: Dict[str, str],
+    ) -> List[DispatchProcess]:
+        with self._lock:
+            parent = self._get_process(parent_id)
+
+            for current_node, destination in from_to.items():
+                child = _Process(
+                    id=self._next_id(),
+                    parent_id=parent_id,
+                    destination_id=destination,
+                    current_node_id=current_node,
+                    root_pipeline_id=root_pipeline_id,
+                    pipeline_stack=list(pipeline_stack),
+                    priority=parent.priority,
+                    queue=parent.queue,
+                )
+                self._processes[child.id] = child
+
+            children = [p for p in self._processes.values() if p.parent_id == parent_id and not p.dead]
+
+        if len(children) != len(from_to):
+            raise ValueError(
+                "process({}) fork failed, children count({}) does not match expect({})".format(
+                    parent_id, len(children), len(from_to)
+                )
+            )
+
+        return [DispatchProcess(process_id=p.id, node_id=p.current_node_id) for p in children]
+
+    def join(self, process_id: int, children_id: List[int]):
+        self._update_process(process_id, ack_num=0, need_ack=len(children_id))
+
+    def set_pipeline_stack(self, process_id: int, stack: List[str]):
+        self._update_process(process_id, pipeline_stack=list(stack))
+
+    # state relate
+    def get_state(self, node_id: str) -> State:
+        with self._lock:
+            try:
+                return copy.copy(self._states[node_id])
+            except KeyError:
+                raise NotFoundError("state of node({}) does not exist".format(node_id))
+
+    def get_state_or_none(self, node_id: str) -> Optional[State]:
+        with self._lock:
+            state = self._states.get(node_id)
+            return copy.copy(state) if state else None
+
+    def get_state_by_root(self, root_id: str) -> List[State]:
+        with self._lock:
+            return [copy.copy(s) for s in self._states.values() if s.root_id == root_id]
+
+    def get_state_by_parent(self, parent_id: str) -> List[State]:
+        with self._lock:
+            return [copy.copy(s) for s in self._states.values() if s.parent_id == parent_id]
+
+    def batch_get_state_name(self, node_id_list: List[str]) -> Dict[str, str]:
+        with self._lock:
+            return {node_id: self._states[node_id].name for node_id in node_id_list if node_id in self._states}
+
+    def has_state(self, node_id: str) -> bool:
+        return node_id in self._states
+
+    def reset_state_inner_loop(self, node_id: str) -> int:
+        with self._lock:
+            state = self._states.get(node_id)
+            if state is None:
+                return 0
+            state.inner_loop = 0
+            return 1
+
+    def reset_children_state_inner_loop(self, node_id: str) -> int:
+        with self._lock:
+            children = [s for s in self._states.values() if s.parent_id == node_id]
+            for state in children:
+                state.inner_loop = 0
+            return len(children)
+
+    def set_state_root_and_parent(self, node_id: str, root_id: str, parent_id: str):
+        with self._lock:
+            state = self._states.get(node_id)
+            if state is not None:
+                state.root_id = root_id
+                state.parent_id = parent_id
+
+    def set_state(
+        self,
+        node_id: str,
+        to_state: str,
+        version: str = None,
+        loop: int = -1,
+        inner_loop: int = -1,
+        root_id: Optional[str] = None,
+        parent_id: Optional[str] = None,
+        is_retry: bool = False,
+        is_skip: bool = False,
+        reset_retry: bool = False,
+        reset_skip: bool = False,
+        error_ignored: bool = False,
+        reset_error_ignored: bool = False,
+        refresh_version: bool = False,
+        clear_started_time: bool = False,
+        set_started_time: bool = False,
+        clear_archived_time: bool = False,
+        set_archive_time: bool = False,
+    ) -> str:
+        with self._lock:
+            state = self._states.get(node_id)
+            now = datetime.now()
+
+            if state is None:
+                state = State(
+                    node_id=node_id,
+                    root_id=root_id or "",
+                    parent_id=parent_id or "",
+                    name=to_state,
+                    version=unique_id("v"),
+                    loop=loop if loop != -1 else 1,
+                    inner_loop=inner_loop if inner_loop != -1 else 1,
+                    retry=0,
+                    skip=False,
+                    error_ignored=False,
+                    created_time=now,
+                    started_time=now if set_started_time else None,
+                    archived_time=now if set_archive_time else None,
+                )
+                self._states[node_id] = state
+                return state.version
+
+            if version and state.version != version:
+                raise StateVersionNotMatchError("state version({}) not match {}".format(state.version, version))
+
+            if not states.can_transit(from_state=state.name, to_state=to_state):
+                raise RuntimeError(
+                    "can't not transit node({}) state from {} to {}".format(node_id, state.name, to_state)
+                )
+
+            state.name = to_state
+            if loop != -1:
+                state.loop = loop
+            if inner_loop != -1:
+                state.inner_loop = inner_loop
+            if root_id:
+                state.root_id = root_id
+            if parent_id:
+                state.parent_id = parent_id
+            if is_retry:
+                state.retry += 1
+            if is_skip:
+                state.skip = True
+            if reset_retry:
+                state.retry = 0
+            if reset_skip:
+                state.skip = False
+            if reset_error_ignored:
+                state.error_ignored = False
+            if error_ignored:
+                state.error_ignored = True
+            if refresh_version:
+                state.version = unique_id("v")
+            if clear_started_time:
+                state.started_time = None
+            if set_started_time:
+                state.started_time = now
+            if clear_archived_time:
+                state.archived_time = None
+            if set_archive_time:
+                state.archived_time = now
+
+            return state.version
+
+    # node relate
+    def get_node(self, node_id: str) -> Node:
+        try:
+            return self._nodes[node_id]
+        except KeyError:
+            raise NotFoundError("node({}) does not exist".format(node_id))
+
+    # schedule relate
+    def _get_schedule(self, schedule_id: int) -> Schedule:
+        try:
+            return self._schedules[schedule_id]
+        except KeyError:
+            raise NotFoundError("schedule({}) does not exist".format(schedule_id))
+
+    def set_schedule(self, process_id: int, node_id: str, version: str, schedule_type: ScheduleType) -> Schedule:
+        with self._lock:
+            schedule = Schedule(
+                id=self._next_id(),
+                type=schedule_type,
+                process_id=process_id,
+                node_id=node_id,
+                finished=False,
+                expired=False,
+                version=version,
+                times=0,
+            )
+            self._schedules[schedule.id] = schedule
+            return copy.copy(schedule)
+
+    def get_schedule(self, schedule_id: int) -> Schedule:
+        with self._lock:
+            return copy.copy(self._get_schedule(schedule_id))
+
+    def get_schedule_with_node_and_version(self, node_id: str, version: str) -> Schedule:
+        with self._lock:
+            for schedule in self._schedules.values():
+                if schedule.node_id == node_id and schedule.version == version:
+                    return copy.copy(schedule)
+        raise NotFoundError("schedule of node({}) with version({}) does not exist".format(node_id, version))
+
+    def apply_schedule_lock(self, schedule_id: int) -> bool:
+        with self._lock:
+            if schedule_id in self._scheduling:
+                return False
+            self._scheduling.add(schedule_id)
+            return True
+
+    def release_schedule_lock(self, schedule_id: int):
+        with self._lock:
+            self._scheduling.discard(schedule_id)
+
+    def expire_schedule(self, schedule_id: int):
+        with self._lock:
+            self._get_schedule(schedule_id).expired = True
+
+    def finish_schedule(self, schedule_id: int):
+        with self._lock:
+            self._get_schedule(schedule_id).finished = True
+
+    def add_schedule_times(self, schedule_id: int):
+        with self._lock:
+            self._get_schedule(schedule_id).times += 1
+
+    # context relate
+    def get_context_values(self, pipeline_id: str, keys: set) -> List[ContextValue]:
+        with self._lock:
+            context = self._context.get(pipeline_id, {})
+            return [context[key].context_value(key) for key in keys if key in context]
+
+    def get_context_key_references(self, pipeline_id: str, keys: set) -> set:
+        with self._lock:
+            context = self._context.get(pipeline_id, {})
+            references = set()
+            for key in keys:
+                if key in context:
+                    references.update(context[key].references)
+            return references
+
+    def resolve_context(self, pipeline_id: str, keys: set) -> List[ContextValue]:
+        with self._lock:
+            references = self.get_context_key_references(pipeline_id, keys)
+            return self.get_context_values(pipeline_id, set(keys).union(references))
+
+    def upsert_plain_context_values(self, pipeline_id: str, update: Dict[str, ContextValue]):
+        with self._lock:
+            context = self._context.setdefault(pipeline_id, {})
+            for key, context_value in update.items():
+                context[key] = _ContextRecord(type=ContextValueType.PLAIN, value=copy.deepcopy(context_value.value))
+
+    def get_context(self, pipeline_id: str) -> List[ContextValue]:
+        with self._lock:
+            return [record.context_value(key) for key, record in self._context.get(pipeline_id, {}).items()]
+
+    def get_context_outputs(self, pipeline_id: str) -> Set[str]:
+        with self._lock:
+            try:
+                return set(self._context_outputs[pipeline_id])
+            except KeyError:
+                raise NotFoundError("context outputs of pipeline({}) does not exist".format(pipeline_id))
+
+    # data relate
+    def _get_data(self, node_id: str) -> Data:
+        try:
+            return self._data[node_id]
+        except KeyError:
+            raise NotFoundError("data of node({}) does not exist".format(node_id))
+
+    def get_data(self, node_id: str) -> Data:
+        with self._lock:
+            data = self._get_data(node_id)
+            return Data(inputs=self.get_data_inputs(node_id), outputs=dict(data.outputs))
+
+    def get_data_inputs(self, node_id: str) -> Dict[str, DataInput]:
+        with self._lock:
+            return {
+                k: DataInput(need_render=di.need_render, value=copy.deepcopy(di.value))
+                for k, di in self._get_data(node_id).inputs.items()
+            }
+
+    def get_data_outputs(self, node_id: str) -> dict:
+        with self._lock:
+            return dict(self._get_data(node_id).outputs)
+
+    def set_data_inputs(self, node_id: str, data: Dict[str, DataInput]):
+        inputs = {k: DataInput(need_render=di.need_render, value=copy.deepcopy(di.value)) for k, di in data.items()}
+        with self._lock:
+            if node_id in self._data:
+                self._data[node_id].inputs = inputs
+            else:
+                self._data[node_id] = Data(inputs=inputs, outputs={})
+
+    def get_execution_data(self, node_id: str) -> ExecutionData:
+        with self._lock:
+            if node_id not in self._execution_data:
+                raise NotFoundError("execution data of node({}) does not exist".format(node_id))
+            return ExecutionData(
+                inputs=self.get_execution_data_inputs(node_id), outputs=self.get_execution_data_outputs(node_id)
+            )
+
+    def get_execution_data_inputs(self, node_id: str) -> dict:
+        with self._lock:
+            return copy.deepcopy(self._execution_data.get(node_id, {}).get("inputs", {}))
+
+    def get_execution_data_outputs(self, node_id: str) -> dict:
+        with self._lock:
+            return copy.deepcopy(self._execution_data.get(node_id, {}).get("outputs", {}))
+
+    def _write_execution_data(self, node_id: str, **data):
+        data = {name: copy.deepcopy(value) for name, value in data.items()}
+        with self._lock:
+            self._execution_data.setdefault(node_id, {"inputs": {}, "outputs": {}}).update(data)
+
+    def set_execution_data(self, node_id: str, data: ExecutionData):
+        self._write_execution_data(node_id, inputs=data.inputs, outputs=data.outputs)
+
+    def set_execution_data_inputs(self, node_id: str, inputs: dict):
+        self._write_execution_data(node_id, inputs=inputs)
+
+    def set_execution_data_outputs(self, node_id: str, outputs: dict):
+        self._write_execution_data(node_id, outputs=outputs)
+
+    def set_callback_data(self, node_id: str, version: str, data: dict) -> int:
+        with self._lock:
+            callback_data = CallbackData(id=self._next_id(), node_id=node_id, version=version, data=copy.deepcopy(data))
+            self._callback_data[callback_data.id] = callback_data
+            return callback_data.id
+
+    def get_callback_data(self, data_id: int) -> CallbackData:
+        with self._lock:
+            try:
+                callback_data = self._callback_data[data_id]
+            except KeyError:
+                raise NotFoundError("callback data({}) does not exist".format(data_id))
+            return CallbackData(
+                id=callback_data.id,
+                node_id=callback_data.node_id,
+                version=callback_data.version,
+                data=copy.deepcopy(callback_data.data),
+            )
+
+    # execution history relate
+    def add_history(
+        self,
+        node_id: str,
+        started_time: datetime,
+        archived_time: datetime,
+        loop: int,
+        skip: bool,
+        retry: int,
+        version: str,
+        inputs: dict,
+        outputs: dict,
+    ) -> int:
+        with self._lock:
+            history = ExecutionHistory(
+                id=self._next_id(),
+                node_id=node_id,
+                started_time=started_time,
+                archived_time=archived_time,
+                loop=loop,
+                skip=skip,
+                retry=retry,
+                version=version,
+                inputs=copy.deepcopy(inputs),
+                outputs=copy.deepcopy(outputs),
+            )
+            self._histories.setdefault(node_id, []).append(history)
+            return history.id
+
+    def _filter_histories(self, node_id: str, loop: int) -> List[ExecutionHistory]:
+        return [h for h in self._histories.get(node_id, []) if loop == -1 or h.loop == loop]
+
+    def get_histories(self, node_id: str, loop: int = -1) -> List[ExecutionHistory]:
+        with self._lock:
+            return [copy.deepcopy(h) for h in self._filter_histories(node_id, loop)]
+
+    def get_short_histories(self, node_id: str, loop: int = -1) -> List[ExecutionShortHistory]:
+        with self._lock:
+            return [
+                ExecutionShortHistory(
+                    id=h.id,
+                    node_id=h.node_id,
+                    started_time=h.started_time,
+                    archived_time=h.archived_time,
+                    loop=h.loop,
+                    skip=h.skip,
+                    retry=h.retry,
+                    version=h.version,
+                )
+                for h in self._filter_histories(node_id, loop)
+            ]
+
+    # prepare relate
+    def _gen_node(self, node_cls, node_type: NodeType, node_id: str, targets: dict, **kwargs) -> Node:
+        kwargs.setdefault("can_skip", False)
+        kwargs.setdefault("can_retry", True)
+        return node_cls(
+            id=node_id,
+            type=node_type,
+            target_flows=list(targets.keys()),
+            target_nodes=list(targets.values()),
+            targets=targets,
+            **kwargs
+        )
+
+    def _gen_conditions(self, gateway: dict, pipeline: dict) -> List[Condition]:
+        return [
+            Condition(
+                name=flow_id,
+                evaluation=cond["evaluate"],
+                target_id=pipeline["flows"][flow_id]["target"],
+                flow_id=flow_id,
+            )
+            for flow_id, cond in gateway["conditions"].items()
+        ]
+
+    def _gen_gateway_node(self, gateway: dict, pipeline: dict, **common) -> Node:
+        gateway_type = gateway["type"]
+
+        if gateway_type == NodeType.ConvergeGateway.value:
+            targets = {gateway["outgoing"]: pipeline["flows"][gateway["outgoing"]]["target"]}
+            return self._gen_node(ConvergeGateway, NodeType.ConvergeGateway, gateway["id"], targets, **common)
+
+        targets = {flow_id: pipeline["flows"][flow_id]["target"] for flow_id in gateway["outgoing"]}
+
+        if gateway_type == NodeType.ExclusiveGateway.value:
+            return self._gen_node(
+                ExclusiveGateway,
+                NodeType.ExclusiveGateway,
+                gateway["id"],
+                targets,
+                can_skip=True,
+                conditions=self._gen_conditions(gateway, pipeline),
+                **common
+            )
+        elif gateway_type == NodeType.ParallelGateway.value:
+            return self._gen_node(
+                ParallelGateway,
+                NodeType.ParallelGateway,
+                gateway["id"],
+                targets,
+                converge_gateway_id=gateway["converge_gateway_id"],
+                **common
+            )
+        elif gateway_type == NodeType.ConditionalParallelGateway.value:
+            return self._gen_node(
+                ConditionalParallelGateway,
+                NodeType.ConditionalParallelGateway,
+                gateway["id"],
+                targets,
+                conditions=self._gen_conditions(gateway, pipeline),
+                converge_gateway_id=gateway["converge_gateway_id"],
+                **common
+            )
+
+        raise ValueError("unsupport gateway type {}: {}".format(gateway_type, gateway))
+
+    def _gen_event_nodes(self, pipeline: dict, **common) -> List[Node]:
+        start_event = pipeline["start_event"]
+        end_event = pipeline["end_event"]
+
+        nodes = [
+            self._gen_node(
+                EmptyStartEvent,
+                NodeType.EmptyStartEvent,
+                start_event["id"],
+                {start_event["outgoing"]: pipeline["flows"][start_event["outgoing"]]["target"]},
+                can_skip=True,
+                **common
+            )
+        ]
+
+        if end_event["type"] == NodeType.EmptyEndEvent.value:
+            nodes.append(self._gen_node(EmptyEndEvent, NodeType.EmptyEndEvent, end_event["id"], {}, **common))
+        else:
+            nodes.append(
+                self._gen_node(
+                    ExecutableEndEvent,
+                    NodeType.ExecutableEndEvent,
+                    end_event["id"],
+                    {},
+                    code=end_event["type"],
+                    **common
+                )
+            )
+
+        return nodes
+
+    def _data_inputs_assemble(self, pipeline_id: str, node_id: str, node_inputs: dict) -> (dict, Dict[str, Any]):
+        inputs = {}
+        compute_values = {}
+        for k, v in node_inputs.items():
+            if v["type"] == "lazy":
+                if k.startswith("${") and k.endswith("}"):
+                    cv_key = "${%s_%s}" % (k[2:-1], node_id)
+                else:
+                    cv_key = "${%s_%s}" % (k, node_id)
+                compute_values[cv_key] = _ContextRecord(
+                    type=ContextValueType.COMPUTE, value=copy.deepcopy(v["value"]), code=v.get("custom_type", "")
+                )
+                inputs[k] = DataInput(need_render=True, value=cv_key)
+            else:
+                inputs[k] = DataInput(need_render=v["type"] == "splice", value=copy.deepcopy(v["value"]))
+
+        return inputs, compute_values
+
+    def _prepare(self, pipeline: dict, root_id: str, subprocess_context: dict, parent_id: Optional[str] = None):
+        parent_id = parent_id or root_id
+        common = {"root_pipeline_id": root_id, "parent_pipeline_id": parent_id}
+
+        context = {}
+        node_outputs = {}
+
+        # collect all node outputs and initial context values
+        for key, input_data in pipeline["data"]["inputs"].items():
+            source_act = input_data.get("source_act")
+            if not source_act:
+                context[key] = _ContextRecord(
+                    type=self.CONTEXT_VALUE_TYPE_MAP[input_data["type"]],
+                    value=copy.deepcopy(input_data["value"]),
+                    code=input_data.get("custom_type", ""),
+                )
+            elif isinstance(source_act, list):
+                for sa in source_act:
+                    node_outputs.setdefault(sa["source_act"], {})[sa["source_key"]] = key
+            else:
+                node_outputs.setdefault(source_act, {})[input_data["source_key"]] = key
+
+        # pre_render_keys in start_event
+        if pipeline["data"].get("pre_render_keys"):
+            self._data[pipeline["start_event"]["id"]] = Data(
+                inputs={"pre_render_keys": DataInput(need_render=False, value=pipeline["data"]["pre_render_keys"])},
+                outputs={},
+            )
+
+        # process activities
+        for act in pipeline["activities"].values():
+            targets = {act["outgoing"]: pipeline["flows"][act["outgoing"]]["target"]}
+
+            if act["type"] == NodeType.ServiceActivity.value:
+                self._nodes[act["id"]] = self._gen_node(
+                    ServiceActivity,
+                    NodeType.ServiceActivity,
+                    act["id"],
+                    targets,
+                    can_skip=act["skippable"],
+                    can_retry=act["retryable"],
+                    code=act["component"]["code"],
+                    version=act["component"].get("version", "legacy"),
+                    timeout=act.get("timeout"),
+                    error_ignorable=act["error_ignorable"],
+                    **common
+                )
+                inputs, compute_values = self._data_inputs_assemble(parent_id, act["id"], act["component"]["inputs"])
+
+            elif act["type"] == NodeType.SubProcess.value:
+                self._nodes[act["id"]] = self._gen_node(
+                    SubProcess,
+                    NodeType.SubProcess,
+                    act["id"],
+                    targets,
+                    start_event_id=act["pipeline"]["start_event"]["id"],
+                    **common
+                )
+                inputs, compute_values = self._data_inputs_assemble(parent_id, act["id"], act["params"])
+
+                # subprocess output and preset context
+                self._context_outputs[act["id"]] = set(act["pipeline"]["data"]["outputs"])
+                sub_context = self._context.setdefault(act["id"], {})
+                for key, value in subprocess_context.items():
+                    sub_context[key] = _ContextRecord(type=ContextValueType.PLAIN, value=copy.deepcopy(value))
+
+                self._prepare(
+                    pipeline=act["pipeline"],
+                    root_id=root_id,
+                    subprocess_context=subprocess_context,
+                    parent_id=act["id"],
+                )
+            else:
+                raise ValueError("unsupport act type {}: {}".format(act["type"], act["id"]))
+
+            self._data[act["id"]] = Data(inputs=inputs, outputs=node_outputs.get(act["id"], {}))
+            context.update(compute_values)
+
+        # process events and gateways
+        for node in self._gen_event_nodes(pipeline, **common):
+            self._nodes[node.id] = node
+        for gateway in pipeline["gateways"].values():
+            self._nodes[gateway["id"]] = self._gen_gateway_node(gateway, pipeline, **common)
+
+        # resolve final references (BFS)
+        direct_references = {key: Template(record.value).get_reference() for key, record in context.items()}
+        for key, record in context.items():
+            queue = list(direct_references[key])
+            while queue:
+                r = queue.pop()
+                if r in record.references:
+                    continue
+                record.references.add(r)
+                queue.extend(direct_references.get(r, []))
+
+        self._context.setdefault(parent_id, {}).update(context)
+
+    def prepare_run_pipeline(
+        self, pipeline: dict, root_pipeline_data: dict, root_pipeline_context: dict, subprocess_context: dict, **options
+    ) -> int:
+        pipeline_id = pipeline["id"]
+
+        with self._lock:
+            self._prepare(pipeline=pipeline, root_id=pipeline_id, subprocess_context=subprocess_context)
+
+            self._data[pipeline_id] = Data(
+                inputs={k: DataInput(need_render=False, value=copy.deepcopy(v)) for k, v in root_pipeline_data.items()},
+                outputs={},
+            )
+            root_context = self._context.setdefault(pipeline_id, {})
+            for key, value in root_pipeline_context.items():
+                root_context[key] = _ContextRecord(type=ContextValueType.PLAIN, value=copy.deepcopy(value))
+            self._context_outputs[pipeline_id] = set(pipeline["data"]["outputs"])
+
+            process = _Process(
+                id=self._next_id(),
+                root_pipeline_id=pipeline_id,
+                pipeline_stack=[pipeline_id],
+                priority=options.get("priority", 100),
+                queue=options.get("queue", ""),
+            )
+            self._processes[process.id] = process
+            self.set_state(
+                node_id=pipeline_id, to_state=states.RUNNING, root_id=pipeline_id, parent_id="", set_started_time=True,
+            )
+
+        return process.id
+
+    def node_rerun_limit(self, root_pipeline_id: str, node_id: str) -> int:
+        return self.rerun_limit
@@ -349,6 +349,63 @@ class State(Representable):
         self.archived_time = archived_time
 
 
+class StateSnapshot(Representable):
+    """
+    节点状态快照，以元组列表的形式保存一批节点的状态，元组中字段的顺序与 FIELDS 一致
+    """
+
+    FIELDS = (
+        "node_id",
+        "root_id",
+        "parent_id",
+        "name",
+        "version",
+        "loop",
+        "inner_loop",
+        "retry",
+        "skip",
+        "error_ignored",
+        "created_time",
+        "started_time",
+        "archived_time",
+    )
+
+    def __init__(self, rows: List[tuple], cursor: Optional[datetime] = None):
+        """
+        :param rows: 节点状态数据
+        :type rows: List[tuple]
+        :param cursor: 下次增量获取时使用的游标，为 None 时表示运行时不支持增量获取
+        :type cursor: Optional[datetime]
+        """
+        self.rows = rows
+        self.cursor = cursor
+
+    @classmethod
+    def from_states(cls, states: List[State], cursor: Optional[datetime] = None) -> "StateSnapshot":
+        """
+        根据节点状态对象列表生成快照
+
+        :param states: 节点状态列表
+        :type states: List[State]
+        :param cursor: 下次增量获取时使用的游标
+        :type cursor: Optional[datetime]
+        :return: 节点状态快照
+        :rtype: StateSnapshot
+        """
+        return cls(rows=[tuple(getattr(s, f) for f in cls.FIELDS) for s in states], cursor=cursor)
+
+    def columns(self) -> Dict[str, list]:
+        """
+        以列的形式返回快照中的状态数据
+
+        :return: 字段名 -> 该字段在所有节点中的值
+        :rtype: Dict[str, list]
+        """
+        if not self.rows:
+            return {f: [] for f in self.FIELDS}
+        return {f: list(column) for f, column in zip(self.FIELDS, zip(*self.rows))}
+
+
 class DataInput(Representable):
     """
     节点数据输入项
@@ -566,6 +623,7 @@ class ProcessInfo(Representable):
         root_pipeline_id: str,
         pipeline_stack: List[str],
         parent_id: int,
+        ready: bool = True,
     ):
         """
 
@@ -579,12 +637,15 @@ class ProcessInfo(Representable):
         :type pipeline_stack: List[str]
         :param parent_id: 父进程 ID
         :type parent_id: int
+        :param ready: 流程数据是否已经准备完成，未准备完成的进程不能开始推进, defaults to True
+        :type ready: bool, optional
         """
         self.process_id = process_id
         self.destination_id = destination_id
         self.parent_id = parent_id
         self.root_pipeline_id = root_pipeline_id
         self.pipeline_stack = pipeline_stack
+        self.ready = ready
 
     @property
     def top_pipeline_id(self):
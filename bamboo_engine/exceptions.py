@@ -36,6 +36,16 @@ class StateVersionNotMatchError(EngineException):
     pass
 
 
+class ReferenceCycleError(EngineException):
+    def __init__(self, keys, *args):
+        self.keys = keys
+        super(ReferenceCycleError, self).__init__(*args)
+
+    def __reduce__(self):
+        # 构造参数与 self.args 不一致，需要自定义序列化方式，保证异常可以从进程池等跨进程场景中传回
+        return self.__class__, (self.keys,) + self.args
+
+
 class TreeInvalidException(EngineException):
     pass
 
@@ -46,18 +56,27 @@ class ConnectionValidateError(TreeInvalidException):
         self.detail = detail
         super(ConnectionValidateError, self).__init__(*args)
 
+    def __reduce__(self):
+        return self.__class__, (self.failed_nodes, self.detail) + self.args
+
 
 class ConvergeMatchError(TreeInvalidException):
     def __init__(self, gateway_id, *args):
         self.gateway_id = gateway_id
         super(ConvergeMatchError, self).__init__(*args)
 
+    def __reduce__(self):
+        return self.__class__, (self.gateway_id,) + self.args
+
 
 class StreamValidateError(TreeInvalidException):
     def __init__(self, node_id, *args):
         self.node_id = node_id
         super(StreamValidateError, self).__init__(*args)
 
+    def __reduce__(self):
+        return self.__class__, (self.node_id,) + self.args
+
 
 class IsolateNodeError(TreeInvalidException):
     pass
@@ -61,17 +61,17 @@ class EmptyEndEventHandler(NodeHandler):
         )
 
         context = Context(self.runtime, context_values, root_pipeline_inputs)
-        hydrated_context = context.hydrate(deformat=False)
+        hydrated_context = context.lazy_hydrate(deformat=False)
+
+        outputs = {}
+        for key in context_outputs:
+            outputs[key] = hydrated_context.get(key, key)
         logger.info(
             "[%s] %s hydrated context: %s",
             root_pipeline_id,
             pipeline_id,
             hydrated_context,
         )
-
-        outputs = {}
-        for key in context_outputs:
-            outputs[key] = hydrated_context.get(key, key)
         if not root_pipeline_finished:
             outputs[self.LOOP_KEY] = subproc_state.loop + Settings.RERUN_INDEX_OFFSET
             outputs[self.INNER_LOOP_KEY] = subproc_state.inner_loop + Settings.RERUN_INDEX_OFFSET
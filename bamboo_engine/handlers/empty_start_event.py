@@ -52,11 +52,7 @@ class EmptyStartEventHandler(NodeHandler):
 
             logger.info("{} pre_render_keys are: {}".format(top_pipeline_id, ",".join(pre_render_keys)))
 
-            refs = self.runtime.get_context_key_references(pipeline_id=top_pipeline_id, keys=set(pre_render_keys))
-
-            context_values = self.runtime.get_context_values(
-                pipeline_id=top_pipeline_id, keys=set(pre_render_keys).union(refs)
-            )
+            context_values = self.runtime.resolve_context(pipeline_id=top_pipeline_id, keys=set(pre_render_keys))
             context = Context(self.runtime, context_values, root_pipeline_inputs)
             hydrated_context = context.hydrate(deformat=False)
             for context_value in context_values:
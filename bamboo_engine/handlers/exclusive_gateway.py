@@ -17,7 +17,7 @@ from bamboo_engine import states
 from bamboo_engine.context import Context
 from bamboo_engine.template import Template
 from bamboo_engine.handler import register_handler, NodeHandler, ExecuteResult
-from bamboo_engine.utils.boolrule import BoolRule
+from bamboo_engine.utils.boolrule import BoolRule, CompiledBoolRule
 from bamboo_engine.eri import NodeType, ProcessInfo
 
 from bamboo_engine.utils.string import transform_escape_char
@@ -56,16 +56,14 @@ class ExclusiveGatewayHandler(NodeHandler):
             self.node.id,
             evaluation_refs,
         )
-        additional_refs = self.runtime.get_context_key_references(pipeline_id=top_pipeline_id, keys=evaluation_refs)
-        evaluation_refs = evaluation_refs.union(additional_refs)
-
+        # 一次性获取引用的变量及其直接和间接引用的变量
+        context_values = self.runtime.resolve_context(pipeline_id=top_pipeline_id, keys=evaluation_refs)
         logger.info(
             "[%s] %s evaluation final refs: %s",
             root_pipeline_id,
             self.node.id,
-            evaluation_refs,
+            [cv.key for cv in context_values],
         )
-        context_values = self.runtime.get_context_values(pipeline_id=top_pipeline_id, keys=evaluation_refs)
         logger.info(
             "[%s] %s evaluation context values: %s",
             root_pipeline_id,
@@ -74,8 +72,20 @@ class ExclusiveGatewayHandler(NodeHandler):
         )
 
         context = Context(self.runtime, context_values, root_pipeline_inputs)
+        # 变量在渲染条件表达式时按需解析，只有被引用到的变量才会被解析
+        rendered_conditions = []
         try:
-            hydrated_context = {k: transform_escape_char(v) for k, v in context.hydrate(deformat=True).items()}
+            hydrated_context = context.lazy_hydrate(deformat=True, transform=transform_escape_char)
+            for c in self.node.conditions:
+                # 条件表达式只会被解析一次，之后只需要渲染其中的模板片段
+                rule = CompiledBoolRule.compile(c.evaluation)
+                if rule:
+                    fragments = {tpl: Template.render_fragment(tpl, hydrated_context) for tpl in rule.templates}
+                    resolved_evaluate = rule.resolve(fragments)
+                else:
+                    fragments = None
+                    resolved_evaluate = Template(c.evaluation).render(hydrated_context)
+                rendered_conditions.append((c, rule, fragments, resolved_evaluate))
         except Exception as e:
             logger.exception(
                 "[%s] %s context hydrate error",
@@ -87,8 +97,7 @@ class ExclusiveGatewayHandler(NodeHandler):
         # check conditions
         meet_targets = []
         meet_conditions = []
-        for c in self.node.conditions:
-            resolved_evaluate = Template(c.evaluation).render(hydrated_context)
+        for c, rule, fragments, resolved_evaluate in rendered_conditions:
             logger.info(
                 "[%s] %s render evaluation %s: %s with %s",
                 root_pipeline_id,
@@ -98,13 +107,13 @@ class ExclusiveGatewayHandler(NodeHandler):
                 hydrated_context,
             )
             try:
-                result = BoolRule(resolved_evaluate).test()
+                result = rule.test(fragments) if rule else BoolRule(resolved_evaluate).test()
                 logger.info("[%s] %s %s test result: %s", root_pipeline_id, self.node.id, resolved_evaluate, result)
             except Exception as e:
                 # test failed
                 return self._execute_fail(
                     "evaluate[{}] fail with data[{}] message: {}".format(
-                        resolved_evaluate, json.dumps(hydrated_context), e
+                        resolved_evaluate, json.dumps(hydrated_context.loaded()), e
                     )
                 )
             else:
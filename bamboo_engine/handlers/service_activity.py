@@ -82,18 +82,15 @@ class ServiceActivityHandler(NodeHandler):
             inputs_refs,
         )
 
-        additional_refs = self.runtime.get_context_key_references(pipeline_id=top_pipeline_id, keys=inputs_refs)
-        inputs_refs = inputs_refs.union(additional_refs)
+        # 一次性获取引用的变量及其直接和间接引用的变量
+        context_values = self.runtime.resolve_context(pipeline_id=top_pipeline_id, keys=inputs_refs)
         logger.info(
             "[%s] %s activity final refs: %s",
             root_pipeline_id,
             self.node.id,
-            inputs_refs,
+            [cv.key for cv in context_values],
         )
 
-        # prepare context
-        context_values = self.runtime.get_context_values(pipeline_id=top_pipeline_id, keys=inputs_refs)
-
         # pre extract loop outputs
         loop_value = loop + Settings.RERUN_INDEX_OFFSET
         need_render_inputs[self.LOOP_KEY] = loop_value
@@ -122,9 +119,10 @@ class ServiceActivityHandler(NodeHandler):
         )
 
         context = Context(self.runtime, context_values, root_pipeline_inputs)
-        # hydrate will call user code, use try to catch unexpected error
+        # 变量在渲染输入时按需解析，解析会调用用户代码，use try to catch unexpected error
         try:
-            hydrated_context = context.hydrate(deformat=True)
+            hydrated_context = context.lazy_hydrate(deformat=True)
+            execute_inputs = Template(need_render_inputs).render(hydrated_context)
         except Exception as e:
             logger.exception(
                 "[%s] %s activity context hydrate error",
@@ -160,8 +158,6 @@ class ServiceActivityHandler(NodeHandler):
             hydrated_context,
         )
 
-        # resolve inputs
-        execute_inputs = Template(need_render_inputs).render(hydrated_context)
         execute_inputs.update(render_escape_inputs)
 
         # data prepare
@@ -61,18 +61,15 @@ class SubProcessHandler(NodeHandler):
             inputs_refs,
         )
 
-        additional_refs = self.runtime.get_context_key_references(pipeline_id=top_pipeline_id, keys=inputs_refs)
-        inputs_refs = inputs_refs.union(additional_refs)
+        # 一次性获取引用的变量及其直接和间接引用的变量
+        context_values = self.runtime.resolve_context(pipeline_id=top_pipeline_id, keys=inputs_refs)
         logger.info(
             "[%s] %s subprocess final refs: %s",
             root_pipeline_id,
             self.node.id,
-            inputs_refs,
+            [cv.key for cv in context_values],
         )
 
-        # prepare context
-        context_values = self.runtime.get_context_values(pipeline_id=top_pipeline_id, keys=inputs_refs)
-
         # pre extract loop outputs
         loop_value = loop + Settings.RERUN_INDEX_OFFSET
         if self.LOOP_KEY in data.outputs:
@@ -92,16 +89,16 @@ class SubProcessHandler(NodeHandler):
         )
 
         context = Context(self.runtime, context_values, root_pipeline_inputs)
-        hydrated_context = context.hydrate(deformat=True)
+        hydrated_context = context.lazy_hydrate(deformat=True)
+
+        # resolve inputs
+        subprocess_inputs = Template(need_render_inputs).render(hydrated_context)
         logger.info(
             "[%s] %s subprocess parent hydrated context: %s",
             root_pipeline_id,
             self.node.id,
             hydrated_context,
         )
-
-        # resolve inputs
-        subprocess_inputs = Template(need_render_inputs).render(hydrated_context)
         subprocess_inputs.update(render_escape_inputs)
         sub_context_values = {
             key: ContextValue(key=key, type=ContextValueType.PLAIN, value=value)
@@ -114,6 +114,18 @@ ENGINE_NODE_SCHEDULE_TIME = Histogram(
     buckets=get_histogram_buckets_from_evn("ENGINE_NODE_SCHEDULE_TIME_BUCKETS"),
     labelnames=["type"],
 )
+ENGINE_TEMPLATE_CACHE_HIT = Counter(
+    "engine_template_cache_hit", "count compiled template cache hit"
+)
+ENGINE_TEMPLATE_CACHE_MISS = Counter(
+    "engine_template_cache_miss", "count compiled template cache miss"
+)
+ENGINE_PIPELINE_PLAN_CACHE_HIT = Counter(
+    "engine_pipeline_plan_cache_hit", "count compiled pipeline plan cache hit"
+)
+ENGINE_PIPELINE_PLAN_CACHE_MISS = Counter(
+    "engine_pipeline_plan_cache_miss", "count compiled pipeline plan cache miss"
+)
 
 # runtime metrics
 ENGINE_RUNTIME_CONTEXT_VALUE_READ_TIME = Histogram(
@@ -160,6 +172,13 @@ ENGINE_RUNTIME_EXEC_DATA_WRITE_TIME = Histogram(
     "engine_runtime_exec_data_write_time",
     "time spent writing node execution data inputs and outputs",
 )
+ENGINE_RUNTIME_EXEC_DATA_WRITE_SKIPPED = Counter(
+    "engine_runtime_exec_data_write_skipped",
+    "count node execution data writes skipped because nothing changed",
+)
+ENGINE_RUNTIME_PAYLOAD_OFFLOADED = Counter(
+    "engine_runtime_payload_offloaded", "count oversized payloads stored in payload table"
+)
 ENGINE_RUNTIME_CALLBACK_DATA_READ_TIME = Histogram(
     "engine_runtime_callback_data_read_time",
     "time spent reading node callback data",
@@ -182,6 +201,12 @@ ENGINE_RUNTIME_STATE_WRITE_TIME = Histogram(
 ENGINE_RUNTIME_NODE_READ_TIME = Histogram(
     "engine_runtime_node_read_time", "time spent reading node"
 )
+ENGINE_RUNTIME_NODE_CACHE_HIT = Counter(
+    "engine_runtime_node_cache_hit", "count node cache hit"
+)
+ENGINE_RUNTIME_NODE_CACHE_MISS = Counter(
+    "engine_runtime_node_cache_miss", "count node cache miss"
+)
 
 ENGINE_RUNTIME_PROCESS_READ_TIME = Histogram(
     "engine_runtime_process_read_time", "time spent reading process"
@@ -11,20 +11,23 @@ an "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express o
 specific language governing permissions and limitations under the License.
 """
 
-"""
-封装模板处理，渲染逻辑的相关模块
-"""
+# 封装模板处理，渲染逻辑的相关模块
 
 import copy
 import re
+import keyword
 import logging
+import traceback
 
-from typing import Any, List, Set
+from typing import Any, List, Set, Optional
 
 from mako.template import Template as MakoTemplate
 from mako import lexer, codegen
 from mako.exceptions import MakoException
 
+from bamboo_engine import metrics
+from bamboo_engine.config import Settings
+from bamboo_engine.utils.collections import LRUCache
 from bamboo_engine.utils.mako_utils.checker import check_mako_template_safety
 from bamboo_engine.utils.mako_utils.exceptions import ForbiddenMakoTemplateException
 from bamboo_engine.utils import mako_safety
@@ -36,6 +39,100 @@ from . import sandbox
 logger = logging.getLogger("root")
 # find mako template(format is ${xxx}，and ${}# not in xxx, # may raise memory error)
 TEMPLATE_PATTERN = re.compile(r"\${[^${}#]+}")
+# 仅由标识符，属性访问以及常量下标访问组成的模板，如 ${a}, ${a.b}, ${a["k"]}，这类模板只引用了第一个标识符
+SIMPLE_REFERENCE_PATTERN = re.compile(
+    r"""^\$\{\s*([A-Za-z_]\w*)(?:\s*\.\s*[A-Za-z_]\w*|\[\s*(?:"[^"\\]*"|'[^'\\]*'|\d+)\s*\])*\s*}$""",
+    re.ASCII,
+)
+STRING_LITERAL_PATTERN = re.compile(r""""[^"\\]*"|'[^'\\]*'""")
+IDENTIFIER_PATTERN = re.compile(r"[A-Za-z_]\w*", re.ASCII)
+# mako 不会视为外部引用的标识符
+NON_REFERENCE_IDENTIFIERS = {"context", "True", "False", "None"}
+
+
+class CompiledTemplate:
+    """
+    模板片段的编译结果，包括安全检查结论以及编译后的 mako 模板
+    """
+
+    def __init__(self, template: str):
+        self.template = template
+        self.safe = False
+        self.safety_error = None
+        self.safety_check_crashed = False
+        self.mako_template = None
+        self.compile_error = None
+
+        try:
+            check_mako_template_safety(
+                template,
+                mako_safety.SingleLineNodeVisitor(),
+                mako_safety.SingleLinCodeExtractor(),
+            )
+        except ForbiddenMakoTemplateException as e:
+            self.safety_error = "forbidden template: {}, exception: {}".format(
+                template, e
+            )
+        except Exception:
+            self.safety_error = "{} safety check error: {}".format(
+                template, traceback.format_exc()
+            )
+            self.safety_check_crashed = True
+        else:
+            self.safe = True
+
+        try:
+            self.mako_template = MakoTemplate(template)
+        except (MakoException, SyntaxError) as e:
+            self.compile_error = e
+
+
+# 模板片段编译缓存，渲染重复出现的模板片段时可以跳过解析，代码生成以及安全检查
+TEMPLATE_CACHE = LRUCache(max_size=Settings.MAKO_TEMPLATE_CACHE_SIZE)
+# 模板片段引用的标志符缓存
+REFERENCE_CACHE = LRUCache(max_size=Settings.MAKO_TEMPLATE_CACHE_SIZE)
+
+
+def get_compiled_template(template: str) -> CompiledTemplate:
+    """
+    获取模板片段的编译结果
+
+    :param template: 模板片段
+    :type template: str
+    :return: 编译结果
+    :rtype: CompiledTemplate
+    """
+    compiled = TEMPLATE_CACHE.get(template)
+    if compiled is not None:
+        metrics.ENGINE_TEMPLATE_CACHE_HIT.inc()
+        return compiled
+
+    metrics.ENGINE_TEMPLATE_CACHE_MISS.inc()
+    compiled = CompiledTemplate(template)
+    # 缓存大小配置可能在模块引入后才被修改
+    TEMPLATE_CACHE.max_size = Settings.MAKO_TEMPLATE_CACHE_SIZE
+    TEMPLATE_CACHE.set(template, compiled)
+    return compiled
+
+
+def get_template_reference(template: str) -> tuple:
+    """
+    获取模板片段引用的标志符
+
+    :param template: 模板片段
+    :type template: str
+    :return: 标志符元组
+    :rtype: tuple
+    """
+    reference = REFERENCE_CACHE.get(template)
+    if reference is None:
+        reference = _get_simple_template_reference(template)
+        if reference is None:
+            reference = tuple(_parse_template_reference(template))
+        REFERENCE_CACHE.max_size = Settings.MAKO_TEMPLATE_CACHE_SIZE
+        REFERENCE_CACHE.set(template, reference)
+
+    return reference
 
 
 class Template:
@@ -111,25 +208,7 @@ class Template:
         return list(set(TEMPLATE_PATTERN.findall(string)))
 
     def _get_template_reference(self, template: str) -> List[str]:
-        lex = lexer.Lexer(template)
-
-        try:
-            node = lex.parse()
-        except MakoException as e:
-            logger.warning(
-                "pipeline get template[{}] reference error[{}]".format(template, e)
-            )
-            return []
-
-        # Dummy compiler. _Identifiers class requires one
-        # but only interested in the reserved_names field
-        def compiler():
-            return None
-
-        compiler.reserved_names = set()
-        identifiers = codegen._Identifiers(compiler, node)
-
-        return list(identifiers.undeclared)
+        return list(get_template_reference(template))
 
     def _render_string(self, string: str, context: dict) -> str:
         """
@@ -155,22 +234,30 @@ class Template:
             return context[deformat_var_key(string)]
 
         for tpl in templates:
-            try:
-                check_mako_template_safety(
-                    tpl,
-                    mako_safety.SingleLineNodeVisitor(),
-                    mako_safety.SingleLinCodeExtractor(),
-                )
-            except ForbiddenMakoTemplateException as e:
-                logger.warning("forbidden template: {}, exception: {}".format(tpl, e))
-                continue
-            except Exception:
-                logger.exception("{} safety check error.".format(tpl))
-                continue
-            resolved = Template._render_template(tpl, context)
-            string = string.replace(tpl, resolved)
+            string = string.replace(tpl, Template.render_fragment(tpl, context))
         return string
 
+    @staticmethod
+    def render_fragment(template: str, context: dict) -> str:
+        """
+        使用特定上下文渲染单个模板片段，未通过安全检查的片段会原样返回
+
+        :param template: 模板片段
+        :type template: str
+        :param context: 上下文
+        :type context: dict
+        :return: 渲染后的模板片段
+        :rtype: str
+        """
+        compiled = get_compiled_template(template)
+        if not compiled.safe:
+            if compiled.safety_check_crashed:
+                logger.error(compiled.safety_error)
+            else:
+                logger.warning(compiled.safety_error)
+            return template
+        return Template._render_compiled_template(compiled, context)
+
     @staticmethod
     def _render_template(template: str, context: dict) -> Any:
         """
@@ -184,20 +271,43 @@ class Template:
         :return: [description]
         :rtype: str
         """
-        data = {}
-        data.update(sandbox.get())
-        data.update(context)
         if not isinstance(template, str):
             raise TypeError(
                 "constant resolve error, template[%s] is not a string" % template
             )
-        try:
-            tm = MakoTemplate(template)
-        except (MakoException, SyntaxError) as e:
-            logger.error("pipeline resolve template[{}] error[{}]".format(template, e))
+        return Template._render_compiled_template(
+            get_compiled_template(template), context
+        )
+
+    @staticmethod
+    def _render_compiled_template(compiled: CompiledTemplate, context: dict) -> Any:
+        """
+        使用特定上下文渲染已编译的模板
+
+        :param compiled: 模板编译结果
+        :type compiled: CompiledTemplate
+        :param context: 上下文
+        :type context: dict
+        :return: 渲染结果
+        :rtype: str
+        """
+        template = compiled.template
+        data = {}
+        data.update(sandbox.get())
+        if isinstance(context, dict):
+            data.update(context)
+        else:
+            # 按需解析的上下文只读取模板片段引用的标志符，避免解析未被使用的变量
+            data.update({ref: context[ref] for ref in get_template_reference(template) if ref in context})
+        if compiled.mako_template is None:
+            logger.error(
+                "pipeline resolve template[{}] error[{}]".format(
+                    template, compiled.compile_error
+                )
+            )
             return template
         try:
-            resolved = tm.render_unicode(**data)
+            resolved = compiled.mako_template.render_unicode(**data)
         except Exception as e:
             logger.warning(
                 "constant content({}) is invalid, data({}), error: {}".format(
@@ -207,3 +317,55 @@ class Template:
             return template
         else:
             return resolved
+
+
+def _get_simple_template_reference(template: str) -> Optional[tuple]:
+    """
+    快速获取简单模板片段（如 ${a}, ${a.b}, ${a["k"]}）引用的标志符，非简单模板返回 None
+
+    :param template: 模板片段
+    :type template: str
+    :return: 标志符元组
+    :rtype: Optional[tuple]
+    """
+    if not SIMPLE_REFERENCE_PATTERN.match(template):
+        return None
+
+    # 关键字无法作为属性使用，除 True, False, None 外也无法作为标识符使用，交由 mako 处理
+    name, *attrs = IDENTIFIER_PATTERN.findall(STRING_LITERAL_PATTERN.sub("", template))
+    if any(keyword.iskeyword(attr) for attr in attrs):
+        return None
+    if keyword.iskeyword(name) and name not in NON_REFERENCE_IDENTIFIERS:
+        return None
+
+    return () if name in NON_REFERENCE_IDENTIFIERS else (name,)
+
+
+def _parse_template_reference(template: str) -> List[str]:
+    """
+    通过 mako 词法分析获取模板片段引用的标志符
+
+    :param template: 模板片段
+    :type template: str
+    :return: 标志符列表
+    :rtype: List[str]
+    """
+    lex = lexer.Lexer(template)
+
+    try:
+        node = lex.parse()
+    except MakoException as e:
+        logger.warning(
+            "pipeline get template[{}] reference error[{}]".format(template, e)
+        )
+        return []
+
+    # Dummy compiler. _Identifiers class requires one
+    # but only interested in the reserved_names field
+    def compiler():
+        return None
+
+    compiler.reserved_names = set()
+    identifiers = codegen._Identifiers(compiler, node)
+
+    return list(identifiers.undeclared)
@@ -17,6 +17,9 @@ bool 表达式解析工具模块
 
 from .boolrule import (
     BoolRule,
+    CompiledBoolRule,
     MissingVariableException,
     UnknownOperatorException,
-)  # noqa
+)
+
+__all__ = ["BoolRule", "CompiledBoolRule", "MissingVariableException", "UnknownOperatorException"]
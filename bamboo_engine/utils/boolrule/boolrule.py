@@ -11,6 +11,8 @@ an "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express o
 specific language governing permissions and limitations under the License.
 """
 
+import re
+
 from pyparsing import (
     CaselessLiteral,
     Combine,
@@ -31,6 +33,9 @@ from pyparsing import (
     oneOf,
 )
 
+from bamboo_engine.config import Settings
+from bamboo_engine.utils.collections import LRUCache
+
 
 class SubstituteVal:
     """
@@ -277,6 +282,243 @@ class BoolRule:
         return passed
 
 
+# 条件表达式中的模板片段，与 bamboo_engine.template 的匹配规则保持一致
+SLOT_PATTERN = re.compile(r"\${[^${}#]+}")
+SLOT_PLACEHOLDER_PREFIX = "_bamboo_slot_"
+SLOT_INT_PATTERN = re.compile(r"[+-]?[0-9]+")
+SLOT_REAL_PATTERN = re.compile(r"[+-]?(?:[0-9]+\.[0-9]*|\.[0-9]+)")
+SLOT_PATH_PATTERN = re.compile(r"_?[A-Za-z][A-Za-z0-9_]*(?:\._?[A-Za-z][A-Za-z0-9_]*)*")
+# 条件表达式编译结果缓存，无法编译的表达式缓存为 False
+COMPILED_RULE_CACHE = LRUCache(max_size=Settings.BOOLRULE_COMPILED_CACHE_SIZE)
+
+
+class UnsupportedSlotValue(Exception):
+    """
+    Raised when a rendered slot value would change the structure of the
+    compiled expression, the rule must be tested with the rendered string.
+    """
+
+    pass
+
+
+class Slot:
+    """
+    Represents a template fragment in the compiled expression.
+
+    :param template: the template fragment, such as ${a}
+    :param quote: the quote char around the fragment, None if it's not quoted
+    :param in_list: whether the fragment is an item of a list value
+    """
+
+    def __init__(self, template, quote, in_list):
+        self.template = template
+        self.quote = quote
+        self.in_list = in_list
+
+    def parse(self, value):
+        """
+        Parse the rendered value of fragment in the same way as the rendered
+        expression will be parsed.
+        """
+        if not isinstance(value, str) or "${" in value:
+            raise UnsupportedSlotValue(value)
+
+        if self.quote is not None:
+            if self.quote in value or "\n" in value or "\r" in value:
+                raise UnsupportedSlotValue(value)
+            if "\\" not in value:
+                return value
+            return self._parse_by_grammar(
+                QuotedString(self.quote), self.quote + value + self.quote
+            )
+
+        if SLOT_INT_PATTERN.fullmatch(value):
+            return int(value)
+        if SLOT_REAL_PATTERN.fullmatch(value):
+            return float(value)
+
+        lower_value = value.lower()
+        if lower_value in ("true", "false"):
+            return lower_value == "true"
+        if SLOT_PATH_PATTERN.fullmatch(value) and not lower_value.startswith(
+            ("true", "false")
+        ):
+            return value
+
+        element = simpleVals if self.in_list else propertyVal
+        return self._parse_by_grammar(element, value)
+
+    def _parse_by_grammar(self, element, value):
+        try:
+            tokens = element.parseString(value, parseAll=True)
+        except Exception:
+            raise UnsupportedSlotValue(value)
+
+        return _expand_literal(tokens[0])
+
+
+def _expand_literal(val):
+    # same as BoolRule._expand_val without context
+    if isinstance(val, SubstituteVal):
+        return val.get_val(None)
+
+    if isinstance(val, ParseResults):
+        val = val.asList()
+
+    if type(val) is list:
+        return [_expand_literal(v) for v in val]
+
+    return val
+
+
+class CompiledBoolRule(BoolRule):
+    """
+    Represents a boolean expression which contains template fragments, the
+    expression is parsed only once with fragments replaced by slots, and is
+    tested against the rendered values of fragments later.
+
+    Testing a compiled rule always gets the same result as testing a
+    ``BoolRule`` with the rendered expression, if a rendered value may change
+    the structure of expression, the rendered expression will be tested.
+
+    :param query: A string containing the un-rendered query
+    """
+
+    def __init__(self, query):
+        self.original_query = query
+        self.templates = list(set(SLOT_PATTERN.findall(query)))
+        self.slots = {}
+
+        if SLOT_PLACEHOLDER_PREFIX in query:
+            raise ValueError("query can not contains %s" % SLOT_PLACEHOLDER_PREFIX)
+
+        placeholders = {}
+        parts = []
+        last_end = 0
+        for index, match in enumerate(SLOT_PATTERN.finditer(query)):
+            placeholder = "%s%s_" % (SLOT_PLACEHOLDER_PREFIX, index)
+            start, end = match.span()
+            before = query[start - 1] if start > 0 else ""
+            after = query[end] if end < len(query) else ""
+            quote = before if before in ("'", '"') and before == after else None
+            placeholders[placeholder] = (match.group(), quote)
+            parts.append(query[last_end:start])
+            parts.append(placeholder)
+            last_end = end
+        parts.append(query[last_end:])
+
+        super().__init__("".join(parts))
+        self._collect_slots(self._tokens, placeholders)
+
+        if len(self.slots) != len(placeholders):
+            raise ValueError("template fragments in query can not be used as values")
+
+    def _collect_slots(self, tokens, placeholders):
+        if tokens is None:
+            return
+
+        for token in tokens:
+            if not isinstance(token, ParseResults):
+                continue
+
+            if not token.getName():
+                self._collect_slots(token, placeholders)
+                continue
+
+            items = token.asDict()
+            for side in ("lval", "rval"):
+                val = items[side][0]
+                if isinstance(val, list):
+                    for item in val:
+                        self._collect_slot(item, True, placeholders)
+                else:
+                    self._collect_slot(val, False, placeholders)
+
+    def _collect_slot(self, val, in_list, placeholders):
+        if isinstance(val, SubstituteVal):
+            name, quoted = val._path, False
+        elif isinstance(val, str):
+            name, quoted = val, True
+        else:
+            return
+
+        if SLOT_PLACEHOLDER_PREFIX not in name:
+            return
+
+        if name not in placeholders or name in self.slots:
+            raise ValueError("template fragment must be used as a whole value")
+
+        template, quote = placeholders[name]
+        if quoted != (quote is not None):
+            raise ValueError("template fragment must be used as a whole value")
+
+        self.slots[name] = Slot(template, quote, in_list)
+
+    def resolve(self, fragments):
+        """
+        Get the rendered query with the rendered values of fragments.
+
+        :param fragments: A dict maps template fragment to its rendered value.
+        """
+        query = self.original_query
+        for tpl in self.templates:
+            query = query.replace(tpl, fragments[tpl])
+        return query
+
+    def test(self, fragments=None):
+        """
+        Test the expression with the rendered values of fragments.
+
+        :param fragments: A dict maps template fragment to its rendered value.
+        :return: True if the expression succesfully evaluated against the
+                rendered values, or False otherwise.
+        """
+        if self._is_match_all():
+            return True
+
+        fragments = fragments or {}
+        try:
+            values = {
+                name: slot.parse(fragments[slot.template])
+                for name, slot in self.slots.items()
+            }
+        except UnsupportedSlotValue:
+            return BoolRule(self.resolve(fragments)).test()
+
+        return self._test_tokens(self._tokens, values)
+
+    def _expand_val(self, val, context):
+        if isinstance(val, SubstituteVal):
+            if val._path in context:
+                return context[val._path]
+            return val._path
+
+        if isinstance(val, str) and val in context:
+            return context[val]
+
+        return super()._expand_val(val, context)
+
+    @classmethod
+    def compile(cls, query):
+        """
+        Get the compiled rule of query from cache, return None if the query
+        can not be compiled.
+
+        :param query: A string containing the un-rendered query
+        """
+        rule = COMPILED_RULE_CACHE.get(query)
+        if rule is None:
+            try:
+                rule = cls(query)
+            except Exception:
+                rule = False
+            # 缓存大小配置可能在模块引入后才被修改
+            COMPILED_RULE_CACHE.max_size = Settings.BOOLRULE_COMPILED_CACHE_SIZE
+            COMPILED_RULE_CACHE.set(query, rule)
+
+        return rule or None
+
+
 class MissingVariableException(Exception):
     """
     Raised when an expression contains a property path that's not supplied in
@@ -11,13 +11,12 @@ an "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express o
 specific language governing permissions and limitations under the License.
 """
 
-"""
-集合类工具
-"""
+# 集合类工具
 
 
-from typing import Any
-from collections import UserDict
+import threading
+from typing import Any, Optional
+from collections import UserDict, OrderedDict
 
 
 class FancyDict(dict):
@@ -56,3 +55,75 @@ class ConstantDict(dict):
         raise TypeError(
             "'%s' object does not support item assignment" % self.__class__.__name__
         )
+
+
+class LRUCache:
+    """
+    线程安全的 LRU 缓存，同时按照条目数量和条目权重总和进行容量限制
+
+    >>> cache = LRUCache(max_size=2)
+    >>> cache.set("a", 1)
+    >>> cache.set("b", 2)
+    >>> cache.set("c", 3)
+    >>> cache.get("a") is None
+    True
+    """
+
+    def __init__(self, max_size: int, max_weight: Optional[int] = None):
+        """
+
+        :param max_size: 最大条目数
+        :type max_size: int
+        :param max_weight: 最大权重总和, defaults to None
+        :type max_weight: Optional[int], optional
+        """
+        self.max_size = max_size
+        self.max_weight = max_weight
+        self.weight = 0
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: Any, default: Any = None) -> Any:
+        with self._lock:
+            try:
+                value, _ = self._data[key]
+            except KeyError:
+                return default
+            self._data.move_to_end(key)
+            return value
+
+    def set(self, key: Any, value: Any, weight: int = 0):
+        # 超过容量限制的条目不进行缓存
+        if self.max_size <= 0 or (self.max_weight is not None and weight > self.max_weight):
+            return
+
+        with self._lock:
+            if key in self._data:
+                self.weight -= self._data.pop(key)[1]
+
+            self._data[key] = (value, weight)
+            self.weight += weight
+
+            while len(self._data) > self.max_size or (self.max_weight is not None and self.weight > self.max_weight):
+                _, (_, evicted_weight) = self._data.popitem(last=False)
+                self.weight -= evicted_weight
+
+    def pop(self, key: Any, default: Any = None) -> Any:
+        with self._lock:
+            try:
+                value, weight = self._data.pop(key)
+            except KeyError:
+                return default
+            self.weight -= weight
+            return value
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+            self.weight = 0
+
+    def __contains__(self, key: Any) -> bool:
+        return key in self._data
+
+    def __len__(self) -> int:
+        return len(self._data)
@@ -28,28 +28,41 @@ class Graph(object):
         visit_stack = {node: False for node in self.nodes}
 
         for node in self.nodes:
+            if visited[node]:
+                continue
             if self._has_cycle(node, visited, visit_stack):
                 return True
         return False
 
     def _has_cycle(self, node, visited, visit_stack):
-        self.last_visited_node = node
-        self.path.append(node)
-        visited[node] = True
-        visit_stack[node] = True
+        # 使用显式栈进行深度优先遍历，避免节点数量较多时超出递归深度限制
+        # self.path 始终与当前遍历栈中的节点保持一致，发现环时追加环的交汇节点
+        self._enter(node, visited, visit_stack)
+        stack = [(node, iter(self.graph[node]))]
 
-        for neighbor in self.graph[node]:
-            if not visited[neighbor]:
-                if self._has_cycle(neighbor, visited, visit_stack):
+        while stack:
+            current, neighbors = stack[-1]
+            for neighbor in neighbors:
+                if not visited[neighbor]:
+                    self._enter(neighbor, visited, visit_stack)
+                    stack.append((neighbor, iter(self.graph[neighbor])))
+                    break
+                elif visit_stack[neighbor]:
+                    self.path.append(neighbor)
                     return True
-            elif visit_stack[neighbor]:
-                self.path.append(neighbor)
-                return True
+            else:
+                stack.pop()
+                self.path.pop()
+                visit_stack[current] = False
 
-        self.path.remove(node)
-        visit_stack[node] = False
         return False
 
+    def _enter(self, node, visited, visit_stack):
+        self.last_visited_node = node
+        self.path.append(node)
+        visited[node] = True
+        visit_stack[node] = True
+
     def get_cycle(self):
         if self.has_cycle():
             cross_node = self.path[-1]
@@ -11,10 +11,9 @@ an "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express o
 specific language governing permissions and limitations under the License.
 """
 
-"""
-字符串处理类工具
-"""
+# 字符串处理类工具
 
+import itertools
 import uuid
 
 ESCAPED_CHARS = {"\n": r"\n", "\r": r"\r", "\t": r"\t"}
@@ -66,6 +65,24 @@ def unique_id(prefix: str) -> str:
     return "{}{}".format(prefix, uuid.uuid4().hex)
 
 
+class UniqueIdGenerator:
+    """
+    批量生成与 unique_id 格式相同（单字符前缀 + 32 位十六进制字符）的 ID，
+    高 16 位字符为生成器创建时通过 uuid4 生成的随机串，低 16 位字符为自增计数，
+    同一个生成器生成的 ID 不会重复，且不需要每次生成 ID 时都调用 uuid4
+    """
+
+    def __init__(self):
+        self._base = uuid.uuid4().hex[:16]
+        self._counter = itertools.count()
+
+    def __call__(self, prefix: str) -> str:
+        if len(prefix) != 1:
+            raise ValueError("prefix length must be 1")
+
+        return "%s%s%016x" % (prefix, self._base, next(self._counter))
+
+
 def get_lower_case_name(text: str) -> str:
     lst = []
     for index, char in enumerate(text):
@@ -11,19 +11,39 @@ an "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express o
 specific language governing permissions and limitations under the License.
 """
 
+from concurrent.futures import Executor
+from typing import Dict, List, Optional
+
 from bamboo_engine.eri import NodeType
 from bamboo_engine import exceptions
 
-from . import rules
+from . import plan, rules
 from .connection import (
     validate_graph_connection,
     validate_graph_without_circle,
 )
 from .gateway import validate_gateways, validate_stream
-from .utils import format_pipeline_tree_io_to_list
+from .utils import PipelineIndex, format_pipeline_tree_io_to_list, get_nodes_dict
+
+
+def validate_and_process_pipeline(pipeline: dict, cycle_tolerate=False, executor: Optional[Executor] = None):
+    """
+    校验流程及其所有子流程，并为网关设置对应的汇聚网关
 
+    传入 executor 时流程树中的每个（子）流程会作为独立的任务提交到 executor 中校验，
+    校验结果按照串行校验时的顺序（先子流程后父流程）合并，抛出的异常与串行校验时一致
+
+    :param pipeline: 流程描述
+    :type pipeline: dict
+    :param cycle_tolerate: 是否允许流程中存在环
+    :type cycle_tolerate: bool
+    :param executor: 用于并行校验子流程的 executor，为 None 时串行校验, defaults to None
+    :type executor: Optional[Executor], optional
+    """
+    if executor is not None:
+        _parallel_validate_and_process_pipeline(pipeline, cycle_tolerate, executor)
+        return
 
-def validate_and_process_pipeline(pipeline: dict, cycle_tolerate=False):
     for subproc in [
         act
         for act in pipeline["activities"].values()
@@ -31,23 +51,112 @@ def validate_and_process_pipeline(pipeline: dict, cycle_tolerate=False):
     ]:
         validate_and_process_pipeline(subproc["pipeline"], cycle_tolerate)
 
+    _process_pipeline(pipeline, cycle_tolerate)
+
+
+def _process_pipeline(pipeline: dict, cycle_tolerate: bool):
     format_pipeline_tree_io_to_list(pipeline)
+
+    # 相同结构的流程直接复用已缓存的编译计划
+    structure = plan.get_pipeline_structure(pipeline, cycle_tolerate)
+    if structure is not None:
+        digest, node_ids = structure
+        compiled_plan = plan.get_compiled_plan(digest)
+        if compiled_plan is not None:
+            compiled_plan.apply(pipeline, node_ids)
+            return
+
+    # 连通性校验与分支流校验共用同一份节点索引，环检测与网关校验共用同一份整数编号的节点索引
+    nodes = get_nodes_dict(pipeline)
+    index = PipelineIndex(pipeline)
+
     # 1. connection validation
-    validate_graph_connection(pipeline)
+    validate_graph_connection(pipeline, nodes)
 
     # do not tolerate circle in flow
     if not cycle_tolerate:
-        no_cycle = validate_graph_without_circle(pipeline)
+        no_cycle = validate_graph_without_circle(pipeline, index)
         if not no_cycle["result"]:
             raise exceptions.TreeInvalidException(no_cycle["message"])
 
     # 2. gateway validation
-    validate_gateways(pipeline)
+    converged = validate_gateways(pipeline, index)
 
     # 3. stream validation
-    validate_stream(pipeline)
+    validate_stream(pipeline, nodes)
+
+    if structure is not None:
+        plan.set_compiled_plan(digest, plan.CompiledPlan.from_converged(converged, node_ids))
+
+
+def _process_detached_pipeline(pipeline: dict, cycle_tolerate: bool) -> Dict[str, str]:
+    """
+    校验不包含子流程内容的流程，返回网关与其汇聚网关的映射，executor 为进程池时校验过程中对流程的修改无法传回，
+    由调用方根据返回值进行设置
+    """
+    _process_pipeline(pipeline, cycle_tolerate)
+    return {
+        gateway_id: gateway["converge_gateway_id"]
+        for gateway_id, gateway in pipeline["gateways"].items()
+        if "converge_gateway_id" in gateway
+    }
+
+
+def _detach_subprocesses(pipeline: dict) -> dict:
+    """
+    返回去掉子流程内容的流程浅拷贝，避免提交任务时重复序列化整棵子流程树
+    """
+    activities = {}
+    for act_id, act in pipeline["activities"].items():
+        if act["type"] == NodeType.SubProcess.value:
+            act = {k: v for k, v in act.items() if k != "pipeline"}
+        activities[act_id] = act
+
+    detached = dict(pipeline)
+    detached["activities"] = activities
+    return detached
+
+
+def _pipelines_in_validate_order(pipeline: dict) -> List[dict]:
+    """
+    按照串行校验的顺序（子流程按照节点顺序先于父流程）返回流程树中的所有流程
+    """
+    ordered = []
+    stack = [(pipeline, False)]
+    while stack:
+        current, expanded = stack.pop()
+        if expanded:
+            ordered.append(current)
+            continue
+
+        stack.append((current, True))
+        subprocs = [act for act in current["activities"].values() if act["type"] == NodeType.SubProcess.value]
+        for subproc in reversed(subprocs):
+            stack.append((subproc["pipeline"], False))
+
+    return ordered
+
+
+def _parallel_validate_and_process_pipeline(pipeline: dict, cycle_tolerate: bool, executor: Executor):
+    # 各个流程的校验互不依赖，全部提交后按照串行校验的顺序获取结果，第一个失败的流程的异常会被抛出
+    pipelines = _pipelines_in_validate_order(pipeline)
+    futures = [
+        executor.submit(_process_detached_pipeline, _detach_subprocesses(p), cycle_tolerate) for p in pipelines
+    ]
+
+    try:
+        for p, future in zip(pipelines, futures):
+            converge_gateways = future.result()
+            format_pipeline_tree_io_to_list(p)
+            for gateway_id, converge_gateway_id in converge_gateways.items():
+                p["gateways"][gateway_id]["converge_gateway_id"] = converge_gateway_id
+    finally:
+        for future in futures:
+            future.cancel()
 
 
 def add_sink_type(node_type: str):
     rules.FLOW_NODES_WITHOUT_STARTEVENT.append(node_type)
     rules.NODE_RULES[node_type] = rules.SINK_RULE
+    # 节点规则发生变化，已缓存的编译计划不再可信
+    plan.clear_compiled_plans()
@@ -18,11 +18,15 @@ from .rules import NODE_RULES
 from .utils import get_nodes_dict
 
 
-def validate_graph_connection(data):
+def validate_graph_connection(data, nodes=None):
     """
     节点连接合法性校验
+
+    :param data: 流程描述
+    :param nodes: get_nodes_dict 返回的节点字典，未传入时根据 data 构造
     """
-    nodes = get_nodes_dict(data)
+    if nodes is None:
+        nodes = get_nodes_dict(data)
 
     result = {"result": True, "message": {}, "failed_nodes": []}
 
@@ -53,7 +57,7 @@ def validate_graph_connection(data):
             )
 
 
-def validate_graph_without_circle(data):
+def validate_graph_without_circle(data, index=None):
     """
     validate if a graph has not cycle
 
@@ -62,14 +66,22 @@ def validate_graph_without_circle(data):
         "message": "error message",
         "error_data": ["node1_id", "node2_id", "node1_id"]
     }
+
+    :param data: 流程描述
+    :param index: data 的 PipelineIndex，传入时使用索引中的整数节点编号构造图
     """
 
-    nodes = [data["start_event"]["id"], data["end_event"]["id"]]
-    nodes += list(data["gateways"].keys()) + list(data["activities"].keys())
-    flows = [
-        [flow["source"], flow["target"]] for _, flow in list(data["flows"].items())
-    ]
-    cycle = Graph(nodes, flows).get_cycle()
+    if index is not None:
+        nodes = range(index.node_count)
+        flows = zip(index.flow_source, index.flow_target)
+        cycle = [index.node_ids[i] for i in Graph(nodes, flows).get_cycle()]
+    else:
+        nodes = [data["start_event"]["id"], data["end_event"]["id"]]
+        nodes += list(data["gateways"].keys()) + list(data["activities"].keys())
+        flows = [
+            [flow["source"], flow["target"]] for _, flow in list(data["flows"].items())
+        ]
+        cycle = Graph(nodes, flows).get_cycle()
     if cycle:
         return {
             "result": False,
@@ -11,10 +11,10 @@ an "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express o
 specific language governing permissions and limitations under the License.
 """
 
-import queue
+from collections import deque
 
 from bamboo_engine import exceptions
-from .utils import get_node_for_sequence, get_nodes_dict
+from .utils import PipelineIndex, get_node_for_sequence, get_nodes_dict
 
 STREAM = "stream"
 P_STREAM = "p_stream"
@@ -43,21 +43,33 @@ def not_in_parallel_gateway(gateway_stack, start_from=None):
     return True
 
 
-def matched_in_prev_blocks(gid, current_start, block_nodes):
+def matched_in_prev_blocks(gid, current_start, block_index):
     """
     check whether gateway with gid is matched in previous block
     :param gid:
     :param current_start:
+    :param block_index: node id to the set of block start which contains the node
+    :return:
+    """
+    blocks = block_index.get(gid)
+    if not blocks:
+        return False
+
+    return len(blocks) > 1 or current_start not in blocks
+
+
+def get_block_index(block_nodes):
+    """
+    build node id to block start index from block nodes
     :param block_nodes:
     :return:
     """
-    prev_nodes = set()
-    for prev_start, nodes in list(block_nodes.items()):
-        if prev_start == current_start:
-            continue
-        prev_nodes.update(nodes)
+    block_index = {}
+    for block_start, nodes in block_nodes.items():
+        for nid in nodes:
+            block_index.setdefault(nid, set()).add(block_start)
 
-    return gid in prev_nodes
+    return block_index
 
 
 def match_converge(
@@ -71,6 +83,7 @@ def match_converge(
     dist_from_start,
     converge_in_len,
     stack=None,
+    block_index=None,
 ):
     """
     find converge for parallel and exclusive in blocks, and check sanity of gateway
@@ -84,12 +97,70 @@ def match_converge(
     :param dist_from_start:
     :param stack:
     :param converge_in_len:
+    :param block_index: index of block_nodes, will be built from block_nodes if not provided
     :return:
     """
 
     if stack is None:
         stack = []
 
+    if block_index is None:
+        block_index = get_block_index(block_nodes)
+
+    # 递归匹配的深度与串联的网关数量成正比，此处通过显式栈驱动生成器来模拟递归调用，避免超出递归深度限制
+    return _run_frames(
+        _match_converge(
+            converges=converges,
+            gateways=gateways,
+            cur_index=cur_index,
+            end_event_id=end_event_id,
+            block_start=block_start,
+            block_nodes=block_nodes,
+            converged=converged,
+            dist_from_start=dist_from_start,
+            converge_in_len=converge_in_len,
+            stack=stack,
+            stack_id_set={g["id"] for g in stack},
+            block_index=block_index,
+        )
+    )
+
+
+def _run_frames(root):
+    """
+    驱动以生成器表示的调用帧，生成器 yield 出的下一个调用帧执行完成后，其返回值会被 send 回调用方
+    :param root: 最外层调用帧
+    :return: 最外层调用帧的返回值
+    """
+    frames = [root]
+    value = None
+    while frames:
+        try:
+            frame = frames[-1].send(value)
+        except StopIteration as e:
+            frames.pop()
+            value = e.value
+        else:
+            frames.append(frame)
+            value = None
+
+    return value
+
+
+def _match_converge(
+    converges,
+    gateways,
+    cur_index,
+    end_event_id,
+    block_start,
+    block_nodes,
+    converged,
+    dist_from_start,
+    converge_in_len,
+    stack,
+    stack_id_set,
+    block_index,
+):
     if cur_index not in gateways:
         return None, False
 
@@ -100,17 +171,18 @@ def match_converge(
     current_gateway = gateways[cur_index]
     target = gateways[cur_index]["target"]
     stack.append(gateways[cur_index])
-    stack_id_set = {g["id"] for g in stack}
+    stack_id_set.add(cur_index)
 
     # find closest converge recursively
     for i in range(len(target)):
 
         # do not process prev blocks nodes
-        if matched_in_prev_blocks(target[i], block_start, block_nodes):
+        if matched_in_prev_blocks(target[i], block_start, block_index):
             target[i] = None
             continue
 
         block_nodes[block_start].add(target[i])
+        block_index.setdefault(target[i], set()).add(block_start)
 
         # do not find self's converge node again
         while target[i] in gateways and target[i] != current_gateway["id"]:
@@ -127,7 +199,7 @@ def match_converge(
                         cur_index, "并行网关中的分支网关必须将所有分支汇聚到一个汇聚网关"
                     )
 
-            converge_id, shared = match_converge(
+            converge_id, shared = yield _match_converge(
                 converges=converges,
                 gateways=gateways,
                 cur_index=target[i],
@@ -138,6 +210,8 @@ def match_converge(
                 converged=converged,
                 dist_from_start=dist_from_start,
                 converge_in_len=converge_in_len,
+                stack_id_set=stack_id_set,
+                block_index=block_index,
             )
             if converge_id:
                 target[i] = converge_id
@@ -158,6 +232,7 @@ def match_converge(
             target[i] = None
 
     stack.pop()
+    stack_id_set.discard(cur_index)
 
     is_exg = current_gateway["type"] == "ExclusiveGateway"
     converge_id = None
@@ -238,11 +313,12 @@ def match_converge(
 
     converged.setdefault(converge_id, []).append(current_gateway["id"])
     block_nodes[block_start].add(current_gateway["id"])
+    block_index.setdefault(current_gateway["id"], set()).add(block_start)
 
     return converge_id, shared
 
 
-def distance_from(origin, node, tree, marked, visited=None):
+def distance_from(origin, node, tree, marked, visited=None, index=None):
     """
     get max distance from origin to node
     :param origin:
@@ -250,51 +326,82 @@ def distance_from(origin, node, tree, marked, visited=None):
     :param tree:
     :param marked:
     :param visited:
+    :param index: PipelineIndex of tree, node of sequence will be looked up in tree if not provided
     :return:
     """
     if visited is None:
         visited = set()
 
-    if node["id"] in marked:
-        return marked[node["id"]]
-
-    if node["id"] == origin["id"]:
-        return 0
-
-    if node["id"] in visited:
-        # do not trace circle
-        return None
-
-    visited.add(node["id"])
-
-    incoming_dist = []
-    for incoming in node["incoming"]:
-        prev_node = get_node_for_sequence(incoming, tree, "source")
+    if index is not None:
+        node_for_sequence = index.node_for_sequence
+    else:
 
-        # get incoming node's distance recursively
-        dist = distance_from(
-            origin=origin, node=prev_node, tree=tree, marked=marked, visited=visited
-        )
+        def node_for_sequence(sid, node_type):
+            return get_node_for_sequence(sid, tree, node_type)
+
+    def enter(current):
+        """
+        返回节点可直接确定的距离，或需要继续沿输入连线回溯时返回该节点的调用帧
+        """
+        if current["id"] in marked:
+            return marked[current["id"]], None
+
+        if current["id"] == origin["id"]:
+            return 0, None
+
+        if current["id"] in visited:
+            # do not trace circle
+            return None, None
+
+        visited.add(current["id"])
+        return None, (current, iter(current["incoming"]), [])
+
+    dist, frame = enter(node)
+    if frame is None:
+        return dist
+
+    # 使用显式栈沿输入连线回溯，避免串联节点数量较多时超出递归深度限制
+    stack = [frame]
+    while True:
+        current, incomings, incoming_dist = stack[-1]
+        for incoming in incomings:
+            prev_node = node_for_sequence(incoming, "source")
+
+            # get incoming node's distance
+            dist, prev_frame = enter(prev_node)
+            if prev_frame is not None:
+                stack.append(prev_frame)
+                break
+
+            # if this incoming do not trace back to current node
+            if dist is not None:
+                incoming_dist.append(dist + 1)
+        else:
+            stack.pop()
 
-        # if this incoming do not trace back to current node
-        if dist is not None:
-            incoming_dist.append(dist + 1)
+            # get max distance
+            res = None
+            if incoming_dist:
+                res = max(incoming_dist)
+                marked[current["id"]] = res
 
-    if not incoming_dist:
-        return None
+            if not stack:
+                return res
 
-    # get max distance
-    res = max(incoming_dist)
-    marked[node["id"]] = res
-    return res
+            if res is not None:
+                stack[-1][2].append(res + 1)
 
 
-def validate_gateways(tree):
+def validate_gateways(tree, index=None):
     """
     check sanity of gateways and find their converge gateway
     :param tree:
+    :param index: PipelineIndex of tree, will be built from tree if not provided
     :return:
     """
+    if index is None:
+        index = PipelineIndex(tree)
+
     converges = {}
     gateways = {}
     all = {}
@@ -320,17 +427,17 @@ def validate_gateways(tree):
 
         # find all first reach nodes(ConvergeGateway, ExclusiveGateway, ParallelGateway, EndEvent)
         # which is not ServiceActivity for each gateway
-        for index in node["outgoing"]:
-            index = tree["flows"][index]["target"]
-            while index in tree["activities"]:
-                index = tree["flows"][tree["activities"][index]["outgoing"]]["target"]
+        for flow_id in node["outgoing"]:
+            target = index.next_hop(flow_id)
+            if target is None:
+                raise exceptions.ConvergeMatchError(node["id"], "网关的分支进入了只包含活动节点的环")
 
             # append this node's id to current gateway's target list
-            node["target"].append(index)
+            node["target"].append(target)
 
         # get current node's distance from start event
         if not distance_from(
-            node=node, origin=tree["start_event"], tree=tree, marked=distances
+            node=node, origin=tree["start_event"], tree=tree, marked=distances, index=index
         ):
             raise exceptions.ConvergeMatchError(node["id"], "无法获取该网关距离开始节点的距离")
 
@@ -352,11 +459,13 @@ def validate_gateways(tree):
     end_event_id = tree["end_event"]["id"]
     converged = {}
     block_nodes = {}
+    block_index = {}
     visited = set()
 
     # process in distance order
     for gw in process_order:
-        if gw in visited or "match" in gw:
+        if gw in visited or gateways[gw]["match"]:
+            # gateway already matched in previous block
             continue
         visited.add(gw)
 
@@ -372,6 +481,7 @@ def validate_gateways(tree):
             block_nodes=block_nodes,
             dist_from_start=distances,
             converge_in_len=converge_positive_in,
+            block_index=block_index,
         )
 
     # set converge gateway
@@ -466,16 +576,19 @@ def flowing(where, to, parallel_converges):
             raise exceptions.StreamValidateError(node_id=target_id)
 
 
-def validate_stream(tree):
+def validate_stream(tree, nodes=None):
     """
     validate flow stream
     :param tree: pipeline tree
+    :param nodes: nodes dict of tree returned by get_nodes_dict, will be built from tree if not provided
     :return:
     """
     # data preparation
     start_event_id = tree["start_event"]["id"]
     end_event_id = tree["end_event"]["id"]
-    nodes = get_nodes_dict(tree)
+    gateways = tree["gateways"]
+    if nodes is None:
+        nodes = get_nodes_dict(tree)
     nodes[start_event_id][STREAM] = {MAIN_STREAM}
     nodes[end_event_id][STREAM] = {MAIN_STREAM}
     parallel_converges = {}
@@ -484,6 +597,10 @@ def validate_stream(tree):
     for nid, node in list(nodes.items()):
         node.setdefault(STREAM, set())
 
+        # nodes may be built before gateway validation, sync converge gateway from tree
+        if nid in gateways and "converge_gateway_id" in gateways[nid]:
+            node["converge_gateway_id"] = gateways[nid]["converge_gateway_id"]
+
         # set allow streams for parallel's converge
         if node["type"] in PARALLEL_GATEWAYS:
             parallel_converges[node["converge_gateway_id"]] = {
@@ -492,12 +609,12 @@ def validate_stream(tree):
             }
 
     # build stream from start
-    node_queue = queue.Queue()
-    node_queue.put(nodes[start_event_id])
-    while not node_queue.empty():
+    node_queue = deque()
+    node_queue.append(nodes[start_event_id])
+    while node_queue:
 
         # get node
-        node = node_queue.get()
+        node = node_queue.popleft()
 
         if node["id"] in visited:
             # flow again to validate stream, but do not add target to queue
@@ -506,7 +623,7 @@ def validate_stream(tree):
 
         # add to queue
         for target_id in node["target"]:
-            node_queue.put(nodes[target_id])
+            node_queue.append(nodes[target_id])
 
         # mark as visited
         visited.add(node["id"])
@@ -0,0 +1,168 @@
+# -*- coding: utf-8 -*-
+"""
+Tencent is pleased to support the open source community by making 蓝鲸智云PaaS平台社区版 (BlueKing PaaS Community
+Edition) available.
+Copyright (C) 2017-2021 THL A29 Limited, a Tencent company. All rights reserved.
+Licensed under the MIT License (the "License"); you may not use this file except in compliance with the License.
+You may obtain a copy of the License at
+http://opensource.org/licenses/MIT
+Unless required by applicable law or agreed to in writing, software distributed under the License is distributed on
+an "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the License for the
+specific language governing permissions and limitations under the License.
+"""
+
+import hashlib
+from collections import deque
+from typing import Dict, List, Optional, Tuple
+
+from bamboo_engine import metrics
+from bamboo_engine.config import Settings
+from bamboo_engine.utils.collections import LRUCache
+
+from .utils import format_to_list
+
+# 同一个模板创建出的流程除节点 ID 外拓扑结构完全一致，校验（连通性、环检测、网关匹配、分支流校验）的结果也完全一致，
+# 此处对流程结构进行规范化编号后计算摘要，缓存校验通过的流程中网关与汇聚网关的匹配关系，
+# 后续相同结构的流程只需要将匹配关系映射到自身的节点 ID 上即可
+PLAN_CACHE = LRUCache(max_size=Settings.PIPELINE_PLAN_CACHE_SIZE)
+
+
+class CompiledPlan:
+    """
+    流程结构的编译计划，节点以其在规范化编号中的序号表示
+    """
+
+    def __init__(self, converge_gateways: List[Tuple[int, int]]):
+        """
+
+        :param converge_gateways: 网关序号与其汇聚网关序号的列表
+        :type converge_gateways: List[Tuple[int, int]]
+        """
+        self.converge_gateways = converge_gateways
+
+    @classmethod
+    def from_converged(cls, converged: Dict[str, List[str]], node_ids: List[str]) -> "CompiledPlan":
+        """
+        根据网关校验的匹配结果生成编译计划
+
+        :param converged: validate_gateways 返回的汇聚网关与其匹配网关列表的映射
+        :type converged: Dict[str, List[str]]
+        :param node_ids: 按照规范化编号排列的节点 ID 列表
+        :type node_ids: List[str]
+        :rtype: CompiledPlan
+        """
+        node_index = {node_id: index for index, node_id in enumerate(node_ids)}
+        converge_gateways = []
+        for converge_id, gateway_ids in converged.items():
+            if not converge_id:
+                continue
+            for gateway_id in gateway_ids:
+                converge_gateways.append((node_index[gateway_id], node_index[converge_id]))
+
+        return cls(converge_gateways=converge_gateways)
+
+    def apply(self, pipeline: dict, node_ids: List[str]):
+        """
+        将编译计划应用到相同结构的流程上
+
+        :param pipeline: 流程描述
+        :type pipeline: dict
+        :param node_ids: 按照规范化编号排列的节点 ID 列表
+        :type node_ids: List[str]
+        """
+        gateways = pipeline["gateways"]
+        for gateway_index, converge_index in self.converge_gateways:
+            gateways[node_ids[gateway_index]]["converge_gateway_id"] = node_ids[converge_index]
+
+
+def get_pipeline_structure(pipeline: dict, cycle_tolerate: bool) -> Optional[Tuple[str, List[str]]]:
+    """
+    从开始节点出发按照输出连线的顺序对流程中的节点和连线进行规范化编号，并计算流程结构的摘要
+
+    存在无法从开始节点到达的节点或连线、引用了不存在的节点或连线时返回 None，此类流程交由完整校验处理
+
+    :param pipeline: 流程描述
+    :type pipeline: dict
+    :param cycle_tolerate: 是否允许流程中存在环
+    :type cycle_tolerate: bool
+    :return: 流程结构摘要及按照规范化编号排列的节点 ID 列表
+    :rtype: Optional[Tuple[str, List[str]]]
+    """
+    start_event = pipeline["start_event"]
+    end_event = pipeline["end_event"]
+    activities = pipeline["activities"]
+    gateways = pipeline["gateways"]
+    flows = pipeline["flows"]
+
+    nodes = {start_event["id"]: start_event, end_event["id"]: end_event}
+    nodes.update(activities)
+    nodes.update(gateways)
+    if len(nodes) != len(activities) + len(gateways) + 2:
+        return None
+
+    node_ids = [start_event["id"]]
+    node_index = {start_event["id"]: 0}
+    flow_ids = []
+    flow_index = {}
+    queue = deque(node_ids)
+    while queue:
+        for flow_id in format_to_list(nodes[queue.popleft()].get("outgoing")):
+            if flow_id in flow_index:
+                continue
+            flow = flows.get(flow_id)
+            if flow is None or flow.get("target") not in nodes:
+                return None
+
+            flow_index[flow_id] = len(flow_ids)
+            flow_ids.append(flow_id)
+
+            target = flow["target"]
+            if target not in node_index:
+                node_index[target] = len(node_ids)
+                node_ids.append(target)
+                queue.append(target)
+
+    if len(node_ids) != len(nodes) or len(flow_ids) != len(flows):
+        return None
+
+    try:
+        node_signatures = [
+            (
+                nodes[node_id]["type"],
+                tuple(flow_index[flow_id] for flow_id in format_to_list(nodes[node_id].get("incoming"))),
+                tuple(flow_index[flow_id] for flow_id in format_to_list(nodes[node_id].get("outgoing"))),
+            )
+            for node_id in node_ids
+        ]
+        flow_signatures = [
+            (node_index[flows[flow_id]["source"]], node_index[flows[flow_id]["target"]]) for flow_id in flow_ids
+        ]
+    except KeyError:
+        return None
+
+    # 校验过程按照字典顺序遍历节点，顺序不同的流程不共享编译计划
+    node_orders = (
+        tuple(node_index[node_id] for node_id in activities),
+        tuple(node_index[node_id] for node_id in gateways),
+    )
+
+    fingerprint = repr((cycle_tolerate, node_signatures, flow_signatures, node_orders))
+    return hashlib.sha1(fingerprint.encode("utf-8")).hexdigest(), node_ids
+
+
+def get_compiled_plan(digest: str) -> Optional[CompiledPlan]:
+    plan = PLAN_CACHE.get(digest)
+    if plan is not None:
+        metrics.ENGINE_PIPELINE_PLAN_CACHE_HIT.inc()
+    else:
+        metrics.ENGINE_PIPELINE_PLAN_CACHE_MISS.inc()
+    return plan
+
+
+def set_compiled_plan(digest: str, plan: CompiledPlan):
+    PLAN_CACHE.max_size = Settings.PIPELINE_PLAN_CACHE_SIZE
+    PLAN_CACHE.set(digest, plan)
+
+
+def clear_compiled_plans():
+    PLAN_CACHE.clear()
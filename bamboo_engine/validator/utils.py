@@ -11,10 +11,15 @@ an "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express o
 specific language governing permissions and limitations under the License.
 """
 
-from copy import deepcopy
+from array import array
+from typing import Optional
 
 from bamboo_engine.exceptions import ValueError
 
+# PipelineIndex 中活动节点下一跳的特殊取值
+_UNRESOLVED = -2
+_CYCLE = -1
+
 
 def format_to_list(notype):
     """
@@ -70,25 +75,126 @@ def get_nodes_dict(data):
     """
     get all FlowNodes of a pipeline
     """
-    data = deepcopy(data)
+    # 只浅拷贝节点本身，校验过程中添加的 source、target 等字段不会影响原始数据，
+    # 同时避免深拷贝节点中的子流程及节点数据带来的开销
     start = data["start_event"]["id"]
     end = data["end_event"]["id"]
 
-    nodes = {start: data["start_event"], end: data["end_event"]}
+    nodes = {start: dict(data["start_event"]), end: dict(data["end_event"])}
 
-    nodes.update(data["activities"])
-    nodes.update(data["gateways"])
+    for node_id, node in data["activities"].items():
+        nodes[node_id] = dict(node)
+    for node_id, node in data["gateways"].items():
+        nodes[node_id] = dict(node)
 
-    for node in list(nodes.values()):
+    flows = data["flows"]
+    for node in nodes.values():
         # format to list
         node["incoming"] = format_to_list(node["incoming"])
         node["outgoing"] = format_to_list(node["outgoing"])
 
-        node["source"] = [
-            data["flows"][incoming]["source"] for incoming in node["incoming"]
-        ]
-        node["target"] = [
-            data["flows"][outgoing]["target"] for outgoing in node["outgoing"]
-        ]
+        node["source"] = [flows[incoming]["source"] for incoming in node["incoming"]]
+        node["target"] = [flows[outgoing]["target"] for outgoing in node["outgoing"]]
 
     return nodes
+
+
+class PipelineIndex:
+    """
+    流程节点索引，索引内部按照开始节点，结束节点，网关，活动的顺序以整数编号表示节点，
+    连线的起止节点以整数数组保存，连线引用的不存在的节点编号在所有节点之后
+
+    活动节点只有一条输出连线，从任意连线出发经过连续的活动节点后第一个到达的网关或事件（下一跳）
+    在首次查询时沿活动链计算，并通过路径压缩记录到链上的所有活动节点，多个网关的分支汇入同一条活动链时不会重复遍历
+    """
+
+    def __init__(self, pipeline: dict):
+        """
+
+        :param pipeline: 流程描述
+        :type pipeline: dict
+        """
+        gateways = pipeline["gateways"]
+        activities = pipeline["activities"]
+        flows = pipeline["flows"]
+
+        self.pipeline = pipeline
+        self.node_ids = [pipeline["start_event"]["id"], pipeline["end_event"]["id"]]
+        self.node_ids.extend(gateways)
+        self.node_ids.extend(activities)
+        self.nodes = [pipeline["start_event"], pipeline["end_event"]]
+        self.nodes.extend(gateways.values())
+        self.nodes.extend(activities.values())
+        self.node_count = len(self.node_ids)
+        self.node_index = {node_id: i for i, node_id in enumerate(self.node_ids)}
+        self._activity_start = 2 + len(gateways)
+
+        self.flow_index = {}
+        self.flow_source = array("l")
+        self.flow_target = array("l")
+        for i, (flow_id, flow) in enumerate(flows.items()):
+            self.flow_index[flow_id] = i
+            self.flow_source.append(self._intern(flow["source"]))
+            self.flow_target.append(self._intern(flow["target"]))
+
+        self._next_hop = array("l", [_UNRESOLVED]) * self.node_count
+
+    def _intern(self, node_id: str) -> int:
+        i = self.node_index.get(node_id)
+        if i is None:
+            i = self.node_index[node_id] = len(self.node_ids)
+            self.node_ids.append(node_id)
+        return i
+
+    def is_activity(self, i: int) -> bool:
+        return self._activity_start <= i < self.node_count
+
+    def node_for_sequence(self, flow_id: str, node_type: str) -> dict:
+        """
+        获取连线的起始或目标节点，与 get_node_for_sequence 行为一致
+
+        :param flow_id: 连线 ID
+        :type flow_id: str
+        :param node_type: source 或 target
+        :type node_type: str
+        :rtype: dict
+        """
+        flow = self.flow_index[flow_id]
+        i = self.flow_source[flow] if node_type == "source" else self.flow_target[flow]
+        if i >= self.node_count:
+            raise ValueError("node(%s) not in data" % self.node_ids[i])
+        return self.nodes[i]
+
+    def next_hop(self, flow_id: str) -> Optional[str]:
+        """
+        获取从连线出发经过连续的活动节点后第一个到达的非活动节点 ID，活动节点之间形成环时返回 None
+
+        :param flow_id: 连线 ID
+        :type flow_id: str
+        :rtype: Optional[str]
+        """
+        i = self.flow_target[self.flow_index[flow_id]]
+        if self.is_activity(i):
+            i = self._resolve_next_hop(i)
+        return None if i == _CYCLE else self.node_ids[i]
+
+    def _resolve_next_hop(self, i: int) -> int:
+        next_hop = self._next_hop
+        path = []
+        current = i
+        while self.is_activity(current) and next_hop[current] == _UNRESOLVED:
+            # 先标记为环，如果沿活动链回到了当前路径上的节点，则路径上的节点都处于环中
+            next_hop[current] = _CYCLE
+            path.append(current)
+            outgoing = self.nodes[current]["outgoing"]
+            if isinstance(outgoing, list):
+                outgoing = outgoing[0]
+            current = self.flow_target[self.flow_index[outgoing]]
+
+        if self.is_activity(current):
+            current = next_hop[current]
+
+        for p in path:
+            next_hop[p] = current
+
+        return current
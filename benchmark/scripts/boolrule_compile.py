@@ -0,0 +1,54 @@
+# -*- coding: utf-8 -*-
+"""
+Tencent is pleased to support the open source community by making 蓝鲸智云PaaS平台社区版 (BlueKing PaaS Community
+Edition) available.
+Copyright (C) 2017-2021 THL A29 Limited, a Tencent company. All rights reserved.
+Licensed under the MIT License (the "License"); you may not use this file except in compliance with the License.
+You may obtain a copy of the License at
+http://opensource.org/licenses/MIT
+Unless required by applicable law or agreed to in writing, software distributed under the License is distributed on
+an "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the License for the
+specific language governing permissions and limitations under the License.
+"""
+
+# 网关条件表达式 micro-benchmark：对比每次渲染后重新解析与预编译表达式的耗时
+#
+#     python benchmark/scripts/boolrule_compile.py
+
+import timeit
+
+from bamboo_engine.template import Template
+from bamboo_engine.utils.boolrule import BoolRule, CompiledBoolRule
+
+CONTEXT = {"count": "3", "status": "success", "ip": "127.0.0.1", "biz": 2}
+
+CONDITIONS = {
+    "simple": "${count} > 2",
+    "quoted": '"${status}" == "success"',
+    "in": '${biz} in (1, 2, 3) and "${ip}" notin ("0.0.0.0", "255.255.255.255")',
+    "nested": '(${count} > 2 or ${biz} == 1) and ("${status}" == "success" or ${count} == ${biz})',
+}
+
+
+def legacy(condition):
+    return BoolRule(Template(condition).render(CONTEXT)).test()
+
+
+def compiled(condition):
+    rule = CompiledBoolRule.compile(condition)
+    fragments = {tpl: Template.render_fragment(tpl, CONTEXT) for tpl in rule.templates}
+    return rule.test(fragments)
+
+
+def main():
+    number = 2000
+    print("condition,render_and_parse(us),compiled(us)")
+    for name, condition in CONDITIONS.items():
+        assert legacy(condition) == compiled(condition)
+        legacy_cost = timeit.timeit(lambda: legacy(condition), number=number)
+        compiled_cost = timeit.timeit(lambda: compiled(condition), number=number)
+        print("{},{:.2f},{:.2f}".format(name, legacy_cost * 1e6 / number, compiled_cost * 1e6 / number))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,68 @@
+# -*- coding: utf-8 -*-
+"""
+Tencent is pleased to support the open source community by making 蓝鲸智云PaaS平台社区版 (BlueKing PaaS Community
+Edition) available.
+Copyright (C) 2017-2021 THL A29 Limited, a Tencent company. All rights reserved.
+Licensed under the MIT License (the "License"); you may not use this file except in compliance with the License.
+You may obtain a copy of the License at
+http://opensource.org/licenses/MIT
+Unless required by applicable law or agreed to in writing, software distributed under the License is distributed on
+an "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the License for the
+specific language governing permissions and limitations under the License.
+"""
+
+# 流程构造规模测试，测量 build_tree 在不同元素数量下的耗时（秒）：
+#
+#     unique_id     默认模式，每个连线及流程 ID 都通过 uuid4 生成
+#     id_generator  传入 UniqueIdGenerator，同一个生成器在所有流程间复用
+#
+# 元素由串联的并行网关块组成（每个块包含 1 个并行网关，2 个服务节点及 1 个汇聚网关），
+# 每个规模重复构造 rounds 次，元素的创建不计入耗时
+#
+#     PYTHONPATH=. python benchmark/scripts/builder_scaling.py 100 1000 10000 50000
+
+import argparse
+
+from common import timer
+
+
+def elements(size: int):
+    from bamboo_engine.builder import EmptyStartEvent, ServiceActivity, EmptyEndEvent, ParallelGateway
+    from bamboo_engine.builder import ConvergeGateway
+
+    start = EmptyStartEvent()
+    tail = start
+    for _ in range(max(size // 4, 1)):
+        pg = tail.extend(ParallelGateway())
+        tail = pg.connect(
+            ServiceActivity(component_code="example_component"), ServiceActivity(component_code="example_component")
+        ).converge(ConvergeGateway())
+    tail.extend(EmptyEndEvent())
+
+    return start
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("sizes", nargs="*", type=int)
+    parser.add_argument("--rounds", type=int, default=3)
+    args = parser.parse_args()
+
+    from bamboo_engine.builder import build_tree
+    from bamboo_engine.utils.string import UniqueIdGenerator
+
+    id_generator = UniqueIdGenerator()
+
+    print("mode,elements,rounds,seconds,elements_per_second")
+    for size in args.sizes or [100, 1000, 10000, 50000]:
+        start = elements(size)
+        count = (size // 4) * 4 + 2
+        for mode, generator in [("unique_id", None), ("id_generator", id_generator)]:
+            with timer() as cost:
+                for _ in range(args.rounds):
+                    build_tree(start, id_generator=generator)
+            print("{},{},{},{:.3f},{:.0f}".format(mode, count, args.rounds, cost[0], count * args.rounds / cost[0]))
+
+
+if __name__ == "__main__":
+    main()
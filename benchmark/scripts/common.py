@@ -0,0 +1,109 @@
+# -*- coding: utf-8 -*-
+"""
+Tencent is pleased to support the open source community by making 蓝鲸智云PaaS平台社区版 (BlueKing PaaS Community
+Edition) available.
+Copyright (C) 2017-2021 THL A29 Limited, a Tencent company. All rights reserved.
+Licensed under the MIT License (the "License"); you may not use this file except in compliance with the License.
+You may obtain a copy of the License at
+http://opensource.org/licenses/MIT
+Unless required by applicable law or agreed to in writing, software distributed under the License is distributed on
+an "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the License for the
+specific language governing permissions and limitations under the License.
+"""
+
+# benchmark 脚本公共工具
+#
+# Django runtime 相关的脚本需要在安装了 pipeline.eri 并完成 migrate 的 Django 项目中运行，
+# 运行前需要设置 DJANGO_SETTINGS_MODULE，例如：
+#
+#     DJANGO_SETTINGS_MODULE=your_project.settings python benchmark/scripts/execution_write_behind.py
+
+import os
+import sys
+import time
+from collections import deque
+from contextlib import contextmanager
+
+
+def setup_django():
+    if "DJANGO_SETTINGS_MODULE" not in os.environ:
+        sys.exit("please set DJANGO_SETTINGS_MODULE before running this benchmark")
+
+    import django
+
+    django.setup()
+
+
+def linear_pipeline(nodes: int, component_code: str = "example_component") -> dict:
+    """
+    构造包含 nodes 个服务节点的单流程多节点流程
+    """
+    from bamboo_engine.builder import EmptyStartEvent, ServiceActivity, EmptyEndEvent, build_tree
+
+    start = EmptyStartEvent()
+    elem = start
+    for _ in range(nodes):
+        elem = elem.extend(ServiceActivity(component_code=component_code))
+    elem.extend(EmptyEndEvent())
+
+    return build_tree(start)
+
+
+@contextmanager
+def count_queries():
+    """
+    统计代码块中执行的 SQL 数量，结果通过 yield 出的 list 获取
+    """
+    from django.db import connection
+    from django.test.utils import CaptureQueriesContext
+
+    result = []
+    with CaptureQueriesContext(connection) as ctx:
+        yield result
+    result.append(len(ctx.captured_queries))
+
+
+@contextmanager
+def timer():
+    """
+    统计代码块的耗时（秒），结果通过 yield 出的 list 获取
+    """
+    result = []
+    start = time.perf_counter()
+    yield result
+    result.append(time.perf_counter() - start)
+
+
+def inline_runtime_class():
+    """
+    返回在当前线程内顺序执行 execute 和 schedule 任务的 BambooDjangoRuntime 子类，避免 broker 和 worker 对测试结果的干扰
+    """
+    from bamboo_engine.engine import Engine
+    from pipeline.eri.runtime import BambooDjangoRuntime
+
+    class InlineRuntime(BambooDjangoRuntime):
+        def __init__(self):
+            super().__init__()
+            self.tasks = deque()
+            self.draining = False
+
+        def execute(self, process_id: int, node_id: str):
+            self.tasks.append(lambda: Engine(self).execute(process_id, node_id))
+            self._drain()
+
+        def schedule(self, process_id: int, node_id: str, schedule_id: str, callback_data_id=None):
+            self.tasks.append(lambda: Engine(self).schedule(process_id, node_id, schedule_id, callback_data_id))
+            self._drain()
+
+        def _drain(self):
+            if self.draining:
+                return
+
+            self.draining = True
+            try:
+                while self.tasks:
+                    self.tasks.popleft()()
+            finally:
+                self.draining = False
+
+    return InlineRuntime
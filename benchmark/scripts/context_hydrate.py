@@ -0,0 +1,112 @@
+# -*- coding: utf-8 -*-
+"""
+Tencent is pleased to support the open source community by making 蓝鲸智云PaaS平台社区版 (BlueKing PaaS Community
+Edition) available.
+Copyright (C) 2017-2021 THL A29 Limited, a Tencent company. All rights reserved.
+Licensed under the MIT License (the "License"); you may not use this file except in compliance with the License.
+You may obtain a copy of the License at
+http://opensource.org/licenses/MIT
+Unless required by applicable law or agreed to in writing, software distributed under the License is distributed on
+an "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the License for the
+specific language governing permissions and limitations under the License.
+"""
+
+# 上下文 hydrate micro-benchmark：对比递归解析（旧实现）与按依赖顺序解析时的耗时及计算型变量的执行次数
+#
+#     PYTHONPATH=. python benchmark/scripts/context_hydrate.py
+
+import time
+
+from mock import MagicMock
+
+from bamboo_engine.context import Context
+from bamboo_engine.eri import ContextValue, ContextValueType, Variable
+
+CALLS = {"count": 0}
+
+
+class ComputeVariable(Variable):
+    def __init__(self, value):
+        self.value = value
+
+    def get(self):
+        CALLS["count"] += 1
+        return self.value.get()
+
+
+def key(*parts):
+    return "${%s}" % "_".join(str(p) for p in parts)
+
+
+def refs(keys):
+    return "-".join(keys)
+
+
+def deep(depth):
+    values = [ContextValue(key("v", 0), type=ContextValueType.PLAIN, value="0")]
+    for i in range(1, depth):
+        values.append(ContextValue(key("v", i), type=ContextValueType.SPLICE, value=refs([key("v", i - 1)])))
+    return values
+
+
+def wide(layers, width):
+    values = [ContextValue(key("l", 0, w), type=ContextValueType.PLAIN, value=str(w)) for w in range(width)]
+    for layer in range(1, layers):
+        prev = [key("l", layer - 1, w) for w in range(width)]
+        for w in range(width):
+            values.append(
+                ContextValue(key("l", layer, w), type=ContextValueType.COMPUTE, value=refs(prev), code="compute")
+            )
+    return values
+
+
+def template(plains, splices, computes):
+    """
+    模拟常见模板：大量普通变量，部分拼接变量引用普通变量，少量计算型变量引用拼接变量
+    """
+    values = [ContextValue(key("p", i), type=ContextValueType.PLAIN, value=str(i)) for i in range(plains)]
+    for i in range(splices):
+        value = refs([key("p", (i + j) % plains) for j in range(3)])
+        values.append(ContextValue(key("s", i), type=ContextValueType.SPLICE, value=value))
+    for i in range(computes):
+        value = refs([key("s", (i + j) % splices) for j in range(4)])
+        values.append(ContextValue(key("c", i), type=ContextValueType.COMPUTE, value=value, code="compute"))
+    return values
+
+
+def legacy_hydrate(context):
+    return {k: var.get() for k, var in context.pool.items()}
+
+
+def measure(values, hydrate):
+    runtime = MagicMock()
+    runtime.get_compute_variable = lambda code, key, value, additional_data: ComputeVariable(value)
+    context = Context(runtime, values, {})
+    CALLS["count"] = 0
+    start = time.perf_counter()
+    result = hydrate(context)
+    return time.perf_counter() - start, CALLS["count"], result
+
+
+def main():
+    cases = {
+        "deep(50)": deep(50),
+        "deep(200)": deep(200),
+        "wide(5x3)": wide(5, 3),
+        "wide(6x4)": wide(6, 4),
+        "template(100,40,10)": template(100, 40, 10),
+    }
+    print("case,variables,legacy(ms),legacy_compute_calls,ordered(ms),ordered_compute_calls")
+    for name, values in cases.items():
+        legacy_cost, legacy_calls, expect = measure(values, legacy_hydrate)
+        ordered_cost, ordered_calls, actual = measure(values, lambda c: c.hydrate())
+        assert expect == actual
+        print(
+            "{},{},{:.2f},{},{:.2f},{}".format(
+                name, len(values), legacy_cost * 1e3, legacy_calls, ordered_cost * 1e3, ordered_calls
+            )
+        )
+
+
+if __name__ == "__main__":
+    main()
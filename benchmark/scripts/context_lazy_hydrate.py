@@ -0,0 +1,85 @@
+# -*- coding: utf-8 -*-
+"""
+Tencent is pleased to support the open source community by making 蓝鲸智云PaaS平台社区版 (BlueKing PaaS Community
+Edition) available.
+Copyright (C) 2017-2021 THL A29 Limited, a Tencent company. All rights reserved.
+Licensed under the MIT License (the "License"); you may not use this file except in compliance with the License.
+You may obtain a copy of the License at
+http://opensource.org/licenses/MIT
+Unless required by applicable law or agreed to in writing, software distributed under the License is distributed on
+an "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the License for the
+specific language governing permissions and limitations under the License.
+"""
+
+# 上下文按需解析 micro-benchmark：对比全量 hydrate 后渲染与按需解析渲染的耗时及计算型变量的执行次数
+#
+#     PYTHONPATH=. python benchmark/scripts/context_lazy_hydrate.py
+
+import time
+
+from mock import MagicMock
+
+from bamboo_engine.context import Context
+from bamboo_engine.eri import ContextValue, ContextValueType, Variable
+from bamboo_engine.template import Template
+
+CALLS = {"count": 0}
+# 模拟请求外部接口的计算型变量耗时
+COMPUTE_COST = 0.0005
+
+
+class ComputeVariable(Variable):
+    def __init__(self, value):
+        self.value = value
+
+    def get(self):
+        CALLS["count"] += 1
+        time.sleep(COMPUTE_COST)
+        return self.value.get()
+
+
+def values(plains, computes):
+    values = [ContextValue("${p_%s}" % i, type=ContextValueType.PLAIN, value=str(i)) for i in range(plains)]
+    for i in range(computes):
+        values.append(
+            ContextValue("${c_%s}" % i, type=ContextValueType.COMPUTE, value="${p_%s}" % (i % plains), code="c")
+        )
+    return values
+
+
+def inputs(plains, computes, used):
+    data = {"p_%s" % i: "${p_%s}-${p_%s}" % (i, (i + 1) % plains) for i in range(plains)}
+    data.update({"c_%s" % i: "${c_%s}" % i for i in range(used)})
+    return data
+
+
+def measure(context_values, render_inputs, lazy):
+    runtime = MagicMock()
+    runtime.get_compute_variable = lambda code, key, value, additional_data: ComputeVariable(value)
+    CALLS["count"] = 0
+    start = time.perf_counter()
+    context = Context(runtime, context_values, {})
+    hydrated = context.lazy_hydrate(deformat=True) if lazy else context.hydrate(deformat=True)
+    result = Template(dict(render_inputs)).render(hydrated)
+    return time.perf_counter() - start, CALLS["count"], result
+
+
+def main():
+    print("plains,computes,used_computes,eager(ms),eager_calls,lazy(ms),lazy_calls")
+    for plains, computes, used in ((50, 10, 10), (50, 10, 2), (100, 40, 5), (200, 40, 0)):
+        context_values = values(plains, computes)
+        render_inputs = inputs(plains, computes, used)
+        # 预热模板编译缓存
+        measure(context_values, render_inputs, False)
+        eager_cost, eager_calls, expect = measure(context_values, render_inputs, False)
+        lazy_cost, lazy_calls, actual = measure(context_values, render_inputs, True)
+        assert expect == actual
+        print(
+            "{},{},{},{:.2f},{},{:.2f},{}".format(
+                plains, computes, used, eager_cost * 1e3, eager_calls, lazy_cost * 1e3, lazy_calls
+            )
+        )
+
+
+if __name__ == "__main__":
+    main()
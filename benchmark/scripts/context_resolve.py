@@ -0,0 +1,88 @@
+# -*- coding: utf-8 -*-
+"""
+Tencent is pleased to support the open source community by making 蓝鲸智云PaaS平台社区版 (BlueKing PaaS Community
+Edition) available.
+Copyright (C) 2017-2021 THL A29 Limited, a Tencent company. All rights reserved.
+Licensed under the MIT License (the "License"); you may not use this file except in compliance with the License.
+You may obtain a copy of the License at
+http://opensource.org/licenses/MIT
+Unless required by applicable law or agreed to in writing, software distributed under the License is distributed on
+an "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the License for the
+specific language governing permissions and limitations under the License.
+"""
+
+# EXECUTION 单流程多节点：每个服务节点都引用全局变量，对比拆分查询与 resolve_context 以及
+# 开启上下文快照（BAMBOO_DJANGO_ERI_CONTEXT_SNAPSHOT）后推进过程中上下文读取的 SQL 数量
+#
+#     DJANGO_SETTINGS_MODULE=your_project.settings python benchmark/scripts/context_resolve.py 100 500 1000
+
+import sys
+
+from common import setup_django, count_queries, timer, inline_runtime_class
+
+
+def referenced_pipeline(nodes: int) -> dict:
+    """
+    构造包含 nodes 个服务节点的流程，每个节点的输入都引用了一个引用了其他变量的全局变量
+    """
+    from bamboo_engine.builder import EmptyStartEvent, ServiceActivity, EmptyEndEvent, Data, Var, build_tree
+
+    start = EmptyStartEvent()
+    elem = start
+    for _ in range(nodes):
+        elem = elem.extend(ServiceActivity(component_code="example_component"))
+        elem.component.inputs.param = Var(type=Var.SPLICE, value="${c}")
+    elem.extend(EmptyEndEvent())
+
+    data = Data()
+    data.inputs["${a}"] = Var(type=Var.PLAIN, value="a")
+    data.inputs["${b}"] = Var(type=Var.PLAIN, value="b")
+    data.inputs["${c}"] = Var(type=Var.SPLICE, value="${a}-${b}")
+
+    return build_tree(start, data=data)
+
+
+def split_runtime_class():
+    """
+    返回使用拆分查询解析上下文的 runtime，用于对比
+    """
+    from bamboo_engine.eri import ContextMixin
+
+    class SplitRuntime(inline_runtime_class()):
+        resolve_context = ContextMixin.resolve_context
+
+    return SplitRuntime
+
+
+def run(nodes: int, mode: str):
+    from django.test.utils import override_settings
+    from bamboo_engine.engine import Engine
+
+    runtime_cls = split_runtime_class() if mode == "split" else inline_runtime_class()
+    runtime = runtime_cls()
+    pipeline = referenced_pipeline(nodes)
+
+    with override_settings(BAMBOO_DJANGO_ERI_CONTEXT_SNAPSHOT=(mode == "snapshot")):
+        with count_queries() as queries, timer() as cost:
+            Engine(runtime).run_pipeline(pipeline=pipeline)
+
+    return queries[0], cost[0]
+
+
+def main():
+    setup_django()
+
+    sizes = [int(n) for n in sys.argv[1:]] or [100, 500, 1000]
+    print("nodes,mode,queries,queries_per_node,seconds,ms_per_node")
+    for nodes in sizes:
+        for mode in ("split", "resolve", "snapshot"):
+            queries, cost = run(nodes, mode)
+            print(
+                "{},{},{},{:.2f},{:.3f},{:.3f}".format(
+                    nodes, mode, queries, queries / nodes, cost, cost * 1000 / nodes
+                )
+            )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,81 @@
+# -*- coding: utf-8 -*-
+"""
+Tencent is pleased to support the open source community by making 蓝鲸智云PaaS平台社区版 (BlueKing PaaS Community
+Edition) available.
+Copyright (C) 2017-2021 THL A29 Limited, a Tencent company. All rights reserved.
+Licensed under the MIT License (the "License"); you may not use this file except in compliance with the License.
+You may obtain a copy of the License at
+http://opensource.org/licenses/MIT
+Unless required by applicable law or agreed to in writing, software distributed under the License is distributed on
+an "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the License for the
+specific language governing permissions and limitations under the License.
+"""
+
+# 上下文写入：向已有 2000 个变量的流程上下文中写入不同数量的变量，对比批量 upsert 与逐条更新的 SQL 数量与耗时
+#
+#     DJANGO_SETTINGS_MODULE=your_project.settings python benchmark/scripts/context_upsert.py 10 50 500
+
+import sys
+
+from mock import MagicMock, patch
+
+from common import setup_django, count_queries, timer
+
+EXIST_KEYS = 2000
+
+
+def prepare_context(pipeline_id: str):
+    from bamboo_engine.eri import ContextValueType
+    from pipeline.eri.models import ContextValue as DBContextValue
+
+    DBContextValue.objects.bulk_create(
+        [
+            DBContextValue(
+                pipeline_id=pipeline_id,
+                key="${var_%s}" % i,
+                type=ContextValueType.PLAIN.value,
+                serializer="json",
+                value='"value"',
+                references="[]",
+            )
+            for i in range(EXIST_KEYS)
+        ],
+        batch_size=500,
+    )
+
+
+def run(keys: int, bulk_upsert: bool):
+    from bamboo_engine.eri import ContextValue, ContextValueType
+    from bamboo_engine.utils.string import unique_id
+    from pipeline.eri.imp.context import ContextMixin
+
+    pipeline_id = unique_id("p")
+    prepare_context(pipeline_id)
+
+    # 一半更新已有变量，一半写入新变量
+    update = {}
+    for i in range(keys):
+        key = "${var_%s}" % (i if i % 2 == 0 else EXIST_KEYS + i)
+        update[key] = ContextValue(key=key, type=ContextValueType.PLAIN, value="output_%s" % i)
+
+    mixin = ContextMixin()
+    with patch.object(ContextMixin, "_support_bulk_upsert", MagicMock(return_value=bulk_upsert)):
+        with count_queries() as queries, timer() as cost:
+            mixin.upsert_plain_context_values(pipeline_id, update)
+
+    return queries[0], cost[0]
+
+
+def main():
+    setup_django()
+
+    sizes = [int(n) for n in sys.argv[1:]] or [10, 50, 500]
+    print("keys,bulk_upsert,queries,ms")
+    for keys in sizes:
+        for bulk_upsert in (False, True):
+            queries, cost = run(keys, bulk_upsert)
+            print("{},{},{},{:.3f}".format(keys, bulk_upsert, queries, cost * 1000))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,129 @@
+# -*- coding: utf-8 -*-
+"""
+Tencent is pleased to support the open source community by making 蓝鲸智云PaaS平台社区版 (BlueKing PaaS Community
+Edition) available.
+Copyright (C) 2017-2021 THL A29 Limited, a Tencent company. All rights reserved.
+Licensed under the MIT License (the "License"); you may not use this file except in compliance with the License.
+You may obtain a copy of the License at
+http://opensource.org/licenses/MIT
+Unless required by applicable law or agreed to in writing, software distributed under the License is distributed on
+an "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the License for the
+specific language governing permissions and limitations under the License.
+"""
+
+# 冷热数据分层：构造一个包含大量节点的已完成流程，对比归档前后热数据表的行数，归档耗时，归档大小，
+# 以及通过 api.get_execution_data 读取热数据与读取归档（首次读取与缓存命中）的耗时
+#
+#     DJANGO_SETTINGS_MODULE=your_project.settings python benchmark/scripts/eri_archive.py 100 1000 5000
+
+import json
+import sys
+
+from common import setup_django, timer
+
+
+def seed(nodes: int):
+    from django.utils import timezone
+    from bamboo_engine import states
+    from bamboo_engine.utils.string import unique_id
+    from pipeline.eri.models import ExecutionData, ExecutionHistory, Node, State
+
+    root_id = unique_id("p")
+    node_ids = [unique_id("n") for _ in range(nodes)]
+    payload = json.dumps({"key_{}".format(i): "value" * 8 for i in range(20)})
+    State.objects.bulk_create(
+        [
+            State(node_id=node_id, root_id=root_id, name=states.FINISHED, version=unique_id("v"))
+            for node_id in [root_id] + node_ids
+        ]
+    )
+    Node.objects.bulk_create([Node(node_id=node_id, root_pipeline_id=root_id, detail="{}") for node_id in node_ids])
+    ExecutionData.objects.bulk_create(
+        [
+            ExecutionData(
+                node_id=node_id, inputs_serializer="json", outputs_serializer="json", inputs=payload, outputs=payload
+            )
+            for node_id in node_ids
+        ]
+    )
+    now = timezone.now()
+    ExecutionHistory.objects.bulk_create(
+        [
+            ExecutionHistory(
+                node_id=node_id,
+                version=unique_id("v"),
+                started_time=now,
+                archived_time=now,
+                inputs_serializer="json",
+                outputs_serializer="json",
+                inputs=payload,
+                outputs=payload,
+            )
+            for node_id in node_ids
+        ]
+    )
+    return root_id, node_ids
+
+
+def hot_rows(root_id: str, node_ids: list) -> int:
+    from pipeline.eri.models import ExecutionData, ExecutionHistory, Node
+
+    return (
+        Node.objects.filter(root_pipeline_id=root_id).count()
+        + ExecutionData.objects.filter(node_id__in=node_ids).count()
+        + ExecutionHistory.objects.filter(node_id__in=node_ids).count()
+    )
+
+
+def read_all(runtime, node_ids: list) -> float:
+    from bamboo_engine import api
+
+    with timer() as cost:
+        for node_id in node_ids:
+            assert api.get_execution_data(runtime, node_id).result
+    return cost[0] / len(node_ids)
+
+
+def run(nodes: int):
+    from pipeline.eri.archive import ARCHIVE_CACHE, archive_pipeline
+    from pipeline.eri.runtime import BambooDjangoRuntime
+
+    runtime = BambooDjangoRuntime()
+    root_id, node_ids = seed(nodes)
+    rows_before = hot_rows(root_id, node_ids)
+    hot_read = read_all(runtime, node_ids)
+
+    with timer() as archive_cost:
+        archive = archive_pipeline(root_id)
+    rows_after = hot_rows(root_id, node_ids)
+
+    ARCHIVE_CACHE.clear()
+    with timer() as cold_first:
+        assert api_get(runtime, node_ids[0])
+    cached_read = read_all(runtime, node_ids)
+
+    return rows_before, rows_after, archive.size, archive_cost[0], hot_read, cold_first[0], cached_read
+
+
+def api_get(runtime, node_id: str) -> bool:
+    from bamboo_engine import api
+
+    return api.get_execution_data(runtime, node_id).result
+
+
+def main():
+    setup_django()
+
+    sizes = [int(n) for n in sys.argv[1:]] or [100, 1000, 5000]
+    print("nodes,hot_rows_before,hot_rows_after,archive_kb,archive(s),hot_read(ms),cold_first(ms),archived_read(ms)")
+    for nodes in sizes:
+        before, after, size, archive_cost, hot_read, cold_first, cached_read = run(nodes)
+        print(
+            "{},{},{},{:.1f},{:.3f},{:.3f},{:.2f},{:.3f}".format(
+                nodes, before, after, size / 1024, archive_cost, hot_read * 1000, cold_first * 1000, cached_read * 1000
+            )
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,113 @@
+# -*- coding: utf-8 -*-
+"""
+Tencent is pleased to support the open source community by making 蓝鲸智云PaaS平台社区版 (BlueKing PaaS Community
+Edition) available.
+Copyright (C) 2017-2021 THL A29 Limited, a Tencent company. All rights reserved.
+Licensed under the MIT License (the "License"); you may not use this file except in compliance with the License.
+You may obtain a copy of the License at
+http://opensource.org/licenses/MIT
+Unless required by applicable law or agreed to in writing, software distributed under the License is distributed on
+an "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the License for the
+specific language governing permissions and limitations under the License.
+"""
+
+# ERI 数据清理：构造若干个已过期的流程（每个流程带有大量节点日志），对比一次性按根流程删除与
+# RetentionSweeper 按主键范围分批删除时单条 DELETE 语句的最长耗时（近似锁持有时间）以及整体删除速率
+#
+#     DJANGO_SETTINGS_MODULE=your_project.settings python benchmark/scripts/eri_retention.py 20 5000
+
+import sys
+from datetime import timedelta
+
+from common import setup_django, timer
+
+
+def seed(pipelines: int, logs: int):
+    from django.utils import timezone
+    from bamboo_engine import states
+    from bamboo_engine.utils.string import unique_id
+    from pipeline.eri.models import LogEntry, Node, State
+
+    created_time = timezone.now() - timedelta(days=60)
+    roots = []
+    for _ in range(pipelines):
+        root_id, node_id = unique_id("p"), unique_id("n")
+        for nid in (root_id, node_id):
+            State.objects.create(node_id=nid, root_id=root_id, name=states.FINISHED, version=unique_id("v"))
+        Node.objects.create(node_id=node_id, root_pipeline_id=root_id, detail="{}")
+        LogEntry.objects.bulk_create(
+            [LogEntry(node_id=node_id, loop=1, level_name="INFO", message="x" * 64) for _ in range(logs)],
+            batch_size=1000,
+        )
+        roots.append((root_id, node_id))
+    root_ids = [r for r, _ in roots]
+    State.objects.filter(root_id__in=root_ids).update(created_time=created_time, archived_time=created_time)
+    return roots
+
+
+def bulk(roots):
+    from pipeline.eri.models import LogEntry, Node, State
+
+    longest = 0
+    for root_id, node_id in roots:
+        for qs in (
+            LogEntry.objects.filter(node_id=node_id),
+            Node.objects.filter(root_pipeline_id=root_id),
+            State.objects.filter(root_id=root_id),
+        ):
+            with timer() as cost:
+                qs.delete()
+            longest = max(longest, cost[0])
+    return longest
+
+
+def sweep(roots, batch_size: int):
+    from pipeline.eri.models import RetentionCheckpoint, State
+    from pipeline.eri.retention import RetentionSweeper
+
+    # 只扫描本次构造的流程，避免清理到库中已有的数据
+    RetentionCheckpoint.objects.update_or_create(
+        name="benchmark", defaults={"scan_cursor": State.objects.get(node_id=roots[0][0]).id - 1}
+    )
+    sweeper = RetentionSweeper(name="benchmark", batch_size=batch_size, rows_per_second=0, pipelines_per_run=10 ** 6)
+    longest = [0]
+    delete_range = sweeper._delete_range
+
+    def timed_delete_range(*args):
+        with timer() as cost:
+            more = delete_range(*args)
+        longest[0] = max(longest[0], cost[0])
+        return more
+
+    sweeper._delete_range = timed_delete_range
+    sweeper.run()
+    RetentionCheckpoint.objects.filter(name="benchmark").delete()
+    return longest[0]
+
+
+def main():
+    setup_django()
+
+    pipelines = int(sys.argv[1]) if len(sys.argv) > 1 else 20
+    logs = int(sys.argv[2]) if len(sys.argv) > 2 else 5000
+    rows = pipelines * (logs + 4)
+
+    print("mode,rows,total(s),rows_per_second,longest_statement(ms)")
+    roots = seed(pipelines, logs)
+    with timer() as cost:
+        longest = bulk(roots)
+    print("bulk,{},{:.3f},{:.0f},{:.2f}".format(rows, cost[0], rows / cost[0], longest * 1000))
+
+    for batch_size in (500, 2000):
+        roots = seed(pipelines, logs)
+        with timer() as cost:
+            longest = sweep(roots, batch_size)
+        print(
+            "sweep(batch={}),{},{:.3f},{:.0f},{:.2f}".format(
+                batch_size, rows, cost[0], rows / cost[0], longest * 1000
+            )
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,82 @@
+# -*- coding: utf-8 -*-
+"""
+Tencent is pleased to support the open source community by making 蓝鲸智云PaaS平台社区版 (BlueKing PaaS Community
+Edition) available.
+Copyright (C) 2017-2021 THL A29 Limited, a Tencent company. All rights reserved.
+Licensed under the MIT License (the "License"); you may not use this file except in compliance with the License.
+You may obtain a copy of the License at
+http://opensource.org/licenses/MIT
+Unless required by applicable law or agreed to in writing, software distributed under the License is distributed on
+an "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the License for the
+specific language governing permissions and limitations under the License.
+"""
+
+# 长轮询节点的执行数据写入：模拟一个节点被调度 polls 次，每次调度后都写入完整的执行数据，输出中包含一个较大的文件列表，
+# 且每 change_every 次调度才发生一次变化，对比逐次全量写入、按摘要跳过未变化写入以及同时开启大数据转存
+# （BAMBOO_DJANGO_ERI_PAYLOAD_OFFLOAD_THRESHOLD）时写入语句的数量、SQL 文本总大小和耗时
+#
+#     DJANGO_SETTINGS_MODULE=your_project.settings python benchmark/scripts/exec_data_offload.py 200 10 20000
+
+import sys
+
+from common import setup_django, timer
+
+
+def full_write(runtime, node_id: str, data):
+    from pipeline.eri.models import ExecutionData as DBExecutionData
+
+    inputs, inputs_serializer = runtime._serialize(data.inputs)
+    outputs, outputs_serializer = runtime._serialize(data.outputs)
+    DBExecutionData.objects.update_or_create(
+        node_id=node_id,
+        defaults={
+            "inputs": inputs,
+            "inputs_serializer": inputs_serializer,
+            "outputs": outputs,
+            "outputs_serializer": outputs_serializer,
+        },
+    )
+
+
+def run(mode: str, polls: int, change_every: int, files: int):
+    from django.db import connection
+    from django.test.utils import CaptureQueriesContext, override_settings
+    from bamboo_engine.eri import ExecutionData
+    from bamboo_engine.utils.string import unique_id
+    from pipeline.eri.runtime import BambooDjangoRuntime
+
+    runtime = BambooDjangoRuntime()
+    node_id = unique_id("n")
+    inputs = {"host": "127.0.0.1", "timeout": 30}
+    threshold = 4096 if mode == "offload" else 0
+
+    with override_settings(BAMBOO_DJANGO_ERI_PAYLOAD_OFFLOAD_THRESHOLD=threshold):
+        with CaptureQueriesContext(connection) as ctx, timer() as cost:
+            for i in range(polls):
+                version = i // change_every
+                outputs = {"files": ["/data/{}/file_{}.log".format(version, n) for n in range(files)], "done": False}
+                data = ExecutionData(inputs=inputs, outputs=outputs)
+                if mode == "full":
+                    full_write(runtime, node_id, data)
+                else:
+                    runtime.set_execution_data(node_id, data)
+
+    writes = [q["sql"] for q in ctx.captured_queries if not q["sql"].lstrip().upper().startswith("SELECT")]
+    return len(writes), sum(len(sql) for sql in writes), cost[0]
+
+
+def main():
+    setup_django()
+
+    polls = int(sys.argv[1]) if len(sys.argv) > 1 else 200
+    change_every = int(sys.argv[2]) if len(sys.argv) > 2 else 10
+    files = int(sys.argv[3]) if len(sys.argv) > 3 else 20000
+
+    print("mode,polls,write_statements,write_sql_kb,total(s)")
+    for mode in ("full", "digest", "offload"):
+        statements, size, cost = run(mode, polls, change_every, files)
+        print("{},{},{},{:.1f},{:.3f}".format(mode, polls, statements, size / 1024, cost))
+
+
+if __name__ == "__main__":
+    main()
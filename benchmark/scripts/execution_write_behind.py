@@ -0,0 +1,54 @@
+# -*- coding: utf-8 -*-
+"""
+Tencent is pleased to support the open source community by making 蓝鲸智云PaaS平台社区版 (BlueKing PaaS Community
+Edition) available.
+Copyright (C) 2017-2021 THL A29 Limited, a Tencent company. All rights reserved.
+Licensed under the MIT License (the "License"); you may not use this file except in compliance with the License.
+You may obtain a copy of the License at
+http://opensource.org/licenses/MIT
+Unless required by applicable law or agreed to in writing, software distributed under the License is distributed on
+an "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the License for the
+specific language governing permissions and limitations under the License.
+"""
+
+# EXECUTION 单流程多节点：对比开启进程写缓冲（BAMBOO_DJANGO_ERI_PROCESS_WRITE_BEHIND）前后
+# 推进循环的数据库往返次数与单节点耗时
+#
+#     DJANGO_SETTINGS_MODULE=your_project.settings python benchmark/scripts/execution_write_behind.py 100 500 1000
+
+import sys
+
+from common import setup_django, linear_pipeline, count_queries, timer, inline_runtime_class
+
+
+def run(nodes: int, write_behind: bool):
+    from django.test.utils import override_settings
+    from bamboo_engine.engine import Engine
+
+    runtime = inline_runtime_class()()
+    pipeline = linear_pipeline(nodes)
+
+    with override_settings(BAMBOO_DJANGO_ERI_PROCESS_WRITE_BEHIND=write_behind):
+        with count_queries() as queries, timer() as cost:
+            Engine(runtime).run_pipeline(pipeline=pipeline)
+
+    return queries[0], cost[0]
+
+
+def main():
+    setup_django()
+
+    sizes = [int(n) for n in sys.argv[1:]] or [100, 500, 1000]
+    print("nodes,write_behind,queries,queries_per_node,seconds,ms_per_node")
+    for nodes in sizes:
+        for write_behind in (False, True):
+            queries, cost = run(nodes, write_behind)
+            print(
+                "{},{},{},{:.2f},{:.3f},{:.3f}".format(
+                    nodes, write_behind, queries, queries / nodes, cost, cost * 1000 / nodes
+                )
+            )
+
+
+if __name__ == "__main__":
+    main()
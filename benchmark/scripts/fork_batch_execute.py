@@ -0,0 +1,62 @@
+# -*- coding: utf-8 -*-
+"""
+Tencent is pleased to support the open source community by making 蓝鲸智云PaaS平台社区版 (BlueKing PaaS Community
+Edition) available.
+Copyright (C) 2017-2021 THL A29 Limited, a Tencent company. All rights reserved.
+Licensed under the MIT License (the "License"); you may not use this file except in compliance with the License.
+You may obtain a copy of the License at
+http://opensource.org/licenses/MIT
+Unless required by applicable law or agreed to in writing, software distributed under the License is distributed on
+an "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the License for the
+specific language governing permissions and limitations under the License.
+"""
+
+# PREPARE单流程多节点 fan-out：对比并行网关 fork 后逐个派发子进程与通过 batch_execute 批量派发的
+# 数据库往返次数与耗时
+#
+# 脚本会向 broker 的 er_execute_benchmark 队列投递任务，请不要为该队列启动 worker，测试结束后清理该队列即可
+#
+#     DJANGO_SETTINGS_MODULE=your_project.settings python benchmark/scripts/fork_batch_execute.py 100 500 1000
+
+import sys
+
+from common import setup_django, count_queries, timer
+
+
+def fork_children(runtime, branches: int):
+    from bamboo_engine.utils.string import unique_id
+    from pipeline.eri.models import Process
+
+    parent = Process.objects.create(priority=100, queue="benchmark", root_pipeline_id=unique_id("p"))
+    dispatches = runtime.fork(
+        parent_id=parent.id,
+        root_pipeline_id=parent.root_pipeline_id,
+        pipeline_stack=[parent.root_pipeline_id],
+        from_to={unique_id("n"): "converge" for _ in range(branches)},
+    )
+    return parent.id, dispatches
+
+
+def main():
+    setup_django()
+
+    from pipeline.eri.runtime import BambooDjangoRuntime
+
+    runtime = BambooDjangoRuntime()
+    sizes = [int(n) for n in sys.argv[1:]] or [100, 500, 1000]
+    print("branches,mode,queries,seconds")
+    for branches in sizes:
+        parent_id, dispatches = fork_children(runtime, branches)
+        with count_queries() as queries, timer() as cost:
+            for d in dispatches:
+                runtime.execute(d.process_id, d.node_id)
+        print("{},execute,{},{:.3f}".format(branches, queries[0], cost[0]))
+
+        parent_id, dispatches = fork_children(runtime, branches)
+        with count_queries() as queries, timer() as cost:
+            runtime.batch_execute(parent_id, dispatches)
+        print("{},batch_execute,{},{:.3f}".format(branches, queries[0], cost[0]))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,78 @@
+# -*- coding: utf-8 -*-
+"""
+Tencent is pleased to support the open source community by making 蓝鲸智云PaaS平台社区版 (BlueKing PaaS Community
+Edition) available.
+Copyright (C) 2017-2021 THL A29 Limited, a Tencent company. All rights reserved.
+Licensed under the MIT License (the "License"); you may not use this file except in compliance with the License.
+You may obtain a copy of the License at
+http://opensource.org/licenses/MIT
+Unless required by applicable law or agreed to in writing, software distributed under the License is distributed on
+an "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the License for the
+specific language governing permissions and limitations under the License.
+"""
+
+# 循环节点执行历史：模拟一个节点重入 loops 次，每次只有少量字段发生变化，对比全量记录与增量记录
+# （BAMBOO_DJANGO_ERI_HISTORY_DELTA）时历史数据的存储大小、写入耗时以及 get_histories 还原全部历史的耗时
+#
+#     DJANGO_SETTINGS_MODULE=your_project.settings python benchmark/scripts/history_delta.py 100 500
+
+import sys
+
+from common import setup_django, timer
+
+
+def run(loops: int, delta: bool):
+    from django.test.utils import override_settings
+    from django.utils import timezone
+    from bamboo_engine.utils.string import unique_id
+    from pipeline.eri.models import ExecutionHistory
+    from pipeline.eri.runtime import BambooDjangoRuntime
+
+    runtime = BambooDjangoRuntime()
+    node_id = unique_id("n")
+    hosts = ["10.0.{}.{}".format(i // 256, i % 256) for i in range(500)]
+
+    with override_settings(BAMBOO_DJANGO_ERI_HISTORY_DELTA=delta):
+        with timer() as write_cost:
+            for loop in range(1, loops + 1):
+                now = timezone.now()
+                runtime.add_history(
+                    node_id=node_id,
+                    started_time=now,
+                    archived_time=now,
+                    loop=loop,
+                    skip=False,
+                    retry=0,
+                    version=unique_id("v"),
+                    inputs={"_loop": loop, "hosts": hosts, "script": "echo hello\n" * 50},
+                    outputs={"_loop": loop, "_result": True, "log": "host {} done".format(loop), "hosts": hosts},
+                )
+
+    size = sum(
+        len(i) + len(o)
+        for i, o in ExecutionHistory.objects.filter(node_id=node_id).values_list("inputs", "outputs")
+    )
+    with timer() as read_cost:
+        histories = runtime.get_histories(node_id)
+    assert len(histories) == loops and histories[-1].inputs["_loop"] == loops
+
+    return size, write_cost[0], read_cost[0]
+
+
+def main():
+    setup_django()
+
+    sizes = [int(n) for n in sys.argv[1:]] or [100, 500]
+    print("loops,mode,stored_kb,write(s),get_histories(ms)")
+    for loops in sizes:
+        for delta in (False, True):
+            size, write_cost, read_cost = run(loops, delta)
+            print(
+                "{},{},{:.1f},{:.3f},{:.2f}".format(
+                    loops, "delta" if delta else "full", size / 1024, write_cost, read_cost * 1000
+                )
+            )
+
+
+if __name__ == "__main__":
+    main()
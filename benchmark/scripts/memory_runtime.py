@@ -0,0 +1,145 @@
+# -*- coding: utf-8 -*-
+"""
+Tencent is pleased to support the open source community by making 蓝鲸智云PaaS平台社区版 (BlueKing PaaS Community
+Edition) available.
+Copyright (C) 2017-2021 THL A29 Limited, a Tencent company. All rights reserved.
+Licensed under the MIT License (the "License"); you may not use this file except in compliance with the License.
+You may obtain a copy of the License at
+http://opensource.org/licenses/MIT
+Unless required by applicable law or agreed to in writing, software distributed under the License is distributed on
+an "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the License for the
+specific language governing permissions and limitations under the License.
+"""
+
+# 使用内存运行时测量引擎本身的开销，不依赖 Django，数据库及 broker，回放 benchmark 目录中的执行场景：
+#
+#     single   单流程多节点，规模为节点数
+#     multi    多流程，规模为流程数，每个流程包含 10 个服务节点
+#     fan_out  并行网关分支，规模为分支数，每个分支包含 10 个服务节点
+#
+# 输出构造，校验，准备，执行四个阶段的耗时（秒）以及执行阶段的节点速率，--workers 大于 0 时使用线程池执行任务
+#
+#     python benchmark/scripts/memory_runtime.py single 100 500 1000 5000
+#     python benchmark/scripts/memory_runtime.py fan_out 10 100 500 --workers 8
+
+import argparse
+
+from common import linear_pipeline, timer
+
+BRANCH_NODES = 10
+
+
+def empty_service_class():
+    from bamboo_engine.eri import Service
+
+    class EmptyService(Service):
+        def pre_execute(self, data, root_pipeline_data):
+            pass
+
+        def execute(self, data, root_pipeline_data):
+            return True
+
+        def schedule(self, schedule, data, root_pipeline_data, callback_data=None):
+            return True
+
+        def need_schedule(self):
+            return False
+
+        def schedule_type(self):
+            return None
+
+        def is_schedule_done(self):
+            return False
+
+        def schedule_after(self, schedule, data, root_pipeline_data):
+            return -1
+
+        def setup_runtime_attributes(self, **attrs):
+            pass
+
+    return EmptyService
+
+
+def fan_out_pipeline(branches: int) -> dict:
+    from bamboo_engine.builder import EmptyStartEvent, ServiceActivity, EmptyEndEvent, ParallelGateway
+    from bamboo_engine.builder import ConvergeGateway, build_tree
+
+    start = EmptyStartEvent()
+    pg = start.extend(ParallelGateway())
+    cg = ConvergeGateway()
+    for _ in range(branches):
+        elem = pg
+        for _ in range(BRANCH_NODES):
+            elem = elem.extend(ServiceActivity(component_code="example_component"))
+        elem.extend(cg)
+    cg.extend(EmptyEndEvent())
+
+    return build_tree(start)
+
+
+def build(scenario: str, size: int) -> list:
+    if scenario == "single":
+        return [linear_pipeline(size)]
+    if scenario == "multi":
+        return [linear_pipeline(BRANCH_NODES) for _ in range(size)]
+    return [fan_out_pipeline(size)]
+
+
+def run(scenario: str, size: int, workers: int):
+    from bamboo_engine import validator
+    from bamboo_engine.eri.memory import MemoryRuntime, InlineTaskExecutor, ThreadPoolTaskExecutor
+
+    executor = ThreadPoolTaskExecutor(max_workers=workers) if workers > 0 else InlineTaskExecutor()
+    runtime = MemoryRuntime(executor=executor)
+    runtime.register_service("example_component", "legacy", empty_service_class())
+
+    with timer() as build_cost:
+        pipelines = build(scenario, size)
+
+    with timer() as validate_cost:
+        for pipeline in pipelines:
+            validator.validate_and_process_pipeline(pipeline, False)
+
+    with timer() as prepare_cost:
+        process_ids = [runtime.prepare_run_pipeline(pipeline, {}, {}, {}) for pipeline in pipelines]
+
+    with timer() as execute_cost:
+        for process_id, pipeline in zip(process_ids, pipelines):
+            runtime.execute(process_id, pipeline["start_event"]["id"])
+        runtime.wait()
+
+    executor.shutdown()
+
+    nodes = sum(len(runtime.get_state_by_root(pipeline["id"])) for pipeline in pipelines)
+    print(
+        "{},{},{},{},{:.3f},{:.3f},{:.3f},{:.3f},{:.0f}".format(
+            scenario,
+            size,
+            "thread_{}".format(workers) if workers > 0 else "inline",
+            nodes,
+            build_cost[0],
+            validate_cost[0],
+            prepare_cost[0],
+            execute_cost[0],
+            nodes / execute_cost[0],
+        )
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("scenario", choices=["single", "multi", "fan_out"])
+    parser.add_argument("sizes", nargs="*", type=int)
+    parser.add_argument("--workers", type=int, default=0)
+    args = parser.parse_args()
+
+    print("scenario,size,executor,nodes,build,validate,prepare,execute,nodes_per_second")
+    for size in args.sizes or [100, 500, 1000]:
+        try:
+            run(args.scenario, size, args.workers)
+        except Exception as e:
+            print("{},{},error,{!r}".format(args.scenario, size, e))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,97 @@
+# -*- coding: utf-8 -*-
+"""
+Tencent is pleased to support the open source community by making 蓝鲸智云PaaS平台社区版 (BlueKing PaaS Community
+Edition) available.
+Copyright (C) 2017-2021 THL A29 Limited, a Tencent company. All rights reserved.
+Licensed under the MIT License (the "License"); you may not use this file except in compliance with the License.
+You may obtain a copy of the License at
+http://opensource.org/licenses/MIT
+Unless required by applicable law or agreed to in writing, software distributed under the License is distributed on
+an "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the License for the
+specific language governing permissions and limitations under the License.
+"""
+
+# 深度嵌套子流程模板的校验与准备耗时，模板中每一层流程包含 branches 个并行分支，每个分支包含 activities 个服务节点，
+# 未到达最大深度时每个分支末尾再嵌套一个同样结构的子流程
+#
+# 分别测量串行，线程池及进程池下 validate_and_process_pipeline 的耗时（秒），每次校验前清空编译计划缓存
+#
+#     PYTHONPATH=. python benchmark/scripts/nested_subprocess.py --branches 4 --depth 4 --workers 4
+
+import argparse
+import copy
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+
+from common import timer
+
+
+def nested_pipeline(branches: int, depth: int, activities: int) -> dict:
+    from bamboo_engine.builder import EmptyStartEvent, ServiceActivity, EmptyEndEvent, ParallelGateway
+    from bamboo_engine.builder import ConvergeGateway, SubProcess, build_tree
+
+    def subprocess_tree(level):
+        start = EmptyStartEvent()
+        pg = start.extend(ParallelGateway())
+        cg = ConvergeGateway()
+        for _ in range(branches):
+            tail = pg
+            for _ in range(activities):
+                tail = tail.extend(ServiceActivity(component_code="example_component"))
+            if level < depth:
+                tail = tail.extend(SubProcess(start=subprocess_tree(level + 1)))
+            tail.extend(cg)
+        cg.extend(EmptyEndEvent())
+        return start
+
+    return build_tree(subprocess_tree(1))
+
+
+def count(pipeline: dict) -> (int, int):
+    pipelines = 1
+    nodes = len(pipeline["activities"]) + len(pipeline["gateways"]) + 2
+    for act in pipeline["activities"].values():
+        if act["type"] == "SubProcess":
+            sub_pipelines, sub_nodes = count(act["pipeline"])
+            pipelines += sub_pipelines
+            nodes += sub_nodes
+    return pipelines, nodes
+
+
+def validate(template: dict, mode: str, workers: int, pipelines: int, nodes: int):
+    from bamboo_engine.validator import plan, validate_and_process_pipeline
+
+    pipeline = copy.deepcopy(template)
+    plan.clear_compiled_plans()
+
+    if mode == "serial":
+        with timer() as cost:
+            validate_and_process_pipeline(pipeline)
+    else:
+        executor_class = ThreadPoolExecutor if mode == "thread" else ProcessPoolExecutor
+        with executor_class(max_workers=workers) as executor:
+            # 预先启动 worker，避免将进程创建的耗时计入校验耗时
+            list(executor.map(abs, range(workers)))
+            with timer() as cost:
+                validate_and_process_pipeline(pipeline, executor=executor)
+
+    print("validate,{},{},{},{:.3f}".format(mode, pipelines, nodes, cost[0]))
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--branches", type=int, default=4)
+    parser.add_argument("--depth", type=int, default=4)
+    parser.add_argument("--activities", type=int, default=5)
+    parser.add_argument("--workers", type=int, default=4)
+    args = parser.parse_args()
+
+    template = nested_pipeline(args.branches, args.depth, args.activities)
+    pipelines, nodes = count(template)
+
+    print("stage,mode,pipelines,nodes,seconds")
+    for mode in ["serial", "thread", "process"]:
+        validate(template, mode, args.workers, pipelines, nodes)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,70 @@
+# -*- coding: utf-8 -*-
+"""
+Tencent is pleased to support the open source community by making 蓝鲸智云PaaS平台社区版 (BlueKing PaaS Community
+Edition) available.
+Copyright (C) 2017-2021 THL A29 Limited, a Tencent company. All rights reserved.
+Licensed under the MIT License (the "License"); you may not use this file except in compliance with the License.
+You may obtain a copy of the License at
+http://opensource.org/licenses/MIT
+Unless required by applicable law or agreed to in writing, software distributed under the License is distributed on
+an "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the License for the
+specific language governing permissions and limitations under the License.
+"""
+
+# EXECUTION 单流程多节点：对比开启节点日志写缓冲（BAMBOO_DJANGO_ERI_LOG_BUFFER）前后推进过程中
+# 日志表的 INSERT 次数与单节点耗时，引擎日志通过 EngineContextLogHandler 写入
+#
+#     DJANGO_SETTINGS_MODULE=your_project.settings python benchmark/scripts/node_log_buffer.py 100 500 1000
+
+import logging
+import sys
+
+from common import setup_django, linear_pipeline, timer, inline_runtime_class
+
+
+def run(nodes: int, buffered: bool):
+    from django.db import connection
+    from django.test.utils import CaptureQueriesContext, override_settings
+    from bamboo_engine.engine import Engine
+    from pipeline.eri.log import EngineContextLogHandler, flush_log_buffer
+    from pipeline.eri.models import LogEntry
+
+    engine_logger = logging.getLogger("bamboo_engine")
+    engine_logger.setLevel(logging.INFO)
+    handler = EngineContextLogHandler()
+    engine_logger.addHandler(handler)
+
+    runtime = inline_runtime_class()()
+    pipeline = linear_pipeline(nodes)
+
+    try:
+        with override_settings(BAMBOO_DJANGO_ERI_LOG_BUFFER=buffered):
+            with CaptureQueriesContext(connection) as ctx, timer() as cost:
+                Engine(runtime).run_pipeline(pipeline=pipeline)
+                # 模拟任务结束时的 task_postrun 信号
+                flush_log_buffer()
+    finally:
+        engine_logger.removeHandler(handler)
+
+    table = LogEntry._meta.db_table
+    inserts = [q for q in ctx.captured_queries if q["sql"].startswith("INSERT") and table in q["sql"]]
+    return len(inserts), cost[0]
+
+
+def main():
+    setup_django()
+
+    sizes = [int(n) for n in sys.argv[1:]] or [100, 500, 1000]
+    print("nodes,buffered,log_inserts,log_inserts_per_node,seconds,ms_per_node")
+    for nodes in sizes:
+        for buffered in (False, True):
+            inserts, cost = run(nodes, buffered)
+            print(
+                "{},{},{},{:.2f},{:.3f},{:.3f}".format(
+                    nodes, buffered, inserts, inserts / nodes, cost, cost * 1000 / nodes
+                )
+            )
+
+
+if __name__ == "__main__":
+    main()
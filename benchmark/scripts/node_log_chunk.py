@@ -0,0 +1,77 @@
+# -*- coding: utf-8 -*-
+"""
+Tencent is pleased to support the open source community by making 蓝鲸智云PaaS平台社区版 (BlueKing PaaS Community
+Edition) available.
+Copyright (C) 2017-2021 THL A29 Limited, a Tencent company. All rights reserved.
+Licensed under the MIT License (the "License"); you may not use this file except in compliance with the License.
+You may obtain a copy of the License at
+http://opensource.org/licenses/MIT
+Unless required by applicable law or agreed to in writing, software distributed under the License is distributed on
+an "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the License for the
+specific language governing permissions and limitations under the License.
+"""
+
+# 节点日志读取：对比逐行存储（LogEntry）与压缩分块存储（BAMBOO_DJANGO_ERI_LOG_STORAGE = "chunk"）下
+# 大日志节点的存储体积，全量读取及读取最后 200 行的耗时
+#
+#     DJANGO_SETTINGS_MODULE=your_project.settings python benchmark/scripts/node_log_chunk.py 1000 10000 50000
+
+import logging
+import sys
+
+from common import setup_django, timer
+
+
+def run(lines: int, storage: str):
+    from django.test.utils import override_settings
+    from bamboo_engine.utils.string import unique_id
+    from pipeline.eri.log import ERINodeLogHandler, flush_log_buffer, read_log_lines
+    from pipeline.eri.models import LogChunk, LogEntry
+
+    node_id, version = unique_id("n"), unique_id("v")
+    log = logging.getLogger("benchmark.node_log_chunk")
+    log.setLevel(logging.INFO)
+    handler = ERINodeLogHandler()
+    log.addHandler(handler)
+    adapter = logging.LoggerAdapter(log, extra={"node_id": node_id, "loop": 1, "version": version})
+
+    try:
+        with override_settings(BAMBOO_DJANGO_ERI_LOG_STORAGE=storage, BAMBOO_DJANGO_ERI_LOG_BUFFER=True):
+            with timer() as write_cost:
+                for i in range(lines):
+                    adapter.info("[stdout] step %s finished, output: %s", i, "x" * 64)
+                flush_log_buffer()
+    finally:
+        log.removeHandler(handler)
+
+    if storage == "chunk":
+        size = sum(len(d) for d in LogChunk.objects.filter(node_id=node_id).values_list("data", flat=True))
+    else:
+        size = sum(len(m) for m in LogEntry.objects.filter(node_id=node_id).values_list("message", flat=True))
+
+    with timer() as full_cost:
+        read_log_lines(node_id, version)
+    with timer() as tail_cost:
+        tail = read_log_lines(node_id, version, offset=-200)
+    assert len(tail) == min(lines, 200)
+
+    return size, write_cost[0], full_cost[0], tail_cost[0]
+
+
+def main():
+    setup_django()
+
+    sizes = [int(n) for n in sys.argv[1:]] or [1000, 10000, 50000]
+    print("lines,storage,stored_kb,write(s),read_all(ms),tail_200(ms)")
+    for lines in sizes:
+        for storage in ("entry", "chunk"):
+            size, write_cost, full_cost, tail_cost = run(lines, storage)
+            print(
+                "{},{},{:.1f},{:.3f},{:.2f},{:.2f}".format(
+                    lines, storage, size / 1024, write_cost, full_cost * 1000, tail_cost * 1000
+                )
+            )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,86 @@
+# -*- coding: utf-8 -*-
+"""
+Tencent is pleased to support the open source community by making 蓝鲸智云PaaS平台社区版 (BlueKing PaaS Community
+Edition) available.
+Copyright (C) 2017-2021 THL A29 Limited, a Tencent company. All rights reserved.
+Licensed under the MIT License (the "License"); you may not use this file except in compliance with the License.
+You may obtain a copy of the License at
+http://opensource.org/licenses/MIT
+Unless required by applicable law or agreed to in writing, software distributed under the License is distributed on
+an "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the License for the
+specific language governing permissions and limitations under the License.
+"""
+
+# 流程校验 micro-benchmark：对比同一模板创建的多个流程在关闭与开启结构编译计划缓存时的校验耗时
+#
+#     PYTHONPATH=. python benchmark/scripts/prepare_plan_cache.py
+
+import copy
+import time
+
+from bamboo_engine.builder import (
+    ConvergeGateway,
+    EmptyEndEvent,
+    EmptyStartEvent,
+    ExclusiveGateway,
+    ParallelGateway,
+    ServiceActivity,
+    build_tree,
+)
+from bamboo_engine.config import Settings
+from bamboo_engine.validator import plan, validate_and_process_pipeline
+
+
+def template(branches, depth):
+    """
+    构造带有并行网关及嵌套分支网关的流程，每次调用生成的节点 ID 均不相同
+    """
+    start = EmptyStartEvent()
+    pg = ParallelGateway()
+    pg_cg = ConvergeGateway()
+    end = EmptyEndEvent()
+
+    start.extend(ServiceActivity()).extend(pg)
+    for _ in range(branches):
+        tail = pg.extend(ServiceActivity())
+        for _ in range(depth):
+            tail = tail.extend(ServiceActivity())
+        eg = ExclusiveGateway(conditions={0: "1 == 1", 1: "1 == 0"})
+        tail.extend(eg).connect(ServiceActivity(), ServiceActivity()).converge(ConvergeGateway()).connect(pg_cg)
+    pg_cg.extend(ServiceActivity()).extend(end)
+
+    return build_tree(start)
+
+
+def run(pipelines, cache_size):
+    Settings.PIPELINE_PLAN_CACHE_SIZE = cache_size
+    plan.clear_compiled_plans()
+    pipelines = copy.deepcopy(pipelines)
+    start = time.perf_counter()
+    for pipeline in pipelines:
+        validate_and_process_pipeline(pipeline)
+    return time.perf_counter() - start, pipelines
+
+
+def main():
+    number = 500
+    print("branches,depth,nodes,pipelines,no_cache(ms),plan_cache(ms)")
+    for branches, depth in ((2, 2), (3, 3), (5, 5), (10, 10)):
+        pipelines = [template(branches, depth) for _ in range(number)]
+        nodes = len(pipelines[0]["activities"]) + len(pipelines[0]["gateways"]) + 2
+
+        default_size = Settings.PIPELINE_PLAN_CACHE_SIZE
+        no_cache_cost, expect = run(pipelines, 0)
+        cache_cost, actual = run(pipelines, default_size)
+        Settings.PIPELINE_PLAN_CACHE_SIZE = default_size
+
+        assert [p["gateways"] for p in expect] == [p["gateways"] for p in actual]
+        print(
+            "{},{},{},{},{:.2f},{:.2f}".format(
+                branches, depth, nodes, number, no_cache_cost * 1e3, cache_cost * 1e3
+            )
+        )
+
+
+if __name__ == "__main__":
+    main()
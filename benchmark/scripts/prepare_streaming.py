@@ -0,0 +1,63 @@
+# -*- coding: utf-8 -*-
+"""
+Tencent is pleased to support the open source community by making 蓝鲸智云PaaS平台社区版 (BlueKing PaaS Community
+Edition) available.
+Copyright (C) 2017-2021 THL A29 Limited, a Tencent company. All rights reserved.
+Licensed under the MIT License (the "License"); you may not use this file except in compliance with the License.
+You may obtain a copy of the License at
+http://opensource.org/licenses/MIT
+Unless required by applicable law or agreed to in writing, software distributed under the License is distributed on
+an "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the License for the
+specific language governing permissions and limitations under the License.
+"""
+
+# 大流程准备耗时与内存峰值：对比一次性生成所有对象后在单个事务中写入，与流式生成并按批次写入两种方式下
+# prepare_run_pipeline 的耗时（秒），SQL 数量及 tracemalloc 统计的内存峰值（MB）
+#
+#     DJANGO_SETTINGS_MODULE=your_project.settings python benchmark/scripts/prepare_streaming.py --nodes 20000
+
+import argparse
+import tracemalloc
+
+from common import count_queries, linear_pipeline, setup_django, timer
+
+
+def prepare(runtime, pipeline: dict, streaming: bool, batch_size: int) -> (float, int, float):
+    from django.test.utils import override_settings
+
+    with override_settings(
+        BAMBOO_DJANGO_ERI_PREPARE_STREAMING=streaming, BAMBOO_DJANGO_ERI_PREPARE_BATCH_SIZE=batch_size
+    ):
+        tracemalloc.start()
+        with count_queries() as queries, timer() as cost:
+            runtime.prepare_run_pipeline(pipeline, {}, {}, {})
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+
+    return cost[0], queries[0], peak / 1024 / 1024
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--nodes", type=int, nargs="+", default=[1000, 5000, 20000])
+    parser.add_argument("--batch-size", type=int, default=500)
+    args = parser.parse_args()
+
+    setup_django()
+
+    from bamboo_engine import validator
+    from pipeline.eri.runtime import BambooDjangoRuntime
+
+    runtime = BambooDjangoRuntime()
+
+    print("mode,nodes,seconds,queries,peak_mb")
+    for nodes in args.nodes:
+        for streaming in [False, True]:
+            pipeline = linear_pipeline(nodes)
+            validator.validate_and_process_pipeline(pipeline)
+            cost, queries, peak = prepare(runtime, pipeline, streaming, args.batch_size)
+            print("{},{},{:.3f},{},{:.1f}".format("streaming" if streaming else "bulk", nodes, cost, queries, peak))
+
+
+if __name__ == "__main__":
+    main()
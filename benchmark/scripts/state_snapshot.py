@@ -0,0 +1,82 @@
+# -*- coding: utf-8 -*-
+"""
+Tencent is pleased to support the open source community by making 蓝鲸智云PaaS平台社区版 (BlueKing PaaS Community
+Edition) available.
+Copyright (C) 2017-2021 THL A29 Limited, a Tencent company. All rights reserved.
+Licensed under the MIT License (the "License"); you may not use this file except in compliance with the License.
+You may obtain a copy of the License at
+http://opensource.org/licenses/MIT
+Unless required by applicable law or agreed to in writing, software distributed under the License is distributed on
+an "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the License for the
+specific language governing permissions and limitations under the License.
+"""
+
+# 状态轮询：对比 get_pipeline_states，get_pipeline_states_snapshot 与只有少量节点发生变化时
+# get_pipeline_states_since 的耗时
+#
+#     DJANGO_SETTINGS_MODULE=your_project.settings python benchmark/scripts/state_snapshot.py 1000 5000
+
+import sys
+from datetime import timedelta
+
+from common import setup_django, timer
+
+CHANGED_RATE = 0.01
+
+
+def prepare_states(nodes: int) -> str:
+    from django.utils import timezone
+    from bamboo_engine import states
+    from bamboo_engine.utils.string import unique_id
+    from pipeline.eri.models import State
+
+    root_id = unique_id("p")
+    State.objects.bulk_create(
+        [State(node_id=root_id, root_id=root_id, parent_id=root_id, name=states.RUNNING, version=unique_id("v"))]
+        + [
+            State(node_id=unique_id("n"), root_id=root_id, parent_id=root_id, name=states.READY, version=unique_id("v"))
+            for _ in range(nodes)
+        ],
+        batch_size=500,
+    )
+    # 避免刚创建的状态落在增量获取的游标回退时间内
+    State.objects.filter(root_id=root_id).update(updated_time=timezone.now() - timedelta(minutes=1))
+    return root_id
+
+
+def main():
+    setup_django()
+
+    from bamboo_engine import api
+    from pipeline.eri.runtime import BambooDjangoRuntime
+    from pipeline.eri.models import State
+
+    runtime = BambooDjangoRuntime()
+    sizes = [int(n) for n in sys.argv[1:]] or [1000, 5000]
+    print("nodes,states_tree(ms),snapshot(ms),since(ms),since_rows")
+    for nodes in sizes:
+        root_id = prepare_states(nodes)
+
+        with timer() as tree_cost:
+            api.get_pipeline_states(runtime, root_id)
+
+        with timer() as snapshot_cost:
+            cursor = api.get_pipeline_states_snapshot(runtime, root_id).data["cursor"]
+
+        # 模拟两次轮询之间少量节点发生状态变化
+        changed = State.objects.filter(root_id=root_id).exclude(node_id=root_id)[: int(nodes * CHANGED_RATE)]
+        for state in changed:
+            runtime.set_state(node_id=state.node_id, to_state="RUNNING")
+
+        with timer() as since_cost:
+            rows = api.get_pipeline_states_since(runtime, root_id, cursor).data["states"]
+
+        print(
+            "{},{:.3f},{:.3f},{:.3f},{}".format(
+                nodes, tree_cost[0] * 1000, snapshot_cost[0] * 1000, since_cost[0] * 1000, len(rows)
+            )
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,55 @@
+# -*- coding: utf-8 -*-
+"""
+Tencent is pleased to support the open source community by making 蓝鲸智云PaaS平台社区版 (BlueKing PaaS Community
+Edition) available.
+Copyright (C) 2017-2021 THL A29 Limited, a Tencent company. All rights reserved.
+Licensed under the MIT License (the "License"); you may not use this file except in compliance with the License.
+You may obtain a copy of the License at
+http://opensource.org/licenses/MIT
+Unless required by applicable law or agreed to in writing, software distributed under the License is distributed on
+an "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the License for the
+specific language governing permissions and limitations under the License.
+"""
+
+# 模板引用提取 micro-benchmark：对比 mako 词法分析，简单模板快速路径以及缓存命中时的耗时
+#
+#     python benchmark/scripts/template_reference.py
+
+import timeit
+
+from bamboo_engine.template import Template
+from bamboo_engine.template.template import (
+    REFERENCE_CACHE,
+    _get_simple_template_reference,
+    _parse_template_reference,
+)
+
+TEMPLATES = {
+    "identifier": "${biz_cc_id}",
+    "attribute": "${job_result.ip_list}",
+    "subscript": '${_system["bk_biz_id"]}',
+    "expression": "${int(count) + 1 if enabled else 0}",
+}
+
+
+def main():
+    number = 10000
+    print("template,mako_lexer(us),fast_path(us),memoized(us)")
+    for name, tpl in TEMPLATES.items():
+        lexer_cost = timeit.timeit(lambda: _parse_template_reference(tpl), number=number)
+        fast_cost = (
+            timeit.timeit(lambda: _get_simple_template_reference(tpl), number=number)
+            if _get_simple_template_reference(tpl) is not None
+            else float("nan")
+        )
+        REFERENCE_CACHE.clear()
+        memoized_cost = timeit.timeit(lambda: Template(tpl).get_reference(), number=number)
+        print(
+            "{},{:.2f},{:.2f},{:.2f}".format(
+                name, lexer_cost * 1e6 / number, fast_cost * 1e6 / number, memoized_cost * 1e6 / number
+            )
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,115 @@
+# -*- coding: utf-8 -*-
+"""
+Tencent is pleased to support the open source community by making 蓝鲸智云PaaS平台社区版 (BlueKing PaaS Community
+Edition) available.
+Copyright (C) 2017-2021 THL A29 Limited, a Tencent company. All rights reserved.
+Licensed under the MIT License (the "License"); you may not use this file except in compliance with the License.
+You may obtain a copy of the License at
+http://opensource.org/licenses/MIT
+Unless required by applicable law or agreed to in writing, software distributed under the License is distributed on
+an "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the License for the
+specific language governing permissions and limitations under the License.
+"""
+
+# 流程校验规模测试，测量 validate_and_process_pipeline 在大规模流程上的耗时：
+#
+#     linear  单流程多节点，规模为服务节点数
+#     blocks  串联的并行网关与分支网关块，规模为节点数（每个块包含 4 个网关及 4 个服务节点）
+#     chains  串联的分支网关块，每个块的 CHAIN_BRANCHES 个分支各经过一个服务节点后汇入同一条服务节点链再汇聚，规模为节点数
+#
+# 每个规模均关闭编译计划缓存后校验，输出构造与校验两个阶段的耗时（秒）以及校验阶段的节点速率
+#
+#     PYTHONPATH=. python benchmark/scripts/validator_scaling.py linear 1000 10000 50000
+#     PYTHONPATH=. python benchmark/scripts/validator_scaling.py blocks 1000 10000 50000
+#     PYTHONPATH=. python benchmark/scripts/validator_scaling.py chains 1000 10000 50000
+
+import argparse
+
+from common import linear_pipeline, timer
+
+BLOCK_NODES = 8
+CHAIN_BRANCHES = 16
+CHAIN_LENGTH = 64
+
+
+def blocks_pipeline(nodes: int) -> dict:
+    from bamboo_engine.builder import EmptyStartEvent, ServiceActivity, EmptyEndEvent, ParallelGateway
+    from bamboo_engine.builder import ConvergeGateway, ExclusiveGateway, build_tree
+
+    start = EmptyStartEvent()
+    tail = start
+    for _ in range(max(nodes // BLOCK_NODES, 1)):
+        pg = tail.extend(ParallelGateway())
+        tail = pg.connect(ServiceActivity(), ServiceActivity()).to(pg).converge(ConvergeGateway())
+        eg = tail.extend(ExclusiveGateway(conditions={0: "1 == 1", 1: "1 == 0"}))
+        tail = eg.connect(ServiceActivity(), ServiceActivity()).to(eg).converge(ConvergeGateway())
+    tail.extend(EmptyEndEvent())
+
+    return build_tree(start)
+
+
+def chains_pipeline(nodes: int) -> dict:
+    from bamboo_engine.builder import EmptyStartEvent, ServiceActivity, EmptyEndEvent
+    from bamboo_engine.builder import ConvergeGateway, ExclusiveGateway, build_tree
+
+    start = EmptyStartEvent()
+    tail = start
+    for _ in range(max(nodes // (CHAIN_BRANCHES + CHAIN_LENGTH + 2), 1)):
+        eg = tail.extend(ExclusiveGateway(conditions={i: "1 == 1" for i in range(CHAIN_BRANCHES)}))
+        branches = [ServiceActivity() for _ in range(CHAIN_BRANCHES)]
+        eg.connect(*branches)
+        chain = ServiceActivity()
+        for branch in branches:
+            branch.extend(chain)
+        for _ in range(CHAIN_LENGTH - 1):
+            chain = chain.extend(ServiceActivity())
+        tail = chain.extend(ConvergeGateway())
+    tail.extend(EmptyEndEvent())
+
+    return build_tree(start)
+
+
+SCENARIOS = {
+    "linear": linear_pipeline,
+    "blocks": blocks_pipeline,
+    "chains": chains_pipeline,
+}
+
+
+def run(scenario: str, size: int):
+    from bamboo_engine.config import Settings
+    from bamboo_engine.validator import plan, validate_and_process_pipeline
+
+    Settings.PIPELINE_PLAN_CACHE_SIZE = 0
+    plan.clear_compiled_plans()
+
+    with timer() as build_cost:
+        pipeline = SCENARIOS[scenario](size)
+
+    with timer() as validate_cost:
+        validate_and_process_pipeline(pipeline, False)
+
+    nodes = len(pipeline["activities"]) + len(pipeline["gateways"]) + 2
+    print(
+        "{},{},{},{:.3f},{:.3f},{:.0f}".format(
+            scenario, size, nodes, build_cost[0], validate_cost[0], nodes / validate_cost[0]
+        )
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("scenario", choices=list(SCENARIOS))
+    parser.add_argument("sizes", nargs="*", type=int)
+    args = parser.parse_args()
+
+    print("scenario,size,nodes,build,validate,nodes_per_second")
+    for size in args.sizes or [1000, 10000, 50000]:
+        try:
+            run(args.scenario, size)
+        except Exception as e:
+            print("{},{},error,{!r}".format(args.scenario, size, e))
+
+
+if __name__ == "__main__":
+    main()
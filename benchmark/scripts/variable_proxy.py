@@ -0,0 +1,107 @@
+# -*- coding: utf-8 -*-
+"""
+Tencent is pleased to support the open source community by making 蓝鲸智云PaaS平台社区版 (BlueKing PaaS Community
+Edition) available.
+Copyright (C) 2017-2021 THL A29 Limited, a Tencent company. All rights reserved.
+Licensed under the MIT License (the "License"); you may not use this file except in compliance with the License.
+You may obtain a copy of the License at
+http://opensource.org/licenses/MIT
+Unless required by applicable law or agreed to in writing, software distributed under the License is distributed on
+an "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the License for the
+specific language governing permissions and limitations under the License.
+"""
+
+# 计算型变量代理 micro-benchmark：对比每个实例都反射变量类的旧代理与按变量类缓存的代理在 hydrate 时的耗时及内存分配
+#
+#     DJANGO_SETTINGS_MODULE=your_project.settings python benchmark/scripts/variable_proxy.py 10 50 200
+
+import inspect
+import sys
+import time
+import tracemalloc
+
+from common import setup_django
+
+
+class LegacyVariableProxy:
+    def __init__(self, original_value, var_cls, pipeline_data):
+        self.get_value = getattr(var_cls, "get_value")
+        self.original_value = original_value
+        self.pipeline_data = pipeline_data
+        for name, value in inspect.getmembers(var_cls):
+            if not name.startswith("__") and not hasattr(self, name) and inspect.isfunction(value):
+                setattr(self, name, value)
+
+    def get(self):
+        self.value = self.original_value.get()
+        return self.get_value(self)
+
+
+def build_context(variables, proxy_cls):
+    from mock import MagicMock
+
+    from bamboo_engine.context import Context
+    from bamboo_engine.eri import ContextValue, ContextValueType, Variable
+    from pipeline.core.data.var import LazyVariable
+
+    class BenchmarkVariable(LazyVariable):
+        code = "benchmark_variable"
+        name = "benchmark_variable"
+
+        def get_value(self):
+            return self.format(self.value)
+
+        def format(value):
+            return "v:%s" % value
+
+    class Wrapper(Variable):
+        def __init__(self, original_value, var_cls, additional_data):
+            self.var = proxy_cls(original_value=original_value, var_cls=var_cls, pipeline_data=additional_data)
+
+        def get(self):
+            return self.var.get()
+
+    runtime = MagicMock()
+    runtime.get_compute_variable = lambda code, key, value, additional_data: Wrapper(
+        value, BenchmarkVariable, additional_data
+    )
+    values = [ContextValue("${p}", type=ContextValueType.PLAIN, value="1")]
+    values.extend(
+        ContextValue("${v_%s}" % i, type=ContextValueType.COMPUTE, value="${p}", code="benchmark_variable")
+        for i in range(variables)
+    )
+    return lambda: Context(runtime, values, {"id": 1}).hydrate()
+
+
+def measure(hydrate, number=200):
+    hydrate()
+    start = time.perf_counter()
+    for _ in range(number):
+        hydrate()
+    cost = (time.perf_counter() - start) / number
+
+    tracemalloc.start()
+    hydrate()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return cost, peak
+
+
+def main():
+    setup_django()
+
+    from pipeline.eri.imp.variable import VariableProxy
+
+    print("variables,legacy(ms),legacy_peak(KB),cached(ms),cached_peak(KB)")
+    for variables in [int(n) for n in sys.argv[1:]] or [10, 50, 200]:
+        legacy_cost, legacy_peak = measure(build_context(variables, LegacyVariableProxy))
+        cached_cost, cached_peak = measure(build_context(variables, VariableProxy))
+        print(
+            "{},{:.3f},{:.1f},{:.3f},{:.1f}".format(
+                variables, legacy_cost * 1e3, legacy_peak / 1024, cached_cost * 1e3, cached_peak / 1024
+            )
+        )
+
+
+if __name__ == "__main__":
+    main()
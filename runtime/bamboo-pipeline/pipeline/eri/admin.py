@@ -91,3 +91,43 @@ class ExecutionHistoryAdmin(admin.ModelAdmin):
 class LogEntryAdmin(admin.ModelAdmin):
     list_display = ["id", "node_id", "version", "level_name", "message", "logged_at"]
     search_fields = ["node_id__exact"]
+
+
+@admin.register(models.LogChunk)
+class LogChunkAdmin(admin.ModelAdmin):
+    list_display = ["id", "node_id", "version", "line_start", "line_count", "logged_at"]
+    search_fields = ["node_id__exact"]
+
+
+@admin.register(models.RetentionCheckpoint)
+class RetentionCheckpointAdmin(admin.ModelAdmin):
+    list_display = [
+        "id",
+        "name",
+        "scan_cursor",
+        "pending_cursor",
+        "root_id",
+        "table",
+        "key_offset",
+        "last_pk",
+        "updated_time",
+    ]
+    search_fields = ["name__exact"]
+
+
+@admin.register(models.RetentionPendingRoot)
+class RetentionPendingRootAdmin(admin.ModelAdmin):
+    list_display = ["id", "name", "root_id"]
+    search_fields = ["root_id__exact"]
+
+
+@admin.register(models.PipelineArchive)
+class PipelineArchiveAdmin(admin.ModelAdmin):
+    list_display = ["id", "root_id", "format_version", "location", "size", "finished_time", "archived_time"]
+    search_fields = ["root_id__exact"]
+
+
+@admin.register(models.Payload)
+class PayloadAdmin(admin.ModelAdmin):
+    list_display = ["id", "node_id", "digest", "size", "created_time"]
+    search_fields = ["node_id__exact", "digest__exact"]
@@ -11,6 +11,8 @@ an "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express o
 specific language governing permissions and limitations under the License.
 """
 
+import atexit
+
 from django.apps import AppConfig
 
 from bamboo_engine.handlers import register
@@ -21,6 +23,24 @@ class ERIConfig(AppConfig):
     verbose_name = "PipelineEngineRuntimeInterface"
 
     def ready(self):
-        from .celery.tasks import execute, schedule, timeout_check  # noqa
+        from celery.signals import task_postrun
+
+        from .celery.tasks import (  # noqa
+            add_history,
+            archive_pipelines,
+            clean_expired_pipelines,
+            execute,
+            schedule,
+            timeout_check,
+        )
+        from .archive import mark_pipeline_finished
+        from .log import flush_log_buffer
+        from .signals import post_set_state
 
         register()
+        # 任务结束时写入缓冲区中的节点日志
+        task_postrun.connect(flush_log_buffer, weak=False, dispatch_uid="pipeline_eri_flush_log_buffer")
+        # 在 celery 任务之外缓存的日志在进程退出时写入
+        atexit.register(flush_log_buffer)
+        # 根流程结束时记录等待归档的流程
+        post_set_state.connect(mark_pipeline_finished, weak=False, dispatch_uid="pipeline_eri_mark_pipeline_finished")
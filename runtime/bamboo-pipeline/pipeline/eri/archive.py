@@ -0,0 +1,411 @@
+# -*- coding: utf-8 -*-
+"""
+Tencent is pleased to support the open source community by making 蓝鲸智云PaaS平台社区版 (BlueKing PaaS Community
+Edition) available.
+Copyright (C) 2017-2021 THL A29 Limited, a Tencent company. All rights reserved.
+Licensed under the MIT License (the "License"); you may not use this file except in compliance with the License.
+You may obtain a copy of the License at
+http://opensource.org/licenses/MIT
+Unless required by applicable law or agreed to in writing, software distributed under the License is distributed on
+an "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the License for the
+specific language governing permissions and limitations under the License.
+"""
+
+import json
+import logging
+import os
+import zlib
+from datetime import timedelta
+from typing import Dict, List, Optional
+
+from django.conf import settings
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import models, transaction
+from django.db.models import Subquery
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+
+from bamboo_engine import states
+from bamboo_engine.utils.collections import LRUCache
+
+from pipeline.eri.models import (
+    CallbackData,
+    ContextOutputs,
+    ContextValue,
+    Data,
+    ExecutionData,
+    ExecutionHistory,
+    Node,
+    Payload,
+    PipelineArchive,
+    Process,
+    Schedule,
+    State,
+)
+from pipeline.eri.payload import resolve_payload
+
+logger = logging.getLogger("root")
+
+ARCHIVE_FORMAT = "bamboo-eri-archive"
+ARCHIVE_FORMAT_VERSION = 1
+# PipelineArchive.format_version 为该值时表示流程已结束，等待归档
+ARCHIVE_PENDING = 0
+
+ARCHIVABLE_STATES = frozenset([states.FINISHED, states.REVOKED])
+
+# 归档的数据表及其与流程关联的字段，True 表示该字段的值为根流程 ID，否则为流程中的节点 ID
+ARCHIVE_TABLES = [
+    (State, "root_id", True),
+    (Node, "root_pipeline_id", True),
+    (Process, "root_pipeline_id", True),
+    (Data, "node_id", False),
+    (ExecutionData, "node_id", False),
+    (ExecutionHistory, "node_id", False),
+    (CallbackData, "node_id", False),
+    (Schedule, "node_id", False),
+    (ContextValue, "pipeline_id", False),
+    (ContextOutputs, "pipeline_id", False),
+]
+
+# 归档后仍然保留的数据表，State 是节点到根流程的索引，引擎接口与数据清理也依赖其中的记录
+HOT_TABLES = frozenset([State])
+
+# 只删除不归档的数据表，其中的数据在归档时已经还原到引用它们的记录中
+DROP_TABLES = [(Payload, "node_id", False)]
+
+# 可能保存了 Payload 引用的字段
+PAYLOAD_FIELDS = {
+    ExecutionData: ("inputs", "outputs"),
+    ExecutionHistory: ("inputs", "outputs"),
+    CallbackData: ("data",),
+}
+
+KEY_CHUNK_SIZE = 500
+
+ARCHIVE_CACHE = LRUCache(32)
+
+
+def _archive_enabled() -> bool:
+    return getattr(settings, "BAMBOO_DJANGO_ERI_ARCHIVE", False)
+
+
+def _chunks(keys: List[str]):
+    for i in range(0, len(keys), KEY_CHUNK_SIZE):
+        yield keys[i : i + KEY_CHUNK_SIZE]
+
+
+class ArchivedPipeline:
+    """
+    解码后的流程归档，其中每个数据表的记录都被还原为未保存的模型实例
+    """
+
+    def __init__(self, root_id: str, archived_at: Optional[str], tables: Dict[str, List[models.Model]]):
+        self.root_id = root_id
+        self.archived_at = archived_at
+        self.tables = tables
+        self._indexes = {}
+
+    def rows(self, model) -> List[models.Model]:
+        return self.tables.get(model._meta.model_name, [])
+
+    def rows_of(self, model, key: str, field: str = "node_id") -> List[models.Model]:
+        """
+        获取某个数据表中关联字段为 key 的记录
+
+        :param model: 数据表模型
+        :type model: Model
+        :param key: 关联字段的值
+        :type key: str
+        :param field: 关联字段名
+        :type field: str
+        :return: 记录列表
+        :rtype: List[Model]
+        """
+        index_key = (model._meta.model_name, field)
+        index = self._indexes.get(index_key)
+        if index is None:
+            index = {}
+            for row in self.rows(model):
+                index.setdefault(getattr(row, field), []).append(row)
+            self._indexes[index_key] = index
+        return index.get(key, [])
+
+
+def _dump_table(model, rows) -> dict:
+    fields = [f.attname for f in model._meta.concrete_fields]
+    payload_indexes = [fields.index(f) for f in PAYLOAD_FIELDS.get(model, ())]
+    dumped = []
+    for row in rows.values_list(*fields):
+        row = list(row)
+        for i in payload_indexes:
+            row[i] = resolve_payload(row[i])
+        dumped.append(row)
+    return {"fields": fields, "rows": dumped}
+
+
+def _load_table(model, table: dict) -> List[models.Model]:
+    datetime_fields = {f.attname for f in model._meta.concrete_fields if isinstance(f, models.DateTimeField)}
+    instances = []
+    for row in table["rows"]:
+        values = dict(zip(table["fields"], row))
+        for field in datetime_fields.intersection(values):
+            if values[field]:
+                values[field] = parse_datetime(values[field])
+        instances.append(model(**values))
+    return instances
+
+
+def encode_archive(root_id: str, tables: Dict[str, dict]) -> bytes:
+    """
+    将流程数据编码为自描述的压缩归档
+
+    :param root_id: 根流程 ID
+    :type root_id: str
+    :param tables: 数据表名到 {"fields": 字段列表, "rows": 记录列表} 的映射
+    :type tables: Dict[str, dict]
+    :return: 压缩后的归档内容
+    :rtype: bytes
+    """
+    payload = {
+        "format": ARCHIVE_FORMAT,
+        "version": ARCHIVE_FORMAT_VERSION,
+        "root_id": root_id,
+        "archived_at": timezone.now(),
+        "tables": tables,
+    }
+    return zlib.compress(json.dumps(payload, cls=DjangoJSONEncoder, separators=(",", ":")).encode("utf-8"))
+
+
+def decode_archive(blob: bytes) -> ArchivedPipeline:
+    """
+    解码 encode_archive 生成的归档
+
+    :param blob: 压缩后的归档内容
+    :type blob: bytes
+    :return: 解码后的流程归档
+    :rtype: ArchivedPipeline
+    """
+    payload = json.loads(zlib.decompress(bytes(blob)).decode("utf-8"))
+    if payload.get("format") != ARCHIVE_FORMAT or payload.get("version") != ARCHIVE_FORMAT_VERSION:
+        raise ValueError("unsupport archive format: {} v{}".format(payload.get("format"), payload.get("version")))
+
+    table_models = {model._meta.model_name: model for model, _, _ in ARCHIVE_TABLES}
+    tables = {
+        name: _load_table(table_models[name], table)
+        for name, table in payload["tables"].items()
+        if name in table_models
+    }
+    return ArchivedPipeline(root_id=payload["root_id"], archived_at=payload["archived_at"], tables=tables)
+
+
+def _archive_path(directory: str, root_id: str) -> str:
+    return os.path.join(directory, root_id[-2:], "{}.eri.z".format(root_id))
+
+
+def _write_archive_file(directory: str, root_id: str, blob: bytes) -> str:
+    path = _archive_path(directory, root_id)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp_path = "{}.tmp".format(path)
+    with open(tmp_path, "wb") as fp:
+        fp.write(blob)
+    os.replace(tmp_path, path)
+    return path
+
+
+def _pipeline_node_ids(root_id: str) -> List[str]:
+    node_ids = set(State.objects.filter(root_id=root_id).values_list("node_id", flat=True))
+    node_ids.update(Node.objects.filter(root_pipeline_id=root_id).values_list("node_id", flat=True))
+    node_ids.add(root_id)
+    return sorted(node_ids)
+
+
+def mark_pipeline_finished(sender, node_id: str, to_state: str, root_id: str, **kwargs):
+    """
+    post_set_state 信号处理函数，根流程结束时记录一条等待归档的 PipelineArchive
+    """
+    if not _archive_enabled() or node_id != root_id or to_state not in ARCHIVABLE_STATES:
+        return
+
+    try:
+        now = timezone.now()
+        _, created = PipelineArchive.objects.get_or_create(root_id=root_id, defaults={"finished_time": now})
+        if not created:
+            PipelineArchive.objects.filter(root_id=root_id, format_version=ARCHIVE_PENDING).update(finished_time=now)
+    except Exception:
+        # 归档只是后台优化，不能影响流程状态的流转
+        logger.exception("[mark_pipeline_finished] mark pipeline(%s) finished failed", root_id)
+
+
+def archive_pipeline(root_id: str) -> Optional[PipelineArchive]:
+    """
+    将某个已结束流程的数据写入归档并删除 State 以外的热数据，
+    配置了 BAMBOO_DJANGO_ERI_ARCHIVE_DIR 时归档内容写入该目录，否则直接存储在 PipelineArchive 中
+
+    :param root_id: 根流程 ID
+    :type root_id: str
+    :return: 归档记录，流程未结束或已经归档时返回 None
+    :rtype: Optional[PipelineArchive]
+    """
+    root_state = State.objects.filter(node_id=root_id).values_list("name", flat=True).first()
+    if root_state not in ARCHIVABLE_STATES:
+        # 流程在结束后又被重新执行，等到再次结束时重新记录
+        PipelineArchive.objects.filter(root_id=root_id, format_version=ARCHIVE_PENDING).delete()
+        return None
+
+    directory = getattr(settings, "BAMBOO_DJANGO_ERI_ARCHIVE_DIR", "")
+    location = ""
+    with transaction.atomic():
+        archive, _ = PipelineArchive.objects.select_for_update().get_or_create(
+            root_id=root_id, defaults={"finished_time": timezone.now()}
+        )
+        if archive.format_version != ARCHIVE_PENDING:
+            return None
+
+        node_ids = _pipeline_node_ids(root_id)
+        tables = {}
+        for model, field, by_root in ARCHIVE_TABLES:
+            if by_root:
+                table = _dump_table(model, model.objects.filter(**{field: root_id}).order_by("id"))
+            else:
+                table = {"fields": None, "rows": []}
+                for chunk in _chunks(node_ids):
+                    rows = model.objects.filter(**{"{}__in".format(field): chunk}).order_by("id")
+                    dumped = _dump_table(model, rows)
+                    table["fields"] = dumped["fields"]
+                    table["rows"].extend(dumped["rows"])
+            tables[model._meta.model_name] = table
+
+        blob = encode_archive(root_id, tables)
+        if directory:
+            location = _write_archive_file(directory, root_id, blob)
+
+        try:
+            archive.format_version = ARCHIVE_FORMAT_VERSION
+            archive.location = location
+            archive.data = b"" if location else blob
+            archive.size = len(blob)
+            archive.archived_time = timezone.now()
+            archive.save()
+
+            for model, field, by_root in ARCHIVE_TABLES + DROP_TABLES:
+                if model in HOT_TABLES:
+                    continue
+                if by_root:
+                    model.objects.filter(**{field: root_id}).delete()
+                else:
+                    for chunk in _chunks(node_ids):
+                        model.objects.filter(**{"{}__in".format(field): chunk}).delete()
+        except Exception:
+            if location:
+                os.remove(location)
+            raise
+
+    ARCHIVE_CACHE.pop(root_id, None)
+    return archive
+
+
+def archive_finished_pipelines(after_hours: Optional[float] = None, limit: Optional[int] = None) -> int:
+    """
+    归档结束时间超过 BAMBOO_DJANGO_ERI_ARCHIVE_AFTER_HOURS 小时的流程，每次最多归档
+    BAMBOO_DJANGO_ERI_ARCHIVE_PIPELINES_PER_RUN 个
+
+    :return: 本次归档的流程数
+    :rtype: int
+    """
+    if after_hours is None:
+        after_hours = float(getattr(settings, "BAMBOO_DJANGO_ERI_ARCHIVE_AFTER_HOURS", 24))
+    limit = limit or int(getattr(settings, "BAMBOO_DJANGO_ERI_ARCHIVE_PIPELINES_PER_RUN", 100))
+    cutoff = timezone.now() - timedelta(hours=after_hours)
+
+    root_ids = list(
+        PipelineArchive.objects.filter(format_version=ARCHIVE_PENDING, finished_time__lt=cutoff)
+        .order_by("finished_time")
+        .values_list("root_id", flat=True)[:limit]
+    )
+    archived = 0
+    for root_id in root_ids:
+        try:
+            if archive_pipeline(root_id):
+                archived += 1
+        except Exception:
+            logger.exception("[archive_finished_pipelines] archive pipeline(%s) failed", root_id)
+
+    return archived
+
+
+def load_archive(root_id: str) -> Optional[ArchivedPipeline]:
+    """
+    读取并解码某个流程的归档，最近读取的归档会缓存在当前进程中
+
+    :param root_id: 根流程 ID
+    :type root_id: str
+    :return: 流程归档，流程未归档时返回 None
+    :rtype: Optional[ArchivedPipeline]
+    """
+    archived = ARCHIVE_CACHE.get(root_id)
+    if archived is not None:
+        return archived
+
+    archive = (
+        PipelineArchive.objects.filter(root_id=root_id)
+        .exclude(format_version=ARCHIVE_PENDING)
+        .only("location", "data")
+        .first()
+    )
+    if archive is None:
+        return None
+
+    if archive.location:
+        with open(archive.location, "rb") as fp:
+            blob = fp.read()
+    else:
+        blob = archive.data
+    archived = decode_archive(blob)
+
+    ARCHIVE_CACHE.max_size = int(getattr(settings, "BAMBOO_DJANGO_ERI_ARCHIVE_CACHE_SIZE", 32))
+    ARCHIVE_CACHE.set(root_id, archived)
+    return archived
+
+
+def load_node_archive(node_id: str) -> Optional[ArchivedPipeline]:
+    """
+    读取某个节点所属流程的归档
+
+    :param node_id: 节点 ID
+    :type node_id: str
+    :return: 流程归档，节点不存在或未归档时返回 None
+    :rtype: Optional[ArchivedPipeline]
+    """
+    root_id = State.objects.filter(node_id=node_id).values_list("root_id", flat=True).first()
+    if not root_id:
+        return None
+    return load_archive(root_id)
+
+
+def is_node_archived(node_id: str) -> bool:
+    """
+    判断某个节点所属的流程是否已经归档
+
+    :param node_id: 节点 ID
+    :type node_id: str
+    :return: 是否已归档
+    :rtype: bool
+    """
+    root_id = State.objects.filter(node_id=node_id).values("root_id")[:1]
+    return PipelineArchive.objects.filter(root_id=Subquery(root_id)).exclude(format_version=ARCHIVE_PENDING).exists()
+
+
+def delete_archive(root_id: str):
+    """
+    删除某个流程的归档文件并清除缓存，归档记录由调用方删除
+
+    :param root_id: 根流程 ID
+    :type root_id: str
+    """
+    locations = PipelineArchive.objects.filter(root_id=root_id).exclude(location="").values_list("location", flat=True)
+    for location in locations:
+        try:
+            os.remove(location)
+        except FileNotFoundError:
+            pass
+    ARCHIVE_CACHE.pop(root_id, None)
@@ -39,6 +39,11 @@ class QueueResolver:
                 "queue": "er_schedule%s" % suffix,
                 "routing_key": "er_schedule%s" % suffix,
             },
+            # 异步写入执行历史的任务复用调度队列的 worker
+            "pipeline.eri.celery.tasks.add_history": {
+                "queue": "er_schedule%s" % suffix,
+                "routing_key": "er_schedule%s" % suffix,
+            },
             "pipeline.eri.celery.tasks.timeout_check": {
                 "queue": "er_timeout%s" % suffix,
                 "routing_key": "er_timeout%s" % suffix,
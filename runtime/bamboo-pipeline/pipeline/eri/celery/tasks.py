@@ -13,10 +13,16 @@ specific language governing permissions and limitations under the License.
 from typing import Optional
 
 from celery import task
+from celery.decorators import periodic_task
+from celery.schedules import crontab
+from django.conf import settings
+from django.utils.dateparse import parse_datetime
 
 from bamboo_engine import states
 from bamboo_engine.engine import Engine
 
+from pipeline.eri.archive import archive_finished_pipelines
+from pipeline.eri.retention import RetentionSweeper
 from pipeline.eri.runtime import BambooDjangoRuntime
 
 
@@ -40,3 +46,51 @@ def timeout_check(self, process_id: int, node_id: str, version: str):
     state = runtime.get_state(node_id=node_id)
     if state.name == states.RUNNING and state.version == version:
         Engine(runtime).forced_fail_activity(node_id=node_id, ex_data="timeout kill")
+
+
+@task(ignore_result=True)
+def add_history(
+    node_id: str,
+    started_time: Optional[str],
+    archived_time: Optional[str],
+    loop: int,
+    skip: bool,
+    retry: int,
+    version: str,
+    inputs: str,
+    inputs_serializer: str,
+    outputs: str,
+    outputs_serializer: str,
+):
+    runtime = BambooDjangoRuntime()
+    runtime._insert_history(
+        node_id=node_id,
+        started_time=parse_datetime(started_time) if started_time else None,
+        archived_time=parse_datetime(archived_time) if archived_time else None,
+        loop=loop,
+        skip=skip,
+        retry=retry,
+        version=version,
+        inputs=runtime._deserialize(inputs, inputs_serializer),
+        outputs=runtime._deserialize(outputs, outputs_serializer),
+    )
+
+
+@periodic_task(
+    run_every=crontab(**getattr(settings, "BAMBOO_DJANGO_ERI_RETENTION_CRON", {"minute": "*/30"})), ignore_result=True
+)
+def clean_expired_pipelines():
+    if not getattr(settings, "BAMBOO_DJANGO_ERI_RETENTION", False):
+        return
+
+    RetentionSweeper().run()
+
+
+@periodic_task(
+    run_every=crontab(**getattr(settings, "BAMBOO_DJANGO_ERI_ARCHIVE_CRON", {"minute": "*/10"})), ignore_result=True
+)
+def archive_pipelines():
+    if not getattr(settings, "BAMBOO_DJANGO_ERI_ARCHIVE", False):
+        return
+
+    archive_finished_pipelines()
@@ -0,0 +1,117 @@
+# -*- coding: utf-8 -*-
+"""
+Tencent is pleased to support the open source community by making 蓝鲸智云PaaS平台社区版 (BlueKing PaaS Community
+Edition) available.
+Copyright (C) 2017-2021 THL A29 Limited, a Tencent company. All rights reserved.
+Licensed under the MIT License (the "License"); you may not use this file except in compliance with the License.
+You may obtain a copy of the License at
+http://opensource.org/licenses/MIT
+Unless required by applicable law or agreed to in writing, software distributed under the License is distributed on
+an "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the License for the
+specific language governing permissions and limitations under the License.
+"""
+
+from typing import List, Optional
+
+from bamboo_engine.eri import ExecutionData, ExecutionHistory, State
+
+from pipeline.eri.archive import is_node_archived, load_archive, load_node_archive
+from pipeline.eri.models import ExecutionData as DBExecutionData
+from pipeline.eri.models import ExecutionHistory as DBExecutionHistory
+from pipeline.eri.models import State as DBState
+from pipeline.eri.imp.serializer import SerializerMixin
+
+
+class ArchiveMixin(SerializerMixin):
+    """
+    归档数据读取接口，历史记录的还原依赖 ExecutionHistoryMixin
+    """
+
+    def is_node_archived(self, node_id: str) -> bool:
+        """
+        判断某个节点所属的流程是否已经归档
+
+        :param node_id: 节点 ID
+        :type node_id: str
+        :return: 是否已归档
+        :rtype: bool
+        """
+        return is_node_archived(node_id)
+
+    def get_archived_state_by_root(self, root_id: str) -> List[State]:
+        """
+        根据根节点 ID 获取已归档流程中所有节点的状态
+
+        :param root_id: 根节点 ID
+        :type root_id: str
+        :return: 节点状态列表，流程未归档时返回空列表
+        :rtype: List[State]
+        """
+        archived = load_archive(root_id)
+        if archived is None:
+            return []
+
+        return [
+            State(
+                node_id=state.node_id,
+                root_id=state.root_id,
+                parent_id=state.parent_id,
+                name=state.name,
+                version=state.version,
+                loop=state.loop,
+                inner_loop=state.inner_loop,
+                retry=state.retry,
+                skip=state.skip,
+                error_ignored=state.error_ignored,
+                created_time=state.created_time,
+                started_time=state.started_time,
+                archived_time=state.archived_time,
+            )
+            for state in archived.rows(DBState)
+        ]
+
+    def get_archived_execution_data(self, node_id: str) -> Optional[ExecutionData]:
+        """
+        获取已归档节点的执行数据
+
+        :param node_id: 节点 ID
+        :type node_id: str
+        :return: 执行数据实例，节点未归档时返回 None
+        :rtype: Optional[ExecutionData]
+        """
+        archived = load_node_archive(node_id)
+        if archived is None:
+            return None
+
+        data_models = archived.rows_of(DBExecutionData, node_id)
+        if not data_models:
+            return None
+
+        data_model = data_models[0]
+        return ExecutionData(
+            inputs=self._deserialize(data_model.inputs, data_model.inputs_serializer),
+            outputs=self._deserialize(data_model.outputs, data_model.outputs_serializer),
+        )
+
+    def get_archived_histories(self, node_id: str, loop: int = -1) -> List[ExecutionHistory]:
+        """
+        返回已归档节点的历史记录
+
+        :param node_id: 节点 ID
+        :type node_id: str
+        :param loop: 重入次数, -1 表示不过滤重入次数
+        :type loop: int, optional
+        :return: 历史记录列表，节点未归档时返回空列表
+        :rtype: List[ExecutionHistory]
+        """
+        archived = load_node_archive(node_id)
+        if archived is None:
+            return []
+
+        models = archived.rows_of(DBExecutionHistory, node_id)
+        by_id = {model.id: model for model in models}
+        # 增量记录依赖的基准记录都在同一个节点的归档中
+        return self._histories_from_models(
+            [model for model in models if loop == -1 or model.loop == loop],
+            lambda ids: [by_id[i] for i in ids if i in by_id],
+        )
@@ -12,9 +12,11 @@ specific language governing permissions and limitations under the License.
 """
 
 import json
-from typing import Dict, List, Set
+from contextlib import contextmanager
+from typing import Dict, List, Optional, Set
 
-from django.db import transaction
+from django.conf import settings
+from django.db import connections, router, transaction
 
 from bamboo_engine import metrics
 from bamboo_engine.eri import ContextValue, ContextValueType
@@ -23,8 +25,67 @@ from pipeline.eri.models import ContextValue as DBContextValue
 from pipeline.eri.models import ContextOutputs
 from pipeline.eri.imp.serializer import SerializerMixin
 
+# 单条 upsert 语句最多写入的变量数
+CONTEXT_UPSERT_BATCH_SIZE = 500
+CONTEXT_UPSERT_COLUMNS = ["pipeline_id", "key", "type", "serializer", "value", "code", "references"]
+CONTEXT_UPSERT_UPDATE_COLUMNS = ["type", "serializer", "value", "code", "references"]
+
 
 class ContextMixin(SerializerMixin):
+    def _get_context_snapshot(self, pipeline_id: str) -> Optional[dict]:
+        snapshots = getattr(self, "_context_snapshots", None)
+        if snapshots is None:
+            return None
+        return snapshots.setdefault(pipeline_id, {})
+
+    def _invalidate_context_snapshot(self, pipeline_id: str):
+        snapshots = getattr(self, "_context_snapshots", None)
+        if snapshots is not None:
+            snapshots.pop(pipeline_id, None)
+
+    def _get_context_models(self, pipeline_id: str, keys: set) -> Dict[str, DBContextValue]:
+        qs = DBContextValue.objects.filter(pipeline_id=pipeline_id, key__in=keys).only(
+            "key", "type", "serializer", "value", "code", "references"
+        )
+        return {cv_model.key: cv_model for cv_model in qs}
+
+    def _fetch_context_models(self, pipeline_id: str, keys: set) -> Dict[str, DBContextValue]:
+        snapshot = self._get_context_snapshot(pipeline_id)
+        if snapshot is None:
+            return self._get_context_models(pipeline_id, keys)
+
+        missing_keys = set(keys).difference(snapshot.keys())
+        if missing_keys:
+            fetched = self._get_context_models(pipeline_id, missing_keys)
+            # 不存在的键同样需要记录，避免重复查询
+            for key in missing_keys:
+                snapshot[key] = fetched.get(key)
+
+        return {key: snapshot[key] for key in keys if snapshot[key] is not None}
+
+    @contextmanager
+    def context_snapshot(self, process_id: int):
+        """
+        在推进循环中开启上下文快照，通过 BAMBOO_DJANGO_ERI_CONTEXT_SNAPSHOT 配置开启
+
+        :param process_id: 进程 ID
+        :type process_id: int
+        """
+        if not getattr(settings, "BAMBOO_DJANGO_ERI_CONTEXT_SNAPSHOT", False):
+            yield
+            return
+
+        # 嵌套开启时由最外层负责清理
+        if getattr(self, "_context_snapshots", None) is not None:
+            yield
+            return
+
+        self._context_snapshots = {}
+        try:
+            yield
+        finally:
+            self._context_snapshots = None
+
     @metrics.setup_histogram(metrics.ENGINE_RUNTIME_CONTEXT_VALUE_READ_TIME)
     def get_context_values(self, pipeline_id: str, keys: set) -> List[ContextValue]:
         """
@@ -71,6 +132,39 @@ class ContextMixin(SerializerMixin):
 
         return set(references)
 
+    @metrics.setup_histogram(metrics.ENGINE_RUNTIME_CONTEXT_VALUE_READ_TIME)
+    def resolve_context(self, pipeline_id: str, keys: set) -> List[ContextValue]:
+        """
+        获取某个流程上下文中 keys 所指定的变量以及这些变量直接和间接引用的其他所有变量的值，
+        变量的 references 中已经记录了所有直接和间接引用，只有引用了 keys 之外的变量时才需要再查询一次
+
+        :param pipeline_id: 流程 ID
+        :type pipeline_id: str
+        :param keys: 变量键
+        :type keys: set
+        :return: 变量值信息
+        :rtype: List[ContextValue]
+        """
+        cv_models = self._fetch_context_models(pipeline_id, keys)
+
+        references = set()
+        for cv_model in cv_models.values():
+            references.update(json.loads(cv_model.references))
+
+        missing_keys = references.difference(keys)
+        if missing_keys:
+            cv_models.update(self._fetch_context_models(pipeline_id, missing_keys))
+
+        return [
+            ContextValue(
+                key=cv_model.key,
+                type=ContextValueType(cv_model.type),
+                value=self._deserialize(cv_model.value, cv_model.serializer),
+                code=cv_model.code or None,
+            )
+            for cv_model in cv_models.values()
+        ]
+
     @metrics.setup_histogram(metrics.ENGINE_RUNTIME_CONTEXT_VALUE_UPSERT_TIME)
     @transaction.atomic
     def upsert_plain_context_values(self, pipeline_id: str, update: Dict[str, ContextValue]):
@@ -82,29 +176,85 @@ class ContextMixin(SerializerMixin):
         :param update: 更新数据
         :type update: Dict[str, ContextValue]
         """
-        exist_keys = DBContextValue.objects.filter(pipeline_id=pipeline_id).values_list("key", flat=True)
-        update_keys = set(update.keys()).intersection(exist_keys)
+        self._invalidate_context_snapshot(pipeline_id)
+
+        if not update:
+            return
 
-        # update
-        for k in update_keys:
-            context_value = update[k]
+        # 序列化在写入前一次性完成
+        rows = []
+        for key, context_value in update.items():
             value, serializer = self._serialize(context_value.value)
+            rows.append((key, serializer, value))
 
-            DBContextValue.objects.filter(pipeline_id=pipeline_id, key=k).update(
-                type=ContextValueType.PLAIN.value, value=value, serializer=serializer, code="", references="[]",
+        connection = connections[router.db_for_write(DBContextValue)]
+        if self._support_bulk_upsert(connection):
+            self._bulk_upsert_context_rows(connection, pipeline_id, rows)
+        else:
+            self._upsert_context_rows(pipeline_id, rows)
+
+    @staticmethod
+    def _support_bulk_upsert(connection) -> bool:
+        if connection.vendor in ("mysql", "postgresql"):
+            return True
+        # SQLite 3.24.0 开始支持 ON CONFLICT DO UPDATE
+        if connection.vendor == "sqlite":
+            return connection.Database.sqlite_version_info >= (3, 24, 0)
+        return False
+
+    def _bulk_upsert_context_rows(self, connection, pipeline_id: str, rows: list):
+        qn = connection.ops.quote_name
+        if connection.vendor == "mysql":
+            on_conflict = "ON DUPLICATE KEY UPDATE {}".format(
+                ", ".join("{0} = VALUES({0})".format(qn(c)) for c in CONTEXT_UPSERT_UPDATE_COLUMNS)
+            )
+        else:
+            on_conflict = "ON CONFLICT ({}, {}) DO UPDATE SET {}".format(
+                qn("pipeline_id"),
+                qn("key"),
+                ", ".join("{0} = EXCLUDED.{0}".format(qn(c)) for c in CONTEXT_UPSERT_UPDATE_COLUMNS),
+            )
+
+        row_placeholder = "({})".format(", ".join(["%s"] * len(CONTEXT_UPSERT_COLUMNS)))
+        batch_size = max(
+            1, min(CONTEXT_UPSERT_BATCH_SIZE, connection.ops.bulk_batch_size(CONTEXT_UPSERT_COLUMNS, rows))
+        )
+
+        with connection.cursor() as cursor:
+            for i in range(0, len(rows), batch_size):
+                batch = rows[i : i + batch_size]
+                sql = "INSERT INTO {} ({}) VALUES {} {}".format(
+                    qn(DBContextValue._meta.db_table),
+                    ", ".join(qn(c) for c in CONTEXT_UPSERT_COLUMNS),
+                    ", ".join([row_placeholder] * len(batch)),
+                    on_conflict,
+                )
+                params = []
+                for key, serializer, value in batch:
+                    params.extend([pipeline_id, key, ContextValueType.PLAIN.value, serializer, value, "", "[]"])
+                cursor.execute(sql, params)
+
+    def _upsert_context_rows(self, pipeline_id: str, rows: list):
+        exist_keys = set(
+            DBContextValue.objects.filter(pipeline_id=pipeline_id, key__in=[row[0] for row in rows]).values_list(
+                "key", flat=True
             )
+        )
 
-        # insert
-        insert_keys = set(update.keys()).difference(exist_keys)
         context_value_models = []
-        for k in insert_keys:
-            context_value = update[k]
-            value, serializer = self._serialize(context_value.value)
+        for key, serializer, value in rows:
+            # update
+            if key in exist_keys:
+                DBContextValue.objects.filter(pipeline_id=pipeline_id, key=key).update(
+                    type=ContextValueType.PLAIN.value, value=value, serializer=serializer, code="", references="[]",
+                )
+                continue
 
+            # insert
             context_value_models.append(
                 DBContextValue(
                     pipeline_id=pipeline_id,
-                    key=context_value.key,
+                    key=key,
                     type=ContextValueType.PLAIN.value,
                     serializer=serializer,
                     value=value,
@@ -113,7 +263,7 @@ class ContextMixin(SerializerMixin):
                 )
             )
 
-        DBContextValue.objects.bulk_create(context_value_models, batch_size=500)
+        DBContextValue.objects.bulk_create(context_value_models, batch_size=CONTEXT_UPSERT_BATCH_SIZE)
 
     @metrics.setup_histogram(metrics.ENGINE_RUNTIME_CONTEXT_VALUE_READ_TIME)
     def get_context(self, pipeline_id: str) -> List[ContextValue]:
@@ -22,6 +22,7 @@ from pipeline.eri.models import Data as DBData
 from pipeline.eri.models import ExecutionData as DBExecutionData
 from pipeline.eri.models import CallbackData as DBCallbackData
 from pipeline.eri.imp.serializer import SerializerMixin
+from pipeline.eri.payload import offload_payload, payload_digest, resolve_payload
 
 
 class DataMixin(SerializerMixin):
@@ -149,6 +150,38 @@ class DataMixin(SerializerMixin):
 
         return self._deserialize(qs[0].outputs, qs[0].outputs_serializer)
 
+    def _write_execution_data(self, node_id: str, **data):
+        """
+        写入节点执行数据的 inputs 和 outputs，序列化后摘要与已写入数据一致的字段不会重复写入，
+        超过阈值的数据会被转存到 Payload 中
+
+        :param node_id: 节点 ID
+        :type node_id: str
+        :param data: 需要写入的字段，key 为 inputs 或 outputs
+        :type data: dict
+        """
+        current = DBExecutionData.objects.filter(node_id=node_id).values("inputs_digest", "outputs_digest").first()
+
+        fields = {}
+        for name, value in data.items():
+            serialized, serializer = self._serialize(value)
+            digest = payload_digest(serialized)
+            if current is not None and current["{}_digest".format(name)] == digest:
+                continue
+            fields[name] = offload_payload(node_id, serialized, digest)
+            fields["{}_serializer".format(name)] = serializer
+            fields["{}_digest".format(name)] = digest
+
+        if current is None:
+            for name in ("inputs", "outputs"):
+                fields.setdefault(name, "{}")
+                fields.setdefault("{}_serializer".format(name), self.JSON_SERIALIZER)
+            DBExecutionData.objects.create(node_id=node_id, **fields)
+        elif fields:
+            DBExecutionData.objects.filter(node_id=node_id).update(**fields)
+        else:
+            metrics.ENGINE_RUNTIME_EXEC_DATA_WRITE_SKIPPED.inc()
+
     @metrics.setup_histogram(metrics.ENGINE_RUNTIME_EXEC_DATA_WRITE_TIME)
     def set_execution_data(self, node_id: str, data: ExecutionData):
         """
@@ -159,23 +192,7 @@ class DataMixin(SerializerMixin):
         :param data: 执行数据实例
         :type data: ExecutionData
         """
-        inputs, inputs_serializer = self._serialize(data.inputs)
-        outputs, outputs_serializer = self._serialize(data.outputs)
-        if DBExecutionData.objects.filter(node_id=node_id).exists():
-            DBExecutionData.objects.filter(node_id=node_id).update(
-                inputs=inputs,
-                inputs_serializer=inputs_serializer,
-                outputs=outputs,
-                outputs_serializer=outputs_serializer,
-            )
-        else:
-            DBExecutionData.objects.create(
-                node_id=node_id,
-                inputs=inputs,
-                inputs_serializer=inputs_serializer,
-                outputs=outputs,
-                outputs_serializer=outputs_serializer,
-            )
+        self._write_execution_data(node_id, inputs=data.inputs, outputs=data.outputs)
 
     @metrics.setup_histogram(metrics.ENGINE_RUNTIME_EXEC_DATA_INPUTS_WRITE_TIME)
     def set_execution_data_inputs(self, node_id: str, inputs: dict):
@@ -187,17 +204,7 @@ class DataMixin(SerializerMixin):
         :param outputs: 输出数据
         :type outputs: dict
         """
-        inputs, inputs_serializer = self._serialize(inputs)
-        if DBExecutionData.objects.filter(node_id=node_id).exists():
-            DBExecutionData.objects.filter(node_id=node_id).update(inputs=inputs, inputs_serializer=inputs_serializer)
-        else:
-            DBExecutionData.objects.create(
-                node_id=node_id,
-                inputs=inputs,
-                inputs_serializer=inputs_serializer,
-                outputs="{}",
-                outputs_serializer=self.JSON_SERIALIZER,
-            )
+        self._write_execution_data(node_id, inputs=inputs)
 
     @metrics.setup_histogram(metrics.ENGINE_RUNTIME_EXEC_DATA_OUTPUTS_WRITE_TIME)
     def set_execution_data_outputs(self, node_id: str, outputs: dict):
@@ -209,19 +216,7 @@ class DataMixin(SerializerMixin):
         :param outputs: 输出数据
         :type outputs: dict
         """
-        outputs, outputs_serializer = self._serialize(outputs)
-        if DBExecutionData.objects.filter(node_id=node_id).exists():
-            DBExecutionData.objects.filter(node_id=node_id).update(
-                outputs=outputs, outputs_serializer=outputs_serializer
-            )
-        else:
-            DBExecutionData.objects.create(
-                node_id=node_id,
-                inputs="{}",
-                inputs_serializer=self.JSON_SERIALIZER,
-                outputs=outputs,
-                outputs_serializer=outputs_serializer,
-            )
+        self._write_execution_data(node_id, outputs=outputs)
 
     def set_callback_data(self, node_id: str, version: str, data: dict) -> int:
         """
@@ -236,7 +231,9 @@ class DataMixin(SerializerMixin):
         :return: 回调数据 ID
         :rtype: int
         """
-        return DBCallbackData.objects.create(node_id=node_id, version=version, data=json.dumps(data)).id
+        return DBCallbackData.objects.create(
+            node_id=node_id, version=version, data=offload_payload(node_id, json.dumps(data))
+        ).id
 
     @metrics.setup_histogram(metrics.ENGINE_RUNTIME_CALLBACK_DATA_READ_TIME)
     def get_callback_data(self, data_id: int) -> CallbackData:
@@ -250,5 +247,8 @@ class DataMixin(SerializerMixin):
         """
         data_model = DBCallbackData.objects.get(id=data_id)
         return CallbackData(
-            id=data_model.id, node_id=data_model.node_id, version=data_model.version, data=json.loads(data_model.data)
+            id=data_model.id,
+            node_id=data_model.node_id,
+            version=data_model.version,
+            data=json.loads(resolve_payload(data_model.data)),
         )
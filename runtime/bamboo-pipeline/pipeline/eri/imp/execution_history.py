@@ -11,17 +11,165 @@ an "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express o
 specific language governing permissions and limitations under the License.
 """
 
-from typing import List
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple
 from datetime import datetime
 
+from celery import current_app
+from django.conf import settings
+from django.db.models import Subquery
+
 from bamboo_engine.eri import ExecutionHistory, ExecutionShortHistory
 
+from pipeline.eri.celery.queues import QueueResolver
 from pipeline.eri.models import ExecutionHistory as DBExecutionHistory
+from pipeline.eri.models import Process, State
 from pipeline.eri.imp.serializer import SerializerMixin
+from pipeline.eri.payload import offload_payload
+
+# 增量记录的序列化器前缀，记录内容为 {"base": 基准历史 ID, "depth": 距离最近一次全量记录的增量数, "set": {}, "unset": []}
+DELTA_SERIALIZER_PREFIX = "delta_"
+
+HISTORY_FIELDS = ("inputs", "outputs")
+
+
+def _same_value(a: Any, b: Any) -> bool:
+    """
+    判断两个值是否相同，除了值相等外还要求类型一致，避免 1、1.0 与 True 这类相等但类型不同的值被视为未变化
+    """
+    if type(a) is not type(b):
+        return False
+    if isinstance(a, dict):
+        return a.keys() == b.keys() and all(_same_value(v, b[k]) for k, v in a.items())
+    if isinstance(a, (list, tuple)):
+        return len(a) == len(b) and all(_same_value(x, y) for x, y in zip(a, b))
+    return a == b
+
+
+def _value_delta(base: Any, value: Any) -> Optional[dict]:
+    """
+    计算 value 相对于 base 的顶层键增量，无法计算或者增量不比全量小时返回 None
+    """
+    if not isinstance(base, dict) or not isinstance(value, dict):
+        return None
+
+    changed = {}
+    for k, v in value.items():
+        try:
+            same = k in base and _same_value(base[k], v)
+        except Exception:
+            same = False
+        if not same:
+            changed[k] = v
+    unset = [k for k in base if k not in value]
+
+    if len(changed) >= len(value) and value:
+        return None
+    return {"set": changed, "unset": unset}
 
 
 class ExecutionHistoryMixin(SerializerMixin):
-    def add_history(
+    def _history_delta_enabled(self) -> bool:
+        return getattr(settings, "BAMBOO_DJANGO_ERI_HISTORY_DELTA", False)
+
+    def _decode_history_field(self, model: DBExecutionHistory, field: str) -> Tuple[bool, Any]:
+        serializer = getattr(model, "{}_serializer".format(field))
+        if serializer.startswith(DELTA_SERIALIZER_PREFIX):
+            return True, self._deserialize(getattr(model, field), serializer[len(DELTA_SERIALIZER_PREFIX) :])
+        return False, self._deserialize(getattr(model, field), serializer)
+
+    def _rebuild_history_values(
+        self, models: List[DBExecutionHistory], load: Callable[[Iterable[int]], List[DBExecutionHistory]]
+    ) -> Dict[Tuple[int, str], Any]:
+        """
+        还原一批历史记录的 inputs 和 outputs，增量记录依赖的基准记录不在 models 中时通过 load 加载
+
+        :param models: 历史记录
+        :type models: List[DBExecutionHistory]
+        :param load: 根据 ID 加载历史记录的函数
+        :type load: Callable[[Iterable[int]], List[DBExecutionHistory]]
+        :return: (历史记录 ID, 字段名) 到还原后数据的映射
+        :rtype: Dict[Tuple[int, str], Any]
+        """
+        known = {model.id for model in models}
+        decoded = {}
+        pending = models
+        while pending:
+            missing = set()
+            for model in pending:
+                for field in HISTORY_FIELDS:
+                    is_delta, value = decoded[(model.id, field)] = self._decode_history_field(model, field)
+                    if is_delta and value["base"] not in known:
+                        missing.add(value["base"])
+
+            pending = load(missing) if missing else []
+            known.update(model.id for model in pending)
+            if missing - known:
+                raise ValueError("history base {} not found".format(sorted(missing - known)))
+
+        values = {}
+        for model in models:
+            for field in HISTORY_FIELDS:
+                chain = []
+                key = (model.id, field)
+                while key not in values:
+                    is_delta, value = decoded[key]
+                    if not is_delta:
+                        values[key] = value
+                        break
+                    chain.append(key)
+                    key = (value["base"], field)
+
+                base = values[key]
+                for delta_key in reversed(chain):
+                    delta = decoded[delta_key][1]
+                    value = dict(base)
+                    for k in delta["unset"]:
+                        value.pop(k, None)
+                    value.update(delta["set"])
+                    values[delta_key] = base = value
+
+        return values
+
+    def _histories_from_models(
+        self, models: List[DBExecutionHistory], load: Callable[[Iterable[int]], List[DBExecutionHistory]]
+    ) -> List[ExecutionHistory]:
+        values = self._rebuild_history_values(models, load)
+        return [
+            ExecutionHistory(
+                id=model.id,
+                node_id=model.node_id,
+                started_time=model.started_time,
+                archived_time=model.archived_time,
+                loop=model.loop,
+                skip=model.skip,
+                retry=model.retry,
+                version=model.version,
+                inputs=values[(model.id, "inputs")],
+                outputs=values[(model.id, "outputs")],
+            )
+            for model in models
+        ]
+
+    def _load_histories(self, ids: Iterable[int]) -> List[DBExecutionHistory]:
+        return list(DBExecutionHistory.objects.filter(id__in=list(ids)))
+
+    def _serialize_history_field(self, node_id: str, value: Any, base: Optional[Tuple[int, int, Any]]) -> (str, str):
+        """
+        序列化历史记录中的字段，base 为 (基准历史 ID, 基准增量深度, 基准数据)，可以生成增量时写入增量记录
+        """
+        if base is not None:
+            base_id, base_depth, base_value = base
+            interval = int(getattr(settings, "BAMBOO_DJANGO_ERI_HISTORY_SNAPSHOT_INTERVAL", 10))
+            delta = _value_delta(base_value, value) if base_depth + 1 < interval else None
+            if delta is not None:
+                delta.update(base=base_id, depth=base_depth + 1)
+                serialized, serializer = self._serialize(delta)
+                return offload_payload(node_id, serialized), DELTA_SERIALIZER_PREFIX + serializer
+
+        serialized, serializer = self._serialize(value)
+        return offload_payload(node_id, serialized), serializer
+
+    def _insert_history(
         self,
         node_id: str,
         started_time: datetime,
@@ -33,8 +181,72 @@ class ExecutionHistoryMixin(SerializerMixin):
         inputs: dict,
         outputs: dict,
     ) -> int:
+        bases = {}
+        if self._history_delta_enabled():
+            # 增量链上的基准记录都是该节点最近的历史，一次查询取出，避免逐条回溯基准记录
+            interval = int(getattr(settings, "BAMBOO_DJANGO_ERI_HISTORY_SNAPSHOT_INTERVAL", 10))
+            recent = {
+                model.id: model
+                for model in DBExecutionHistory.objects.filter(node_id=node_id).order_by("-id")[: max(interval, 1)]
+            }
+            if recent:
+                last = recent[max(recent)]
+
+                def load(ids: Iterable[int]) -> List[DBExecutionHistory]:
+                    ids = set(ids)
+                    cached = [recent[i] for i in ids if i in recent]
+                    missing = ids - set(recent)
+                    return cached + (self._load_histories(missing) if missing else [])
+
+                values = self._rebuild_history_values([last], load)
+                for field in HISTORY_FIELDS:
+                    is_delta, value = self._decode_history_field(last, field)
+                    bases[field] = (last.id, value["depth"] if is_delta else 0, values[(last.id, field)])
+
+        inputs, inputs_serializer = self._serialize_history_field(node_id, inputs, bases.get("inputs"))
+        outputs, outputs_serializer = self._serialize_history_field(node_id, outputs, bases.get("outputs"))
+        return DBExecutionHistory.objects.create(
+            node_id=node_id,
+            loop=loop,
+            retry=retry,
+            skip=skip,
+            version=version,
+            started_time=started_time,
+            archived_time=archived_time,
+            inputs=inputs,
+            inputs_serializer=inputs_serializer,
+            outputs=outputs,
+            outputs_serializer=outputs_serializer,
+        ).id
+
+    def _history_task_routing(self, node_id: str) -> Tuple[str, int]:
+        """
+        获取异步写入历史任务使用的队列及优先级
+
+        子进程的队列及优先级继承自父进程，因此通过节点所属的根流程查找任意一个进程即可，
+        不依赖可能因为延迟写入而过期的 current_node_id
         """
-        为某个节点记录一次执行历史
+        root_id = State.objects.filter(node_id=node_id).values("root_id")[:1]
+        process = Process.objects.filter(root_pipeline_id=Subquery(root_id)).only("queue", "priority").first()
+        if process is None:
+            return "", 100
+        return process.queue, process.priority
+
+    def add_history(
+        self,
+        node_id: str,
+        started_time: datetime,
+        archived_time: datetime,
+        loop: int,
+        skip: bool,
+        retry: int,
+        version: str,
+        inputs: dict,
+        outputs: dict,
+    ) -> Optional[int]:
+        """
+        为某个节点记录一次执行历史，开启 BAMBOO_DJANGO_ERI_HISTORY_DELTA 后只记录与上一次历史之间的差异，
+        开启 BAMBOO_DJANGO_ERI_HISTORY_ASYNC 后通过 celery 任务异步写入，此时返回 None
 
         : param node_id: 节点 ID
         : type node_id: str
@@ -55,21 +267,43 @@ class ExecutionHistoryMixin(SerializerMixin):
         : param outputs: 输出数据
         : type outputs: dict
         """
-        inputs, inputs_serializer = self._serialize(inputs)
-        outputs, outputs_serializer = self._serialize(outputs)
-        return DBExecutionHistory.objects.create(
-            node_id=node_id,
-            loop=loop,
-            retry=retry,
-            skip=skip,
-            version=version,
-            started_time=started_time,
-            archived_time=archived_time,
-            inputs=inputs,
-            inputs_serializer=inputs_serializer,
-            outputs=outputs,
-            outputs_serializer=outputs_serializer,
-        ).id
+        if not getattr(settings, "BAMBOO_DJANGO_ERI_HISTORY_ASYNC", False):
+            return self._insert_history(
+                node_id=node_id,
+                started_time=started_time,
+                archived_time=archived_time,
+                loop=loop,
+                skip=skip,
+                retry=retry,
+                version=version,
+                inputs=inputs,
+                outputs=outputs,
+            )
+
+        task_name = "pipeline.eri.celery.tasks.add_history"
+        queue, priority = self._history_task_routing(node_id)
+        queue, routing_key = QueueResolver(queue).resolve_task_queue_and_routing_key(task_name)
+        # 数据在当前进程中序列化，避免 celery 序列化器无法处理节点数据中的对象
+        serialized_inputs, inputs_serializer = self._serialize(inputs)
+        serialized_outputs, outputs_serializer = self._serialize(outputs)
+        current_app.tasks[task_name].apply_async(
+            kwargs={
+                "node_id": node_id,
+                "started_time": started_time.isoformat() if started_time else None,
+                "archived_time": archived_time.isoformat() if archived_time else None,
+                "loop": loop,
+                "skip": skip,
+                "retry": retry,
+                "version": version,
+                "inputs": serialized_inputs,
+                "inputs_serializer": inputs_serializer,
+                "outputs": serialized_outputs,
+                "outputs_serializer": outputs_serializer,
+            },
+            queue=queue,
+            routing_key=routing_key,
+            priority=priority,
+        )
 
     def get_histories(self, node_id: str, loop: int = -1) -> List[ExecutionHistory]:
         """
@@ -87,21 +321,7 @@ class ExecutionHistoryMixin(SerializerMixin):
             fields["loop"] = loop
         qs = DBExecutionHistory.objects.filter(**fields)
 
-        return [
-            ExecutionHistory(
-                id=model.id,
-                node_id=model.node_id,
-                started_time=model.started_time,
-                archived_time=model.archived_time,
-                loop=model.loop,
-                skip=model.skip,
-                retry=model.retry,
-                version=model.version,
-                inputs=self._deserialize(model.inputs, model.inputs_serializer),
-                outputs=self._deserialize(model.outputs, model.outputs_serializer),
-            )
-            for model in qs
-        ]
+        return self._histories_from_models(list(qs), self._load_histories)
 
     def get_short_histories(self, node_id: str, loop: int = -1) -> List[ExecutionShortHistory]:
         """
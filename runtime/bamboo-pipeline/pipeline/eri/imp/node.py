@@ -12,6 +12,9 @@ specific language governing permissions and limitations under the License.
 """
 
 import json
+from typing import List
+
+from django.conf import settings
 
 from bamboo_engine import metrics
 from bamboo_engine.eri import (
@@ -28,9 +31,18 @@ from bamboo_engine.eri import (
     ExecutableEndEvent,
     Condition,
 )
+from bamboo_engine.utils.collections import LRUCache
 
 from pipeline.eri.models import Node as DBNode
 
+# 节点详情在流程准备完成后不会再发生变化，所以可以在进程内缓存解析后的节点对象
+NODE_CACHE = LRUCache(
+    max_size=getattr(settings, "BAMBOO_DJANGO_ERI_NODE_CACHE_SIZE", 10000),
+    max_weight=getattr(settings, "BAMBOO_DJANGO_ERI_NODE_CACHE_MAX_BYTES", 64 * 1024 * 1024),
+)
+# 已经预加载过节点的根流程
+PRELOADED_ROOTS = LRUCache(max_size=1000)
+
 
 class NodeMixin:
     def _get_node(self, node: DBNode):
@@ -106,5 +118,36 @@ class NodeMixin:
         :return: Node 实例
         :rtype: Node
         """
-        node = DBNode.objects.get(node_id=node_id)
-        return self._get_node(node)
+        node = NODE_CACHE.get(node_id)
+        if node is not None:
+            metrics.ENGINE_RUNTIME_NODE_CACHE_HIT.inc()
+            return node
+
+        metrics.ENGINE_RUNTIME_NODE_CACHE_MISS.inc()
+        db_node = DBNode.objects.get(node_id=node_id)
+        node = self._get_node(db_node)
+        NODE_CACHE.set(node_id, node, weight=len(db_node.detail))
+
+        # 第一次遇到某个根流程时，将该流程的所有节点一次性加载到缓存中
+        if db_node.root_pipeline_id and db_node.root_pipeline_id not in PRELOADED_ROOTS:
+            self.preload_nodes(db_node.root_pipeline_id)
+
+        return node
+
+    def preload_nodes(self, root_pipeline_id: str) -> List[Node]:
+        """
+        一次性加载某个根流程下所有节点的详细信息并放入缓存
+
+        :param root_pipeline_id: 根流程 ID
+        :type root_pipeline_id: str
+        :return: Node 实例列表
+        :rtype: List[Node]
+        """
+        nodes = []
+        for db_node in DBNode.objects.filter(root_pipeline_id=root_pipeline_id).only("node_id", "detail"):
+            node = self._get_node(db_node)
+            NODE_CACHE.set(db_node.node_id, node, weight=len(db_node.detail))
+            nodes.append(node)
+
+        PRELOADED_ROOTS.set(root_pipeline_id, True)
+        return nodes
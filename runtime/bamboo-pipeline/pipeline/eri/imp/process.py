@@ -12,8 +12,10 @@ specific language governing permissions and limitations under the License.
 """
 
 import json
+from contextlib import contextmanager
 from typing import List, Optional, Dict
 
+from django.conf import settings
 from django.utils import timezone
 from django.db.models import F
 
@@ -23,7 +25,75 @@ from bamboo_engine.eri import ProcessInfo, SuspendedProcessInfo, DispatchProcess
 from pipeline.eri.models import Process
 
 
+class ProcessWriteBuffer:
+    """
+    单个进程在推进循环中的写缓冲，同一字段的多次写入只保留最后一次
+    """
+
+    def __init__(self):
+        self.fields = {}
+        self.buffered_nodes = 0
+
+
 class ProcessMixin:
+    def _get_process_write_buffer(self, process_id: int) -> Optional[ProcessWriteBuffer]:
+        return getattr(self, "_process_write_buffers", {}).get(process_id)
+
+    def _update_process(self, process_id: int, **fields):
+        buffer = self._get_process_write_buffer(process_id)
+
+        if buffer is None:
+            Process.objects.filter(id=process_id).update(**fields)
+        else:
+            buffer.fields.update(fields)
+
+    @contextmanager
+    def process_write_behind(self, process_id: int):
+        """
+        在推进循环中开启进程数据的写缓冲，通过 BAMBOO_DJANGO_ERI_PROCESS_WRITE_BEHIND 配置开启
+
+        :param process_id: 进程 ID
+        :type process_id: int
+        """
+        if not getattr(settings, "BAMBOO_DJANGO_ERI_PROCESS_WRITE_BEHIND", False):
+            yield
+            return
+
+        if not hasattr(self, "_process_write_buffers"):
+            self._process_write_buffers = {}
+
+        # 嵌套开启时由最外层负责写入
+        if process_id in self._process_write_buffers:
+            yield
+            return
+
+        self._process_write_buffers[process_id] = ProcessWriteBuffer()
+        try:
+            yield
+        finally:
+            try:
+                self.flush_process_buffer(process_id)
+            finally:
+                self._process_write_buffers.pop(process_id, None)
+
+    def flush_process_buffer(self, process_id: int):
+        """
+        将进程在写缓冲中暂存的数据通过一条语句写入
+
+        :param process_id: 进程 ID
+        :type process_id: int
+        """
+        buffer = self._get_process_write_buffer(process_id)
+
+        if buffer is None:
+            return
+
+        fields, buffer.fields = buffer.fields, {}
+        buffer.buffered_nodes = 0
+
+        if fields:
+            Process.objects.filter(id=process_id).update(**fields)
+
     def beat(self, process_id: int):
         """
         进程心跳
@@ -31,7 +101,7 @@ class ProcessMixin:
         :param process_id: 进程 ID
         :type process_id: int
         """
-        Process.objects.filter(id=process_id).update(last_heartbeat=timezone.now())
+        self._update_process(process_id, last_heartbeat=timezone.now())
 
     def wake_up(self, process_id: int):
         """
@@ -40,7 +110,7 @@ class ProcessMixin:
         :param process_id: 进程 ID
         :type process_id: int
         """
-        Process.objects.filter(id=process_id).update(asleep=False)
+        self._update_process(process_id, asleep=False)
 
     def sleep(self, process_id: int):
         """
@@ -49,7 +119,7 @@ class ProcessMixin:
         :param process_id: 进程 ID
         :type process_id: int
         """
-        Process.objects.filter(id=process_id).update(asleep=True)
+        self._update_process(process_id, asleep=True)
 
     def suspend(self, process_id: int, by: str):
         """
@@ -87,7 +157,7 @@ class ProcessMixin:
         :param process_id: 进程 ID
         :type process_id: int
         """
-        Process.objects.filter(id=process_id).update(dead=True)
+        self._update_process(process_id, dead=True)
 
     @metrics.setup_histogram(metrics.ENGINE_RUNTIME_PROCESS_READ_TIME)
     def get_process_info(self, process_id: int) -> ProcessInfo:
@@ -100,7 +170,7 @@ class ProcessMixin:
         :rtype: ProcessInfo
         """
         qs = Process.objects.filter(id=process_id).only(
-            "id", "destination_id", "root_pipeline_id", "pipeline_stack", "parent_id"
+            "id", "destination_id", "root_pipeline_id", "pipeline_stack", "parent_id", "ready"
         )
 
         if len(qs) != 1:
@@ -113,6 +183,7 @@ class ProcessMixin:
             root_pipeline_id=process.root_pipeline_id,
             pipeline_stack=json.loads(process.pipeline_stack),
             parent_id=process.parent_id,
+            ready=process.ready,
         )
 
     def kill(self, process_id: int):
@@ -184,7 +255,18 @@ class ProcessMixin:
         :param node_id: 节点 ID
         :type node_id: str
         """
-        Process.objects.filter(id=process_id).update(current_node_id=node_id)
+        buffer = self._get_process_write_buffer(process_id)
+
+        if buffer is None:
+            Process.objects.filter(id=process_id).update(current_node_id=node_id)
+            return
+
+        buffer.fields["current_node_id"] = node_id
+        buffer.buffered_nodes += 1
+
+        # 缓冲的节点数达到上限时写入，避免 current_node_id 长时间落后
+        if buffer.buffered_nodes >= int(getattr(settings, "BAMBOO_DJANGO_ERI_PROCESS_WRITE_BEHIND_NODES", 20)):
+            self.flush_process_buffer(process_id)
 
     def child_process_finish(self, parent_id: int, process_id: int) -> bool:
         """
@@ -310,7 +392,7 @@ class ProcessMixin:
         :rtype: List[ProcessInfo]
         """
         qs = Process.objects.filter(root_pipeline_id=pipeline_id).only(
-            "id", "destination_id", "root_pipeline_id", "pipeline_stack", "parent_id"
+            "id", "destination_id", "root_pipeline_id", "pipeline_stack", "parent_id", "ready"
         )
 
         return [
@@ -320,6 +402,7 @@ class ProcessMixin:
                 root_pipeline_id=process.root_pipeline_id,
                 pipeline_stack=json.loads(process.pipeline_stack),
                 parent_id=process.parent_id,
+                ready=process.ready,
             )
             for process in qs
         ]
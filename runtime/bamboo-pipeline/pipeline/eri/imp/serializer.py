@@ -16,12 +16,15 @@ import pickle
 import codecs
 from typing import Any
 
+from pipeline.eri.payload import resolve_payload
+
 
 class SerializerMixin:
     JSON_SERIALIZER = "json"
     PICKLE_SERIALIZER = "pickle"
 
     def _deserialize(self, data: str, serializer: str) -> Any:
+        data = resolve_payload(data)
         if serializer == self.JSON_SERIALIZER:
             return json.loads(data)
         elif serializer == self.PICKLE_SERIALIZER:
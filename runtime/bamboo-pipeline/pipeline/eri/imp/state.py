@@ -11,10 +11,12 @@ an "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express o
 specific language governing permissions and limitations under the License.
 """
 
+from datetime import datetime, timedelta
 from typing import Optional, Dict, List
 
+from django.conf import settings
 from django.utils import timezone
-from bamboo_engine.eri import State
+from bamboo_engine.eri import State, StateSnapshot
 from bamboo_engine import states, metrics
 from bamboo_engine.utils.string import unique_id
 from bamboo_engine.exceptions import StateVersionNotMatchError
@@ -24,6 +26,13 @@ from pipeline.eri.models import State as DBState
 
 
 class StateMixin:
+    def _state_snapshot_cursor_overlap(self) -> timedelta:
+        """
+        增量获取状态快照时游标向前回退的时间，用于覆盖获取快照时尚未提交的状态更新，
+        通过 BAMBOO_DJANGO_ERI_STATE_SNAPSHOT_CURSOR_OVERLAP 配置（秒），应当大于状态更新事务的最长提交耗时
+        """
+        return timedelta(seconds=float(getattr(settings, "BAMBOO_DJANGO_ERI_STATE_SNAPSHOT_CURSOR_OVERLAP", 1)))
+
     @metrics.setup_histogram(metrics.ENGINE_RUNTIME_STATE_READ_TIME)
     def get_state(self, node_id: str) -> State:
         """
@@ -127,6 +136,41 @@ class StateMixin:
             for state in qs
         ]
 
+    def get_state_snapshot_by_root(self, root_id: str) -> StateSnapshot:
+        """
+        根据根节点 ID 获取该流程下所有节点的状态快照
+
+        :param root_id: 根节点 ID
+        :type root_id: str
+        :return: 节点状态快照
+        :rtype: StateSnapshot
+        """
+        return self.get_state_snapshot_by_root_since(root_id, None)
+
+    def get_state_snapshot_by_root_since(self, root_id: str, cursor: Optional[datetime]) -> StateSnapshot:
+        """
+        根据根节点 ID 获取该流程下自 cursor 之后发生过变化的节点的状态快照，
+        返回的快照中可能包含少量在 cursor 之前发生变化的节点
+
+        增量结果是尽力而为的：更新时间早于 cursor 减去回退时间、但在上一次获取之后才提交的状态更新不会被返回，
+        被删除的节点也不会被返回，调用方需要定期传入 cursor=None 获取全量状态进行校正
+
+        :param root_id: 根节点 ID
+        :type root_id: str
+        :param cursor: 上一次获取快照时返回的游标，为 None 时获取所有节点的状态
+        :type cursor: Optional[datetime]
+        :return: 节点状态快照
+        :rtype: StateSnapshot
+        """
+        # 游标需要在查询前生成，查询过程中发生的更新会在下一次获取时返回
+        next_cursor = timezone.now()
+
+        qs = DBState.objects.filter(root_id=root_id)
+        if cursor is not None:
+            qs = qs.filter(updated_time__gte=cursor - self._state_snapshot_cursor_overlap())
+
+        return StateSnapshot(rows=list(qs.values_list(*StateSnapshot.FIELDS)), cursor=next_cursor)
+
     def batch_get_state_name(self, node_id_list: List[str]) -> Dict[str, str]:
         """
         批量获取一批节点的状态
@@ -159,7 +203,7 @@ class StateMixin:
         :return: 更新状态行数
         :rtype: int
         """
-        return DBState.objects.filter(node_id=node_id).update(inner_loop=0)
+        return DBState.objects.filter(node_id=node_id).update(inner_loop=0, updated_time=timezone.now())
 
     def reset_children_state_inner_loop(self, node_id: str) -> int:
         """
@@ -170,7 +214,7 @@ class StateMixin:
         :return: 更新状态行数
         :rtype: int
         """
-        return DBState.objects.filter(parent_id=node_id).update(inner_loop=0)
+        return DBState.objects.filter(parent_id=node_id).update(inner_loop=0, updated_time=timezone.now())
 
     def set_state_root_and_parent(self, node_id: str, root_id: str, parent_id: str):
         """
@@ -183,7 +227,9 @@ class StateMixin:
         :param parent_id: 父流程 ID
         :type parent_id: str
         """
-        DBState.objects.filter(node_id=node_id).update(root_id=root_id, parent_id=parent_id)
+        DBState.objects.filter(node_id=node_id).update(
+            root_id=root_id, parent_id=parent_id, updated_time=timezone.now()
+        )
 
     @metrics.setup_histogram(metrics.ENGINE_RUNTIME_STATE_WRITE_TIME)
     def set_state(
@@ -312,7 +358,7 @@ class StateMixin:
             if version:
                 filters["version"] = version
 
-            rows = DBState.objects.filter(**filters).update(name=to_state, **fields)
+            rows = DBState.objects.filter(**filters).update(name=to_state, updated_time=timezone.now(), **fields)
 
             if rows != 1:
                 raise StateVersionNotMatchError("state with version({}) not exist".format(version))
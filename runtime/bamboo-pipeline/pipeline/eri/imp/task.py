@@ -10,11 +10,14 @@ Unless required by applicable law or agreed to in writing, software distributed
 an "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the License for the
 specific language governing permissions and limitations under the License.
 """
-from typing import Optional
+from typing import Optional, List
 
 from celery import current_app
 
+from bamboo_engine.eri import DispatchProcess
+
 from pipeline.eri.celery.queues import QueueResolver
+from pipeline.eri.log import flush_log_buffer
 
 from pipeline.eri.models import Process
 
@@ -42,8 +45,33 @@ class TaskMixin:
         task_name = "pipeline.eri.celery.tasks.execute"
         route_params = self._get_task_route_params(task_name, process_id)
 
+        # 后续任务可能在其他 worker 中立即执行，派发前写入已缓存的节点日志以保证日志顺序
+        flush_log_buffer()
         current_app.tasks[task_name].apply_async(kwargs={"process_id": process_id, "node_id": node_id}, **route_params)
 
+    def batch_execute(self, parent_id: int, dispatches: List[DispatchProcess]):
+        """
+        批量派发子进程的执行任务，子进程的路由信息与父进程一致，只需要解析一次，所有任务通过同一个 producer 发送
+
+        :param parent_id: 父进程 ID
+        :type parent_id: int
+        :param dispatches: 待调度进程信息列表
+        :type dispatches: List[DispatchProcess]
+        """
+        if not dispatches:
+            return
+
+        task_name = "pipeline.eri.celery.tasks.execute"
+        route_params = self._get_task_route_params(task_name, parent_id)
+        task = current_app.tasks[task_name]
+
+        flush_log_buffer()
+        with current_app.producer_or_acquire() as producer:
+            for d in dispatches:
+                task.apply_async(
+                    kwargs={"process_id": d.process_id, "node_id": d.node_id}, producer=producer, **route_params
+                )
+
     def schedule(
         self, process_id: int, node_id: str, schedule_id: str, callback_data_id: Optional[int] = None,
     ):
@@ -60,6 +88,7 @@ class TaskMixin:
         task_name = "pipeline.eri.celery.tasks.schedule"
         route_params = self._get_task_route_params(task_name, process_id)
 
+        flush_log_buffer()
         current_app.tasks[task_name].apply_async(
             kwargs={
                 "process_id": process_id,
@@ -93,6 +122,7 @@ class TaskMixin:
         task_name = "pipeline.eri.celery.tasks.schedule"
         route_params = self._get_task_route_params(task_name, process_id)
 
+        flush_log_buffer()
         current_app.tasks[task_name].apply_async(
             kwargs={
                 "process_id": process_id,
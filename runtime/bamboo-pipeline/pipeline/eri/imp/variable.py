@@ -12,6 +12,7 @@ specific language governing permissions and limitations under the License.
 """
 
 import inspect
+import threading
 from typing import Any, Type
 
 from bamboo_engine.eri import Variable as VariableInterface
@@ -19,13 +20,51 @@ from pipeline.core.data.var import Variable
 
 
 class VariableProxy:
+    """
+    计算型变量代理，提供变量类中定义的函数，并以变量配置的解析结果作为 value 调用变量类的 get_value
+
+    每个变量类对应的代理类只会生成一次，代理实例只保存自身的数据
+
+    代理实例没有 __dict__，变量类的 get_value 中只能读写 original_value、pipeline_data 与 value，
+    不能在 self 上设置其他属性，需要保存的中间结果请使用局部变量
+    """
+
+    __slots__ = ("original_value", "pipeline_data", "value")
+
+    _proxy_classes = {}
+    _proxy_classes_lock = threading.Lock()
+
+    def __new__(cls, original_value: Variable, var_cls: Type, pipeline_data: dict):
+        if cls is VariableProxy:
+            cls = VariableProxy.get_proxy_class(var_cls)
+        return super().__new__(cls)
+
     def __init__(self, original_value: Variable, var_cls: Type, pipeline_data: dict):
-        self.get_value = getattr(var_cls, "get_value")
         self.original_value = original_value
         self.pipeline_data = pipeline_data
+
+    @classmethod
+    def get_proxy_class(cls, var_cls: Type) -> Type["VariableProxy"]:
+        """
+        获取变量类对应的代理类，变量类中定义的函数会以 staticmethod 的形式挂载到代理类上
+
+        :param var_cls: 变量类
+        :type var_cls: Type
+        :return: 代理类
+        :rtype: Type[VariableProxy]
+        """
+        proxy_cls = cls._proxy_classes.get(var_cls)
+        if proxy_cls is not None:
+            return proxy_cls
+
+        attrs = {"__slots__": (), "get_value": staticmethod(getattr(var_cls, "get_value"))}
         for name, value in inspect.getmembers(var_cls):
-            if not name.startswith("__") and not hasattr(self, name) and inspect.isfunction(value):
-                setattr(self, name, value)
+            if not name.startswith("__") and name not in attrs and not hasattr(cls, name) and inspect.isfunction(value):
+                attrs[name] = staticmethod(value)
+        proxy_cls = type("%sProxy" % var_cls.__name__, (cls,), attrs)
+
+        with cls._proxy_classes_lock:
+            return cls._proxy_classes.setdefault(var_cls, proxy_cls)
 
     def get(self) -> Any:
         self.value = self.original_value.get()
@@ -11,24 +11,294 @@ an "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express o
 specific language governing permissions and limitations under the License.
 """
 
+import json
 import logging
+import random
+import threading
+import time
+import zlib
+from collections import OrderedDict, deque
 from logging import LogRecord, LoggerAdapter
+from typing import List, Optional
 
+from django.conf import settings
 from django.core.exceptions import AppRegistryNotReady
+from django.db import connection
 from bamboo_engine import local
 
 logger = logging.getLogger("pipeline.eri.log")
 
+# 缓冲区达到容量上限时的处理策略：由写入方同步写入数据库（背压）或丢弃新日志
+LOG_BUFFER_OVERFLOW_FLUSH = "flush"
+LOG_BUFFER_OVERFLOW_DROP = "drop"
+
+# 节点日志存储方式：每条日志一行 LogEntry 或者按照节点执行版本压缩分块存储的 LogChunk
+LOG_STORAGE_ENTRY = "entry"
+LOG_STORAGE_CHUNK = "chunk"
+
 
 def get_logger(node_id: str, loop: int, version: str):
     return LoggerAdapter(logger=logger, extra={"node_id": node_id, "loop": loop, "version": version})
 
 
+def _chunk_storage_enabled() -> bool:
+    return getattr(settings, "BAMBOO_DJANGO_ERI_LOG_STORAGE", LOG_STORAGE_ENTRY) == LOG_STORAGE_CHUNK
+
+
+def _sampled(level_name: str) -> bool:
+    """
+    按照 BAMBOO_DJANGO_ERI_LOG_SAMPLING 中配置的日志等级采样率判断是否需要记录该条日志，未配置的等级全部记录
+    """
+    rate = getattr(settings, "BAMBOO_DJANGO_ERI_LOG_SAMPLING", {}).get(level_name)
+    return rate is None or random.random() < rate
+
+
+class LogBuffer:
+    """
+    节点日志写缓冲，当前 worker 中所有 handler 共享同一个缓冲区以保证日志的写入顺序
+
+    缓冲区中的日志在数量达到 BAMBOO_DJANGO_ERI_LOG_BUFFER_SIZE，最早一条日志缓存时间超过
+    BAMBOO_DJANGO_ERI_LOG_BUFFER_FLUSH_INTERVAL 秒，celery 任务结束或者引擎派发后续任务时通过 bulk_create 批量写入；
+    缓存时间由后台定时器检查，不依赖后续日志的写入，进程正常退出时也会写入剩余的日志
+    """
+
+    def __init__(self):
+        self.entries = deque()
+        self.first_buffered_at = None
+        self.dropped = 0
+        self._lock = threading.Lock()
+        # 保证多次写入按照缓存顺序依次完成
+        self._flush_lock = threading.Lock()
+        self._timer = None
+
+    def __len__(self) -> int:
+        return len(self.entries)
+
+    def add(self, entry):
+        """
+        向缓冲区中添加一条日志，并在满足条件时触发写入
+
+        :param entry: 未保存的 LogEntry 实例
+        :type entry: LogEntry
+        """
+        max_size = int(getattr(settings, "BAMBOO_DJANGO_ERI_LOG_BUFFER_MAX_SIZE", 10000))
+        overflow = getattr(settings, "BAMBOO_DJANGO_ERI_LOG_BUFFER_OVERFLOW", LOG_BUFFER_OVERFLOW_FLUSH)
+
+        size = int(getattr(settings, "BAMBOO_DJANGO_ERI_LOG_BUFFER_SIZE", 100))
+        interval = float(getattr(settings, "BAMBOO_DJANGO_ERI_LOG_BUFFER_FLUSH_INTERVAL", 1))
+
+        while True:
+            with self._lock:
+                if len(self.entries) < max_size:
+                    now = time.monotonic()
+                    if not self.entries:
+                        self.first_buffered_at = now
+                    self.entries.append(entry)
+                    should_flush = len(self.entries) >= size or now - self.first_buffered_at >= interval
+                    if not should_flush:
+                        self._start_timer(interval)
+                    break
+
+                if overflow == LOG_BUFFER_OVERFLOW_DROP:
+                    self.dropped += 1
+                    return
+
+            self.flush()
+
+        if should_flush:
+            self.flush()
+
+    def _start_timer(self, interval: float):
+        # fork 出的子进程中不存在父进程的定时器线程，is_alive 会返回 False
+        if self._timer is not None and self._timer.is_alive():
+            return
+
+        self._timer = threading.Timer(interval, self._flush_on_timer)
+        self._timer.daemon = True
+        self._timer.start()
+
+    def _cancel_timer(self):
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+
+    def _flush_on_timer(self):
+        with self._lock:
+            self._timer = None
+
+        try:
+            flush_log_buffer()
+        finally:
+            # 定时器线程中打开的数据库连接不会被 django 回收
+            connection.close()
+
+    def flush(self):
+        """
+        将缓冲区中的日志按照写入顺序批量写入数据库，写入失败的日志会重新放回缓冲区头部
+        """
+        with self._flush_lock:
+            self._flush()
+
+    def _flush(self):
+        from pipeline.eri.models import LogEntry
+
+        with self._lock:
+            self._cancel_timer()
+            if not self.entries:
+                return
+            entries = list(self.entries)
+            self.entries.clear()
+            self.first_buffered_at = None
+
+        try:
+            if _chunk_storage_enabled():
+                write_log_chunks(entries)
+            else:
+                LogEntry.objects.bulk_create(
+                    entries, batch_size=int(getattr(settings, "BAMBOO_DJANGO_ERI_LOG_BUFFER_SIZE", 100))
+                )
+        except Exception:
+            max_size = int(getattr(settings, "BAMBOO_DJANGO_ERI_LOG_BUFFER_MAX_SIZE", 10000))
+            with self._lock:
+                self.entries.extendleft(reversed(entries))
+                while len(self.entries) > max_size:
+                    self.entries.popleft()
+                    self.dropped += 1
+                self.first_buffered_at = time.monotonic()
+                self._start_timer(float(getattr(settings, "BAMBOO_DJANGO_ERI_LOG_BUFFER_FLUSH_INTERVAL", 1)))
+            raise
+
+
+LOG_BUFFER = LogBuffer()
+
+
+def flush_log_buffer(**kwargs):
+    """
+    将当前 worker 中缓存的节点日志写入数据库，同时作为 celery task_postrun 信号以及进程退出时的处理函数
+    """
+    if not LOG_BUFFER.entries:
+        return
+
+    try:
+        LOG_BUFFER.flush()
+    except Exception:
+        logging.getLogger("root").exception("[flush_log_buffer] flush node log failed")
+
+
+def encode_log_chunk(lines: List[str]) -> bytes:
+    return zlib.compress(json.dumps(lines).encode("utf-8"))
+
+
+def decode_log_chunk(data: bytes) -> List[str]:
+    return json.loads(zlib.decompress(bytes(data)).decode("utf-8"))
+
+
+def write_log_chunks(entries: list):
+    """
+    将日志按照节点执行版本分组，每组日志按照 BAMBOO_DJANGO_ERI_LOG_CHUNK_LINES 行切分后压缩写入 LogChunk
+
+    :param entries: 按照输出顺序排列的未保存 LogEntry 实例列表
+    :type entries: list
+    """
+    from pipeline.eri.models import LogChunk
+
+    chunk_lines = int(getattr(settings, "BAMBOO_DJANGO_ERI_LOG_CHUNK_LINES", 1000))
+    groups = OrderedDict()
+    for entry in entries:
+        groups.setdefault((entry.node_id, entry.version), []).append(entry)
+
+    chunks = []
+    for (node_id, version), group in groups.items():
+        last = (
+            LogChunk.objects.filter(node_id=node_id, version=version)
+            .order_by("-line_start")
+            .values_list("line_start", "line_count")
+            .first()
+        )
+        line_start = sum(last) if last else 0
+        for i in range(0, len(group), chunk_lines):
+            lines = [entry.message for entry in group[i : i + chunk_lines]]
+            chunks.append(
+                LogChunk(
+                    node_id=node_id,
+                    version=version,
+                    loop=group[i].loop,
+                    line_start=line_start,
+                    line_count=len(lines),
+                    data=encode_log_chunk(lines),
+                )
+            )
+            line_start += len(lines)
+
+    LogChunk.objects.bulk_create(chunks)
+
+
+def read_log_lines(node_id: str, version: str, offset: int = 0, limit: Optional[int] = None) -> List[str]:
+    """
+    读取节点某个执行版本的日志行，分块存储的日志只会解压与读取范围有交集的分块
+
+    :param node_id: 节点 ID
+    :type node_id: str
+    :param version: 执行版本
+    :type version: str
+    :param offset: 起始行，负数表示从末尾倒数
+    :type offset: int, optional
+    :param limit: 最大读取行数，None 表示读取到末尾
+    :type limit: Optional[int], optional
+    :return: 日志行列表
+    :rtype: List[str]
+    """
+    from pipeline.eri.models import LogChunk, LogEntry
+
+    chunks = list(
+        LogChunk.objects.filter(node_id=node_id, version=version)
+        .order_by("line_start", "id")
+        .values_list("id", "line_start", "line_count")
+    )
+
+    if not chunks:
+        qs = LogEntry.objects.filter(node_id=node_id, version=version)
+        if offset < 0:
+            offset = max(qs.count() + offset, 0)
+        qs = qs.order_by("id").values_list("message", flat=True)
+        return list(qs[offset : offset + limit] if limit is not None else qs[offset:])
+
+    total = chunks[-1][1] + chunks[-1][2]
+    if offset < 0:
+        offset = max(total + offset, 0)
+    end = total if limit is None else min(offset + limit, total)
+    if offset >= end:
+        return []
+
+    chunk_ids = [chunk_id for chunk_id, start, count in chunks if start < end and start + count > offset]
+    data = dict(LogChunk.objects.filter(id__in=chunk_ids).values_list("id", "data"))
+
+    lines = []
+    for chunk_id, start, count in chunks:
+        if chunk_id not in data:
+            continue
+        chunk_lines = decode_log_chunk(data[chunk_id])
+        lines.extend(chunk_lines[max(offset - start, 0) : end - start])
+
+    return lines
+
+
+def _write_log_entry(**fields):
+    from pipeline.eri.models import LogEntry
+
+    # 分块存储需要积累多行日志后再进行压缩，始终经过写缓冲
+    if getattr(settings, "BAMBOO_DJANGO_ERI_LOG_BUFFER", False) or _chunk_storage_enabled():
+        LOG_BUFFER.add(LogEntry(**fields))
+    else:
+        LogEntry.objects.create(**fields)
+
+
 class ERINodeLogHandler(logging.Handler):
     def emit(self, record: LogRecord):
-        from pipeline.eri.models import LogEntry
+        if not _sampled(record.levelname):
+            return
 
-        LogEntry.objects.create(
+        _write_log_entry(
             node_id=record.node_id,
             loop=record.loop,
             version=record.version,
@@ -41,7 +311,7 @@ class ERINodeLogHandler(logging.Handler):
 class EngineContextLogHandler(logging.Handler):
     def emit(self, record):
         try:
-            from pipeline.eri.models import LogEntry
+            from pipeline.eri.models import LogEntry  # noqa
         except AppRegistryNotReady:
             return
 
@@ -49,7 +319,10 @@ class EngineContextLogHandler(logging.Handler):
         if not node_info:
             return
 
-        LogEntry.objects.create(
+        if not _sampled(record.levelname):
+            return
+
+        _write_log_entry(
             node_id=node_info.node_id,
             version=node_info.version,
             loop=node_info.loop,
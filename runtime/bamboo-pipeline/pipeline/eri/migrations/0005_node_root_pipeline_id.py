@@ -0,0 +1,18 @@
+# Generated by Django 2.2.16 on 2021-08-02 10:12
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("eri", "0004_state_inner_loop_"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="node",
+            name="root_pipeline_id",
+            field=models.CharField(db_index=True, default="", max_length=33, verbose_name="根流程 ID"),
+        ),
+    ]
@@ -0,0 +1,19 @@
+# Generated by Django 2.2.16 on 2021-08-09 11:20
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("eri", "0005_node_root_pipeline_id"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="state",
+            name="updated_time",
+            field=models.DateTimeField(auto_now=True, null=True, verbose_name="更新时间"),
+        ),
+        migrations.AlterIndexTogether(name="state", index_together={("root_id", "updated_time")},),
+    ]
@@ -0,0 +1,27 @@
+# Generated by Django 2.2.16 on 2021-08-16 10:32
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("eri", "0006_state_updated_time"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="LogChunk",
+            fields=[
+                ("id", models.BigAutoField(primary_key=True, serialize=False, verbose_name="ID")),
+                ("node_id", models.CharField(max_length=33, verbose_name="节点 ID")),
+                ("version", models.CharField(default="", max_length=33, verbose_name="状态版本")),
+                ("loop", models.IntegerField(default=1, verbose_name="循环次数")),
+                ("line_start", models.IntegerField(verbose_name="起始行号")),
+                ("line_count", models.IntegerField(verbose_name="日志行数")),
+                ("data", models.BinaryField(verbose_name="压缩日志内容")),
+                ("logged_at", models.DateTimeField(auto_now_add=True, db_index=True, verbose_name="输出时间")),
+            ],
+            options={"index_together": {("node_id", "version", "line_start")}},
+        ),
+    ]
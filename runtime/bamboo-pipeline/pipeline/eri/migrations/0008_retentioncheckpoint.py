@@ -0,0 +1,26 @@
+# Generated by Django 2.2.16 on 2021-08-23 11:05
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("eri", "0007_logchunk"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="RetentionCheckpoint",
+            fields=[
+                ("id", models.BigAutoField(primary_key=True, serialize=False, verbose_name="ID")),
+                ("name", models.CharField(max_length=64, unique=True, verbose_name="清理任务名")),
+                ("scan_cursor", models.BigIntegerField(default=0, verbose_name="已扫描的最大状态 ID")),
+                ("root_id", models.CharField(default="", max_length=33, verbose_name="正在清理的根流程 ID")),
+                ("table", models.CharField(default="", max_length=64, verbose_name="正在清理的数据表")),
+                ("key_offset", models.IntegerField(default=0, verbose_name="正在清理的键分片偏移")),
+                ("last_pk", models.BigIntegerField(default=0, verbose_name="已删除的最大主键")),
+                ("updated_time", models.DateTimeField(auto_now=True, verbose_name="更新时间")),
+            ],
+        ),
+    ]
@@ -0,0 +1,27 @@
+# Generated by Django 2.2.16 on 2021-08-30 15:21
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("eri", "0008_retentioncheckpoint"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="PipelineArchive",
+            fields=[
+                ("id", models.BigAutoField(primary_key=True, serialize=False, verbose_name="ID")),
+                ("root_id", models.CharField(max_length=33, unique=True, verbose_name="根流程 ID")),
+                ("format_version", models.IntegerField(default=0, verbose_name="归档格式版本，0 表示等待归档")),
+                ("location", models.CharField(default="", max_length=255, verbose_name="归档文件路径")),
+                ("data", models.BinaryField(default=b"", verbose_name="压缩归档内容")),
+                ("size", models.IntegerField(default=0, verbose_name="归档大小")),
+                ("finished_time", models.DateTimeField(verbose_name="流程结束时间")),
+                ("archived_time", models.DateTimeField(null=True, verbose_name="归档时间")),
+            ],
+            options={"index_together": {("format_version", "finished_time")}},
+        ),
+    ]
@@ -0,0 +1,35 @@
+# Generated by Django 2.2.16 on 2021-09-06 14:48
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("eri", "0009_pipelinearchive"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="executiondata",
+            name="inputs_digest",
+            field=models.CharField(default="", max_length=64, verbose_name="节点执行输入数据摘要"),
+        ),
+        migrations.AddField(
+            model_name="executiondata",
+            name="outputs_digest",
+            field=models.CharField(default="", max_length=64, verbose_name="节点执行输出数据摘要"),
+        ),
+        migrations.CreateModel(
+            name="Payload",
+            fields=[
+                ("id", models.BigAutoField(primary_key=True, serialize=False, verbose_name="ID")),
+                ("node_id", models.CharField(max_length=33, verbose_name="节点 ID")),
+                ("digest", models.CharField(db_index=True, max_length=64, verbose_name="内容摘要")),
+                ("data", models.TextField(verbose_name="序列化后的数据")),
+                ("size", models.IntegerField(verbose_name="数据大小")),
+                ("created_time", models.DateTimeField(auto_now_add=True, verbose_name="创建时间")),
+            ],
+            options={"unique_together": {("node_id", "digest")}},
+        ),
+    ]
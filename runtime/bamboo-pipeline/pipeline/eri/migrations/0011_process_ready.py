@@ -0,0 +1,18 @@
+# Generated by Django 2.2.16 on 2021-09-13 10:21
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("eri", "0010_payload"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="process",
+            name="ready",
+            field=models.BooleanField(default=True, verbose_name="流程数据是否已经准备完成"),
+        ),
+    ]
@@ -0,0 +1,27 @@
+# Generated by Django 2.2.16 on 2021-09-14 11:05
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("eri", "0011_process_ready"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="retentioncheckpoint",
+            name="pending_cursor",
+            field=models.BigIntegerField(default=0, verbose_name="已复查的最大待清理记录 ID"),
+        ),
+        migrations.CreateModel(
+            name="RetentionPendingRoot",
+            fields=[
+                ("id", models.BigAutoField(primary_key=True, serialize=False, verbose_name="ID")),
+                ("name", models.CharField(max_length=64, verbose_name="清理任务名")),
+                ("root_id", models.CharField(db_index=True, max_length=33, verbose_name="等待完成的根流程 ID")),
+            ],
+            options={"unique_together": {("name", "root_id")}},
+        ),
+    ]
@@ -32,11 +32,13 @@ class Process(models.Model):
     priority = models.IntegerField(_("优先级"))
     queue = models.CharField(_("所属队列"), default="", max_length=128)
     pipeline_stack = models.TextField(_("流程栈"), default="[]", null=False)
+    ready = models.BooleanField(_("流程数据是否已经准备完成"), default=True)
 
 
 class Node(models.Model):
     id = models.BigAutoField(_("ID"), primary_key=True)
     node_id = models.CharField(_("节点 ID"), null=False, max_length=33, db_index=True)
+    root_pipeline_id = models.CharField(_("根流程 ID"), null=False, default="", max_length=33, db_index=True)
     detail = models.TextField(_("节点详情"), null=False)
 
 
@@ -55,6 +57,10 @@ class State(models.Model):
     created_time = models.DateTimeField(_("创建时间"), auto_now_add=True)
     started_time = models.DateTimeField(_("开始时间"), null=True)
     archived_time = models.DateTimeField(_("归档时间"), null=True)
+    updated_time = models.DateTimeField(_("更新时间"), null=True, auto_now=True)
+
+    class Meta:
+        index_together = ["root_id", "updated_time"]
 
 
 class Schedule(models.Model):
@@ -86,6 +92,8 @@ class ExecutionData(models.Model):
     outputs_serializer = models.CharField(_("输出序列化器"), null=False, max_length=32)
     inputs = models.TextField(_("节点执行输入数据"))
     outputs = models.TextField(_("节点执行输出数据"))
+    inputs_digest = models.CharField(_("节点执行输入数据摘要"), default="", max_length=64)
+    outputs_digest = models.CharField(_("节点执行输出数据摘要"), default="", max_length=64)
 
 
 class CallbackData(models.Model):
@@ -145,3 +153,64 @@ class LogEntry(models.Model):
 
     class Meta:
         index_together = ["node_id", "loop"]
+
+
+class LogChunk(models.Model):
+    id = models.BigAutoField(_("ID"), primary_key=True)
+    node_id = models.CharField(_("节点 ID"), max_length=33)
+    version = models.CharField(_("状态版本"), default="", max_length=33)
+    loop = models.IntegerField(_("循环次数"), default=1)
+    line_start = models.IntegerField(_("起始行号"))
+    line_count = models.IntegerField(_("日志行数"))
+    data = models.BinaryField(_("压缩日志内容"))
+    logged_at = models.DateTimeField(_("输出时间"), auto_now_add=True, db_index=True)
+
+    class Meta:
+        index_together = ["node_id", "version", "line_start"]
+
+
+class RetentionCheckpoint(models.Model):
+    id = models.BigAutoField(_("ID"), primary_key=True)
+    name = models.CharField(_("清理任务名"), max_length=64, unique=True)
+    scan_cursor = models.BigIntegerField(_("已扫描的最大状态 ID"), default=0)
+    root_id = models.CharField(_("正在清理的根流程 ID"), default="", max_length=33)
+    table = models.CharField(_("正在清理的数据表"), default="", max_length=64)
+    key_offset = models.IntegerField(_("正在清理的键分片偏移"), default=0)
+    last_pk = models.BigIntegerField(_("已删除的最大主键"), default=0)
+    pending_cursor = models.BigIntegerField(_("已复查的最大待清理记录 ID"), default=0)
+    updated_time = models.DateTimeField(_("更新时间"), auto_now=True)
+
+
+class RetentionPendingRoot(models.Model):
+    id = models.BigAutoField(_("ID"), primary_key=True)
+    name = models.CharField(_("清理任务名"), max_length=64)
+    root_id = models.CharField(_("等待完成的根流程 ID"), max_length=33, db_index=True)
+
+    class Meta:
+        unique_together = ["name", "root_id"]
+
+
+class PipelineArchive(models.Model):
+    id = models.BigAutoField(_("ID"), primary_key=True)
+    root_id = models.CharField(_("根流程 ID"), max_length=33, unique=True)
+    format_version = models.IntegerField(_("归档格式版本，0 表示等待归档"), default=0)
+    location = models.CharField(_("归档文件路径"), default="", max_length=255)
+    data = models.BinaryField(_("压缩归档内容"), default=b"")
+    size = models.IntegerField(_("归档大小"), default=0)
+    finished_time = models.DateTimeField(_("流程结束时间"))
+    archived_time = models.DateTimeField(_("归档时间"), null=True)
+
+    class Meta:
+        index_together = ["format_version", "finished_time"]
+
+
+class Payload(models.Model):
+    id = models.BigAutoField(_("ID"), primary_key=True)
+    node_id = models.CharField(_("节点 ID"), max_length=33)
+    digest = models.CharField(_("内容摘要"), max_length=64, db_index=True)
+    data = models.TextField(_("序列化后的数据"))
+    size = models.IntegerField(_("数据大小"))
+    created_time = models.DateTimeField(_("创建时间"), auto_now_add=True)
+
+    class Meta:
+        unique_together = ["node_id", "digest"]
@@ -0,0 +1,87 @@
+# -*- coding: utf-8 -*-
+"""
+Tencent is pleased to support the open source community by making 蓝鲸智云PaaS平台社区版 (BlueKing PaaS Community
+Edition) available.
+Copyright (C) 2017-2021 THL A29 Limited, a Tencent company. All rights reserved.
+Licensed under the MIT License (the "License"); you may not use this file except in compliance with the License.
+You may obtain a copy of the License at
+http://opensource.org/licenses/MIT
+Unless required by applicable law or agreed to in writing, software distributed under the License is distributed on
+an "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the License for the
+specific language governing permissions and limitations under the License.
+"""
+
+import hashlib
+
+from django.conf import settings
+
+from bamboo_engine import metrics
+from bamboo_engine.utils.collections import LRUCache
+
+from pipeline.eri.models import Payload
+
+# 被转存的数据在原字段中只保存该前缀加上内容摘要，JSON 与 base64 编码的 pickle 数据都不可能以该前缀开头
+PAYLOAD_REF_PREFIX = "ref:"
+
+# 转存数据内容不可变，按照摘要缓存最近读取的数据，权重为数据长度
+PAYLOAD_CACHE = LRUCache(256, max_weight=32 * 1024 * 1024)
+
+
+def payload_digest(value: str) -> str:
+    return hashlib.sha1(value.encode("utf-8")).hexdigest()
+
+
+def is_payload_ref(value: str) -> bool:
+    return value.startswith(PAYLOAD_REF_PREFIX)
+
+
+def offload_payload(node_id: str, value: str, digest: str = None) -> str:
+    """
+    长度超过 BAMBOO_DJANGO_ERI_PAYLOAD_OFFLOAD_THRESHOLD 的数据会按照内容摘要存储到 Payload 中，
+    同一节点中内容相同的数据只会存储一次
+
+    :param node_id: 节点 ID
+    :type node_id: str
+    :param value: 序列化后的数据
+    :type value: str
+    :param digest: 数据摘要，为 None 时根据 value 计算
+    :type digest: str
+    :return: 需要写入原字段的内容，未超过阈值时为 value 本身，否则为数据引用
+    :rtype: str
+    """
+    threshold = int(getattr(settings, "BAMBOO_DJANGO_ERI_PAYLOAD_OFFLOAD_THRESHOLD", 0))
+    if threshold <= 0 or len(value) <= threshold:
+        return value
+
+    digest = digest or payload_digest(value)
+    _, created = Payload.objects.get_or_create(
+        node_id=node_id, digest=digest, defaults={"data": value, "size": len(value)}
+    )
+    if created:
+        metrics.ENGINE_RUNTIME_PAYLOAD_OFFLOADED.inc()
+    return PAYLOAD_REF_PREFIX + digest
+
+
+def resolve_payload(value: str) -> str:
+    """
+    将数据引用还原为被转存的数据，非引用的内容原样返回
+
+    :param value: 字段中的内容
+    :type value: str
+    :return: 序列化后的数据
+    :rtype: str
+    """
+    if not is_payload_ref(value):
+        return value
+
+    digest = value[len(PAYLOAD_REF_PREFIX) :]
+    data = PAYLOAD_CACHE.get(digest)
+    if data is not None:
+        return data
+
+    data = Payload.objects.filter(digest=digest).values_list("data", flat=True).first()
+    if data is None:
+        raise ValueError("payload({}) not found".format(digest))
+
+    PAYLOAD_CACHE.set(digest, data, weight=len(data))
+    return data
@@ -0,0 +1,316 @@
+# -*- coding: utf-8 -*-
+"""
+Tencent is pleased to support the open source community by making 蓝鲸智云PaaS平台社区版 (BlueKing PaaS Community
+Edition) available.
+Copyright (C) 2017-2021 THL A29 Limited, a Tencent company. All rights reserved.
+Licensed under the MIT License (the "License"); you may not use this file except in compliance with the License.
+You may obtain a copy of the License at
+http://opensource.org/licenses/MIT
+Unless required by applicable law or agreed to in writing, software distributed under the License is distributed on
+an "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the License for the
+specific language governing permissions and limitations under the License.
+"""
+
+import logging
+import time
+from datetime import timedelta
+from typing import List, Optional
+
+from django.conf import settings
+from django.db.models import F
+from django.utils import timezone
+
+from bamboo_engine import states
+
+from pipeline.eri.archive import delete_archive
+from pipeline.eri.models import (
+    CallbackData,
+    ContextOutputs,
+    ContextValue,
+    Data,
+    ExecutionData,
+    ExecutionHistory,
+    LogChunk,
+    LogEntry,
+    Node,
+    Payload,
+    PipelineArchive,
+    Process,
+    RetentionCheckpoint,
+    RetentionPendingRoot,
+    Schedule,
+    State,
+)
+
+logger = logging.getLogger("root")
+
+# 可以被清理的根流程状态
+RETENTION_STATES = frozenset([states.FINISHED, states.REVOKED])
+
+# 节点维度的键：流程中所有节点（包括子流程）的 ID
+KEY_NODES = "nodes"
+# 根流程维度的键：根流程 ID
+KEY_ROOT = "root"
+
+# 按照清理顺序排列的数据表，State 中的根流程状态最后删除，保证中断后重新执行时仍能找到该流程的所有节点
+RETENTION_TABLES = [
+    (LogEntry, "node_id", KEY_NODES),
+    (LogChunk, "node_id", KEY_NODES),
+    (ExecutionHistory, "node_id", KEY_NODES),
+    (CallbackData, "node_id", KEY_NODES),
+    (Schedule, "node_id", KEY_NODES),
+    (ExecutionData, "node_id", KEY_NODES),
+    (Data, "node_id", KEY_NODES),
+    (Payload, "node_id", KEY_NODES),
+    (ContextValue, "pipeline_id", KEY_NODES),
+    (ContextOutputs, "pipeline_id", KEY_NODES),
+    (Process, "root_pipeline_id", KEY_ROOT),
+    (Node, "root_pipeline_id", KEY_ROOT),
+    (PipelineArchive, "root_id", KEY_ROOT),
+    (State, "root_id", KEY_ROOT),
+]
+
+
+class RetentionSweeper:
+    """
+    ERI 数据清理器，删除完成或撤销时间超过 BAMBOO_DJANGO_ERI_RETENTION_DAYS 天的根流程在各个数据表中的记录
+
+    清理器按照主键顺序分段扫描 State 表中的根流程状态，每个数据表按照主键范围分批删除，每批最多
+    BAMBOO_DJANGO_ERI_RETENTION_BATCH_SIZE 行，并根据 BAMBOO_DJANGO_ERI_RETENTION_ROWS_PER_SECOND 限制删除速率；
+    扫描位置与删除进度会记录在 RetentionCheckpoint 中，中断后再次执行时会从上次的位置继续
+
+    创建时间已经超过保留天数但仍未完成的流程会被跳过并记录到 RetentionPendingRoot 中，扫描位置照常向后推进；
+    每轮清理开始时会按照 RetentionCheckpoint.pending_cursor 轮流复查最多 scan_size 个被跳过的流程，
+    其中已经完成且超过保留天数的流程会在此时被清理；长期无法完成的流程可以手动调用 clean_pipeline 进行清理
+    """
+
+    def __init__(
+        self,
+        name: str = "default",
+        days: Optional[int] = None,
+        batch_size: Optional[int] = None,
+        rows_per_second: Optional[int] = None,
+        pipelines_per_run: Optional[int] = None,
+        scan_size: Optional[int] = None,
+        key_chunk_size: Optional[int] = None,
+    ):
+        self.name = name
+        self.days = days if days is not None else int(getattr(settings, "BAMBOO_DJANGO_ERI_RETENTION_DAYS", 30))
+        self.batch_size = batch_size or int(getattr(settings, "BAMBOO_DJANGO_ERI_RETENTION_BATCH_SIZE", 500))
+        self.rows_per_second = (
+            rows_per_second
+            if rows_per_second is not None
+            else int(getattr(settings, "BAMBOO_DJANGO_ERI_RETENTION_ROWS_PER_SECOND", 5000))
+        )
+        self.pipelines_per_run = pipelines_per_run or int(
+            getattr(settings, "BAMBOO_DJANGO_ERI_RETENTION_PIPELINES_PER_RUN", 100)
+        )
+        self.scan_size = scan_size or int(getattr(settings, "BAMBOO_DJANGO_ERI_RETENTION_SCAN_SIZE", 1000))
+        self.key_chunk_size = key_chunk_size or int(
+            getattr(settings, "BAMBOO_DJANGO_ERI_RETENTION_KEY_CHUNK_SIZE", 500)
+        )
+        self.deleted = 0
+
+    def _throttle(self, deleted: int):
+        if self.rows_per_second > 0 and deleted > 0:
+            time.sleep(deleted / self.rows_per_second)
+
+    def _pipeline_node_ids(self, root_id: str) -> List[str]:
+        node_ids = set(Node.objects.filter(root_pipeline_id=root_id).values_list("node_id", flat=True))
+        node_ids.update(State.objects.filter(root_id=root_id).values_list("node_id", flat=True))
+        node_ids.add(root_id)
+        # 保证中断后重新计算出的分片与记录的 key_offset 一致
+        return sorted(node_ids)
+
+    def _delete_range(self, model, field: str, keys: List[str], checkpoint: RetentionCheckpoint) -> bool:
+        """
+        删除 keys 对应的一批记录，每次删除后更新检查点
+
+        :param model: 数据表模型
+        :type model: Model
+        :param field: 键字段名
+        :type field: str
+        :param keys: 当前分片中的键
+        :type keys: List[str]
+        :param checkpoint: 检查点
+        :type checkpoint: RetentionCheckpoint
+        :return: 是否还有剩余记录
+        :rtype: bool
+        """
+        lookup = {"{}__in".format(field): keys}
+        pks = list(
+            model.objects.filter(id__gt=checkpoint.last_pk, **lookup)
+            .order_by("id")
+            .values_list("id", flat=True)[: self.batch_size]
+        )
+        if not pks:
+            return False
+
+        deleted, _ = model.objects.filter(id__gte=pks[0], id__lte=pks[-1], **lookup).delete()
+        checkpoint.last_pk = pks[-1]
+        checkpoint.save(update_fields=["last_pk", "updated_time"])
+
+        self.deleted += deleted
+        self._throttle(deleted)
+        return len(pks) == self.batch_size
+
+    def _clean(self, checkpoint: RetentionCheckpoint):
+        root_id = checkpoint.root_id
+        node_ids = self._pipeline_node_ids(root_id)
+        tables = [model._meta.model_name for model, _, _ in RETENTION_TABLES]
+        start = tables.index(checkpoint.table) if checkpoint.table in tables else 0
+
+        # 归档文件不在数据库中，需要在删除归档记录前清理
+        delete_archive(root_id)
+
+        for model, field, key_type in RETENTION_TABLES[start:]:
+            if checkpoint.table != model._meta.model_name:
+                checkpoint.table = model._meta.model_name
+                checkpoint.key_offset = 0
+                checkpoint.last_pk = 0
+                checkpoint.save(update_fields=["table", "key_offset", "last_pk", "updated_time"])
+
+            keys = node_ids if key_type == KEY_NODES else [root_id]
+            while checkpoint.key_offset < len(keys):
+                chunk = keys[checkpoint.key_offset : checkpoint.key_offset + self.key_chunk_size]
+                while self._delete_range(model, field, chunk, checkpoint):
+                    pass
+                checkpoint.key_offset += self.key_chunk_size
+                checkpoint.last_pk = 0
+                checkpoint.save(update_fields=["key_offset", "last_pk", "updated_time"])
+
+        RetentionPendingRoot.objects.filter(root_id=root_id).delete()
+
+        checkpoint.root_id = ""
+        checkpoint.table = ""
+        checkpoint.key_offset = 0
+        checkpoint.last_pk = 0
+        checkpoint.save(update_fields=["root_id", "table", "key_offset", "last_pk", "updated_time"])
+
+    def _cleanable(self, name: str, archived_time, cutoff) -> bool:
+        return name in RETENTION_STATES and (archived_time is None or archived_time < cutoff)
+
+    def _recheck_pending(self, checkpoint: RetentionCheckpoint, cutoff, limit: int) -> int:
+        """
+        复查之前被跳过的未完成流程，清理其中已经完成且超过保留天数的流程
+
+        :param checkpoint: 检查点
+        :type checkpoint: RetentionCheckpoint
+        :param cutoff: 保留时间的截止点
+        :type cutoff: datetime
+        :param limit: 本次最多清理的流程数
+        :type limit: int
+        :return: 清理的流程数
+        :rtype: int
+        """
+        pending = list(
+            RetentionPendingRoot.objects.filter(name=self.name, id__gt=checkpoint.pending_cursor)
+            .order_by("id")
+            .values_list("id", "root_id")[: self.scan_size]
+        )
+        # 复查到末尾后下次从头开始
+        pending_cursor = pending[-1][0] if len(pending) == self.scan_size else 0
+        roots = {
+            node_id: (name, archived_time)
+            for node_id, name, archived_time in State.objects.filter(
+                node_id__in=[root_id for _, root_id in pending], node_id=F("root_id")
+            ).values_list("node_id", "name", "archived_time")
+        }
+
+        cleaned = 0
+        for pending_id, root_id in pending:
+            if root_id not in roots:
+                # 流程已经被手动清理
+                RetentionPendingRoot.objects.filter(id=pending_id).delete()
+                continue
+
+            if self._cleanable(*roots[root_id], cutoff):
+                if cleaned >= limit:
+                    pending_cursor = pending_id - 1
+                    break
+                checkpoint.root_id = root_id
+                checkpoint.save(update_fields=["root_id", "updated_time"])
+                self._clean(checkpoint)
+                cleaned += 1
+
+        checkpoint.pending_cursor = pending_cursor
+        checkpoint.save(update_fields=["pending_cursor", "updated_time"])
+        return cleaned
+
+    def clean_pipeline(self, root_id: str):
+        """
+        清理某个根流程的所有数据，不检查流程状态与保留时间
+
+        :param root_id: 根流程 ID
+        :type root_id: str
+        """
+        checkpoint, _ = RetentionCheckpoint.objects.get_or_create(name="{}:{}".format(self.name, root_id)[:64])
+        checkpoint.root_id = root_id
+        self._clean(checkpoint)
+        checkpoint.delete()
+
+    def run(self) -> dict:
+        """
+        执行一轮清理，最多清理 pipelines_per_run 个根流程
+
+        :return: 本轮清理的流程数、跳过的流程数以及删除的行数
+        :rtype: dict
+        """
+        self.deleted = 0
+        cleaned = 0
+        skipped = 0
+        cutoff = timezone.now() - timedelta(days=self.days)
+        checkpoint, _ = RetentionCheckpoint.objects.get_or_create(name=self.name)
+
+        # 继续上次中断的清理
+        if checkpoint.root_id:
+            self._clean(checkpoint)
+            cleaned += 1
+
+        cleaned += self._recheck_pending(checkpoint, cutoff, self.pipelines_per_run - cleaned)
+
+        cursor = checkpoint.scan_cursor
+        reached_end = False
+        while cleaned < self.pipelines_per_run and not reached_end:
+            roots = list(
+                State.objects.filter(id__gt=cursor, node_id=F("root_id"))
+                .order_by("id")
+                .values_list("id", "node_id", "name", "created_time", "archived_time")[: self.scan_size]
+            )
+            reached_end = len(roots) < self.scan_size
+
+            for state_id, root_id, name, created_time, archived_time in roots:
+                if created_time >= cutoff:
+                    reached_end = True
+                    break
+
+                if name not in RETENTION_STATES:
+                    _, created = RetentionPendingRoot.objects.get_or_create(name=self.name, root_id=root_id)
+                    if created:
+                        logger.info("[RetentionSweeper] skip unfinished pipeline %s(%s)", root_id, name)
+                        skipped += 1
+                elif self._cleanable(name, archived_time, cutoff):
+                    checkpoint.root_id = root_id
+                    checkpoint.scan_cursor = state_id
+                    checkpoint.save(update_fields=["root_id", "scan_cursor", "updated_time"])
+                    self._clean(checkpoint)
+                    cleaned += 1
+                else:
+                    # 完成时间还在保留期内，下次从这里继续扫描
+                    reached_end = True
+                    break
+
+                cursor = state_id
+                if cleaned >= self.pipelines_per_run:
+                    break
+
+            checkpoint.scan_cursor = cursor
+            checkpoint.save(update_fields=["scan_cursor", "updated_time"])
+
+        logger.info(
+            "[RetentionSweeper] %s pipelines cleaned, %s pipelines skipped, %s rows deleted",
+            cleaned,
+            skipped,
+            self.deleted,
+        )
+        return {"cleaned": cleaned, "skipped": skipped, "deleted": self.deleted}
@@ -12,7 +12,8 @@ specific language governing permissions and limitations under the License.
 """
 
 import json
-from typing import Optional, List
+from itertools import chain
+from typing import Iterator, Optional, List, Union
 
 from django.conf import settings
 from django.db import transaction
@@ -35,9 +36,11 @@ from pipeline.eri.imp.data import DataMixin
 from pipeline.eri.imp.context import ContextMixin
 from pipeline.eri.imp.execution_history import ExecutionHistoryMixin
 from pipeline.eri.imp.task import TaskMixin
+from pipeline.eri.imp.archive import ArchiveMixin
 from pipeline.eri.celery.queues import QueueResolver
+from pipeline.eri.log import read_log_lines
 
-from pipeline.eri.models import Node, Data, ContextValue, Process, ContextOutputs, LogEntry, ExecutionHistory, State
+from pipeline.eri.models import Node, Data, ContextValue, Process, ContextOutputs, ExecutionHistory, State
 
 
 class BambooDjangoRuntime(
@@ -51,6 +54,7 @@ class BambooDjangoRuntime(
     ProcessMixin,
     PipelinePluginManagerMixin,
     HooksMixin,
+    ArchiveMixin,
     EngineRuntimeInterface,
 ):
     CONTEXT_VALUE_TYPE_MAP = {
@@ -106,6 +110,7 @@ class BambooDjangoRuntime(
     def _gen_executable_end_event_node(self, event: dict, pipeline: dict, root_id: str, parent_id: str) -> Node:
         return Node(
             node_id=event["id"],
+            root_pipeline_id=root_id,
             detail=json.dumps(
                 {
                     "id": event["id"],
@@ -123,6 +128,7 @@ class BambooDjangoRuntime(
     def _gen_event_node(self, event: dict, pipeline: dict, root_id: str, parent_id: str) -> Node:
         return Node(
             node_id=event["id"],
+            root_pipeline_id=root_id,
             detail=json.dumps(
                 {
                     "id": event["id"],
@@ -184,11 +190,12 @@ class BambooDjangoRuntime(
         else:
             raise ValueError("unsupport gateway type {}: {}".format(gateway["type"], gateway))
 
-        return Node(node_id=gateway["id"], detail=json.dumps(detail))
+        return Node(node_id=gateway["id"], root_pipeline_id=root_id, detail=json.dumps(detail))
 
     def _gen_activity_node(self, act: dict, pipeline: dict, root_id: str, parent_id: str) -> Node:
         return Node(
             node_id=act["id"],
+            root_pipeline_id=root_id,
             detail=json.dumps(
                 {
                     "id": act["id"],
@@ -209,6 +216,7 @@ class BambooDjangoRuntime(
     def _gen_subproc_node(self, subproc: dict, pipeline: dict, root_id: str, parent_id: str) -> Node:
         return Node(
             node_id=subproc["id"],
+            root_pipeline_id=root_id,
             detail=json.dumps(
                 {
                     "id": subproc["id"],
@@ -223,16 +231,17 @@ class BambooDjangoRuntime(
             ),
         )
 
-    def _prepare(
+    def _iter_prepare(
         self, pipeline: dict, root_id: str, subprocess_context: dict, parent_id: Optional[str] = None
-    ) -> (List[Node], List[Data], List[ContextValue], List[ContextOutputs]):
+    ) -> Iterator[Union[Node, Data, ContextValue, ContextOutputs]]:
+        """
+        逐个生成流程中的节点，数据及上下文对象，节点及数据对象生成后立即返回，
+        属于当前流程的上下文变量需要在流程处理完成后计算引用关系，因此在当前流程处理完成后返回
+        """
 
         parent_id = parent_id or root_id
 
-        nodes = []
-        datas = []
         context_values = []
-        context_outputs = []
 
         node_outputs = {}
         context_var_references = {}
@@ -264,29 +273,25 @@ class BambooDjangoRuntime(
 
         # pre_render_keys in start_event
         if "pre_render_keys" in pipeline["data"] and pipeline["data"]["pre_render_keys"]:
-            datas.append(
-                Data(
-                    node_id=pipeline["start_event"]["id"],
-                    inputs=codec.data_json_dumps(
-                        {"pre_render_keys": {"need_render": False, "value": pipeline["data"]["pre_render_keys"]}}
-                    ),
-                    outputs={},
-                )
+            yield Data(
+                node_id=pipeline["start_event"]["id"],
+                inputs=codec.data_json_dumps(
+                    {"pre_render_keys": {"need_render": False, "value": pipeline["data"]["pre_render_keys"]}}
+                ),
+                outputs={},
             )
 
         # process activities
         for act in pipeline["activities"].values():
             if act["type"] == NodeType.ServiceActivity.value:
                 # node
-                nodes.append(self._gen_activity_node(act=act, pipeline=pipeline, root_id=root_id, parent_id=parent_id))
+                yield self._gen_activity_node(act=act, pipeline=pipeline, root_id=root_id, parent_id=parent_id)
                 # data
                 data_inputs, compute_cvs = self._data_inputs_assemble(parent_id, act["id"], act["component"]["inputs"])
-                datas.append(
-                    Data(
-                        node_id=act["id"],
-                        inputs=codec.data_json_dumps(data_inputs),
-                        outputs=json.dumps(node_outputs.get(act["id"], {})),
-                    )
+                yield Data(
+                    node_id=act["id"],
+                    inputs=codec.data_json_dumps(data_inputs),
+                    outputs=json.dumps(node_outputs.get(act["id"], {})),
                 )
                 # compute context values
                 for cv in compute_cvs:
@@ -296,17 +301,13 @@ class BambooDjangoRuntime(
 
             elif act["type"] == NodeType.SubProcess.value:
                 # node
-                nodes.append(
-                    self._gen_subproc_node(subproc=act, pipeline=pipeline, root_id=root_id, parent_id=parent_id)
-                )
+                yield self._gen_subproc_node(subproc=act, pipeline=pipeline, root_id=root_id, parent_id=parent_id)
                 # data
                 data_inputs, compute_cvs = self._data_inputs_assemble(parent_id, act["id"], act["params"])
-                datas.append(
-                    Data(
-                        node_id=act["id"],
-                        inputs=codec.data_json_dumps(data_inputs),
-                        outputs=json.dumps(node_outputs.get(act["id"], {})),
-                    )
+                yield Data(
+                    node_id=act["id"],
+                    inputs=codec.data_json_dumps(data_inputs),
+                    outputs=json.dumps(node_outputs.get(act["id"], {})),
                 )
                 # compute context values
                 for cv in compute_cvs:
@@ -315,60 +316,45 @@ class BambooDjangoRuntime(
                     context_var_references[cv.key] = Template(cv.value).get_reference()
 
                 # subprocess output
-                context_outputs.append(
-                    ContextOutputs(pipeline_id=act["id"], outputs=json.dumps(act["pipeline"]["data"]["outputs"]))
-                )
+                yield ContextOutputs(pipeline_id=act["id"], outputs=json.dumps(act["pipeline"]["data"]["outputs"]))
 
                 # subprocess preset context
                 for key, value in subprocess_context.items():
                     serialized, serializer = self._serialize(value)
-                    context_values.append(
-                        ContextValue(
-                            pipeline_id=act["id"],
-                            key=key,
-                            type=self.CONTEXT_VALUE_TYPE_MAP["plain"],
-                            serializer=serializer,
-                            value=serialized,
-                            references="[]",
-                        )
+                    yield ContextValue(
+                        pipeline_id=act["id"],
+                        key=key,
+                        type=self.CONTEXT_VALUE_TYPE_MAP["plain"],
+                        serializer=serializer,
+                        value=serialized,
+                        references="[]",
                     )
 
-                sub_nodes, sub_datas, sub_ctx_values, sub_ctx_outputs = self._prepare(
+                yield from self._iter_prepare(
                     pipeline=act["pipeline"],
                     root_id=root_id,
                     subprocess_context=subprocess_context,
                     parent_id=act["id"],
                 )
-
-                nodes.extend(sub_nodes)
-                datas.extend(sub_datas)
-                context_values.extend(sub_ctx_values)
-                context_outputs.extend(sub_ctx_outputs)
             else:
                 raise ValueError("unsupport act type {}: {}".format(act["type"], act["id"]))
 
         # process events
-        nodes.append(
-            self._gen_event_node(event=pipeline["start_event"], pipeline=pipeline, root_id=root_id, parent_id=parent_id)
+        yield self._gen_event_node(
+            event=pipeline["start_event"], pipeline=pipeline, root_id=root_id, parent_id=parent_id
         )
         if pipeline["end_event"]["type"] == NodeType.EmptyEndEvent.value:
-            nodes.append(
-                self._gen_event_node(
-                    event=pipeline["end_event"], pipeline=pipeline, root_id=root_id, parent_id=parent_id
-                )
+            yield self._gen_event_node(
+                event=pipeline["end_event"], pipeline=pipeline, root_id=root_id, parent_id=parent_id
             )
         else:
-            nodes.append(
-                self._gen_executable_end_event_node(
-                    event=pipeline["end_event"], pipeline=pipeline, root_id=root_id, parent_id=parent_id
-                )
+            yield self._gen_executable_end_event_node(
+                event=pipeline["end_event"], pipeline=pipeline, root_id=root_id, parent_id=parent_id
             )
 
         # process gateways
         for gateway in pipeline["gateways"].values():
-            nodes.append(
-                self._gen_gateway_node(gateway=gateway, pipeline=pipeline, root_id=root_id, parent_id=parent_id)
-            )
+            yield self._gen_gateway_node(gateway=gateway, pipeline=pipeline, root_id=root_id, parent_id=parent_id)
 
         # resolve final references (BFS)
         # convert a:b, b:c,d -> a:b,c,d b:c,d
@@ -388,15 +374,124 @@ class BambooDjangoRuntime(
                     queue.extend(context_var_references[r])
 
         for cv in context_values:
-            if cv.pipeline_id != parent_id:
-                continue
             fr = final_references.get(cv.key)
             cv.references = json.dumps(list(fr)) if fr else "[]"
+            yield cv
 
         if parent_id == root_id:
-            context_outputs.append(ContextOutputs(pipeline_id=root_id, outputs=json.dumps(pipeline["data"]["outputs"])))
+            yield ContextOutputs(pipeline_id=root_id, outputs=json.dumps(pipeline["data"]["outputs"]))
 
-        return nodes, datas, context_values, context_outputs
+    def _prepare(
+        self,
+        pipeline: dict,
+        root_id: str,
+        subprocess_context: dict,
+        parent_id: Optional[str] = None,
+    ) -> (List[Node], List[Data], List[ContextValue], List[ContextOutputs]):
+        rows = {Node: [], Data: [], ContextValue: [], ContextOutputs: []}
+        for row in self._iter_prepare(
+            pipeline=pipeline, root_id=root_id, subprocess_context=subprocess_context, parent_id=parent_id
+        ):
+            rows[type(row)].append(row)
+
+        return rows[Node], rows[Data], rows[ContextValue], rows[ContextOutputs]
+
+    def _iter_root_rows(
+        self, pipeline_id: str, root_pipeline_data: dict, root_pipeline_context: dict
+    ) -> Iterator[Union[Data, ContextValue]]:
+        yield Data(
+            node_id=pipeline_id,
+            inputs=codec.data_json_dumps(
+                {k: {"need_render": False, "value": v} for k, v in root_pipeline_data.items()}
+            ),
+            outputs="{}",
+        )
+        for key, value in root_pipeline_context.items():
+            serialized, serializer = self._serialize(value)
+            yield ContextValue(
+                pipeline_id=pipeline_id,
+                key=key,
+                type=self.CONTEXT_VALUE_TYPE_MAP["plain"],
+                serializer=serializer,
+                value=serialized,
+                references="[]",
+            )
+
+    def _streaming_prepare_run_pipeline(
+        self,
+        pipeline: dict,
+        root_pipeline_data: dict,
+        root_pipeline_context: dict,
+        subprocess_context: dict,
+        queue: str,
+        priority: int,
+        batch_size: int,
+    ) -> int:
+        """
+        流式准备流程数据，只有进程及根流程状态的创建在事务中完成，此时进程被标记为未准备完成；
+        节点，数据及上下文对象由生成器逐个产生，每种对象累积 batch_size 个后在事务外批量写入，全部写入后再将进程标记为准备完成
+
+        写入过程中出现异常时会删除本次已经写入的进程，根流程状态，节点，数据及上下文对象后重新抛出异常，
+        避免残留的数据导致该流程 ID 无法再次执行
+        """
+        pipeline_id = pipeline["id"]
+
+        rows = self._iter_prepare(pipeline=pipeline, root_id=pipeline_id, subprocess_context=subprocess_context)
+        rows = chain(rows, self._iter_root_rows(pipeline_id, root_pipeline_data, root_pipeline_context))
+
+        with transaction.atomic():
+            pid = Process.objects.create(
+                root_pipeline_id=pipeline_id,
+                queue=queue,
+                priority=priority,
+                pipeline_stack='["{}"]'.format(pipeline_id),
+                ready=False,
+            ).id
+            self.set_state(
+                node_id=pipeline_id, to_state=states.RUNNING, root_id=pipeline_id, parent_id="", set_started_time=True,
+            )
+
+        # 只记录写入成功的数据节点 ID 及上下文所属的流程 ID，清理时不会误删其他流程的数据
+        written_data_nodes = set()
+        written_pipelines = set()
+
+        def flush(model, chunk):
+            model.objects.bulk_create(chunk, batch_size=batch_size)
+            if model is Data:
+                written_data_nodes.update(row.node_id for row in chunk)
+            elif model is not Node:
+                written_pipelines.update(row.pipeline_id for row in chunk)
+
+        try:
+            chunks = {Node: [], Data: [], ContextValue: [], ContextOutputs: []}
+            for row in rows:
+                model = type(row)
+                chunks[model].append(row)
+                if len(chunks[model]) >= batch_size:
+                    flush(model, chunks[model])
+                    chunks[model] = []
+
+            for model, chunk in chunks.items():
+                if chunk:
+                    flush(model, chunk)
+
+            Process.objects.filter(id=pid).update(ready=True)
+        except Exception:
+            self._clean_streaming_prepare(pid, pipeline_id, written_data_nodes, written_pipelines, batch_size)
+            raise
+
+        return pid
+
+    def _clean_streaming_prepare(self, pid: int, pipeline_id: str, data_nodes: set, pipelines: set, batch_size: int):
+        with transaction.atomic():
+            Node.objects.filter(root_pipeline_id=pipeline_id).delete()
+            data_nodes = list(data_nodes)
+            for i in range(0, len(data_nodes), batch_size):
+                Data.objects.filter(node_id__in=data_nodes[i : i + batch_size]).delete()
+            ContextValue.objects.filter(pipeline_id__in=pipelines).delete()
+            ContextOutputs.objects.filter(pipeline_id__in=pipelines).delete()
+            State.objects.filter(node_id=pipeline_id).delete()
+            Process.objects.filter(id=pid).delete()
 
     def prepare_run_pipeline(
         self, pipeline: dict, root_pipeline_data: dict, root_pipeline_context: dict, subprocess_context: dict, **options
@@ -409,6 +504,8 @@ class BambooDjangoRuntime(
         - 准备好流程中每个节点的信息
         - 准备好流程中每个节点数据对象的信息
 
+        配置了 BAMBOO_DJANGO_ERI_PREPARE_STREAMING 时使用流式准备，避免大流程一次性生成所有对象并在一个长事务中写入
+
         :param pipeline: pipeline 描述对象
         :type pipeline: dict
         :param root_pipeline_data 根流程数据
@@ -424,32 +521,27 @@ class BambooDjangoRuntime(
         queue = options.get("queue", "")
         priority = options.get("priority", 100)
         pipeline_id = pipeline["id"]
+        batch_size = getattr(settings, "BAMBOO_DJANGO_ERI_PREPARE_BATCH_SIZE", 500)
+
+        if getattr(settings, "BAMBOO_DJANGO_ERI_PREPARE_STREAMING", False):
+            return self._streaming_prepare_run_pipeline(
+                pipeline=pipeline,
+                root_pipeline_data=root_pipeline_data,
+                root_pipeline_context=root_pipeline_context,
+                subprocess_context=subprocess_context,
+                queue=queue,
+                priority=priority,
+                batch_size=batch_size,
+            )
 
         nodes, datas, context_values, context_outputs = self._prepare(
             pipeline=pipeline, root_id=pipeline["id"], subprocess_context=subprocess_context
         )
-        datas.append(
-            Data(
-                node_id=pipeline_id,
-                inputs=codec.data_json_dumps(
-                    {k: {"need_render": False, "value": v} for k, v in root_pipeline_data.items()}
-                ),
-                outputs="{}",
-            )
-        )
-        for key, value in root_pipeline_context.items():
-            serialized, serializer = self._serialize(value)
-            context_values.append(
-                ContextValue(
-                    pipeline_id=pipeline_id,
-                    key=key,
-                    type=self.CONTEXT_VALUE_TYPE_MAP["plain"],
-                    serializer=serializer,
-                    value=serialized,
-                    references="[]",
-                )
-            )
-        batch_size = getattr(settings, "BAMBOO_DJANGO_ERI_PREPARE_BATCH_SIZE", 500)
+        for row in self._iter_root_rows(pipeline_id, root_pipeline_data, root_pipeline_context):
+            if isinstance(row, Data):
+                datas.append(row)
+            else:
+                context_values.append(row)
 
         with transaction.atomic():
             pid = Process.objects.create(
@@ -502,7 +594,19 @@ class BambooDjangoRuntime(
                     )
                     queue.declare(channel=channel)
 
-    def get_plain_log_for_node(self, node_id: str, history_id: int = -1) -> str:
+    def _get_log_version(self, node_id: str, history_id: int) -> Optional[str]:
+        if history_id != -1:
+            qs = ExecutionHistory.objects.filter(id=history_id).only("version")
+        else:
+            qs = State.objects.filter(node_id=node_id).only("version")
+
+        if not qs:
+            return None
+        return qs.first().version
+
+    def get_plain_log_for_node(
+        self, node_id: str, history_id: int = -1, offset: int = 0, limit: Optional[int] = None
+    ) -> str:
         """
         读取某个节点某一次执行的日志
 
@@ -510,20 +614,31 @@ class BambooDjangoRuntime(
         :type node_id: str
         :param history_id: 执行历史 ID, -1 表示获取最新日志
         :type history_id: int, optional
+        :param offset: 起始行，负数表示从末尾倒数, defaults to 0
+        :type offset: int, optional
+        :param limit: 最大读取行数，None 表示读取全部日志, defaults to None
+        :type limit: Optional[int], optional
         :return: 节点日志
         :rtype: str
         """
-        if history_id != -1:
-            qs = ExecutionHistory.objects.filter(id=history_id).only("version")
-        else:
-            qs = State.objects.filter(node_id=node_id).only("version")
+        version = self._get_log_version(node_id, history_id)
+        if version is None:
+            return ""
+        return "\n".join(read_log_lines(node_id=node_id, version=version, offset=offset, limit=limit))
 
-        if not qs:
+    def tail_plain_log_for_node(self, node_id: str, lines: int, history_id: int = -1) -> str:
+        """
+        读取某个节点某一次执行的最后若干行日志
+
+        :param node_id: 节点 ID
+        :type node_id: str
+        :param lines: 读取行数
+        :type lines: int
+        :param history_id: 执行历史 ID, -1 表示获取最新日志
+        :type history_id: int, optional
+        :return: 节点日志
+        :rtype: str
+        """
+        if lines <= 0:
             return ""
-        version = qs.first().version
-        return "\n".join(
-            [
-                e.message
-                for e in LogEntry.objects.order_by("id").filter(node_id=node_id, version=version).only("message")
-            ]
-        )
+        return self.get_plain_log_for_node(node_id=node_id, history_id=history_id, offset=-lines)
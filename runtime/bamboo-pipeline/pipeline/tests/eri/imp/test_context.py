@@ -12,7 +12,8 @@ specific language governing permissions and limitations under the License.
 """
 import json
 
-from django.test import TransactionTestCase
+from mock import MagicMock, patch
+from django.test import TransactionTestCase, override_settings
 
 from bamboo_engine.eri import ContextValue, ContextValueType
 
@@ -103,6 +104,45 @@ class ContextMixinTestCase(TransactionTestCase):
         )
         self.assertEqual(references, {"${var_1}", "${var_2}", "${var_3}"})
 
+    def test_resolve_context(self):
+        with self.assertNumQueries(1):
+            context_values = self.mixin.resolve_context(self.pipeline_id, {"${var_1}", "${var_2}", "${var_4}"})
+        self.assertEqual({cv.key for cv in context_values}, {"${var_1}", "${var_2}", "${var_4}"})
+
+        with self.assertNumQueries(2):
+            context_values = self.mixin.resolve_context(self.pipeline_id, {"${var_4}"})
+        context_values = {cv.key: cv for cv in context_values}
+        self.assertEqual(set(context_values.keys()), {"${var_1}", "${var_2}", "${var_3}", "${var_4}"})
+        self.assertEqual(context_values["${var_3}"].type, ContextValueType.SPLICE)
+        self.assertEqual(context_values["${var_3}"].value, "${var_1}_${var_2}")
+        self.assertEqual(context_values["${var_4}"].type, ContextValueType.COMPUTE)
+        self.assertEqual(context_values["${var_4}"].value, {"attr1": "a", "attr2": "${var_3}"})
+        self.assertEqual(context_values["${var_4}"].code, "cv")
+
+        context_values = self.mixin.resolve_context(self.pipeline_id, {"${not_exist}"})
+        self.assertEqual(context_values, [])
+
+    @override_settings(BAMBOO_DJANGO_ERI_CONTEXT_SNAPSHOT=True)
+    def test_resolve_context__with_snapshot(self):
+        with self.mixin.context_snapshot(1):
+            with self.assertNumQueries(2):
+                context_values = self.mixin.resolve_context(self.pipeline_id, {"${var_3}", "${not_exist}"})
+            self.assertEqual({cv.key for cv in context_values}, {"${var_1}", "${var_2}", "${var_3}"})
+
+            with self.assertNumQueries(0):
+                context_values = self.mixin.resolve_context(self.pipeline_id, {"${var_1}", "${not_exist}"})
+            self.assertEqual({cv.key for cv in context_values}, {"${var_1}"})
+
+            update = {"${var_1}": ContextValue(key="${var_1}", type=ContextValueType.PLAIN, value="456")}
+            self.mixin.upsert_plain_context_values(self.pipeline_id, update)
+
+            with self.assertNumQueries(1):
+                context_values = self.mixin.resolve_context(self.pipeline_id, {"${var_1}"})
+            self.assertEqual(context_values[0].value, "456")
+
+        with self.assertNumQueries(1):
+            self.mixin.resolve_context(self.pipeline_id, {"${var_1}"})
+
     def test_get_context(self):
         context_values = self.mixin.get_context(self.pipeline_id)
         self.assertEqual(len(context_values), 4)
@@ -163,3 +203,25 @@ class ContextMixinTestCase(TransactionTestCase):
         self.assertEqual(context_values["${var_6}"].type, ContextValueType.PLAIN)
         self.assertEqual(context_values["${var_6}"].value, "6_val")
         self.assertIsNone(context_values["${var_6}"].code)
+
+    def test_upsert_plain_context_values__empty(self):
+        with self.assertNumQueries(0):
+            self.mixin.upsert_plain_context_values(self.pipeline_id, {})
+
+    def test_upsert_plain_context_values__not_support_bulk_upsert(self):
+        update = {
+            "${var_4}": ContextValue(key="${var_4}", type=ContextValueType.PLAIN, value="compute_val"),
+            "${var_5}": ContextValue(key="${var_5}", type=ContextValueType.PLAIN, value="5_val"),
+        }
+        with patch("pipeline.eri.imp.context.ContextMixin._support_bulk_upsert", MagicMock(return_value=False)):
+            self.mixin.upsert_plain_context_values(self.pipeline_id, update)
+
+        context_values = {cv.key: cv for cv in self.mixin.get_context(self.pipeline_id)}
+        self.assertEqual(len(context_values), 5)
+        self.assertEqual(context_values["${var_3}"].type, ContextValueType.SPLICE)
+        self.assertEqual(context_values["${var_4}"].type, ContextValueType.PLAIN)
+        self.assertEqual(context_values["${var_4}"].value, "compute_val")
+        self.assertIsNone(context_values["${var_4}"].code)
+        self.assertEqual(context_values["${var_5}"].type, ContextValueType.PLAIN)
+        self.assertEqual(context_values["${var_5}"].value, "5_val")
+        self.assertEqual(DBContextValue.objects.get(pipeline_id=self.pipeline_id, key="${var_4}").references, "[]")
@@ -12,7 +12,9 @@ specific language governing permissions and limitations under the License.
 """
 import json
 
-from django.test import TransactionTestCase
+from django.db import connection
+from django.test import TransactionTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
 
 from bamboo_engine import exceptions
 from bamboo_engine.eri import Data, DataInput, ExecutionData, CallbackData
@@ -21,6 +23,8 @@ from pipeline.eri.imp.data import DataMixin
 from pipeline.eri.models import Data as DBData
 from pipeline.eri.models import ExecutionData as DBExecutionData
 from pipeline.eri.models import CallbackData as DBCallbackData
+from pipeline.eri.models import Payload
+from pipeline.eri.payload import PAYLOAD_CACHE, PAYLOAD_REF_PREFIX
 from bamboo_engine.utils.string import unique_id
 
 
@@ -352,3 +356,47 @@ class DataMixinTestCase(TransactionTestCase):
         self.assertEqual(data.node_id, self.node_id)
         self.assertEqual(data.version, self.version)
         self.assertEqual(data.data, self.raw_callback_data)
+
+    def test_set_execution_data__skip_unchanged(self):
+        node_id = unique_id("n")
+        self.mixin.set_execution_data(node_id, ExecutionData(self.json_exec_data_inputs, self.json_exec_data_outputs))
+
+        with CaptureQueriesContext(connection) as ctx:
+            self.mixin.set_execution_data(
+                node_id, ExecutionData(self.json_exec_data_inputs, self.json_exec_data_outputs)
+            )
+        self.assertEqual(len(ctx.captured_queries), 1)
+
+        self.mixin.set_execution_data_outputs(node_id, {"changed": True})
+        data = self.mixin.get_execution_data(node_id)
+        self.assertEqual(data.inputs, self.json_exec_data_inputs)
+        self.assertEqual(data.outputs, {"changed": True})
+
+    @override_settings(BAMBOO_DJANGO_ERI_PAYLOAD_OFFLOAD_THRESHOLD=64)
+    def test_set_execution_data__offload(self):
+        PAYLOAD_CACHE.clear()
+        node_id = unique_id("n")
+        large_outputs = {"files": ["file_{}".format(i) for i in range(100)]}
+
+        self.mixin.set_execution_data(node_id, ExecutionData(self.json_exec_data_inputs, large_outputs))
+
+        data_model = DBExecutionData.objects.get(node_id=node_id)
+        self.assertFalse(data_model.inputs.startswith(PAYLOAD_REF_PREFIX))
+        self.assertTrue(data_model.outputs.startswith(PAYLOAD_REF_PREFIX))
+        self.assertEqual(Payload.objects.filter(node_id=node_id).count(), 1)
+        self.assertEqual(self.mixin.get_execution_data(node_id).outputs, large_outputs)
+        self.assertEqual(self.mixin.get_execution_data_outputs(node_id), large_outputs)
+
+        # 内容相同的数据只会存储一次
+        self.mixin.set_execution_data_outputs(node_id, {"small": 1})
+        self.mixin.set_execution_data_outputs(node_id, large_outputs)
+        self.assertEqual(Payload.objects.filter(node_id=node_id).count(), 1)
+        self.assertEqual(self.mixin.get_execution_data_outputs(node_id), large_outputs)
+
+    @override_settings(BAMBOO_DJANGO_ERI_PAYLOAD_OFFLOAD_THRESHOLD=64)
+    def test_callback_data__offload(self):
+        raw_callback_data = {"rows": list(range(100))}
+        data_id = self.mixin.set_callback_data(node_id=self.node_id, version=self.version, data=raw_callback_data)
+
+        self.assertTrue(DBCallbackData.objects.get(id=data_id).data.startswith(PAYLOAD_REF_PREFIX))
+        self.assertEqual(self.mixin.get_callback_data(data_id).data, raw_callback_data)
@@ -11,13 +11,16 @@ an "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express o
 specific language governing permissions and limitations under the License.
 """
 
+from mock import MagicMock, patch
 from django.utils import timezone
-from django.test import TransactionTestCase
+from django.test import TransactionTestCase, override_settings
 
+from bamboo_engine import states
 from bamboo_engine.eri import ExecutionHistory, ExecutionShortHistory
 
-from pipeline.eri.imp.execution_history import ExecutionHistoryMixin
+from pipeline.eri.imp.execution_history import DELTA_SERIALIZER_PREFIX, ExecutionHistoryMixin
 from pipeline.eri.models import ExecutionHistory as DBExecutionHistory
+from pipeline.eri.models import Process, State
 from bamboo_engine.utils.string import unique_id
 
 
@@ -253,3 +256,141 @@ class ExecutionHistoryMixinTestCase(TransactionTestCase):
         self.assertTrue(histories[0].skip)
         self.assertEqual(histories[0].retry, 3)
         self.assertEqual(histories[0].version, self.version)
+
+    def _add_loop_histories(self, count):
+        inputs = []
+        for loop in range(1, count + 1):
+            data = {"_loop": loop, "hosts": ["127.0.0.{}".format(i) for i in range(50)], "obj": Obj(1, 2)}
+            if loop == 3:
+                data.pop("hosts")
+            inputs.append(data)
+            self.mixin.add_history(
+                node_id=self.node_id,
+                started_time=self.started_time,
+                archived_time=self.archived_time,
+                loop=loop,
+                skip=False,
+                retry=0,
+                version=self.version,
+                inputs=data,
+                outputs={"_result": loop % 2 == 0},
+            )
+        return inputs
+
+    @override_settings(BAMBOO_DJANGO_ERI_HISTORY_DELTA=True, BAMBOO_DJANGO_ERI_HISTORY_SNAPSHOT_INTERVAL=3)
+    def test_add_history__delta(self):
+        inputs = self._add_loop_histories(7)
+
+        qs = DBExecutionHistory.objects.filter(node_id=self.node_id).order_by("id")
+        serializers = list(qs.values_list("inputs_serializer", flat=True))
+        # 每 3 条历史记录一次全量快照
+        self.assertEqual(
+            [s.startswith(DELTA_SERIALIZER_PREFIX) for s in serializers], [False, True, True, False, True, True, False]
+        )
+
+        histories = self.mixin.get_histories(self.node_id)
+        self.assertEqual([h.inputs for h in histories], inputs)
+        self.assertEqual([h.outputs for h in histories], [{"_result": loop % 2 == 0} for loop in range(1, 8)])
+
+        # 基准记录不在查询结果中时需要额外加载
+        histories = self.mixin.get_histories(self.node_id, loop=6)
+        self.assertEqual(len(histories), 1)
+        self.assertEqual(histories[0].inputs, inputs[5])
+
+    @override_settings(BAMBOO_DJANGO_ERI_HISTORY_DELTA=True)
+    def test_add_history__delta_keep_value_type(self):
+        outputs = [
+            {"_result": 1, "list": [1], "unchanged": "a"},
+            {"_result": True, "list": [True], "unchanged": "a"},
+            {"_result": 1.0, "list": [1.0], "unchanged": "a"},
+        ]
+        for loop, data in enumerate(outputs, 1):
+            self.mixin.add_history(
+                node_id=self.node_id,
+                started_time=self.started_time,
+                archived_time=self.archived_time,
+                loop=loop,
+                skip=False,
+                retry=0,
+                version=self.version,
+                inputs={},
+                outputs=data,
+            )
+
+        histories = self.mixin.get_histories(self.node_id)
+        self.assertEqual([h.outputs for h in histories], outputs)
+        for history, data in zip(histories, outputs):
+            self.assertIs(type(history.outputs["_result"]), type(data["_result"]))
+            self.assertIs(type(history.outputs["list"][0]), type(data["list"][0]))
+
+    @override_settings(BAMBOO_DJANGO_ERI_HISTORY_DELTA=True, BAMBOO_DJANGO_ERI_HISTORY_SNAPSHOT_INTERVAL=5)
+    def test_add_history__delta_load_chain_in_one_query(self):
+        inputs = self._add_loop_histories(4)
+
+        # 一次查询取出增量链，一次写入新记录
+        with self.assertNumQueries(2):
+            self.mixin.add_history(
+                node_id=self.node_id,
+                started_time=self.started_time,
+                archived_time=self.archived_time,
+                loop=5,
+                skip=False,
+                retry=0,
+                version=self.version,
+                inputs=dict(inputs[-1], loop=5),
+                outputs={},
+            )
+
+        histories = self.mixin.get_histories(self.node_id)
+        self.assertEqual(histories[-1].inputs, dict(inputs[-1], loop=5))
+
+    @override_settings(BAMBOO_DJANGO_ERI_HISTORY_ASYNC=True)
+    def test_add_history__async(self):
+        app = MagicMock()
+        with patch("pipeline.eri.imp.execution_history.current_app", app):
+            history_id = self.mixin.add_history(
+                node_id=self.node_id,
+                started_time=self.started_time,
+                archived_time=self.archived_time,
+                loop=1,
+                skip=False,
+                retry=0,
+                version=self.version,
+                inputs=self.json_data,
+                outputs=self.pickle_data,
+            )
+
+        self.assertIsNone(history_id)
+        self.assertFalse(DBExecutionHistory.objects.filter(node_id=self.node_id).exists())
+        task = app.tasks["pipeline.eri.celery.tasks.add_history"]
+        kwargs = task.apply_async.call_args[1]["kwargs"]
+        self.assertEqual(task.apply_async.call_args[1]["queue"], "er_schedule")
+        self.assertEqual(self.mixin._deserialize(kwargs["outputs"], kwargs["outputs_serializer"]), self.pickle_data)
+        self.assertEqual(kwargs["started_time"], self.started_time.isoformat())
+
+    @override_settings(BAMBOO_DJANGO_ERI_HISTORY_ASYNC=True)
+    def test_add_history__async_route_by_root_process(self):
+        root_id = unique_id("p")
+        State.objects.create(node_id=self.node_id, root_id=root_id, name=states.RUNNING, version=self.version)
+        # 延迟写入时进程的当前节点可能还没有更新
+        Process.objects.create(root_pipeline_id=root_id, current_node_id=unique_id("n"), queue="q", priority=50)
+
+        app = MagicMock()
+        with patch("pipeline.eri.imp.execution_history.current_app", app):
+            with self.assertNumQueries(1):
+                self.mixin.add_history(
+                    node_id=self.node_id,
+                    started_time=self.started_time,
+                    archived_time=self.archived_time,
+                    loop=1,
+                    skip=False,
+                    retry=0,
+                    version=self.version,
+                    inputs=self.json_data,
+                    outputs=self.json_data,
+                )
+
+        task = app.tasks["pipeline.eri.celery.tasks.add_history"]
+        self.assertEqual(task.apply_async.call_args[1]["queue"], "er_schedule_q")
+        self.assertEqual(task.apply_async.call_args[1]["routing_key"], "er_schedule_q")
+        self.assertEqual(task.apply_async.call_args[1]["priority"], 50)
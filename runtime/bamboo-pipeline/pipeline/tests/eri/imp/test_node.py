@@ -27,13 +27,15 @@ from bamboo_engine.eri import (
     ExecutableEndEvent,
 )
 
-from pipeline.eri.imp.node import NodeMixin
+from pipeline.eri.imp.node import NodeMixin, NODE_CACHE, PRELOADED_ROOTS
 from pipeline.eri.models import Node as DBNode
 
 
 class ProcessMixinTestCase(TestCase):
     def setUp(self):
         self.mixin = NodeMixin()
+        NODE_CACHE.clear()
+        PRELOADED_ROOTS.clear()
 
     def test_get_node(self):
         nodes = {
@@ -261,3 +263,50 @@ class ProcessMixinTestCase(TestCase):
         self.assertEqual(node.can_skip, True)
         self.assertEqual(node.can_retry, True)
         self.assertEqual(node.code, "")
+
+    def _create_service_activity(self, node_id: str, root_pipeline_id: str):
+        detail = {
+            "id": node_id,
+            "type": NodeType.ServiceActivity.value,
+            "targets": {"f1": "t1"},
+            "root_pipeline_id": root_pipeline_id,
+            "parent_pipeline_id": root_pipeline_id,
+            "can_skip": True,
+            "can_retry": True,
+            "code": "test_code",
+            "version": "legacy",
+            "timeout": None,
+            "error_ignorable": True,
+        }
+        DBNode.objects.create(node_id=node_id, root_pipeline_id=root_pipeline_id, detail=json.dumps(detail))
+
+    def test_get_node__cache(self):
+        self._create_service_activity("n1", "root")
+
+        node = self.mixin.get_node("n1")
+        with self.assertNumQueries(0):
+            self.assertIs(self.mixin.get_node("n1"), node)
+
+    def test_get_node__preload_root(self):
+        for node_id in ["n1", "n2", "n3"]:
+            self._create_service_activity(node_id, "root")
+        self._create_service_activity("n4", "root2")
+
+        self.mixin.get_node("n1")
+        self.assertIn("root", PRELOADED_ROOTS)
+        self.assertNotIn("root2", PRELOADED_ROOTS)
+        self.assertNotIn("n4", NODE_CACHE)
+
+        with self.assertNumQueries(0):
+            node = self.mixin.get_node("n3")
+        self.assertEqual(node.id, "n3")
+        self.assertEqual(node.root_pipeline_id, "root")
+
+    def test_preload_nodes(self):
+        for node_id in ["n1", "n2"]:
+            self._create_service_activity(node_id, "root")
+
+        nodes = self.mixin.preload_nodes("root")
+        self.assertEqual({n.id for n in nodes}, {"n1", "n2"})
+        self.assertIn("n1", NODE_CACHE)
+        self.assertIn("n2", NODE_CACHE)
@@ -14,7 +14,7 @@ specific language governing permissions and limitations under the License.
 import uuid
 import threading
 
-from django.test import TransactionTestCase
+from django.test import TransactionTestCase, override_settings
 
 from pipeline.eri.models import Process
 from pipeline.eri.imp.process import ProcessMixin
@@ -100,6 +100,10 @@ class ProcessMixinTestCase(TransactionTestCase):
         self.assertEqual(process_info.root_pipeline_id, process.root_pipeline_id)
         self.assertEqual(process_info.pipeline_stack, [])
         self.assertEqual(process_info.parent_id, process.parent_id)
+        self.assertTrue(process_info.ready)
+
+        Process.objects.filter(id=process.id).update(ready=False)
+        self.assertFalse(self.mixin.get_process_info(process.id).ready)
 
     def test_get_suspended_process_info(self):
         p1 = Process.objects.create(priority=1, queue="queue", current_node_id=uuid.uuid1().hex)
@@ -234,3 +238,88 @@ class ProcessMixinTestCase(TransactionTestCase):
 
         p = self.mixin.get_process_info_with_root_pipeline("not_exist")
         self.assertEqual(0, len(p))
+
+    def test_process_write_behind__disabled(self):
+        with self.mixin.process_write_behind(self.process.id):
+            self.mixin.wake_up(self.process.id)
+            self.process.refresh_from_db()
+            self.assertFalse(self.process.asleep)
+
+    @override_settings(BAMBOO_DJANGO_ERI_PROCESS_WRITE_BEHIND=True)
+    def test_process_write_behind(self):
+        with self.mixin.process_write_behind(self.process.id):
+            self.mixin.wake_up(self.process.id)
+            self.mixin.beat(self.process.id)
+            self.mixin.set_current_node(self.process.id, "n1")
+            self.mixin.set_current_node(self.process.id, "n2")
+            self.process.refresh_from_db()
+            self.assertTrue(self.process.asleep)
+            self.assertEqual(self.process.current_node_id, "")
+
+            self.mixin.flush_process_buffer(self.process.id)
+            self.process.refresh_from_db()
+            self.assertFalse(self.process.asleep)
+            self.assertEqual(self.process.current_node_id, "n2")
+
+            self.mixin.sleep(self.process.id)
+            self.mixin.die(self.process.id)
+
+        self.process.refresh_from_db()
+        self.assertTrue(self.process.asleep)
+        self.assertTrue(self.process.dead)
+
+        # 退出后写操作立即生效
+        self.mixin.wake_up(self.process.id)
+        self.process.refresh_from_db()
+        self.assertFalse(self.process.asleep)
+
+    @override_settings(BAMBOO_DJANGO_ERI_PROCESS_WRITE_BEHIND=True, BAMBOO_DJANGO_ERI_PROCESS_WRITE_BEHIND_NODES=2)
+    def test_process_write_behind__flush_when_reach_node_limit(self):
+        with self.mixin.process_write_behind(self.process.id):
+            self.mixin.set_current_node(self.process.id, "n1")
+            self.process.refresh_from_db()
+            self.assertEqual(self.process.current_node_id, "")
+
+            self.mixin.set_current_node(self.process.id, "n2")
+            self.process.refresh_from_db()
+            self.assertEqual(self.process.current_node_id, "n2")
+
+    @override_settings(BAMBOO_DJANGO_ERI_PROCESS_WRITE_BEHIND=True)
+    def test_process_write_behind__flush_when_raise(self):
+        try:
+            with self.mixin.process_write_behind(self.process.id):
+                self.mixin.set_current_node(self.process.id, "n1")
+                raise ValueError()
+        except ValueError:
+            pass
+
+        self.process.refresh_from_db()
+        self.assertEqual(self.process.current_node_id, "n1")
+
+    @override_settings(BAMBOO_DJANGO_ERI_PROCESS_WRITE_BEHIND=True)
+    def test_process_write_behind__flush_before_suspend(self):
+        with self.mixin.process_write_behind(self.process.id):
+            self.mixin.wake_up(self.process.id)
+            self.mixin.set_current_node(self.process.id, "n1")
+            # 与引擎推进循环一致，暂停前写入缓冲的当前节点
+            self.mixin.flush_process_buffer(self.process.id)
+            self.mixin.suspend(self.process.id, "n1")
+
+            # 进程让出前其他 worker 已经可以通过当前节点找到进程
+            self.assertEqual(self.mixin.get_process_id_with_current_node_id("n1"), self.process.id)
+            self.process.refresh_from_db()
+            self.assertTrue(self.process.suspended)
+            self.assertEqual(self.process.suspended_by, "n1")
+
+    @override_settings(BAMBOO_DJANGO_ERI_PROCESS_WRITE_BEHIND=True)
+    def test_process_write_behind__flush_before_freeze(self):
+        with self.mixin.process_write_behind(self.process.id):
+            self.mixin.wake_up(self.process.id)
+            self.mixin.set_current_node(self.process.id, "n1")
+            self.mixin.flush_process_buffer(self.process.id)
+            self.mixin.freeze(self.process.id)
+
+            self.assertEqual(self.mixin.get_process_id_with_current_node_id("n1"), self.process.id)
+            self.process.refresh_from_db()
+            self.assertTrue(self.process.frozen)
+            self.assertFalse(self.process.asleep)
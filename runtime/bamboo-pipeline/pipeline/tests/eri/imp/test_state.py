@@ -13,7 +13,9 @@ specific language governing permissions and limitations under the License.
 
 from mock import patch, MagicMock
 
-from django.test import TransactionTestCase
+from datetime import timedelta
+
+from django.test import TransactionTestCase, override_settings
 from django.utils import timezone
 
 from bamboo_engine.eri.models import State
@@ -225,6 +227,73 @@ class StateMixinTestCase(TransactionTestCase):
         state_list = self.mixin.get_state_by_parent("not_exist")
         self.assertEqual(state_list, [])
 
+    def test_get_state_snapshot_by_root(self):
+        snapshot = self.mixin.get_state_snapshot_by_root(self.state.root_id)
+        self.assertIsNotNone(snapshot.cursor)
+        self.assertEqual(len(snapshot.rows), 1)
+        columns = snapshot.columns()
+        self.assertEqual(columns["node_id"], [self.state.node_id])
+        self.assertEqual(columns["name"], [states.RUNNING])
+        self.assertEqual(columns["version"], [self.state.version])
+        self.assertEqual(columns["started_time"], [self.started_time])
+        self.assertEqual(columns["archived_time"], [self.archived_time])
+
+    def test_get_state_snapshot_by_root__not_exist(self):
+        snapshot = self.mixin.get_state_snapshot_by_root("not_exist")
+        self.assertEqual(snapshot.rows, [])
+
+    def test_get_state_snapshot_by_root_since(self):
+        s1 = DBState.objects.create(
+            node_id=unique_id("n"),
+            root_id=self.state.root_id,
+            parent_id=self.state.root_id,
+            name=states.READY,
+            version=unique_id("v"),
+        )
+        cursor = self.mixin.get_state_snapshot_by_root_since(self.state.root_id, None).cursor
+
+        # 模拟游标生成之后未发生变化的节点
+        DBState.objects.filter(node_id=self.state.node_id).update(
+            updated_time=cursor - self.mixin._state_snapshot_cursor_overlap() - timedelta(seconds=1)
+        )
+        self.mixin.set_state(node_id=s1.node_id, to_state=states.RUNNING)
+
+        snapshot = self.mixin.get_state_snapshot_by_root_since(self.state.root_id, cursor)
+        self.assertGreaterEqual(snapshot.cursor, cursor)
+        self.assertEqual(len(snapshot.rows), 1)
+        columns = snapshot.columns()
+        self.assertEqual(columns["node_id"], [s1.node_id])
+        self.assertEqual(columns["name"], [states.RUNNING])
+
+    def _late_commit_update(self, cursor, lag):
+        # 模拟在获取快照前开始、获取快照后才提交的状态更新，其更新时间早于游标
+        DBState.objects.filter(node_id=self.state.node_id).update(name=states.FAILED, updated_time=cursor - lag)
+
+    def test_get_state_snapshot_by_root_since__late_commit(self):
+        cursor = self.mixin.get_state_snapshot_by_root_since(self.state.root_id, None).cursor
+        self._late_commit_update(cursor, timedelta(milliseconds=500))
+
+        snapshot = self.mixin.get_state_snapshot_by_root_since(self.state.root_id, cursor)
+        columns = snapshot.columns()
+        self.assertEqual(columns["node_id"], [self.state.node_id])
+        self.assertEqual(columns["name"], [states.FAILED])
+
+    @override_settings(BAMBOO_DJANGO_ERI_STATE_SNAPSHOT_CURSOR_OVERLAP=5)
+    def test_get_state_snapshot_by_root_since__late_commit_with_overlap_setting(self):
+        cursor = self.mixin.get_state_snapshot_by_root_since(self.state.root_id, None).cursor
+        self._late_commit_update(cursor, timedelta(seconds=3))
+
+        snapshot = self.mixin.get_state_snapshot_by_root_since(self.state.root_id, cursor)
+        self.assertEqual(snapshot.columns()["name"], [states.FAILED])
+
+        # 提交耗时超过回退时间的更新不会被增量获取返回，需要通过全量获取校正
+        cursor = snapshot.cursor
+        self._late_commit_update(cursor, timedelta(seconds=6))
+        self.assertEqual(self.mixin.get_state_snapshot_by_root_since(self.state.root_id, cursor).rows, [])
+        self.assertEqual(
+            self.mixin.get_state_snapshot_by_root_since(self.state.root_id, None).columns()["name"], [states.FAILED]
+        )
+
     def test_batch_get_state_name(self):
         s1 = DBState.objects.create(
             node_id=unique_id("n"),
@@ -19,7 +19,7 @@ from bamboo_engine.eri import ContextValue, ContextValueType
 from bamboo_engine.context import Context, SpliceVariable
 
 from pipeline.core.data.var import LazyVariable
-from pipeline.eri.imp.variable import VariableWrapper
+from pipeline.eri.imp.variable import VariableProxy, VariableWrapper
 
 
 class TestVariable(LazyVariable):
@@ -32,6 +32,18 @@ class TestVariable(LazyVariable):
         return "heihei"
 
 
+class HelperVariable(LazyVariable):
+    code = "proxy_helper_test"
+    name = "proxy_helper_test"
+
+    def get_value(self):
+        return self.upper(self.value)
+
+    @staticmethod
+    def upper(value):
+        return value.upper()
+
+
 class VariableWrapperTestCase(TestCase):
     def test_get(self):
         runtime = MagicMock()
@@ -51,3 +63,19 @@ class VariableWrapperTestCase(TestCase):
         )
 
         self.assertEqual(w.get(), "heihei")
+
+    def test_proxy_class_cache(self):
+        original_value = MagicMock()
+        original_value.get = MagicMock(return_value="a-b")
+
+        p1 = VariableProxy(original_value=original_value, var_cls=HelperVariable, pipeline_data={})
+        p2 = VariableProxy(original_value=original_value, var_cls=HelperVariable, pipeline_data={"id": 1})
+
+        self.assertIs(type(p1), type(p2))
+        self.assertIs(type(p1), VariableProxy.get_proxy_class(HelperVariable))
+        self.assertTrue(issubclass(type(p1), VariableProxy))
+        self.assertEqual(p1.get(), "A-B")
+        self.assertEqual(p2.pipeline_data, {"id": 1})
+        self.assertFalse(hasattr(p1, "__dict__"))
+        with self.assertRaises(AttributeError):
+            p1.extra = 1
@@ -0,0 +1,168 @@
+# -*- coding: utf-8 -*-
+"""
+Tencent is pleased to support the open source community by making 蓝鲸智云PaaS平台社区版 (BlueKing PaaS Community
+Edition) available.
+Copyright (C) 2017-2021 THL A29 Limited, a Tencent company. All rights reserved.
+Licensed under the MIT License (the "License"); you may not use this file except in compliance with the License.
+You may obtain a copy of the License at
+http://opensource.org/licenses/MIT
+Unless required by applicable law or agreed to in writing, software distributed under the License is distributed on
+an "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the License for the
+specific language governing permissions and limitations under the License.
+"""
+
+import json
+import os
+import shutil
+import tempfile
+from datetime import timedelta
+
+from django.test import TransactionTestCase, override_settings
+from django.utils import timezone
+
+from bamboo_engine import states
+from bamboo_engine.utils.string import unique_id
+
+from pipeline.eri.archive import (
+    ARCHIVE_CACHE,
+    ARCHIVE_PENDING,
+    archive_finished_pipelines,
+    archive_pipeline,
+    decode_archive,
+    encode_archive,
+    mark_pipeline_finished,
+)
+from pipeline.eri.models import (
+    ContextValue,
+    ExecutionData,
+    ExecutionHistory,
+    Node,
+    Payload,
+    PipelineArchive,
+    State,
+)
+from pipeline.eri.retention import RetentionSweeper
+from pipeline.eri.runtime import BambooDjangoRuntime
+
+
+class ArchiveTestCase(TransactionTestCase):
+    def setUp(self):
+        ARCHIVE_CACHE.clear()
+        self.runtime = BambooDjangoRuntime()
+        self.root_id = unique_id("p")
+        self.node_id = unique_id("n")
+        for node_id in (self.root_id, self.node_id):
+            State.objects.create(node_id=node_id, root_id=self.root_id, name=states.FINISHED, version=unique_id("v"))
+        Node.objects.create(node_id=self.node_id, root_pipeline_id=self.root_id, detail="{}")
+        ExecutionData.objects.create(
+            node_id=self.node_id,
+            inputs_serializer="json",
+            outputs_serializer="json",
+            inputs=json.dumps({"a": 1}),
+            outputs=json.dumps({"b": 2}),
+        )
+        for loop in (1, 2):
+            ExecutionHistory.objects.create(
+                node_id=self.node_id,
+                loop=loop,
+                version=unique_id("v"),
+                started_time=timezone.now(),
+                archived_time=timezone.now(),
+                inputs_serializer="json",
+                outputs_serializer="json",
+                inputs=json.dumps({"loop": loop}),
+                outputs="{}",
+            )
+        ContextValue.objects.create(
+            pipeline_id=self.root_id, key="${a}", type=0, serializer="json", value="1", references="[]"
+        )
+
+    def _assert_archived(self):
+        self.assertFalse(Node.objects.filter(root_pipeline_id=self.root_id).exists())
+        self.assertFalse(ExecutionData.objects.filter(node_id=self.node_id).exists())
+        self.assertFalse(ExecutionHistory.objects.filter(node_id=self.node_id).exists())
+        self.assertFalse(ContextValue.objects.filter(pipeline_id=self.root_id).exists())
+        # State 作为索引保留在热数据中
+        self.assertEqual(State.objects.filter(root_id=self.root_id).count(), 2)
+
+        self.assertTrue(self.runtime.is_node_archived(self.node_id))
+        self.assertTrue(self.runtime.is_node_archived(self.root_id))
+
+        data = self.runtime.get_archived_execution_data(self.node_id)
+        self.assertEqual(data.inputs, {"a": 1})
+        self.assertEqual(data.outputs, {"b": 2})
+
+        histories = self.runtime.get_archived_histories(self.node_id)
+        self.assertEqual([h.inputs for h in histories], [{"loop": 1}, {"loop": 2}])
+        self.assertEqual(len(self.runtime.get_archived_histories(self.node_id, loop=2)), 1)
+
+        archived_states = self.runtime.get_archived_state_by_root(self.root_id)
+        self.assertEqual({s.node_id for s in archived_states}, {self.root_id, self.node_id})
+
+    def test_encode_and_decode(self):
+        blob = encode_archive(self.root_id, {"node": {"fields": ["id", "node_id"], "rows": [[1, "n1"]]}})
+        archived = decode_archive(blob)
+        self.assertEqual(archived.root_id, self.root_id)
+        self.assertEqual(archived.rows(Node)[0].node_id, "n1")
+        self.assertEqual(archived.rows_of(Node, "n1")[0].id, 1)
+
+    def test_archive_pipeline(self):
+        archive = archive_pipeline(self.root_id)
+
+        self.assertNotEqual(archive.format_version, ARCHIVE_PENDING)
+        self.assertEqual(archive.location, "")
+        self.assertEqual(archive.size, len(archive.data))
+        self._assert_archived()
+        # 重复归档直接返回
+        self.assertIsNone(archive_pipeline(self.root_id))
+
+    def test_archive_pipeline__to_directory(self):
+        directory = tempfile.mkdtemp()
+        try:
+            with override_settings(BAMBOO_DJANGO_ERI_ARCHIVE_DIR=directory):
+                archive = archive_pipeline(self.root_id)
+
+            self.assertTrue(archive.location.startswith(directory))
+            self.assertTrue(os.path.exists(archive.location))
+            self.assertEqual(bytes(archive.data), b"")
+            self._assert_archived()
+
+            RetentionSweeper(rows_per_second=0).clean_pipeline(self.root_id)
+            self.assertFalse(os.path.exists(archive.location))
+            self.assertFalse(PipelineArchive.objects.filter(root_id=self.root_id).exists())
+        finally:
+            shutil.rmtree(directory)
+
+    @override_settings(BAMBOO_DJANGO_ERI_PAYLOAD_OFFLOAD_THRESHOLD=4)
+    def test_archive_pipeline__inline_payloads(self):
+        self.runtime.set_execution_data_inputs(self.node_id, {"a": 1})
+        self.assertTrue(Payload.objects.filter(node_id=self.node_id).exists())
+
+        archive_pipeline(self.root_id)
+
+        self.assertFalse(Payload.objects.filter(node_id=self.node_id).exists())
+        self._assert_archived()
+
+    def test_archive_pipeline__not_finished(self):
+        State.objects.filter(node_id=self.root_id).update(name=states.RUNNING)
+
+        self.assertIsNone(archive_pipeline(self.root_id))
+        self.assertTrue(ExecutionData.objects.filter(node_id=self.node_id).exists())
+        self.assertIsNone(self.runtime.get_archived_execution_data(self.node_id))
+        self.assertFalse(self.runtime.is_node_archived(self.node_id))
+
+    @override_settings(BAMBOO_DJANGO_ERI_ARCHIVE=True)
+    def test_mark_and_archive_finished_pipelines(self):
+        mark_pipeline_finished(sender=State, node_id=self.node_id, to_state=states.FINISHED, root_id=self.root_id)
+        self.assertFalse(PipelineArchive.objects.exists())
+
+        mark_pipeline_finished(sender=State, node_id=self.root_id, to_state=states.FINISHED, root_id=self.root_id)
+        self.assertEqual(PipelineArchive.objects.get(root_id=self.root_id).format_version, ARCHIVE_PENDING)
+        # 等待归档的流程仍然读取热数据
+        self.assertFalse(self.runtime.is_node_archived(self.node_id))
+
+        self.assertEqual(archive_finished_pipelines(after_hours=1), 0)
+
+        PipelineArchive.objects.filter(root_id=self.root_id).update(finished_time=timezone.now() - timedelta(hours=2))
+        self.assertEqual(archive_finished_pipelines(after_hours=1), 1)
+        self._assert_archived()
@@ -0,0 +1,243 @@
+# -*- coding: utf-8 -*-
+"""
+Tencent is pleased to support the open source community by making 蓝鲸智云PaaS平台社区版 (BlueKing PaaS Community
+Edition) available.
+Copyright (C) 2017-2021 THL A29 Limited, a Tencent company. All rights reserved.
+Licensed under the MIT License (the "License"); you may not use this file except in compliance with the License.
+You may obtain a copy of the License at
+http://opensource.org/licenses/MIT
+Unless required by applicable law or agreed to in writing, software distributed under the License is distributed on
+an "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the License for the
+specific language governing permissions and limitations under the License.
+"""
+
+import logging
+import threading
+import time
+
+from mock import MagicMock, patch
+from django.test import TransactionTestCase, override_settings
+
+from bamboo_engine.utils.string import unique_id
+
+from pipeline.eri.log import (
+    LOG_BUFFER,
+    ERINodeLogHandler,
+    decode_log_chunk,
+    flush_log_buffer,
+    get_logger,
+    read_log_lines,
+)
+from pipeline.eri.models import LogChunk, LogEntry, State
+from pipeline.eri.runtime import BambooDjangoRuntime
+
+
+class LogBufferTestCase(TransactionTestCase):
+    def setUp(self):
+        self.node_id = unique_id("n")
+        self.version = unique_id("v")
+        self.handler = ERINodeLogHandler()
+        self.logger = logging.getLogger(unique_id("l"))
+        self.logger.setLevel(logging.DEBUG)
+        self.logger.addHandler(self.handler)
+        self.adapter = logging.LoggerAdapter(
+            logger=self.logger, extra={"node_id": self.node_id, "loop": 1, "version": self.version}
+        )
+        LOG_BUFFER.entries.clear()
+        LOG_BUFFER.dropped = 0
+
+    def tearDown(self):
+        self.logger.removeHandler(self.handler)
+        LOG_BUFFER.entries.clear()
+        # 取消未触发的定时写入
+        LOG_BUFFER.flush()
+
+    def test_unbuffered(self):
+        self.adapter.info("1")
+        self.assertEqual(LogEntry.objects.filter(node_id=self.node_id).count(), 1)
+        self.assertEqual(len(LOG_BUFFER), 0)
+
+    @override_settings(BAMBOO_DJANGO_ERI_LOG_BUFFER=True, BAMBOO_DJANGO_ERI_LOG_BUFFER_SIZE=3)
+    def test_flush_on_size(self):
+        self.adapter.info("1")
+        self.adapter.info("2")
+        self.assertEqual(LogEntry.objects.filter(node_id=self.node_id).count(), 0)
+        self.assertEqual(len(LOG_BUFFER), 2)
+
+        self.adapter.info("3")
+        self.assertEqual(LogEntry.objects.filter(node_id=self.node_id).count(), 3)
+        self.assertEqual(len(LOG_BUFFER), 0)
+
+    @override_settings(BAMBOO_DJANGO_ERI_LOG_BUFFER=True, BAMBOO_DJANGO_ERI_LOG_BUFFER_FLUSH_INTERVAL=0)
+    def test_flush_on_interval(self):
+        self.adapter.info("1")
+        self.assertEqual(LogEntry.objects.filter(node_id=self.node_id).count(), 1)
+
+    @override_settings(BAMBOO_DJANGO_ERI_LOG_BUFFER=True, BAMBOO_DJANGO_ERI_LOG_BUFFER_FLUSH_INTERVAL=0.1)
+    def test_flush_on_timer(self):
+        self.adapter.info("1")
+        self.assertEqual(len(LOG_BUFFER), 1)
+
+        # 没有后续日志写入时由定时器写入
+        deadline = time.monotonic() + 5
+        while len(LOG_BUFFER) and time.monotonic() < deadline:
+            time.sleep(0.05)
+
+        self.assertEqual(len(LOG_BUFFER), 0)
+        self.assertEqual(LogEntry.objects.filter(node_id=self.node_id).count(), 1)
+
+    @override_settings(BAMBOO_DJANGO_ERI_LOG_BUFFER=True, BAMBOO_DJANGO_ERI_LOG_BUFFER_FLUSH_INTERVAL=60)
+    def test_flush_log_buffer_keep_order(self):
+        for i in range(10):
+            self.adapter.info(str(i))
+        self.assertEqual(LogEntry.objects.filter(node_id=self.node_id).count(), 0)
+
+        flush_log_buffer(sender=None)
+
+        messages = list(LogEntry.objects.order_by("id").filter(node_id=self.node_id).values_list("message", flat=True))
+        self.assertEqual(messages, [str(i) for i in range(10)])
+
+    @override_settings(
+        BAMBOO_DJANGO_ERI_LOG_BUFFER=True,
+        BAMBOO_DJANGO_ERI_LOG_BUFFER_FLUSH_INTERVAL=60,
+        BAMBOO_DJANGO_ERI_LOG_BUFFER_MAX_SIZE=2,
+        BAMBOO_DJANGO_ERI_LOG_BUFFER_OVERFLOW="drop",
+    )
+    def test_overflow_drop(self):
+        for i in range(5):
+            self.adapter.info(str(i))
+
+        self.assertEqual(len(LOG_BUFFER), 2)
+        self.assertEqual(LOG_BUFFER.dropped, 3)
+        self.assertEqual(LogEntry.objects.filter(node_id=self.node_id).count(), 0)
+
+    @override_settings(
+        BAMBOO_DJANGO_ERI_LOG_BUFFER=True,
+        BAMBOO_DJANGO_ERI_LOG_BUFFER_FLUSH_INTERVAL=60,
+        BAMBOO_DJANGO_ERI_LOG_BUFFER_MAX_SIZE=10,
+        BAMBOO_DJANGO_ERI_LOG_BUFFER_OVERFLOW="drop",
+    )
+    def test_overflow_drop__concurrent(self):
+        def write():
+            for i in range(50):
+                self.adapter.info(str(i))
+
+        threads = [threading.Thread(target=write) for _ in range(4)]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+
+        self.assertEqual(len(LOG_BUFFER), 10)
+        self.assertEqual(LOG_BUFFER.dropped, 190)
+
+    @override_settings(
+        BAMBOO_DJANGO_ERI_LOG_BUFFER=True,
+        BAMBOO_DJANGO_ERI_LOG_BUFFER_FLUSH_INTERVAL=60,
+        BAMBOO_DJANGO_ERI_LOG_BUFFER_MAX_SIZE=2,
+    )
+    def test_overflow_flush(self):
+        for i in range(5):
+            self.adapter.info(str(i))
+
+        self.assertEqual(len(LOG_BUFFER), 1)
+        self.assertEqual(LogEntry.objects.filter(node_id=self.node_id).count(), 4)
+
+    @override_settings(BAMBOO_DJANGO_ERI_LOG_BUFFER=True, BAMBOO_DJANGO_ERI_LOG_BUFFER_FLUSH_INTERVAL=60)
+    def test_flush_failed(self):
+        self.adapter.info("1")
+        with patch("pipeline.eri.models.LogEntry.objects.bulk_create", MagicMock(side_effect=Exception)):
+            flush_log_buffer()
+
+        self.assertEqual(len(LOG_BUFFER), 1)
+        flush_log_buffer()
+        self.assertEqual(LogEntry.objects.filter(node_id=self.node_id).count(), 1)
+
+    @override_settings(BAMBOO_DJANGO_ERI_LOG_SAMPLING={"DEBUG": 0, "INFO": 1})
+    def test_sampling(self):
+        self.adapter.debug("1")
+        self.adapter.info("2")
+
+        self.assertEqual(
+            list(LogEntry.objects.filter(node_id=self.node_id).values_list("message", flat=True)), ["2"]
+        )
+
+    def test_get_logger(self):
+        adapter = get_logger(self.node_id, 1, self.version)
+        self.assertEqual(adapter.extra, {"node_id": self.node_id, "loop": 1, "version": self.version})
+
+
+class LogChunkTestCase(TransactionTestCase):
+    def setUp(self):
+        self.node_id = unique_id("n")
+        self.version = unique_id("v")
+        self.handler = ERINodeLogHandler()
+        self.logger = logging.getLogger(unique_id("l"))
+        self.logger.setLevel(logging.DEBUG)
+        self.logger.addHandler(self.handler)
+        self.adapter = logging.LoggerAdapter(
+            logger=self.logger, extra={"node_id": self.node_id, "loop": 1, "version": self.version}
+        )
+        LOG_BUFFER.entries.clear()
+
+    def tearDown(self):
+        self.logger.removeHandler(self.handler)
+        LOG_BUFFER.entries.clear()
+        # 取消未触发的定时写入
+        LOG_BUFFER.flush()
+
+    @override_settings(
+        BAMBOO_DJANGO_ERI_LOG_STORAGE="chunk",
+        BAMBOO_DJANGO_ERI_LOG_BUFFER_SIZE=7,
+        BAMBOO_DJANGO_ERI_LOG_BUFFER_FLUSH_INTERVAL=60,
+        BAMBOO_DJANGO_ERI_LOG_CHUNK_LINES=3,
+    )
+    def test_write_and_read_chunks(self):
+        for i in range(10):
+            self.adapter.info("line %s" % i)
+        flush_log_buffer()
+
+        self.assertEqual(LogEntry.objects.filter(node_id=self.node_id).count(), 0)
+        chunks = list(
+            LogChunk.objects.filter(node_id=self.node_id, version=self.version)
+            .order_by("line_start")
+            .values_list("line_start", "line_count", "data")
+        )
+        self.assertEqual([(start, count) for start, count, _ in chunks], [(0, 3), (3, 3), (6, 1), (7, 3)])
+        self.assertEqual(decode_log_chunk(chunks[0][2]), ["line 0", "line 1", "line 2"])
+
+        lines = ["line %s" % i for i in range(10)]
+        self.assertEqual(read_log_lines(self.node_id, self.version), lines)
+        self.assertEqual(read_log_lines(self.node_id, self.version, offset=2, limit=5), lines[2:7])
+        self.assertEqual(read_log_lines(self.node_id, self.version, offset=-4), lines[-4:])
+        self.assertEqual(read_log_lines(self.node_id, self.version, offset=20), [])
+        self.assertEqual(read_log_lines(self.node_id, self.version, offset=-20, limit=2), lines[:2])
+
+    def test_read_entries(self):
+        for i in range(5):
+            self.adapter.info("line %s" % i)
+
+        lines = ["line %s" % i for i in range(5)]
+        self.assertEqual(read_log_lines(self.node_id, self.version), lines)
+        self.assertEqual(read_log_lines(self.node_id, self.version, offset=1, limit=2), lines[1:3])
+        self.assertEqual(read_log_lines(self.node_id, self.version, offset=-2), lines[-2:])
+
+    @override_settings(BAMBOO_DJANGO_ERI_LOG_STORAGE="chunk", BAMBOO_DJANGO_ERI_LOG_BUFFER_FLUSH_INTERVAL=60)
+    def test_runtime_plain_log(self):
+        State.objects.create(
+            node_id=self.node_id,
+            root_id="",
+            parent_id="",
+            name="FINISHED",
+            version=self.version,
+        )
+        for i in range(5):
+            self.adapter.info("line %s" % i)
+        flush_log_buffer()
+
+        runtime = BambooDjangoRuntime()
+        self.assertEqual(runtime.get_plain_log_for_node(self.node_id), "\n".join("line %s" % i for i in range(5)))
+        self.assertEqual(runtime.get_plain_log_for_node(self.node_id, offset=1, limit=1), "line 1")
+        self.assertEqual(runtime.tail_plain_log_for_node(self.node_id, 2), "line 3\nline 4")
+        self.assertEqual(runtime.tail_plain_log_for_node(self.node_id, 0), "")
+        self.assertEqual(runtime.get_plain_log_for_node(unique_id("n")), "")
@@ -0,0 +1,211 @@
+# -*- coding: utf-8 -*-
+"""
+Tencent is pleased to support the open source community by making 蓝鲸智云PaaS平台社区版 (BlueKing PaaS Community
+Edition) available.
+Copyright (C) 2017-2021 THL A29 Limited, a Tencent company. All rights reserved.
+Licensed under the MIT License (the "License"); you may not use this file except in compliance with the License.
+You may obtain a copy of the License at
+http://opensource.org/licenses/MIT
+Unless required by applicable law or agreed to in writing, software distributed under the License is distributed on
+an "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the License for the
+specific language governing permissions and limitations under the License.
+"""
+
+from datetime import timedelta
+
+from mock import patch
+from django.test import TransactionTestCase
+from django.utils import timezone
+
+from bamboo_engine import states
+from bamboo_engine.utils.string import unique_id
+
+from pipeline.eri.models import (
+    ContextValue,
+    Data,
+    LogEntry,
+    Node,
+    Process,
+    RetentionCheckpoint,
+    RetentionPendingRoot,
+    State,
+)
+from pipeline.eri.retention import RetentionSweeper
+
+
+class RetentionSweeperTestCase(TransactionTestCase):
+    def _pipeline(self, name=states.FINISHED, days=40, archived_days=None, logs=3):
+        root_id = unique_id("p")
+        node_id = unique_id("n")
+        created_time = timezone.now() - timedelta(days=days)
+        archived_days = days if archived_days is None else archived_days
+        archived_time = timezone.now() - timedelta(days=archived_days)
+
+        for nid in (root_id, node_id):
+            State.objects.create(node_id=nid, root_id=root_id, name=name, version=unique_id("v"))
+        State.objects.filter(root_id=root_id).update(created_time=created_time, archived_time=archived_time)
+        Node.objects.create(node_id=node_id, root_pipeline_id=root_id, detail="{}")
+        Process.objects.create(root_pipeline_id=root_id, priority=100)
+        Data.objects.create(node_id=node_id, inputs="{}", outputs="{}")
+        ContextValue.objects.create(
+            pipeline_id=root_id, key="${a}", type=0, serializer="json", value="1", references="[]"
+        )
+        LogEntry.objects.bulk_create(
+            [LogEntry(node_id=node_id, loop=1, level_name="INFO", message=str(i)) for i in range(logs)]
+        )
+        return root_id, node_id
+
+    def _assert_cleaned(self, root_id, node_id):
+        self.assertFalse(State.objects.filter(root_id=root_id).exists())
+        self.assertFalse(Node.objects.filter(root_pipeline_id=root_id).exists())
+        self.assertFalse(Process.objects.filter(root_pipeline_id=root_id).exists())
+        self.assertFalse(Data.objects.filter(node_id=node_id).exists())
+        self.assertFalse(ContextValue.objects.filter(pipeline_id=root_id).exists())
+        self.assertFalse(LogEntry.objects.filter(node_id=node_id).exists())
+
+    def _assert_kept(self, root_id, node_id):
+        self.assertEqual(State.objects.filter(root_id=root_id).count(), 2)
+        self.assertTrue(Node.objects.filter(root_pipeline_id=root_id).exists())
+        self.assertTrue(LogEntry.objects.filter(node_id=node_id).exists())
+
+    def test_run(self):
+        expired = self._pipeline()
+        revoked = self._pipeline(name=states.REVOKED)
+        running = self._pipeline(name=states.RUNNING)
+        recent_archived = self._pipeline(archived_days=1)
+        recent = self._pipeline(days=1)
+
+        result = RetentionSweeper(days=30, rows_per_second=0).run()
+
+        self.assertEqual(result["cleaned"], 2)
+        self.assertEqual(result["skipped"], 1)
+        self._assert_cleaned(*expired)
+        self._assert_cleaned(*revoked)
+        self._assert_kept(*running)
+        self._assert_kept(*recent_archived)
+        self._assert_kept(*recent)
+
+        # 扫描位置越过未完成的流程，停在仍处于保留期的流程之前
+        checkpoint = RetentionCheckpoint.objects.get(name="default")
+        self.assertEqual(checkpoint.scan_cursor, State.objects.get(node_id=running[0]).id)
+        self.assertEqual(checkpoint.root_id, "")
+        self.assertEqual(list(RetentionPendingRoot.objects.values_list("name", "root_id")), [("default", running[0])])
+
+    def test_run__batches_and_throttle(self):
+        expired = self._pipeline(logs=7)
+
+        with patch("pipeline.eri.retention.time.sleep") as sleep:
+            result = RetentionSweeper(days=30, batch_size=2, rows_per_second=10).run()
+
+        self._assert_cleaned(*expired)
+        # 4 批 LogEntry，以及 Data、ContextValue、Process、Node、State 各一批
+        self.assertEqual(sleep.call_count, 9)
+        self.assertAlmostEqual(sum(c[0][0] for c in sleep.call_args_list), result["deleted"] / 10.0)
+
+    def test_run__pipelines_per_run(self):
+        first = self._pipeline()
+        second = self._pipeline()
+
+        RetentionSweeper(days=30, rows_per_second=0, pipelines_per_run=1).run()
+        self._assert_cleaned(*first)
+        self._assert_kept(*second)
+
+        RetentionSweeper(days=30, rows_per_second=0, pipelines_per_run=1).run()
+        self._assert_cleaned(*second)
+
+    def test_run__clean_skipped_pipeline_after_finished(self):
+        running = self._pipeline(name=states.RUNNING)
+        expired = self._pipeline()
+
+        result = RetentionSweeper(days=30, rows_per_second=0).run()
+        self.assertEqual(result["cleaned"], 1)
+        self.assertEqual(result["skipped"], 1)
+        self._assert_kept(*running)
+        self._assert_cleaned(*expired)
+
+        checkpoint = RetentionCheckpoint.objects.get(name="default")
+        self.assertEqual(checkpoint.scan_cursor, State.objects.get(node_id=expired[0]).id)
+        self.assertTrue(RetentionPendingRoot.objects.filter(root_id=running[0]).exists())
+
+        State.objects.filter(root_id=running[0]).update(name=states.FINISHED)
+
+        result = RetentionSweeper(days=30, rows_per_second=0).run()
+        self.assertEqual(result["cleaned"], 1)
+        self.assertEqual(result["skipped"], 0)
+        self._assert_cleaned(*running)
+        self.assertFalse(RetentionPendingRoot.objects.exists())
+
+    def test_run__many_unfinished_before_cleanable(self):
+        running = [self._pipeline(name=states.RUNNING) for _ in range(5)]
+        expired = [self._pipeline() for _ in range(3)]
+
+        result = RetentionSweeper(days=30, rows_per_second=0, scan_size=2).run()
+        self.assertEqual(result["cleaned"], 3)
+        self.assertEqual(result["skipped"], 5)
+        for pipeline in expired:
+            self._assert_cleaned(*pipeline)
+        for pipeline in running:
+            self._assert_kept(*pipeline)
+
+        # 扫描位置越过所有未完成的流程
+        checkpoint = RetentionCheckpoint.objects.get(name="default")
+        self.assertGreater(checkpoint.scan_cursor, State.objects.get(node_id=running[-1][0]).id)
+        self.assertEqual(RetentionPendingRoot.objects.count(), 5)
+
+        # 再次执行不会重复记录被跳过的流程
+        with patch("pipeline.eri.retention.logger") as logger:
+            result = RetentionSweeper(days=30, rows_per_second=0, scan_size=2).run()
+        self.assertEqual(result, {"cleaned": 0, "skipped": 0, "deleted": 0})
+        logger.info.assert_called_once()
+
+        # 完成后的流程在复查时被清理，每轮最多复查 scan_size 个
+        State.objects.filter(root_id__in=[p[0] for p in running[:3]]).update(name=states.FINISHED)
+        cleaned = 0
+        for _ in range(3):
+            cleaned += RetentionSweeper(days=30, rows_per_second=0, scan_size=2).run()["cleaned"]
+        self.assertEqual(cleaned, 3)
+        for pipeline in running[:3]:
+            self._assert_cleaned(*pipeline)
+        for pipeline in running[3:]:
+            self._assert_kept(*pipeline)
+        self.assertEqual(
+            set(RetentionPendingRoot.objects.values_list("root_id", flat=True)), {p[0] for p in running[3:]}
+        )
+
+    def test_run__resume_from_checkpoint(self):
+        root_id, node_id = self._pipeline(logs=5)
+        # 模拟上次执行在删除前两条日志后中断
+        last_pk = LogEntry.objects.filter(node_id=node_id).order_by("id")[1].id
+        LogEntry.objects.filter(node_id=node_id, id__lte=last_pk).delete()
+        RetentionCheckpoint.objects.create(
+            name="default",
+            scan_cursor=State.objects.get(node_id=root_id).id,
+            root_id=root_id,
+            table="logentry",
+            last_pk=last_pk,
+        )
+
+        RetentionSweeper(days=30, rows_per_second=0).run()
+
+        self._assert_cleaned(root_id, node_id)
+        checkpoint = RetentionCheckpoint.objects.get(name="default")
+        self.assertEqual(checkpoint.root_id, "")
+        self.assertEqual(checkpoint.table, "")
+
+    def test_clean_pipeline(self):
+        root_id, node_id = self._pipeline(name=states.RUNNING, days=1)
+
+        RetentionSweeper(rows_per_second=0).clean_pipeline(root_id)
+
+        self._assert_cleaned(root_id, node_id)
+        self.assertFalse(RetentionCheckpoint.objects.exists())
+
+    def test_clean_pipeline__remove_pending(self):
+        root_id, node_id = self._pipeline(name=states.RUNNING)
+        RetentionSweeper(days=30, rows_per_second=0).run()
+        self.assertTrue(RetentionPendingRoot.objects.filter(root_id=root_id).exists())
+
+        RetentionSweeper(rows_per_second=0).clean_pipeline(root_id)
+
+        self._assert_cleaned(root_id, node_id)
+        self.assertFalse(RetentionPendingRoot.objects.exists())
@@ -13,14 +13,28 @@ specific language governing permissions and limitations under the License.
 
 import json
 
-from django.test import TransactionTestCase
+from django.test import TransactionTestCase, override_settings
+from mock import patch
 
 from bamboo_engine.eri import NodeType
 from bamboo_engine import builder
 from bamboo_engine import validator
-from bamboo_engine.builder import *  # noqa
-
-from pipeline.eri.models import Process, Node, Data, ContextValue, ContextOutputs
+from bamboo_engine.builder import (
+    ConditionalParallelGateway,
+    ConvergeGateway,
+    EmptyEndEvent,
+    EmptyStartEvent,
+    ExclusiveGateway,
+    NodeOutput,
+    ParallelGateway,
+    Params,
+    ServiceActivity,
+    SubProcess,
+    Var,
+    build_tree,
+)
+
+from pipeline.eri.models import Process, Node, Data, ContextValue, ContextOutputs, State
 from pipeline.eri.runtime import BambooDjangoRuntime
 
 
@@ -826,3 +840,111 @@ class BambooDjangoRuntimeTestCase(TransactionTestCase):
                 "references": set(),
             },
         )
+
+    def _nested_pipeline(self, branches, depth):
+        def subprocess_tree(level):
+            sub_start = EmptyStartEvent()
+            tail = sub_start
+            for _ in range(branches):
+                act = ServiceActivity(component_code="sub_debug_node")
+                act.component.inputs.key1 = Var(type=Var.SPLICE, value="${a}")
+                act.component.inputs.key2 = Var(type=Var.LAZY, value="${a}-${b}", custom_type="ip")
+                tail = tail.extend(act)
+                if level < depth:
+                    sub_data = builder.Data()
+                    sub_data.inputs["${a}"] = Var(type=Var.PLAIN, value="a")
+                    sub_data.inputs["${b}"] = Var(type=Var.SPLICE, value="${a}_b")
+                    sub_data.outputs = ["${b}"]
+                    tail = tail.extend(
+                        SubProcess(
+                            start=subprocess_tree(level + 1),
+                            data=sub_data,
+                            params=Params({"${a}": Var(type=Var.SPLICE, value="${a}")}),
+                        )
+                    )
+            tail.extend(EmptyEndEvent())
+            return sub_start
+
+        pipeline_data = builder.Data()
+        pipeline_data.inputs["${a}"] = Var(type=Var.PLAIN, value="a")
+        pipeline_data.inputs["${b}"] = Var(type=Var.SPLICE, value="${a}_b")
+        pipeline = build_tree(subprocess_tree(1), id="pipeline", data=pipeline_data)
+        validator.validate_and_process_pipeline(pipeline)
+        return pipeline
+
+    def _prepared_rows(self, prepared):
+        nodes, datas, context_values, context_outputs = prepared
+        return (
+            sorted((n.node_id, n.root_pipeline_id, n.detail) for n in nodes),
+            sorted((d.node_id, d.inputs, d.outputs) for d in datas),
+            sorted(
+                (cv.pipeline_id, cv.key, cv.type, cv.value, sorted(json.loads(cv.references))) for cv in context_values
+            ),
+            sorted((co.pipeline_id, co.outputs) for co in context_outputs),
+        )
+
+    @override_settings(BAMBOO_DJANGO_ERI_PREPARE_STREAMING=True, BAMBOO_DJANGO_ERI_PREPARE_BATCH_SIZE=3)
+    def test_streaming_prepare_run_pipeline(self):
+        pipeline = self._nested_pipeline(branches=2, depth=3)
+        subprocess_context = {"${k1}": "v1"}
+        expect = self._prepared_rows(
+            self.runtime._prepare(pipeline=pipeline, root_id="pipeline", subprocess_context=subprocess_context)
+        )
+
+        pid = self.runtime.prepare_run_pipeline(pipeline, {"k": "v"}, {"${k2}": "v2"}, subprocess_context)
+
+        self.assertTrue(Process.objects.get(id=pid).ready)
+        self.assertEqual(Node.objects.count(), len(expect[0]))
+        self.assertEqual(Data.objects.count(), len(expect[1]) + 1)
+        self.assertEqual(ContextValue.objects.count(), len(expect[2]) + 1)
+        self.assertEqual(ContextOutputs.objects.count(), len(expect[3]))
+        self.assertEqual(
+            sorted(
+                (cv.pipeline_id, cv.key, cv.type, cv.value, sorted(json.loads(cv.references)))
+                for cv in ContextValue.objects.exclude(pipeline_id="pipeline", key="${k2}")
+            ),
+            expect[2],
+        )
+
+    def _assert_nothing_prepared(self, pipeline_id):
+        self.assertFalse(Process.objects.filter(root_pipeline_id=pipeline_id).exists())
+        self.assertFalse(State.objects.filter(node_id=pipeline_id).exists())
+        self.assertEqual(Node.objects.count(), 0)
+        self.assertEqual(Data.objects.count(), 0)
+        self.assertEqual(ContextValue.objects.count(), 0)
+        self.assertEqual(ContextOutputs.objects.count(), 0)
+
+    @override_settings(BAMBOO_DJANGO_ERI_PREPARE_STREAMING=True, BAMBOO_DJANGO_ERI_PREPARE_BATCH_SIZE=3)
+    def test_streaming_prepare_run_pipeline__raise(self):
+        pipeline = self._nested_pipeline(branches=2, depth=2)
+        subproc = [act for act in pipeline["activities"].values() if act["type"] == NodeType.SubProcess.value][-1]
+        invalid_act = next(iter(subproc["pipeline"]["activities"].values()))
+        invalid_act["type"] = "InvalidActivity"
+
+        self.assertRaises(ValueError, self.runtime.prepare_run_pipeline, pipeline, {}, {}, {"${k1}": "v1"})
+
+        self._assert_nothing_prepared("pipeline")
+
+    @override_settings(BAMBOO_DJANGO_ERI_PREPARE_STREAMING=True, BAMBOO_DJANGO_ERI_PREPARE_BATCH_SIZE=3)
+    def test_streaming_prepare_run_pipeline__write_failed(self):
+        pipeline = self._nested_pipeline(branches=2, depth=3)
+        bulk_create = Data.objects.bulk_create
+        calls = []
+
+        def failed_bulk_create(objs, *args, **kwargs):
+            calls.append(len(objs))
+            # 前两个批次写入成功后写入失败
+            if len(calls) > 2:
+                raise RuntimeError("write failed")
+            return bulk_create(objs, *args, **kwargs)
+
+        with patch.object(Data.objects, "bulk_create", failed_bulk_create):
+            self.assertRaises(RuntimeError, self.runtime.prepare_run_pipeline, pipeline, {}, {}, {"${k1}": "v1"})
+
+        self.assertEqual(len(calls), 3)
+        self._assert_nothing_prepared("pipeline")
+
+        # 清理后同一个流程可以重新准备
+        pid = self.runtime.prepare_run_pipeline(pipeline, {}, {}, {"${k1}": "v1"})
+        self.assertTrue(Process.objects.get(id=pid).ready)
+        self.assertEqual(State.objects.get(node_id="pipeline").name, "RUNNING")
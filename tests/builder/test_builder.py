@@ -0,0 +1,85 @@
+# -*- coding: utf-8 -*-
+"""
+Tencent is pleased to support the open source community by making 蓝鲸智云PaaS平台社区版 (BlueKing PaaS Community
+Edition) available.
+Copyright (C) 2017-2021 THL A29 Limited, a Tencent company. All rights reserved.
+Licensed under the MIT License (the "License"); you may not use this file except in compliance with the License.
+You may obtain a copy of the License at
+http://opensource.org/licenses/MIT
+Unless required by applicable law or agreed to in writing, software distributed under the License is distributed on
+an "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the License for the
+specific language governing permissions and limitations under the License.
+"""
+
+from bamboo_engine.builder import (
+    ConvergeGateway,
+    Data,
+    EmptyEndEvent,
+    EmptyStartEvent,
+    ExclusiveGateway,
+    ParallelGateway,
+    ServiceActivity,
+    SubProcess,
+    Var,
+    build_tree,
+)
+from bamboo_engine.utils.string import UniqueIdGenerator
+
+
+def elements():
+    sub_start = EmptyStartEvent(id="sub_start")
+    sub_start.extend(ServiceActivity(id="sub_act", component_code="example")).extend(EmptyEndEvent(id="sub_end"))
+
+    start = EmptyStartEvent(id="start")
+    pg = start.extend(ParallelGateway(id="pg"))
+    cg = pg.connect(
+        ServiceActivity(id="act_1", component_code="example"),
+        SubProcess(id="subproc", start=sub_start),
+    ).converge(ConvergeGateway(id="cg"))
+    eg = cg.extend(ExclusiveGateway(id="eg", conditions={0: "${a} == 1", 1: "${a} != 1"}))
+    eg.connect(
+        ServiceActivity(id="act_2", component_code="example"), ServiceActivity(id="act_3", component_code="example")
+    ).converge(EmptyEndEvent(id="end"))
+    return start
+
+
+def flow_links(tree):
+    # 以节点 ID 表示连线，忽略连线 ID 的差异
+    links = sorted((flow["source"], flow["target"]) for flow in tree["flows"].values())
+    for act in tree["activities"].values():
+        if act["type"] == "SubProcess":
+            links.extend(flow_links(act["pipeline"]))
+    return links
+
+
+def test_build_tree():
+    data = Data()
+    data.inputs["${a}"] = Var(type=Var.PLAIN, value=1)
+
+    tree = build_tree(elements(), data=data)
+
+    assert tree["id"].startswith("p")
+    assert tree["start_event"]["id"] == "start"
+    assert tree["end_event"]["id"] == "end"
+    assert set(tree["activities"]) == {"act_1", "subproc", "act_2", "act_3"}
+    assert set(tree["gateways"]) == {"pg", "cg", "eg"}
+    assert tree["data"]["inputs"]["${a}"]["value"] == 1
+    assert len(tree["end_event"]["incoming"]) == 2
+    assert set(tree["gateways"]["eg"]["conditions"]) == set(tree["gateways"]["eg"]["outgoing"])
+    assert tree["activities"]["subproc"]["pipeline"]["id"] == "subproc"
+    for flow_id, flow in tree["flows"].items():
+        assert flow["id"] == flow_id
+
+
+def test_build_tree_with_id_generator():
+    generator = UniqueIdGenerator()
+
+    expect = build_tree(elements())
+    tree = build_tree(elements(), id_generator=generator)
+
+    assert flow_links(tree) == flow_links(expect)
+    assert tree["id"][1:17] == generator("p")[1:17]
+    subprocess_flows = tree["activities"]["subproc"]["pipeline"]["flows"]
+    assert all(flow_id[1:17] == tree["id"][1:17] for flow_id in list(tree["flows"]) + list(subprocess_flows))
+    assert len(set(tree["flows"]) | set(subprocess_flows)) == len(tree["flows"]) + len(subprocess_flows)
+    assert set(tree["gateways"]["eg"]["conditions"]) == set(tree["gateways"]["eg"]["outgoing"])
@@ -14,8 +14,16 @@ specific language governing permissions and limitations under the License.
 import pytest
 from mock import MagicMock, call, patch
 
-from bamboo_engine.api import preview_node_inputs
-from bamboo_engine.eri import SuspendedProcessInfo, NodeType, Variable
+from bamboo_engine.api import (
+    preview_node_inputs,
+    get_pipeline_states,
+    get_pipeline_states_snapshot,
+    get_pipeline_states_since,
+    get_execution_data,
+    get_node_histories,
+    get_node_short_histories,
+)
+from bamboo_engine.eri import SuspendedProcessInfo, NodeType, Variable, State, StateSnapshot, ExecutionData
 from bamboo_engine import states, exceptions
 from bamboo_engine.engine import Engine
 
@@ -46,7 +54,7 @@ def test_run_pipeline():
             **options
         )
 
-    validator.validate_and_process_pipeline.assert_called_once_with(pipeline, False)
+    validator.validate_and_process_pipeline.assert_called_once_with(pipeline, False, executor=None)
     runtime.pre_prepare_run_pipeline.assert_called_once_with(
         pipeline, root_pipeline_data, root_pipeline_context, subprocess_context, **options
     )
@@ -1179,3 +1187,153 @@ def test_retry_subprocess__success():
     )
     runtime.execute.assert_called_once_with(process_id, node_id)
     runtime.post_retry_subprocess.assert_called_once_with(node_id)
+
+
+def test_get_pipeline_states_snapshot():
+    state = State(
+        node_id="n1",
+        root_id="root",
+        parent_id="root",
+        name=states.RUNNING,
+        version="v1",
+        loop=1,
+        inner_loop=1,
+        retry=0,
+        skip=False,
+        error_ignored=False,
+        created_time=None,
+        started_time=None,
+        archived_time=None,
+    )
+    snapshot = StateSnapshot.from_states([state])
+    runtime = MagicMock()
+    runtime.get_state_snapshot_by_root = MagicMock(return_value=snapshot)
+
+    api_result = get_pipeline_states_snapshot(runtime, "root")
+    assert api_result.result is True
+    assert api_result.data["fields"] == list(StateSnapshot.FIELDS)
+    assert api_result.data["states"] == [
+        ("n1", "root", "root", states.RUNNING, "v1", 1, 1, 0, False, False, None, None, None)
+    ]
+    assert api_result.data["cursor"] is None
+    assert snapshot.columns()["node_id"] == ["n1"]
+    runtime.get_state_snapshot_by_root.assert_called_once_with("root")
+
+
+def test_get_pipeline_states_since():
+    snapshot = StateSnapshot(rows=[], cursor="c2")
+    runtime = MagicMock()
+    runtime.get_state_snapshot_by_root_since = MagicMock(return_value=snapshot)
+
+    api_result = get_pipeline_states_since(runtime, "root", "c1")
+    assert api_result.result is True
+    assert api_result.data == {"fields": list(StateSnapshot.FIELDS), "states": [], "cursor": "c2"}
+    assert snapshot.columns()["node_id"] == []
+    runtime.get_state_snapshot_by_root_since.assert_called_once_with("root", "c1")
+
+
+def test_get_pipeline_states__fallback_to_archive():
+    state = State(
+        node_id="root",
+        root_id="root",
+        parent_id="root",
+        name=states.FINISHED,
+        version="v1",
+        loop=1,
+        inner_loop=1,
+        retry=0,
+        skip=False,
+        error_ignored=False,
+        created_time=None,
+        started_time=None,
+        archived_time=None,
+    )
+    runtime = MagicMock()
+    runtime.get_state_by_root = MagicMock(return_value=[])
+    runtime.get_archived_state_by_root = MagicMock(return_value=[state])
+
+    api_result = get_pipeline_states(runtime, "root")
+    assert api_result.result is True
+    assert api_result.data["root"]["state"] == states.FINISHED
+    runtime.get_archived_state_by_root.assert_called_once_with("root")
+
+
+def test_get_execution_data__fallback_to_archive():
+    runtime = MagicMock()
+    runtime.get_execution_data = MagicMock(side_effect=exceptions.NotFoundError)
+    runtime.get_archived_execution_data = MagicMock(return_value=ExecutionData(inputs={"a": 1}, outputs={"b": 2}))
+
+    api_result = get_execution_data(runtime, "n1")
+    assert api_result.result is True
+    assert api_result.data == {"inputs": {"a": 1}, "outputs": {"b": 2}}
+    runtime.get_archived_execution_data.assert_called_once_with("n1")
+
+
+def test_get_execution_data__not_archived():
+    runtime = MagicMock()
+    runtime.get_execution_data = MagicMock(side_effect=exceptions.NotFoundError)
+    runtime.get_archived_execution_data = MagicMock(return_value=None)
+
+    api_result = get_execution_data(runtime, "n1")
+    assert api_result.result is False
+    assert isinstance(api_result.exc, exceptions.NotFoundError)
+
+
+def test_get_node_histories__hot_data_exist():
+    history = MagicMock()
+    runtime = MagicMock()
+    runtime.get_histories = MagicMock(return_value=[history])
+
+    api_result = get_node_histories(runtime, "n1")
+    assert api_result.result is True
+    assert len(api_result.data) == 1
+    runtime.get_archived_histories.assert_not_called()
+
+
+def test_get_node_histories__fallback_to_archive():
+    history = MagicMock()
+    runtime = MagicMock()
+    runtime.get_histories = MagicMock(return_value=[])
+    runtime.is_node_archived = MagicMock(return_value=True)
+    runtime.get_archived_histories = MagicMock(return_value=[history])
+
+    api_result = get_node_histories(runtime, "n1", 2)
+    assert api_result.result is True
+    assert api_result.data[0]["id"] == history.id
+    runtime.is_node_archived.assert_called_once_with("n1")
+    runtime.get_archived_histories.assert_called_once_with("n1", 2)
+
+
+def test_get_node_histories__not_archived():
+    runtime = MagicMock()
+    runtime.get_histories = MagicMock(return_value=[])
+    runtime.is_node_archived = MagicMock(return_value=False)
+
+    api_result = get_node_histories(runtime, "n1")
+    assert api_result.result is True
+    assert api_result.data == []
+    runtime.get_archived_histories.assert_not_called()
+
+
+def test_get_node_short_histories__fallback_to_archive():
+    history = MagicMock()
+    runtime = MagicMock()
+    runtime.get_short_histories = MagicMock(return_value=[])
+    runtime.is_node_archived = MagicMock(return_value=True)
+    runtime.get_archived_histories = MagicMock(return_value=[history])
+
+    api_result = get_node_short_histories(runtime, "n1", 2)
+    assert api_result.result is True
+    assert api_result.data[0]["id"] == history.id
+    runtime.get_archived_histories.assert_called_once_with("n1", 2)
+
+
+def test_get_node_short_histories__not_archived():
+    runtime = MagicMock()
+    runtime.get_short_histories = MagicMock(return_value=[])
+    runtime.is_node_archived = MagicMock(return_value=False)
+
+    api_result = get_node_short_histories(runtime, "n1")
+    assert api_result.result is True
+    assert api_result.data == []
+    runtime.get_archived_histories.assert_not_called()
@@ -13,7 +13,7 @@ specific language governing permissions and limitations under the License.
 
 import pytest
 import mock
-from mock import MagicMock, call
+from mock import MagicMock
 
 from bamboo_engine.eri import (
     ProcessInfo,
@@ -31,6 +31,12 @@ from bamboo_engine.exceptions import StateVersionNotMatchError
 from bamboo_engine.handler import HandlerFactory, ExecuteResult
 
 
+def assert_flushed_before(runtime, method):
+    # 写缓冲中的当前节点需要在进程让出前写入，恢复，重试等操作会根据当前节点查找进程
+    names = [call[0] for call in runtime.method_calls]
+    assert "flush_process_buffer" in names[: names.index(method)]
+
+
 def test_execute__reach_destination_and_wake_up_failed():
     node_id = "nid"
     pi = ProcessInfo(
@@ -79,6 +85,28 @@ def test_execute__reach_destination_and_wake_up_success():
     runtime.execute.assert_called_once_with(pi.parent_id, pi.destination_id)
 
 
+def test_execute__process_not_ready():
+    node_id = "nid"
+    pi = ProcessInfo(
+        process_id="pid",
+        destination_id="d1",
+        root_pipeline_id="root",
+        pipeline_stack=["root"],
+        parent_id="parent",
+        ready=False,
+    )
+
+    runtime = MagicMock()
+    runtime.get_process_info = MagicMock(return_value=pi)
+
+    engine = Engine(runtime=runtime)
+    engine.execute(pi.process_id, node_id)
+
+    runtime.wake_up.assert_not_called()
+    runtime.beat.assert_not_called()
+    runtime.set_current_node.assert_not_called()
+
+
 def test_execute__engine_frozen():
     node_id = "nid"
     pi = ProcessInfo(
@@ -99,6 +127,7 @@ def test_execute__engine_frozen():
     runtime.beat.assert_called_once_with(pi.process_id)
     runtime.set_current_node.assert_called_once_with(pi.process_id, node_id)
     runtime.freeze.assert_called_once_with(pi.process_id)
+    assert_flushed_before(runtime, "freeze")
 
 
 def test_execute__root_pipeline_revoked():
@@ -143,6 +172,7 @@ def test_execute__root_pipeline_suspended():
 
     runtime.beat.assert_called_once_with(pi.process_id)
     runtime.suspend.assert_called_once_with(pi.process_id, pi.root_pipeline_id)
+    assert_flushed_before(runtime, "suspend")
 
 
 def test_execute__suspended_in_pipeline_stack():
@@ -171,6 +201,7 @@ def test_execute__suspended_in_pipeline_stack():
 
     runtime.beat.assert_called_once_with(pi.process_id)
     runtime.suspend.assert_called_once_with(pi.process_id, pi.pipeline_stack[1])
+    assert_flushed_before(runtime, "suspend")
 
 
 def test_execute__exceed_rerun_limit():
@@ -234,6 +265,7 @@ def test_execute__exceed_rerun_limit():
         node_id=node_id, to_state=states.FAILED, set_archive_time=True
     )
     runtime.sleep.assert_called_once_with(pi.process_id)
+    assert_flushed_before(runtime, "set_state")
 
 
 def test_execute__node_has_suspended_appoint():
@@ -293,6 +325,7 @@ def test_execute__node_has_suspended_appoint():
         node_id=node_id, root_id=pi.root_pipeline_id, parent_id=pi.top_pipeline_id
     )
     runtime.suspend.assert_called_once_with(pi.process_id, node_id)
+    assert_flushed_before(runtime, "suspend")
 
 
 def test_execute__node_can_not_transit_to_running():
@@ -991,12 +1024,8 @@ def test_execute__has_dispatch_processes():
     runtime.join.assert_called_once_with(
         pi.process_id, [d.process_id for d in dispatch_processes]
     )
-    runtime.execute.assert_has_calls(
-        [
-            call(dispatch_processes[0].process_id, dispatch_processes[0].node_id),
-            call(dispatch_processes[1].process_id, dispatch_processes[1].node_id),
-        ]
-    )
+    runtime.batch_execute.assert_called_once_with(pi.process_id, dispatch_processes)
+    runtime.execute.assert_not_called()
     runtime.die.assert_not_called()
 
     get_handler.assert_called_once_with(node, runtime)
@@ -1157,3 +1186,76 @@ def test_execute__raise_state_version_not_match():
     runtime.set_state.assert_not_called()
     runtime.set_execution_data_outputs.assert_not_called()
     runtime.sleep.assert_not_called()
+
+
+def test_execute__flush_process_buffer_before_yield():
+    node_id = "nid"
+    pi = ProcessInfo(
+        process_id="pid",
+        destination_id="d1",
+        root_pipeline_id="root",
+        pipeline_stack=["root"],
+        parent_id="parent",
+    )
+    node = ServiceActivity(
+        id=node_id,
+        type=NodeType.ServiceActivity,
+        target_flows=["f1"],
+        target_nodes=["t1"],
+        targets={"f1": "t1"},
+        root_pipeline_id="root",
+        parent_pipeline_id="root",
+        code="",
+        version="",
+        timeout=None,
+        error_ignorable=False,
+    )
+    schedule = Schedule(
+        id=2,
+        type=ScheduleType.POLL,
+        process_id=pi.process_id,
+        node_id=node_id,
+        finished=False,
+        expired=False,
+        version="v",
+        times=0,
+    )
+
+    runtime = MagicMock()
+    runtime.get_process_info = MagicMock(return_value=pi)
+    runtime.is_frozen = MagicMock(return_value=False)
+    runtime.batch_get_state_name = MagicMock(return_value={"root": states.RUNNING})
+    runtime.get_node = MagicMock(return_value=node)
+    runtime.get_state_or_none = MagicMock(return_value=None)
+    runtime.set_schedule = MagicMock(return_value=schedule)
+    runtime.set_state = MagicMock(return_value="v")
+
+    handler = MagicMock()
+    handler.execute = MagicMock(
+        return_value=ExecuteResult(
+            should_sleep=True,
+            schedule_ready=True,
+            schedule_type=ScheduleType.POLL,
+            schedule_after=5,
+            dispatch_processes=[],
+            next_node_id=None,
+            should_die=False,
+        )
+    )
+
+    engine = Engine(runtime=runtime)
+
+    with mock.patch(
+        "bamboo_engine.engine.HandlerFactory.get_handler",
+        MagicMock(return_value=handler),
+    ):
+        engine.execute(pi.process_id, node_id)
+
+    runtime.process_write_behind.assert_called_once_with(pi.process_id)
+    runtime.context_snapshot.assert_called_once_with(pi.process_id)
+    calls = [c[0] for c in runtime.mock_calls]
+    # 服务节点执行前与进程让出前都需要写入缓冲的进程数据
+    assert calls.index("set_state") < calls.index("flush_process_buffer") < calls.index("sleep")
+    last_flush = len(calls) - 1 - calls[::-1].index("flush_process_buffer")
+    assert calls.index("sleep") < last_flush < calls.index("set_schedule") < calls.index("schedule")
+    assert calls.count("flush_process_buffer") == 2
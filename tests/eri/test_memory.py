@@ -0,0 +1,315 @@
+# -*- coding: utf-8 -*-
+"""
+Tencent is pleased to support the open source community by making 蓝鲸智云PaaS平台社区版 (BlueKing PaaS Community
+Edition) available.
+Copyright (C) 2017-2021 THL A29 Limited, a Tencent company. All rights reserved.
+Licensed under the MIT License (the "License"); you may not use this file except in compliance with the License.
+You may obtain a copy of the License at
+http://opensource.org/licenses/MIT
+Unless required by applicable law or agreed to in writing, software distributed under the License is distributed on
+an "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the License for the
+specific language governing permissions and limitations under the License.
+"""
+
+from bamboo_engine import api, states
+from bamboo_engine.builder import (
+    EmptyStartEvent,
+    ServiceActivity,
+    SubProcess,
+    ParallelGateway,
+    ConvergeGateway,
+    EmptyEndEvent,
+    Data,
+    Var,
+    NodeOutput,
+    build_tree,
+)
+from bamboo_engine.eri import Service, ScheduleType
+from bamboo_engine.eri.memory import MemoryRuntime, InlineTaskExecutor, ThreadPoolTaskExecutor
+
+
+class BaseService(Service):
+    def pre_execute(self, data, root_pipeline_data):
+        pass
+
+    def execute(self, data, root_pipeline_data):
+        return True
+
+    def schedule(self, schedule, data, root_pipeline_data, callback_data=None):
+        return True
+
+    def need_schedule(self):
+        return False
+
+    def schedule_type(self):
+        return None
+
+    def is_schedule_done(self):
+        return False
+
+    def schedule_after(self, schedule, data, root_pipeline_data):
+        return -1
+
+    def setup_runtime_attributes(self, **attrs):
+        pass
+
+
+class EchoService(BaseService):
+    def execute(self, data, root_pipeline_data):
+        data.outputs.value = data.inputs.value
+        return True
+
+
+class FailService(BaseService):
+    def execute(self, data, root_pipeline_data):
+        return False
+
+
+class CallbackService(BaseService):
+    def schedule(self, schedule, data, root_pipeline_data, callback_data=None):
+        data.outputs.callback = callback_data.data
+        return True
+
+    def need_schedule(self):
+        return True
+
+    def schedule_type(self):
+        return ScheduleType.CALLBACK
+
+
+class PollService(BaseService):
+    def __init__(self):
+        self.done = False
+
+    def schedule(self, schedule, data, root_pipeline_data, callback_data=None):
+        data.outputs.times = schedule.times
+        self.done = schedule.times >= 3
+        return True
+
+    def need_schedule(self):
+        return True
+
+    def schedule_type(self):
+        return ScheduleType.POLL
+
+    def is_schedule_done(self):
+        return self.done
+
+    def schedule_after(self, schedule, data, root_pipeline_data):
+        return 5
+
+
+def _runtime(executor=None):
+    runtime = MemoryRuntime(executor=executor)
+    runtime.register_service("echo", "legacy", EchoService)
+    runtime.register_service("fail", "legacy", FailService)
+    runtime.register_service("callback", "legacy", CallbackService)
+    runtime.register_service("poll", "legacy", PollService)
+    return runtime
+
+
+def _act(code, **inputs):
+    act = ServiceActivity(component_code=code)
+    for key, value in inputs.items():
+        act.component.inputs[key] = Var(type=Var.SPLICE, value=value)
+    return act
+
+
+def _linear(codes):
+    start = EmptyStartEvent()
+    elem = start
+    acts = []
+    for code in codes:
+        act = _act(code, value=code)
+        acts.append(act)
+        elem = elem.extend(act)
+    elem.extend(EmptyEndEvent())
+    return start, acts
+
+
+def _state_names(runtime, root_id):
+    return {s.node_id: s.name for s in runtime.get_state_by_root(root_id)}
+
+
+def test_linear_pipeline():
+    runtime = _runtime()
+    start = EmptyStartEvent()
+    act_1 = _act("echo", value="${input}")
+    act_2 = _act("echo", value="${act_1_value}_2")
+    start.extend(act_1).extend(act_2).extend(EmptyEndEvent())
+
+    data = Data()
+    data.inputs["${input}"] = Var(type=Var.PLAIN, value="hello")
+    data.inputs["${act_1_value}"] = NodeOutput(type=Var.PLAIN, source_act=act_1.id, source_key="value")
+    pipeline = build_tree(start, data=data)
+
+    assert api.run_pipeline(runtime, pipeline).result
+    assert runtime.wait()
+
+    assert runtime.get_state(pipeline["id"]).name == states.FINISHED
+    assert set(_state_names(runtime, pipeline["id"]).values()) == {states.FINISHED}
+    assert runtime.get_execution_data_outputs(act_1.id)["value"] == "hello"
+    assert runtime.get_execution_data_outputs(act_2.id)["value"] == "hello_2"
+
+
+def test_parallel_fan_out():
+    runtime = _runtime()
+    start = EmptyStartEvent()
+    pg = ParallelGateway()
+    cg = ConvergeGateway()
+    branches = [_act("echo", value=i) for i in range(5)]
+    start.extend(pg).connect(*branches).to(pg).converge(cg).extend(EmptyEndEvent())
+    pipeline = build_tree(start)
+
+    api.run_pipeline(runtime, pipeline)
+    runtime.wait()
+
+    assert runtime.get_state(pipeline["id"]).name == states.FINISHED
+    for act in branches:
+        assert runtime.get_state(act.id).name == states.FINISHED
+    # 1 个主进程和 5 个子进程
+    assert len(runtime.get_process_info_with_root_pipeline(pipeline["id"])) == 6
+
+
+def test_subprocess():
+    runtime = _runtime()
+    sub_start, sub_acts = _linear(["echo", "echo"])
+    subprocess = SubProcess(start=sub_start)
+    start = EmptyStartEvent()
+    start.extend(subprocess).extend(EmptyEndEvent())
+    pipeline = build_tree(start)
+
+    api.run_pipeline(runtime, pipeline)
+    runtime.wait()
+
+    assert runtime.get_state(pipeline["id"]).name == states.FINISHED
+    assert runtime.get_state(subprocess.id).name == states.FINISHED
+    for act in sub_acts:
+        assert runtime.get_state(act.id).parent_id == subprocess.id
+        assert runtime.get_state(act.id).name == states.FINISHED
+
+
+def test_failed_node_retry_and_skip():
+    runtime = _runtime()
+    start, (act_1, act_2) = _linear(["fail", "echo"])
+    pipeline = build_tree(start)
+
+    api.run_pipeline(runtime, pipeline)
+    runtime.wait()
+
+    assert runtime.get_state(act_1.id).name == states.FAILED
+    assert api.retry_node(runtime, act_1.id).result
+    runtime.wait()
+    assert runtime.get_state(act_1.id).name == states.FAILED
+    assert runtime.get_state(act_1.id).retry == 1
+
+    assert api.skip_node(runtime, act_1.id).result
+    runtime.wait()
+    assert runtime.get_state(act_1.id).skip is True
+    assert runtime.get_state(act_2.id).name == states.FINISHED
+    assert runtime.get_state(pipeline["id"]).name == states.FINISHED
+
+
+def test_callback():
+    runtime = _runtime()
+    start, (act,) = _linear(["callback"])
+    pipeline = build_tree(start)
+
+    api.run_pipeline(runtime, pipeline)
+    runtime.wait()
+
+    state = runtime.get_state(act.id)
+    assert state.name == states.RUNNING
+    assert runtime.get_schedule_with_node_and_version(act.id, state.version).finished is False
+
+    assert api.callback(runtime, act.id, state.version, {"k": "v"}).result
+    runtime.wait()
+
+    assert runtime.get_state(act.id).name == states.FINISHED
+    assert runtime.get_execution_data_outputs(act.id)["callback"] == {"k": "v"}
+    assert runtime.get_state(pipeline["id"]).name == states.FINISHED
+
+
+def test_poll_schedule_with_virtual_clock():
+    runtime = _runtime(InlineTaskExecutor())
+    start, (act,) = _linear(["poll"])
+    pipeline = build_tree(start)
+
+    api.run_pipeline(runtime, pipeline)
+    runtime.wait()
+
+    assert runtime.get_state(act.id).name == states.FINISHED
+    assert runtime.get_execution_data_outputs(act.id)["times"] == 3
+    assert runtime.get_state(pipeline["id"]).name == states.FINISHED
+
+
+def test_timeout_monitor():
+    runtime = _runtime()
+    start = EmptyStartEvent()
+    act = ServiceActivity(component_code="callback", timeout=10)
+    start.extend(act).extend(EmptyEndEvent())
+    pipeline = build_tree(start)
+
+    api.run_pipeline(runtime, pipeline)
+    runtime.wait()
+
+    assert runtime.get_state(act.id).name == states.FAILED
+    assert runtime.get_execution_data_outputs(act.id)["ex_data"] == "timeout kill"
+
+
+def test_pause_and_resume_pipeline():
+    runtime = _runtime()
+    start, (act,) = _linear(["callback"])
+    pipeline = build_tree(start)
+
+    api.run_pipeline(runtime, pipeline)
+    runtime.wait()
+    version = runtime.get_state(act.id).version
+
+    assert api.pause_pipeline(runtime, pipeline["id"]).result
+    api.callback(runtime, act.id, version, {})
+    runtime.wait()
+    assert runtime.get_state(act.id).name == states.FINISHED
+    assert runtime.get_state(pipeline["id"]).name == states.SUSPENDED
+
+    assert api.resume_pipeline(runtime, pipeline["id"]).result
+    runtime.wait()
+    assert runtime.get_state(pipeline["id"]).name == states.FINISHED
+
+
+def test_thread_pool_executor():
+    executor = ThreadPoolTaskExecutor(max_workers=4)
+    runtime = _runtime(executor)
+    pipelines = []
+    for _ in range(10):
+        start = EmptyStartEvent()
+        pg = ParallelGateway()
+        cg = ConvergeGateway()
+        start.extend(pg).connect(*[_act("echo", value=i) for i in range(3)]).to(pg).converge(cg).extend(
+            EmptyEndEvent()
+        )
+        pipelines.append(build_tree(start))
+
+    try:
+        for pipeline in pipelines:
+            api.run_pipeline(runtime, pipeline)
+        assert runtime.wait(timeout=30)
+    finally:
+        executor.shutdown()
+
+    for pipeline in pipelines:
+        assert set(_state_names(runtime, pipeline["id"]).values()) == {states.FINISHED}
+
+
+def test_histories_and_data_isolation():
+    runtime = _runtime()
+    runtime.set_execution_data_outputs("n", {"a": {"b": 1}})
+    outputs = runtime.get_execution_data_outputs("n")
+    outputs["a"]["b"] = 2
+    assert runtime.get_execution_data_outputs("n") == {"a": {"b": 1}}
+
+    history_id = runtime.add_history("n", None, None, 1, False, 0, "v1", {"i": 1}, {"o": 1})
+    runtime.add_history("n", None, None, 2, False, 0, "v2", {"i": 2}, {"o": 2})
+
+    assert [h.id for h in runtime.get_histories("n", loop=1)] == [history_id]
+    assert [h.version for h in runtime.get_short_histories("n")] == ["v1", "v2"]
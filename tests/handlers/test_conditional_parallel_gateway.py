@@ -49,16 +49,14 @@ def test_exclusive_gateway__context_hydrate_raise():
         pipeline_stack=["root"],
         parent_id="parent",
     )
-    additional_refs = []
 
     runtime = MagicMock()
-    runtime.get_context_key_references = MagicMock(return_value=additional_refs)
-    runtime.get_context_values = MagicMock(return_value=[])
+    runtime.resolve_context = MagicMock(return_value=[])
     runtime.get_execution_data_outputs = MagicMock(return_value={})
     runtime.get_data_inputs = MagicMock(return_value={})
 
     raise_context = MagicMock()
-    raise_context.hydrate = MagicMock(side_effect=Exception)
+    raise_context.lazy_hydrate = MagicMock(side_effect=Exception)
 
     handler = ConditionalParallelGatewayHandler(node, runtime)
     with patch("bamboo_engine.handlers.conditional_parallel_gateway.Context", MagicMock(return_value=raise_context)):
@@ -74,8 +72,7 @@ def test_exclusive_gateway__context_hydrate_raise():
     assert result.should_die == False
 
     runtime.get_data_inputs.assert_called_once_with("root")
-    runtime.get_context_key_references.assert_called_once_with(pipeline_id=pi.top_pipeline_id, keys={"${k}"})
-    runtime.get_context_values.assert_called_once_with(pipeline_id=pi.top_pipeline_id, keys={"${k}"})
+    runtime.resolve_context.assert_called_once_with(pipeline_id=pi.top_pipeline_id, keys={"${k}"})
     runtime.get_execution_data_outputs.assert_called_once_with(node.id)
     runtime.set_state.assert_called_once_with(node_id=node.id, to_state=states.FAILED, set_archive_time=True)
     runtime.set_execution_data_outputs.assert_called_once()
@@ -105,12 +102,10 @@ def test_conditional_parallel_gateway__execute_bool_rule_test_raise():
         pipeline_stack=["root"],
         parent_id="parent",
     )
-    additional_refs = []
     context_values = []
 
     runtime = MagicMock()
-    runtime.get_context_key_references = MagicMock(return_value=additional_refs)
-    runtime.get_context_values = MagicMock(return_value=[])
+    runtime.resolve_context = MagicMock(return_value=[])
     runtime.get_execution_data_outputs = MagicMock(return_value={})
     runtime.get_data_inputs = MagicMock(return_value={})
 
@@ -126,8 +121,7 @@ def test_conditional_parallel_gateway__execute_bool_rule_test_raise():
     assert result.should_die == False
 
     runtime.get_data_inputs.assert_called_once_with("root")
-    runtime.get_context_key_references.assert_called_once_with(pipeline_id=pi.top_pipeline_id, keys={"${k}"})
-    runtime.get_context_values.assert_called_once_with(pipeline_id=pi.top_pipeline_id, keys={"${k}"})
+    runtime.resolve_context.assert_called_once_with(pipeline_id=pi.top_pipeline_id, keys={"${k}"})
     runtime.get_execution_data_outputs.assert_called_once_with(node.id)
     runtime.set_state.assert_called_once_with(node_id=node.id, to_state=states.FAILED, set_archive_time=True)
     runtime.set_execution_data_outputs.assert_called_once()
@@ -157,12 +151,10 @@ def test_conditional_parallel_gateway__execute_not_fork_targets():
         pipeline_stack=["root"],
         parent_id="parent",
     )
-    additional_refs = []
     context_values = []
 
     runtime = MagicMock()
-    runtime.get_context_key_references = MagicMock(return_value=additional_refs)
-    runtime.get_context_values = MagicMock(return_value=[])
+    runtime.resolve_context = MagicMock(return_value=[])
     runtime.get_execution_data_outputs = MagicMock(return_value={})
     runtime.get_data_inputs = MagicMock(return_value={})
 
@@ -178,8 +170,7 @@ def test_conditional_parallel_gateway__execute_not_fork_targets():
     assert result.should_die == False
 
     runtime.get_data_inputs.assert_called_once_with("root")
-    runtime.get_context_key_references.assert_called_once_with(pipeline_id=pi.top_pipeline_id, keys=set())
-    runtime.get_context_values.assert_called_once_with(pipeline_id=pi.top_pipeline_id, keys=set())
+    runtime.resolve_context.assert_called_once_with(pipeline_id=pi.top_pipeline_id, keys=set())
     runtime.get_execution_data_outputs.assert_called_once_with(node.id)
     runtime.set_state.assert_called_once_with(node_id=node.id, to_state=states.FAILED, set_archive_time=True)
     runtime.set_execution_data_outputs.assert_called_once_with(
@@ -212,13 +203,11 @@ def test_conditional_parallel_gateway__execute_success():
         pipeline_stack=["root"],
         parent_id="parent",
     )
-    additional_refs = []
     context_values = []
     dispatch_processes = ["p1", "p2", "p3"]
 
     runtime = MagicMock()
-    runtime.get_context_key_references = MagicMock(return_value=additional_refs)
-    runtime.get_context_values = MagicMock(return_value=[])
+    runtime.resolve_context = MagicMock(return_value=[])
     runtime.fork = MagicMock(return_value=dispatch_processes)
     runtime.get_data_inputs = MagicMock(return_value={})
 
@@ -234,8 +223,7 @@ def test_conditional_parallel_gateway__execute_success():
     assert result.should_die == False
 
     runtime.get_data_inputs.assert_called_once_with("root")
-    runtime.get_context_key_references.assert_called_once_with(pipeline_id=pi.top_pipeline_id, keys=set())
-    runtime.get_context_values.assert_called_once_with(pipeline_id=pi.top_pipeline_id, keys=set())
+    runtime.resolve_context.assert_called_once_with(pipeline_id=pi.top_pipeline_id, keys=set())
     runtime.fork.assert_called_once_with(
         parent_id=pi.process_id,
         root_pipeline_id=pi.root_pipeline_id,
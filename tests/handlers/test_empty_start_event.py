@@ -93,8 +93,7 @@ def test_empty_start_event_handler__execute_success():
     )
 
     runtime = MagicMock()
-    runtime.get_context_key_references = MagicMock(return_value={"${c}"})
-    runtime.get_context_values = MagicMock(return_value=context_values)
+    runtime.resolve_context = MagicMock(return_value=context_values)
     runtime.get_data = MagicMock(return_value=data)
 
     handler = EmptyStartEventHandler(node, runtime)
@@ -113,7 +112,7 @@ def test_empty_start_event_handler__execute_success():
         to_state=states.FINISHED,
         set_archive_time=True,
     )
-    runtime.get_context_values.assert_called_once_with(pipeline_id=pi.top_pipeline_id, keys={"${a}", "${b}", "${c}"})
+    runtime.resolve_context.assert_called_once_with(pipeline_id=pi.top_pipeline_id, keys={"${a}", "${b}"})
     runtime.upsert_plain_context_values.assert_called_once_with(
         pi.top_pipeline_id, upsert_context_dict
     )
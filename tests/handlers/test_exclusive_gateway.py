@@ -48,16 +48,14 @@ def test_exclusive_gateway__context_hydrate_raise():
         pipeline_stack=["root"],
         parent_id="parent",
     )
-    additional_refs = []
 
     runtime = MagicMock()
-    runtime.get_context_key_references = MagicMock(return_value=additional_refs)
-    runtime.get_context_values = MagicMock(return_value=[])
+    runtime.resolve_context = MagicMock(return_value=[])
     runtime.get_execution_data_outputs = MagicMock(return_value={})
     runtime.get_data_inputs = MagicMock(return_value={})
 
     raise_context = MagicMock()
-    raise_context.hydrate = MagicMock(side_effect=Exception)
+    raise_context.lazy_hydrate = MagicMock(side_effect=Exception)
 
     handler = ExclusiveGatewayHandler(node, runtime)
     with patch("bamboo_engine.handlers.exclusive_gateway.Context", MagicMock(return_value=raise_context)):
@@ -73,8 +71,7 @@ def test_exclusive_gateway__context_hydrate_raise():
     assert result.should_die == False
 
     runtime.get_data_inputs.assert_called_once_with("root")
-    runtime.get_context_key_references.assert_called_once_with(pipeline_id=pi.top_pipeline_id, keys={"${k}"})
-    runtime.get_context_values.assert_called_once_with(pipeline_id=pi.top_pipeline_id, keys={"${k}"})
+    runtime.resolve_context.assert_called_once_with(pipeline_id=pi.top_pipeline_id, keys={"${k}"})
     runtime.get_execution_data_outputs.assert_called_once_with(node.id)
     runtime.set_state.assert_called_once_with(node_id=node.id, to_state=states.FAILED, set_archive_time=True)
     runtime.set_execution_data_outputs.assert_called_once()
@@ -103,11 +100,9 @@ def test_exclusive_gateway__execute_bool_rule_test_raise():
         pipeline_stack=["root"],
         parent_id="parent",
     )
-    additional_refs = []
 
     runtime = MagicMock()
-    runtime.get_context_key_references = MagicMock(return_value=additional_refs)
-    runtime.get_context_values = MagicMock(return_value=[])
+    runtime.resolve_context = MagicMock(return_value=[])
     runtime.get_execution_data_outputs = MagicMock(return_value={})
     runtime.get_data_inputs = MagicMock(return_value={})
 
@@ -123,8 +118,7 @@ def test_exclusive_gateway__execute_bool_rule_test_raise():
     assert result.should_die == False
 
     runtime.get_data_inputs.assert_called_once_with("root")
-    runtime.get_context_key_references.assert_called_once_with(pipeline_id=pi.top_pipeline_id, keys={"${k}"})
-    runtime.get_context_values.assert_called_once_with(pipeline_id=pi.top_pipeline_id, keys={"${k}"})
+    runtime.resolve_context.assert_called_once_with(pipeline_id=pi.top_pipeline_id, keys={"${k}"})
     runtime.get_execution_data_outputs.assert_called_once_with(node.id)
     runtime.set_state.assert_called_once_with(node_id=node.id, to_state=states.FAILED, set_archive_time=True)
     runtime.set_execution_data_outputs.assert_called_once()
@@ -153,11 +147,9 @@ def test_exclusive_gateway__execute_not_meet_targets():
         pipeline_stack=["root"],
         parent_id="parent",
     )
-    additional_refs = []
 
     runtime = MagicMock()
-    runtime.get_context_key_references = MagicMock(return_value=additional_refs)
-    runtime.get_context_values = MagicMock(return_value=[])
+    runtime.resolve_context = MagicMock(return_value=[])
     runtime.get_execution_data_outputs = MagicMock(return_value={})
     runtime.get_data_inputs = MagicMock(return_value={})
 
@@ -173,8 +165,7 @@ def test_exclusive_gateway__execute_not_meet_targets():
     assert result.should_die == False
 
     runtime.get_data_inputs.assert_called_once_with("root")
-    runtime.get_context_key_references.assert_called_once_with(pipeline_id=pi.top_pipeline_id, keys=set())
-    runtime.get_context_values.assert_called_once_with(pipeline_id=pi.top_pipeline_id, keys=set())
+    runtime.resolve_context.assert_called_once_with(pipeline_id=pi.top_pipeline_id, keys=set())
     runtime.get_execution_data_outputs.assert_called_once_with(node.id)
     runtime.set_state.assert_called_once_with(node_id=node.id, to_state=states.FAILED, set_archive_time=True)
     runtime.set_execution_data_outputs.assert_called_once_with(
@@ -205,11 +196,9 @@ def test_exclusive_gateway__execute_mutiple_meet_targets():
         pipeline_stack=["root"],
         parent_id="parent",
     )
-    additional_refs = []
 
     runtime = MagicMock()
-    runtime.get_context_key_references = MagicMock(return_value=additional_refs)
-    runtime.get_context_values = MagicMock(return_value=[])
+    runtime.resolve_context = MagicMock(return_value=[])
     runtime.get_execution_data_outputs = MagicMock(return_value={})
     runtime.get_data_inputs = MagicMock(return_value={})
 
@@ -225,8 +214,7 @@ def test_exclusive_gateway__execute_mutiple_meet_targets():
     assert result.should_die == False
 
     runtime.get_data_inputs.assert_called_once_with("root")
-    runtime.get_context_key_references.assert_called_once_with(pipeline_id=pi.top_pipeline_id, keys=set())
-    runtime.get_context_values.assert_called_once_with(pipeline_id=pi.top_pipeline_id, keys=set())
+    runtime.resolve_context.assert_called_once_with(pipeline_id=pi.top_pipeline_id, keys=set())
     runtime.get_execution_data_outputs.assert_called_once_with(node.id)
     runtime.set_state.assert_called_once_with(node_id=node.id, to_state=states.FAILED, set_archive_time=True)
     runtime.set_execution_data_outputs.assert_called_once_with(
@@ -258,11 +246,9 @@ def test_exclusive_gateway__execute_success():
         pipeline_stack=["root"],
         parent_id="parent",
     )
-    additional_refs = []
 
     runtime = MagicMock()
-    runtime.get_context_key_references = MagicMock(return_value=additional_refs)
-    runtime.get_context_values = MagicMock(return_value=[])
+    runtime.resolve_context = MagicMock(return_value=[])
     runtime.get_data_inputs = MagicMock(return_value={})
 
     handler = ExclusiveGatewayHandler(node, runtime)
@@ -277,6 +263,5 @@ def test_exclusive_gateway__execute_success():
     assert result.should_die == False
 
     runtime.get_data_inputs.assert_called_once_with("root")
-    runtime.get_context_key_references.assert_called_once_with(pipeline_id=pi.top_pipeline_id, keys=set())
-    runtime.get_context_values.assert_called_once_with(pipeline_id=pi.top_pipeline_id, keys=set())
+    runtime.resolve_context.assert_called_once_with(pipeline_id=pi.top_pipeline_id, keys=set())
     runtime.set_state.assert_called_once_with(node_id=node.id, to_state=states.FINISHED, set_archive_time=True)
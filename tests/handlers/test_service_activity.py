@@ -61,8 +61,7 @@ def test_execute__raise_not_ignore():
 
     runtime = MagicMock()
     runtime.get_data = MagicMock(return_value=data)
-    runtime.get_context_key_references = MagicMock(return_value=set())
-    runtime.get_context_values = MagicMock(return_value=[])
+    runtime.resolve_context = MagicMock(return_value=[])
     runtime.get_service = MagicMock(return_value=service)
 
     handler = ServiceActivityHandler(node, runtime)
@@ -78,8 +77,7 @@ def test_execute__raise_not_ignore():
 
     runtime.get_data.assert_called_once_with(node.id)
     runtime.get_data_inputs.assert_called_once_with(pi.root_pipeline_id)
-    runtime.get_context_key_references.assert_called_once_with(pipeline_id=pi.top_pipeline_id, keys=set())
-    runtime.get_context_values.assert_called_once_with(pipeline_id=pi.top_pipeline_id, keys=set())
+    runtime.resolve_context.assert_called_once_with(pipeline_id=pi.top_pipeline_id, keys=set())
     runtime.get_service.assert_called_once_with(code=node.code, version=node.version)
     runtime.start_timeout_monitor.assert_called_once_with(
         process_id=pi.process_id,
@@ -151,8 +149,7 @@ def test_execute__raise_ignore():
 
     runtime = MagicMock()
     runtime.get_data = MagicMock(return_value=data)
-    runtime.get_context_key_references = MagicMock(return_value=set())
-    runtime.get_context_values = MagicMock(return_value=[])
+    runtime.resolve_context = MagicMock(return_value=[])
     runtime.get_service = MagicMock(return_value=service)
 
     handler = ServiceActivityHandler(node, runtime)
@@ -168,8 +165,7 @@ def test_execute__raise_ignore():
 
     runtime.get_data.assert_called_once_with(node.id)
     runtime.get_data_inputs.assert_called_once_with(pi.root_pipeline_id)
-    runtime.get_context_key_references.assert_called_once_with(pipeline_id=pi.top_pipeline_id, keys=set())
-    runtime.get_context_values.assert_called_once_with(pipeline_id=pi.top_pipeline_id, keys=set())
+    runtime.resolve_context.assert_called_once_with(pipeline_id=pi.top_pipeline_id, keys=set())
     runtime.get_service.assert_called_once_with(code=node.code, version=node.version)
     runtime.start_timeout_monitor.assert_not_called()
     runtime.set_state.assert_called_once_with(
@@ -235,11 +231,10 @@ def test_context_hydrate__raise():
 
     runtime = MagicMock()
     runtime.get_data = MagicMock(return_value=data)
-    runtime.get_context_key_references = MagicMock(return_value=set())
-    runtime.get_context_values = MagicMock(return_value=[])
+    runtime.resolve_context = MagicMock(return_value=[])
 
     raise_context = MagicMock()
-    raise_context.hydrate = MagicMock(side_effect=Exception)
+    raise_context.lazy_hydrate = MagicMock(side_effect=Exception)
 
     handler = ServiceActivityHandler(node, runtime)
     with patch("bamboo_engine.handlers.service_activity.Context", MagicMock(return_value=raise_context)):
@@ -255,8 +250,7 @@ def test_context_hydrate__raise():
 
     runtime.get_data.assert_called_once_with(node.id)
     runtime.get_data_inputs.assert_called_once_with(pi.root_pipeline_id)
-    runtime.get_context_key_references.assert_called_once_with(pipeline_id=pi.top_pipeline_id, keys=set())
-    runtime.get_context_values.assert_called_once_with(pipeline_id=pi.top_pipeline_id, keys=set())
+    runtime.resolve_context.assert_called_once_with(pipeline_id=pi.top_pipeline_id, keys=set())
     runtime.set_state.assert_called_once_with(
         node_id=node.id, version="v1", to_state=states.FAILED, set_archive_time=True
     )
@@ -302,8 +296,7 @@ def test_execute__success_and_schedule():
 
     runtime = MagicMock()
     runtime.get_data = MagicMock(return_value=data)
-    runtime.get_context_key_references = MagicMock(return_value=set())
-    runtime.get_context_values = MagicMock(return_value=[])
+    runtime.resolve_context = MagicMock(return_value=[])
     runtime.get_service = MagicMock(return_value=service)
 
     handler = ServiceActivityHandler(node, runtime)
@@ -319,8 +312,7 @@ def test_execute__success_and_schedule():
 
     runtime.get_data.assert_called_once_with(node.id)
     runtime.get_data_inputs.assert_called_once_with(pi.root_pipeline_id)
-    runtime.get_context_key_references.assert_called_once_with(pipeline_id=pi.top_pipeline_id, keys=set())
-    runtime.get_context_values.assert_called_once_with(pipeline_id=pi.top_pipeline_id, keys=set())
+    runtime.resolve_context.assert_called_once_with(pipeline_id=pi.top_pipeline_id, keys=set())
     runtime.get_service.assert_called_once_with(code=node.code, version=node.version)
     runtime.start_timeout_monitor.assert_called_once_with(
         process_id=pi.process_id,
@@ -399,8 +391,7 @@ def test_execute__success_and_no_schedule():
 
     runtime = MagicMock()
     runtime.get_data = MagicMock(return_value=data)
-    runtime.get_context_key_references = MagicMock(return_value=set(["${k6}"]))
-    runtime.get_context_values = MagicMock(return_value=[])
+    runtime.resolve_context = MagicMock(return_value=[])
     runtime.get_service = MagicMock(return_value=service)
 
     handler = ServiceActivityHandler(node, runtime)
@@ -416,8 +407,7 @@ def test_execute__success_and_no_schedule():
 
     runtime.get_data.assert_called_once_with(node.id)
     runtime.get_data_inputs.assert_called_once_with(pi.root_pipeline_id)
-    runtime.get_context_key_references.assert_called_once_with(pipeline_id=pi.top_pipeline_id, keys=set(["${k4}"]))
-    runtime.get_context_values.assert_called_once_with(pipeline_id=pi.top_pipeline_id, keys=set(["${k4}", "${k6}"]))
+    runtime.resolve_context.assert_called_once_with(pipeline_id=pi.top_pipeline_id, keys=set(["${k4}"]))
     runtime.get_service.assert_called_once_with(code=node.code, version=node.version)
     runtime.start_timeout_monitor.assert_called_once_with(
         process_id=pi.process_id,
@@ -517,8 +507,7 @@ def test_execute__fail_and_schedule():
 
     runtime = MagicMock()
     runtime.get_data = MagicMock(return_value=data)
-    runtime.get_context_key_references = MagicMock(return_value=set())
-    runtime.get_context_values = MagicMock(return_value=[])
+    runtime.resolve_context = MagicMock(return_value=[])
     runtime.get_service = MagicMock(return_value=service)
 
     handler = ServiceActivityHandler(node, runtime)
@@ -534,8 +523,7 @@ def test_execute__fail_and_schedule():
 
     runtime.get_data.assert_called_once_with(node.id)
     runtime.get_data_inputs.assert_called_once_with(pi.root_pipeline_id)
-    runtime.get_context_key_references.assert_called_once_with(pipeline_id=pi.top_pipeline_id, keys=set())
-    runtime.get_context_values.assert_called_once_with(pipeline_id=pi.top_pipeline_id, keys=set())
+    runtime.resolve_context.assert_called_once_with(pipeline_id=pi.top_pipeline_id, keys=set())
     runtime.get_service.assert_called_once_with(code=node.code, version=node.version)
     runtime.start_timeout_monitor.assert_called_once_with(
         process_id=pi.process_id,
@@ -61,8 +61,7 @@ def test_subprocess_handler__execute_success():
 
     runtime = MagicMock()
     runtime.get_data = MagicMock(return_value=data)
-    runtime.get_context_key_references = MagicMock(return_value=set())
-    runtime.get_context_values = MagicMock(return_value=context_values)
+    runtime.resolve_context = MagicMock(return_value=context_values)
 
     handler = SubProcessHandler(node, runtime)
     result = handler.execute(pi, 1, 1, "v1")
@@ -77,10 +76,7 @@ def test_subprocess_handler__execute_success():
 
     runtime.get_data.assert_called_once_with(node.id)
     runtime.get_data_inputs.assert_called_once_with(pi.root_pipeline_id)
-    runtime.get_context_key_references.assert_called_once_with(
-        pipeline_id="root", keys={"${v1}", "${sub_loop}"}
-    )
-    runtime.get_context_values.assert_called_once_with(
+    runtime.resolve_context.assert_called_once_with(
         pipeline_id="root", keys={"${v1}", "${sub_loop}"}
     )
     runtime.reset_children_state_inner_loop.assert_called_once_with(node.id)
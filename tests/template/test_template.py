@@ -13,8 +13,16 @@ specific language governing permissions and limitations under the License.
 
 import datetime
 
+from bamboo_engine import metrics
 from bamboo_engine.config import Settings
 from bamboo_engine.template import Template
+from bamboo_engine.template.template import (
+    TEMPLATE_CACHE,
+    REFERENCE_CACHE,
+    get_compiled_template,
+    _get_simple_template_reference,
+    _parse_template_reference,
+)
 
 
 def test_get_reference():
@@ -110,3 +118,57 @@ def test_mako_attack():
     ]
     for at in attack_templates:
         assert Template(at).render({}) == at
+
+
+def test_render__compiled_template_cache():
+    TEMPLATE_CACHE.clear()
+
+    assert Template("${a + 1}").render({"a": 1}) == "2"
+    compiled = get_compiled_template("${a + 1}")
+    assert compiled.safe is True
+    assert compiled.mako_template is not None
+
+    hit = metrics.ENGINE_TEMPLATE_CACHE_HIT._value.get()
+    assert Template("${a + 1}").render({"a": 2}) == "3"
+    assert metrics.ENGINE_TEMPLATE_CACHE_HIT._value.get() == hit + 1
+    assert get_compiled_template("${a + 1}") is compiled
+
+
+def test_render__compiled_template_cache_keep_safety_verdict():
+    TEMPLATE_CACHE.clear()
+
+    attack = '${"".__class__.__mro__[-1].__subclasses__()}'
+    for _ in range(2):
+        assert Template(attack).render({}) == attack
+    assert get_compiled_template(attack).safe is False
+
+
+def test_get_reference__simple_template_fast_path():
+    simple_templates = [
+        "${a}",
+        "${ a }",
+        "${a.b}",
+        "${a . b.c}",
+        '${a["k"]}',
+        "${a['k'].b}",
+        "${a[0]}",
+        '${a["x.if"]}',
+        "${int}",
+        "${context}",
+        "${None}",
+        "${True.x}",
+    ]
+    for tpl in simple_templates:
+        assert sorted(_get_simple_template_reference(tpl)) == sorted(_parse_template_reference(tpl))
+
+    for tpl in ["${a+b}", "${a[b]}", "${a.if}", "${if}", "${a | h}", "${a()}"]:
+        assert _get_simple_template_reference(tpl) is None
+
+
+def test_get_reference__memoized():
+    REFERENCE_CACHE.clear()
+
+    assert Template("${a.b} and ${c + d}").get_reference(deformat=True) == {"a", "c", "d"}
+    assert REFERENCE_CACHE.get("${a.b}") == ("a",)
+    assert sorted(REFERENCE_CACHE.get("${c + d}")) == ["c", "d"]
+    assert Template("${c + d}").get_reference() == {"${c}", "${d}"}
@@ -11,10 +11,13 @@ an "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express o
 specific language governing permissions and limitations under the License.
 """
 
+import pytest
 from mock import MagicMock
 
+from bamboo_engine.exceptions import ReferenceCycleError
 from bamboo_engine.eri import ContextValue, ContextValueType, Variable
 from bamboo_engine.context import Context, PlainVariable, SpliceVariable
+from bamboo_engine.template import Template
 
 
 def test_hydrate():
@@ -70,6 +73,137 @@ def test_hydrate():
     }
 
 
+def test_hydrate__evaluate_each_variable_once():
+    calls = {}
+
+    class CV(Variable):
+        def __init__(self, key, value):
+            self.key = key
+            self.value = value
+
+        def get(self):
+            calls[self.key] = calls.get(self.key, 0) + 1
+            return "cv(%s)" % self.value.get()
+
+    runtime = MagicMock()
+    runtime.get_compute_variable = MagicMock(side_effect=lambda code, key, value, additional_data: CV(key, value))
+
+    # a -> b, c -> d -> e(plain)
+    values = [
+        ContextValue("${a}", type=ContextValueType.SPLICE, value="${b}+${c}"),
+        ContextValue("${b}", type=ContextValueType.COMPUTE, value="${d}", code="cv"),
+        ContextValue("${c}", type=ContextValueType.COMPUTE, value="${d}", code="cv"),
+        ContextValue("${d}", type=ContextValueType.COMPUTE, value="${e}", code="cv"),
+        ContextValue("${e}", type=ContextValueType.PLAIN, value="1"),
+    ]
+
+    context = Context(runtime, values, {})
+    hydrated = context.hydrate()
+
+    assert hydrated == {
+        "${a}": "cv(cv(1))+cv(cv(1))",
+        "${b}": "cv(cv(1))",
+        "${c}": "cv(cv(1))",
+        "${d}": "cv(1)",
+        "${e}": "1",
+    }
+    assert list(hydrated.keys()) == ["${a}", "${b}", "${c}", "${d}", "${e}"]
+    assert calls == {"${b}": 1, "${c}": 1, "${d}": 1}
+    assert context.resolved == {}
+
+    context.hydrate()
+    assert calls == {"${b}": 2, "${c}": 2, "${d}": 2}
+
+
+def test_hydrate__reference_cycle():
+    runtime = MagicMock()
+    values = [
+        ContextValue("${a}", type=ContextValueType.SPLICE, value="${b}"),
+        ContextValue("${b}", type=ContextValueType.SPLICE, value="${a}"),
+        ContextValue("${c}", type=ContextValueType.SPLICE, value="${a}-${d}"),
+        ContextValue("${d}", type=ContextValueType.PLAIN, value="1"),
+        ContextValue("${e}", type=ContextValueType.SPLICE, value="${e}"),
+    ]
+
+    context = Context(runtime, values, {})
+    with pytest.raises(ReferenceCycleError) as excinfo:
+        context.hydrate()
+    assert excinfo.value.keys == {"${a}", "${b}", "${c}", "${e}"}
+
+    hydrated = context.hydrate(deformat=True, mute_error=True)
+    assert hydrated["d"] == "1"
+    for key in ["a", "b", "c", "e"]:
+        assert "circular reference" in hydrated[key]
+
+
+def test_lazy_hydrate():
+    calls = {}
+
+    class CV(Variable):
+        def __init__(self, key, value):
+            self.key = key
+            self.value = value
+
+        def get(self):
+            calls[self.key] = calls.get(self.key, 0) + 1
+            if self.key == "${err}":
+                raise Exception("get error")
+            return "cv(%s)" % self.value.get()
+
+    runtime = MagicMock()
+    runtime.get_compute_variable = MagicMock(side_effect=lambda code, key, value, additional_data: CV(key, value))
+
+    values = [
+        ContextValue("${a}", type=ContextValueType.SPLICE, value="${b}-${c}"),
+        ContextValue("${b}", type=ContextValueType.COMPUTE, value="${d}", code="cv"),
+        ContextValue("${c}", type=ContextValueType.COMPUTE, value="${d}", code="cv"),
+        ContextValue("${d}", type=ContextValueType.COMPUTE, value="1", code="cv"),
+        ContextValue("${unused}", type=ContextValueType.COMPUTE, value="${d}", code="cv"),
+        ContextValue("${err}", type=ContextValueType.COMPUTE, value="${d}", code="cv"),
+    ]
+
+    context = Context(runtime, values, {})
+    hydrated = context.lazy_hydrate(deformat=True, transform=lambda v: v.upper())
+
+    assert len(hydrated) == 6
+    assert list(hydrated) == ["a", "b", "c", "d", "unused", "err"]
+    assert "a" in hydrated
+    assert "${a}" not in hydrated
+    assert calls == {}
+
+    assert Template("${a}!").render(hydrated) == "CV(CV(1))-CV(CV(1))!"
+    assert hydrated["a"] == "CV(CV(1))-CV(CV(1))"
+    assert hydrated.get("b") == "CV(CV(1))"
+    assert calls == {"${b}": 1, "${c}": 1, "${d}": 1}
+    assert hydrated.loaded() == {"a": "CV(CV(1))-CV(CV(1))", "b": "CV(CV(1))"}
+
+    with pytest.raises(Exception):
+        hydrated["err"]
+    assert calls["${err}"] == 1
+
+    muted = context.lazy_hydrate(mute_error=True)
+    assert muted["${err}"] == "get error"
+    assert muted["${d}"] == "cv(1)"
+    assert calls["${d}"] == 1
+    assert "${unused}" not in calls
+
+
+def test_lazy_hydrate__reference_cycle():
+    runtime = MagicMock()
+    values = [
+        ContextValue("${a}", type=ContextValueType.SPLICE, value="${b}"),
+        ContextValue("${b}", type=ContextValueType.SPLICE, value="${a}"),
+        ContextValue("${c}", type=ContextValueType.SPLICE, value="${a}-${d}"),
+        ContextValue("${d}", type=ContextValueType.PLAIN, value="1"),
+    ]
+
+    hydrated = Context(runtime, values, {}).lazy_hydrate()
+    assert hydrated["${d}"] == "1"
+    with pytest.raises(ReferenceCycleError) as excinfo:
+        hydrated["${c}"]
+    assert excinfo.value.keys == {"${a}", "${b}"}
+
+
 def test_extract_outputs():
     pipeline_id = "pipeline"
     data_outputs = {"a": "b", "c": "d", "e": "f"}
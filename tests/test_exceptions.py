@@ -0,0 +1,40 @@
+# -*- coding: utf-8 -*-
+"""
+Tencent is pleased to support the open source community by making 蓝鲸智云PaaS平台社区版 (BlueKing PaaS Community
+Edition) available.
+Copyright (C) 2017-2021 THL A29 Limited, a Tencent company. All rights reserved.
+Licensed under the MIT License (the "License"); you may not use this file except in compliance with the License.
+You may obtain a copy of the License at
+http://opensource.org/licenses/MIT
+Unless required by applicable law or agreed to in writing, software distributed under the License is distributed on
+an "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the License for the
+specific language governing permissions and limitations under the License.
+"""
+
+import pickle
+
+import pytest
+
+from bamboo_engine import exceptions
+
+
+@pytest.mark.parametrize(
+    "error, attrs",
+    [
+        (exceptions.ReferenceCycleError(["${a}", "${b}"], "cycle"), {"keys": ["${a}", "${b}"]}),
+        (
+            exceptions.ConnectionValidateError(["n1"], {"n1": "msg"}, "invalid"),
+            {"failed_nodes": ["n1"], "detail": {"n1": "msg"}},
+        ),
+        (exceptions.ConvergeMatchError("g1", "msg"), {"gateway_id": "g1"}),
+        (exceptions.StreamValidateError("n1"), {"node_id": "n1"}),
+    ],
+)
+def test_pickle(error, attrs):
+    loaded = pickle.loads(pickle.dumps(error))
+
+    assert type(loaded) is type(error)
+    assert loaded.args == error.args
+    assert str(loaded) == str(error)
+    for attr, value in attrs.items():
+        assert getattr(loaded, attr) == value
@@ -11,7 +11,9 @@ an "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express o
 specific language governing permissions and limitations under the License.
 """
 
-from bamboo_engine.utils.boolrule.boolrule import BoolRule
+from mock import patch
+
+from bamboo_engine.utils.boolrule.boolrule import COMPILED_RULE_CACHE, BoolRule, CompiledBoolRule
 
 
 def test_eq():
@@ -207,3 +209,58 @@ def test_multi_and():
         ).test()
         == False
     )
+
+
+def test_compiled_rule():
+    rule = CompiledBoolRule("${a} > 2 and ${b} == \"c\" or ${a} in (${b}, 4)")
+    assert sorted(rule.templates) == ["${a}", "${b}"]
+
+    for a, b in [("3", "c"), ("1", "c"), ("4", "d"), ("1", "d"), ("true", "1")]:
+        fragments = {"${a}": a, "${b}": b}
+        resolved = rule.resolve(fragments)
+        assert rule.test(fragments) == BoolRule(resolved).test()
+
+
+def test_compiled_rule_quoted_fragment():
+    rule = CompiledBoolRule("\"${a}\" == \"1\"")
+    assert rule.test({"${a}": "1"}) is True
+    assert rule.test({"${a}": "2"}) is False
+    # value contains quote char fallback to rendered expression
+    assert rule.test({"${a}": '1" == "1" or "2'}) is True
+
+
+def test_compiled_rule_structure_changing_value():
+    rule = CompiledBoolRule("${a} == 2")
+    fragments = {"${a}": "1 == 1 or 2"}
+    assert rule.test(fragments) is BoolRule("1 == 1 or 2 == 2").test() is True
+
+
+def test_compiled_rule_match_all():
+    assert CompiledBoolRule("*").test() is True
+
+
+def test_compiled_rule_compile_cache():
+    rule = CompiledBoolRule.compile("${cache_a} == 1")
+    assert rule is CompiledBoolRule.compile("${cache_a} == 1")
+    assert rule.test({"${cache_a}": "1"}) is True
+
+
+def test_compiled_rule_compile_cache_size():
+    COMPILED_RULE_CACHE.clear()
+    with patch("bamboo_engine.utils.boolrule.boolrule.Settings.BOOLRULE_COMPILED_CACHE_SIZE", 1):
+        first = CompiledBoolRule.compile("${size_a} == 1")
+        CompiledBoolRule.compile("${size_b} == 1")
+
+        assert len(COMPILED_RULE_CACHE) == 1
+        assert CompiledBoolRule.compile("${size_a} == 1") is not first
+
+    with patch("bamboo_engine.utils.boolrule.boolrule.Settings.BOOLRULE_COMPILED_CACHE_SIZE", 0):
+        COMPILED_RULE_CACHE.clear()
+        assert CompiledBoolRule.compile("${size_a} == 1").test({"${size_a}": "1"}) is True
+        assert len(COMPILED_RULE_CACHE) == 0
+
+
+def test_compiled_rule_compile_not_supported():
+    # template fragments used as part of value can not be compiled
+    assert CompiledBoolRule.compile("${a}1 == 11") is None
+    assert CompiledBoolRule.compile("${a} ==") is None
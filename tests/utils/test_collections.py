@@ -0,0 +1,69 @@
+# -*- coding: utf-8 -*-
+"""
+Tencent is pleased to support the open source community by making 蓝鲸智云PaaS平台社区版 (BlueKing PaaS Community
+Edition) available.
+Copyright (C) 2017-2021 THL A29 Limited, a Tencent company. All rights reserved.
+Licensed under the MIT License (the "License"); you may not use this file except in compliance with the License.
+You may obtain a copy of the License at
+http://opensource.org/licenses/MIT
+Unless required by applicable law or agreed to in writing, software distributed under the License is distributed on
+an "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the License for the
+specific language governing permissions and limitations under the License.
+"""
+
+from bamboo_engine.utils.collections import LRUCache
+
+
+def test_lru_cache__evict_by_size():
+    cache = LRUCache(max_size=2)
+    cache.set("a", 1)
+    cache.set("b", 2)
+    assert cache.get("a") == 1
+
+    cache.set("c", 3)
+    assert "b" not in cache
+    assert cache.get("a") == 1
+    assert cache.get("c") == 3
+    assert cache.get("b", "default") == "default"
+    assert len(cache) == 2
+
+
+def test_lru_cache__evict_by_weight():
+    cache = LRUCache(max_size=10, max_weight=10)
+    cache.set("a", 1, weight=4)
+    cache.set("b", 2, weight=4)
+    cache.set("c", 3, weight=4)
+    assert "a" not in cache
+    assert cache.weight == 8
+
+    cache.set("b", 2, weight=1)
+    assert cache.weight == 5
+
+    # 超过权重上限的条目不会被缓存
+    cache.set("d", 4, weight=11)
+    assert "d" not in cache
+    assert cache.weight == 5
+
+
+def test_lru_cache__disabled():
+    cache = LRUCache(max_size=0)
+    cache.set("a", 1)
+    assert cache.get("a") is None
+
+
+def test_lru_cache__pop():
+    cache = LRUCache(max_size=2, max_weight=10)
+    cache.set("a", 1, weight=3)
+    cache.set("b", 2, weight=4)
+    assert cache.pop("a") == 1
+    assert cache.pop("a", "default") == "default"
+    assert "a" not in cache
+    assert cache.weight == 4
+
+
+def test_lru_cache__clear():
+    cache = LRUCache(max_size=2, max_weight=10)
+    cache.set("a", 1, weight=3)
+    cache.clear()
+    assert len(cache) == 0
+    assert cache.weight == 0
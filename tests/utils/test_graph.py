@@ -0,0 +1,40 @@
+# -*- coding: utf-8 -*-
+"""
+Tencent is pleased to support the open source community by making 蓝鲸智云PaaS平台社区版 (BlueKing PaaS Community
+Edition) available.
+Copyright (C) 2017-2021 THL A29 Limited, a Tencent company. All rights reserved.
+Licensed under the MIT License (the "License"); you may not use this file except in compliance with the License.
+You may obtain a copy of the License at
+http://opensource.org/licenses/MIT
+Unless required by applicable law or agreed to in writing, software distributed under the License is distributed on
+an "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the License for the
+specific language governing permissions and limitations under the License.
+"""
+
+from bamboo_engine.utils.graph import Graph
+
+
+def test_graph_without_cycle():
+    graph = Graph([1, 2, 3, 4], [[1, 2], [2, 3], [3, 4]])
+    assert not graph.has_cycle()
+    assert graph.get_cycle() == []
+
+
+def test_graph_get_cycle():
+    assert Graph([1, 2, 3, 4], [[1, 2], [2, 3], [3, 4], [4, 1]]).get_cycle() == [1, 2, 3, 4, 1]
+    assert Graph([1, 2, 3, 4], [[1, 2], [2, 3], [3, 4], [4, 2]]).get_cycle() == [2, 3, 4, 2]
+    assert Graph([1, 2, 3, 4, 5], [[1, 2], [2, 3], [2, 4], [4, 5], [5, 2]]).get_cycle() == [2, 4, 5, 2]
+
+
+def test_graph_get_cycle__self_loop():
+    assert Graph([1, 2], [[1, 2], [2, 2]]).get_cycle() == [2, 2]
+
+
+def test_graph_get_cycle__deep_graph():
+    size = 20000
+    nodes = list(range(size))
+    flows = [[i, i + 1] for i in range(size - 1)]
+    assert Graph(nodes, flows).get_cycle() == []
+
+    flows.append([size - 1, size - 3])
+    assert Graph(nodes, flows).get_cycle() == [size - 3, size - 2, size - 1, size - 3]
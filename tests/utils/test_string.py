@@ -11,6 +11,8 @@ an "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express o
 specific language governing permissions and limitations under the License.
 """
 
+import pytest
+
 from bamboo_engine.utils import string
 
 
@@ -26,4 +28,21 @@ def test_transform_escape_char():
     assert string.transform_escape_char({}) == {}
     assert string.transform_escape_char("k") == "k"
     assert string.transform_escape_char("\nk") == "\\nk"
-    assert string.transform_escape_char("\\nk") == "\\nk"
\ No newline at end of file
+    assert string.transform_escape_char("\\nk") == "\\nk"
+
+
+def test_unique_id_generator():
+    generator = string.UniqueIdGenerator()
+    ids = [generator("f") for _ in range(1000)]
+
+    assert len(set(ids)) == 1000
+    for uid in ids:
+        assert len(uid) == len(string.unique_id("f"))
+        assert uid.startswith("f")
+        int(uid[1:], 16)
+
+    assert generator("p")[1:17] == ids[0][1:17]
+    assert string.UniqueIdGenerator()("f")[1:17] != ids[0][1:17]
+
+    with pytest.raises(ValueError):
+        generator("ff")
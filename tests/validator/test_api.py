@@ -0,0 +1,200 @@
+# -*- coding: utf-8 -*-
+"""
+Tencent is pleased to support the open source community by making 蓝鲸智云PaaS平台社区版 (BlueKing PaaS Community
+Edition) available.
+Copyright (C) 2017-2021 THL A29 Limited, a Tencent company. All rights reserved.
+Licensed under the MIT License (the "License"); you may not use this file except in compliance with the License.
+You may obtain a copy of the License at
+http://opensource.org/licenses/MIT
+Unless required by applicable law or agreed to in writing, software distributed under the License is distributed on
+an "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the License for the
+specific language governing permissions and limitations under the License.
+"""
+
+import copy
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+
+import pytest
+
+from bamboo_engine import exceptions
+from bamboo_engine.builder import (
+    ConvergeGateway,
+    EmptyEndEvent,
+    EmptyStartEvent,
+    ExclusiveGateway,
+    ParallelGateway,
+    ServiceActivity,
+    SubProcess,
+    build_tree,
+)
+from bamboo_engine.validator import plan, validate_and_process_pipeline
+
+
+def setup_function():
+    plan.clear_compiled_plans()
+
+
+def _linear_pipeline(size):
+    start = EmptyStartEvent()
+    tail = start
+    for _ in range(size):
+        tail = tail.extend(ServiceActivity())
+    tail.extend(EmptyEndEvent())
+
+    return build_tree(start)
+
+
+def _blocks_pipeline(size):
+    start = EmptyStartEvent()
+    tail = start
+    gateways = []
+    for _ in range(size):
+        pg = tail.extend(ParallelGateway())
+        pg_cg = ConvergeGateway()
+        tail = pg.connect(ServiceActivity(), ServiceActivity()).to(pg).converge(pg_cg)
+        eg = tail.extend(ExclusiveGateway(conditions={0: "1 == 1", 1: "1 == 0"}))
+        eg_cg = ConvergeGateway()
+        tail = eg.connect(ServiceActivity(), ServiceActivity()).to(eg).converge(eg_cg)
+        gateways.append((pg.id, pg_cg.id))
+        gateways.append((eg.id, eg_cg.id))
+    tail.extend(EmptyEndEvent())
+
+    return build_tree(start), gateways
+
+
+def test_validate_large_linear_pipeline():
+    pipeline = _linear_pipeline(5000)
+    original_activity = next(iter(pipeline["activities"].values()))
+
+    validate_and_process_pipeline(pipeline)
+
+    # 校验过程不会在原始节点上留下中间数据
+    assert "source" not in original_activity
+    assert "target" not in original_activity
+    assert "stream" not in original_activity
+
+
+def test_validate_large_gateway_blocks_pipeline():
+    pipeline, gateways = _blocks_pipeline(1500)
+
+    validate_and_process_pipeline(pipeline)
+
+    for gateway_id, converge_id in gateways:
+        assert pipeline["gateways"][gateway_id]["converge_gateway_id"] == converge_id
+
+
+def test_validate_large_pipeline_with_cycle():
+    start = EmptyStartEvent()
+    first = start.extend(ServiceActivity())
+    tail = first
+    for _ in range(5000):
+        tail = tail.extend(ServiceActivity())
+    eg = tail.extend(ExclusiveGateway(conditions={0: "1 == 1", 1: "1 == 0"}))
+    eg.connect(EmptyEndEvent(), first)
+    pipeline = build_tree(start)
+
+    with pytest.raises(exceptions.TreeInvalidException):
+        validate_and_process_pipeline(pipeline)
+
+    validate_and_process_pipeline(pipeline, cycle_tolerate=True)
+
+
+def _nested_pipeline(branches, depth):
+    def subprocess_tree(level):
+        start = EmptyStartEvent()
+        pg = start.extend(ParallelGateway())
+        cg = ConvergeGateway()
+        for _ in range(branches):
+            tail = pg.extend(ServiceActivity())
+            if level < depth:
+                tail = tail.extend(SubProcess(start=subprocess_tree(level + 1)))
+            tail.extend(cg)
+        cg.extend(EmptyEndEvent())
+        return start
+
+    return build_tree(subprocess_tree(1))
+
+
+def _pipelines(pipeline):
+    yield pipeline
+    for act in pipeline["activities"].values():
+        if act["type"] == "SubProcess":
+            yield from _pipelines(act["pipeline"])
+
+
+@pytest.mark.parametrize("executor_class", [ThreadPoolExecutor, ProcessPoolExecutor])
+def test_validate_with_executor(executor_class):
+    pipeline = _nested_pipeline(branches=3, depth=3)
+    expect = copy.deepcopy(pipeline)
+    validate_and_process_pipeline(expect)
+
+    plan.clear_compiled_plans()
+    with executor_class(max_workers=2) as executor:
+        validate_and_process_pipeline(pipeline, executor=executor)
+
+    assert pipeline == expect
+    for p in _pipelines(pipeline):
+        for gateway in p["gateways"].values():
+            if gateway["type"] == "ParallelGateway":
+                assert gateway["converge_gateway_id"] in p["gateways"]
+
+
+def test_validate_with_executor__raise_as_serial():
+    pipeline = _nested_pipeline(branches=2, depth=3)
+    subprocs = [p for p in _pipelines(pipeline)][1:]
+    # 第一个子流程与根流程中的并行网关都缺少一条分支，串行校验时先校验子流程
+    for p in (subprocs[0], pipeline):
+        pg = next(g for g in p["gateways"].values() if g["type"] == "ParallelGateway")
+        pg["outgoing"] = pg["outgoing"][:1]
+
+    with pytest.raises(exceptions.StreamValidateError) as serial_err:
+        validate_and_process_pipeline(copy.deepcopy(pipeline))
+    assert serial_err.value.node_id in {**subprocs[0]["activities"], **subprocs[0]["gateways"]}
+
+    with ThreadPoolExecutor(max_workers=4) as executor:
+        with pytest.raises(exceptions.StreamValidateError) as parallel_err:
+            validate_and_process_pipeline(pipeline, executor=executor)
+
+    assert parallel_err.value.node_id == serial_err.value.node_id
+
+
+def _break_connection(pipeline):
+    act = next(iter(pipeline["activities"].values()))
+    pipeline["flows"][act["outgoing"]]["target"] = pipeline["start_event"]["id"]
+
+
+def _break_converge(pipeline):
+    pg = next(g for g in pipeline["gateways"].values() if g["type"] == "ParallelGateway")
+    pipeline["flows"][pg["outgoing"][0]]["target"] = pipeline["end_event"]["id"]
+
+
+def _break_stream(pipeline):
+    pg = next(g for g in pipeline["gateways"].values() if g["type"] == "ParallelGateway")
+    pg["outgoing"] = pg["outgoing"][:1]
+
+
+@pytest.mark.parametrize(
+    "break_pipeline, error_class, attrs",
+    [
+        (_break_connection, exceptions.ConnectionValidateError, ["failed_nodes", "detail"]),
+        (_break_converge, exceptions.ConvergeMatchError, ["gateway_id"]),
+        (_break_stream, exceptions.StreamValidateError, ["node_id"]),
+    ],
+)
+def test_validate_with_process_pool__raise_as_serial(break_pipeline, error_class, attrs):
+    pipeline = _nested_pipeline(branches=2, depth=2)
+    break_pipeline([p for p in _pipelines(pipeline)][1])
+
+    with pytest.raises(error_class) as serial_err:
+        validate_and_process_pipeline(copy.deepcopy(pipeline))
+
+    with ProcessPoolExecutor(max_workers=2) as executor:
+        with pytest.raises(error_class) as parallel_err:
+            validate_and_process_pipeline(copy.deepcopy(pipeline), executor=executor)
+
+        # 异常能够正常传回，进程池在校验失败后仍然可用
+        validate_and_process_pipeline(_nested_pipeline(branches=2, depth=2), executor=executor)
+
+    assert parallel_err.value.args == serial_err.value.args
+    for attr in attrs:
+        assert getattr(parallel_err.value, attr) == getattr(serial_err.value, attr)
@@ -11,8 +11,26 @@ an "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express o
 specific language governing permissions and limitations under the License.
 """
 
+import pytest
 
-from .cases import *  # noqa
+from bamboo_engine import exceptions
+from bamboo_engine.validator.gateway import (
+    STREAM,
+    distance_from,
+    match_converge,
+    validate_gateways,
+    validate_stream,
+)
+from bamboo_engine.validator.utils import PipelineIndex
+
+from .cases import (
+    flow_invalid_cases,
+    flow_valid_case,
+    flow_valid_edge_cases,
+    gateway_invalid_cases,
+    gateway_valid_cases,
+)
+from .utils import end_event_id
 
 
 def test_distance_from_start():
@@ -41,6 +59,17 @@ def test_distance_from_start():
         )
 
 
+def test_distance_from_start_with_index():
+    tree, gateway_validation_assert, _ = flow_valid_case()
+    index = PipelineIndex(tree)
+    distances = {}
+    for gid, g in list(tree["gateways"].items()):
+        distance_from(origin=tree["start_event"], node=g, tree=tree, marked=distances, index=index)
+
+    for gid, ga in list(gateway_validation_assert.items()):
+        assert distances[gid] == ga["distance"]
+
+
 def test_match_converge():
     for n, i in enumerate(gateway_valid_cases, start=1):
         converge, gateway, stack, eid, start, distances, in_len = i["case"]()
@@ -214,3 +243,16 @@ def test_validate_stream():
             invalid = True
 
         assert invalid == True, "invalid case %s expect raise exception" % n
+
+
+def test_validate_gateway__activity_cycle():
+    tree, _, _ = flow_valid_case()
+    gateway_id, gateway = next(iter(tree["gateways"].items()))
+    act_id = "act_cycle"
+    tree["activities"][act_id] = {"id": act_id, "type": "ServiceActivity", "incoming": [], "outgoing": "f_cycle"}
+    tree["flows"]["f_cycle"] = {"id": "f_cycle", "source": act_id, "target": act_id}
+    tree["flows"][gateway["outgoing"][0]]["target"] = act_id
+
+    with pytest.raises(exceptions.ConvergeMatchError) as e:
+        validate_gateways(tree)
+    assert e.value.gateway_id == gateway_id
@@ -0,0 +1,125 @@
+# -*- coding: utf-8 -*-
+"""
+Tencent is pleased to support the open source community by making 蓝鲸智云PaaS平台社区版 (BlueKing PaaS Community
+Edition) available.
+Copyright (C) 2017-2021 THL A29 Limited, a Tencent company. All rights reserved.
+Licensed under the MIT License (the "License"); you may not use this file except in compliance with the License.
+You may obtain a copy of the License at
+http://opensource.org/licenses/MIT
+Unless required by applicable law or agreed to in writing, software distributed under the License is distributed on
+an "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the License for the
+specific language governing permissions and limitations under the License.
+"""
+
+import copy
+
+import pytest
+
+from bamboo_engine import exceptions
+from bamboo_engine.builder import (
+    ConvergeGateway,
+    EmptyEndEvent,
+    EmptyStartEvent,
+    ExclusiveGateway,
+    ParallelGateway,
+    ServiceActivity,
+    build_tree,
+)
+from bamboo_engine.validator import plan, validate_and_process_pipeline
+from bamboo_engine.validator.gateway import validate_gateways, validate_stream
+
+
+def setup_function():
+    plan.clear_compiled_plans()
+
+
+def _build_pipeline():
+    start = EmptyStartEvent()
+    act_1 = ServiceActivity()
+    pg = ParallelGateway()
+    act_2 = ServiceActivity()
+    eg = ExclusiveGateway(conditions={0: "1 == 1", 1: "1 == 0"})
+    act_3 = ServiceActivity()
+    act_4 = ServiceActivity()
+    eg_cg = ConvergeGateway()
+    pg_cg = ConvergeGateway()
+    end = EmptyEndEvent()
+
+    start.extend(act_1).extend(pg).connect(act_2, eg)
+    eg.connect(act_3, act_4).converge(eg_cg)
+    act_2.connect(pg_cg)
+    eg_cg.connect(pg_cg)
+    pg_cg.extend(end)
+
+    return build_tree(start)
+
+
+def _converge_pairs(pipeline):
+    return {gid: g.get("converge_gateway_id") for gid, g in pipeline["gateways"].items()}
+
+
+def test_validate_with_compiled_plan():
+    pipeline_1 = _build_pipeline()
+    pipeline_2 = _build_pipeline()
+    expect = copy.deepcopy(pipeline_2)
+
+    validate_and_process_pipeline(pipeline_1)
+    assert len(plan.PLAN_CACHE) == 1
+
+    validate_and_process_pipeline(pipeline_2)
+    assert len(plan.PLAN_CACHE) == 1
+
+    # 与完整校验的结果保持一致
+    validate_gateways(expect)
+    validate_stream(expect)
+    assert _converge_pairs(pipeline_2) == _converge_pairs(expect)
+    assert set(_converge_pairs(pipeline_2).values()) - {None}
+
+
+def test_validate_with_compiled_plan__structure_changed():
+    pipeline_1 = _build_pipeline()
+    pipeline_2 = _build_pipeline()
+    list(pipeline_2["activities"].values())[0]["type"] = "SubProcess"
+
+    digest_1, _ = plan.get_pipeline_structure(pipeline_1, False)
+    digest_2, _ = plan.get_pipeline_structure(pipeline_2, False)
+    digest_3, _ = plan.get_pipeline_structure(pipeline_1, True)
+
+    assert len({digest_1, digest_2, digest_3}) == 3
+
+
+def test_get_pipeline_structure__unreachable_node():
+    pipeline = _build_pipeline()
+    pipeline["activities"]["unreachable"] = {
+        "id": "unreachable",
+        "type": "ServiceActivity",
+        "incoming": [],
+        "outgoing": "",
+    }
+
+    assert plan.get_pipeline_structure(pipeline, False) is None
+
+
+def test_get_pipeline_structure__missing_flow():
+    pipeline = _build_pipeline()
+    pipeline["flows"].pop(pipeline["start_event"]["outgoing"])
+
+    assert plan.get_pipeline_structure(pipeline, False) is None
+
+
+def test_invalid_pipeline_not_cached():
+    start = EmptyStartEvent()
+    pg = ParallelGateway()
+    act_1 = ServiceActivity()
+    act_2 = ServiceActivity()
+    end = EmptyEndEvent()
+    start.extend(pg).connect(act_1, act_2)
+    act_1.extend(end)
+    act_2.connect(end)
+    pipeline = build_tree(start)
+
+    for _ in range(2):
+        with pytest.raises(exceptions.TreeInvalidException):
+            validate_and_process_pipeline(copy.deepcopy(pipeline))
+
+    assert len(plan.PLAN_CACHE) == 0
@@ -0,0 +1,102 @@
+# -*- coding: utf-8 -*-
+"""
+Tencent is pleased to support the open source community by making 蓝鲸智云PaaS平台社区版 (BlueKing PaaS Community
+Edition) available.
+Copyright (C) 2017-2021 THL A29 Limited, a Tencent company. All rights reserved.
+Licensed under the MIT License (the "License"); you may not use this file except in compliance with the License.
+You may obtain a copy of the License at
+http://opensource.org/licenses/MIT
+Unless required by applicable law or agreed to in writing, software distributed under the License is distributed on
+an "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the License for the
+specific language governing permissions and limitations under the License.
+"""
+
+import pytest
+
+from bamboo_engine.exceptions import ValueError
+from bamboo_engine.validator.connection import validate_graph_without_circle
+from bamboo_engine.validator.utils import PipelineIndex, get_node_for_sequence
+
+
+def chain_pipeline():
+    # s -> pg -> a1 -> a2 -> a3 -> cg -> e
+    #         -> a4 -> a2
+    return {
+        "start_event": {"id": "s", "type": "EmptyStartEvent", "incoming": "", "outgoing": "f0"},
+        "end_event": {"id": "e", "type": "EmptyEndEvent", "incoming": ["f7"], "outgoing": ""},
+        "activities": {
+            "a1": {"id": "a1", "type": "ServiceActivity", "incoming": ["f2"], "outgoing": "f3"},
+            "a2": {"id": "a2", "type": "ServiceActivity", "incoming": ["f3", "f5"], "outgoing": "f4"},
+            "a3": {"id": "a3", "type": "ServiceActivity", "incoming": ["f4"], "outgoing": "f6"},
+            "a4": {"id": "a4", "type": "ServiceActivity", "incoming": ["f1"], "outgoing": "f5"},
+        },
+        "gateways": {
+            "pg": {"id": "pg", "type": "ParallelGateway", "incoming": ["f0"], "outgoing": ["f1", "f2"]},
+            "cg": {"id": "cg", "type": "ConvergeGateway", "incoming": ["f6"], "outgoing": "f7"},
+        },
+        "flows": {
+            "f0": {"id": "f0", "source": "s", "target": "pg"},
+            "f1": {"id": "f1", "source": "pg", "target": "a4"},
+            "f2": {"id": "f2", "source": "pg", "target": "a1"},
+            "f3": {"id": "f3", "source": "a1", "target": "a2"},
+            "f4": {"id": "f4", "source": "a2", "target": "a3"},
+            "f5": {"id": "f5", "source": "a4", "target": "a2"},
+            "f6": {"id": "f6", "source": "a3", "target": "cg"},
+            "f7": {"id": "f7", "source": "cg", "target": "e"},
+        },
+    }
+
+
+def test_pipeline_index__node_ids():
+    index = PipelineIndex(chain_pipeline())
+
+    assert index.node_ids == ["s", "e", "pg", "cg", "a1", "a2", "a3", "a4"]
+    assert index.node_count == 8
+    assert [index.is_activity(i) for i in range(index.node_count)] == [False] * 4 + [True] * 4
+    assert list(index.flow_source) == [0, 2, 2, 4, 5, 7, 6, 3]
+    assert list(index.flow_target) == [2, 7, 4, 5, 6, 5, 3, 1]
+
+
+def test_pipeline_index__next_hop():
+    index = PipelineIndex(chain_pipeline())
+
+    assert index.next_hop("f0") == "pg"
+    assert index.next_hop("f2") == "cg"
+    # a1 -> a2 -> a3 路径已压缩，从 a4 出发只需要经过一跳
+    assert list(index._next_hop[4:7]) == [3, 3, 3]
+    assert index.next_hop("f1") == "cg"
+    assert index.next_hop("f7") == "e"
+
+
+def test_pipeline_index__next_hop_in_activity_cycle():
+    pipeline = chain_pipeline()
+    pipeline["flows"]["f6"]["target"] = "a1"
+
+    index = PipelineIndex(pipeline)
+
+    assert index.next_hop("f1") is None
+    assert index.next_hop("f2") is None
+    assert index.next_hop("f0") == "pg"
+
+
+def test_pipeline_index__node_for_sequence():
+    pipeline = chain_pipeline()
+    pipeline["flows"]["f8"] = {"id": "f8", "source": "cg", "target": "not_exist"}
+    index = PipelineIndex(pipeline)
+
+    for flow_id in ["f0", "f1", "f5", "f7"]:
+        for node_type in ["source", "target"]:
+            assert index.node_for_sequence(flow_id, node_type) is get_node_for_sequence(flow_id, pipeline, node_type)
+
+    with pytest.raises(ValueError):
+        index.node_for_sequence("f8", "target")
+
+
+def test_validate_graph_without_circle_with_index():
+    pipeline = chain_pipeline()
+    assert validate_graph_without_circle(pipeline, PipelineIndex(pipeline)) == {"result": True, "data": []}
+
+    pipeline["flows"]["f6"]["target"] = "a1"
+    result = validate_graph_without_circle(pipeline, PipelineIndex(pipeline))
+    assert result == validate_graph_without_circle(pipeline)
+    assert result["error_data"] == ["a2", "a3", "a1", "a2"]